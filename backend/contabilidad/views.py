@@ -20,6 +20,7 @@ from .serializers import (
     ReporteFinancieroResumenSerializer,
     GenerarReporteSerializer
 )
+from finanzas_reportes.trabajos import en_segundo_plano
 
 
 class PlanCuentasViewSet(viewsets.ModelViewSet):
@@ -146,6 +147,7 @@ class ReportesFinancierosViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     @action(detail=False, methods=['post'])
+    @en_segundo_plano
     def generar(self, request):
         """Genera reportes financieros"""
         serializer = GenerarReporteSerializer(data=request.data)
@@ -204,3 +204,47 @@ LOGGING = {
 # True = sistema de undo activo (registra acciones deshacibles)
 # Puede ser sobrescrito en dev.py, prod.py, etc.
 ENABLE_UNDO_SYSTEM = False
+
+# ===================================================================
+# REPORTES EN SEGUNDO PLANO
+# ===================================================================
+# Segundos que se conserva el resultado de un reporte asincrónico
+# (ver finanzas_reportes/trabajos.py y `manage.py run_report_worker`)
+REPORTES_RESULTADO_TTL = int(os.getenv('REPORTES_RESULTADO_TTL', 24 * 60 * 60))
+# ?asincrono=1 sólo encola si hay un `run_report_worker` corriendo; si no,
+# el reporte se calcula en el request como cualquier llamada sincrónica
+REPORTES_ASINCRONOS = os.getenv('REPORTES_ASINCRONOS', 'False').lower() == 'true'
+
+# ===================================================================
+# AFIP (WSAA / WSFEv1)
+# ===================================================================
+# Vacías = URLs oficiales según el ambiente de la ConfiguracionAFIP.
+# Para probar sin AFIP: `manage.py run_afip_stub` y apuntarlas al stub
+# (ver finanzas_reportes/afip_stub.py)
+AFIP_WSAA_URL = os.getenv('AFIP_WSAA_URL', '')
+AFIP_WSFE_URL = os.getenv('AFIP_WSFE_URL', '')
+# Segundos de espera por respuesta de AFIP
+AFIP_TIMEOUT = int(os.getenv('AFIP_TIMEOUT', 30))
+# Alias de CACHES donde se comparten los tickets del WSAA entre workers
+# (ver finanzas_reportes/wsaa.py); tiene que ser un cache compartido
+AFIP_TICKETS_CACHE = os.getenv('AFIP_TICKETS_CACHE', 'default')
+
+# Alias de CACHES de los reportes cacheados y sus versiones por tabla (ver
+# finanzas_reportes/cache_reportes.py); con varios workers tiene que ser un
+# cache compartido para que un cambio invalide los reportes en todos
+REPORTES_CACHE = os.getenv('REPORTES_CACHE', 'default')
+
+# ===================================================================
+# PDF de facturas electrónicas (ver finanzas_reportes/facturas_pdf.py)
+# ===================================================================
+FACTURAS_PDF_DIR = Path(os.getenv('FACTURAS_PDF_DIR', MEDIA_ROOT / 'facturas_pdf'))
+FACTURAS_PDF_LOGO = Path(os.getenv('FACTURAS_PDF_LOGO', BASE_DIR / 'static' / 'logo.png'))
+# Procesos para generar PDF en lote (vacío = uno por CPU)
+FACTURAS_PDF_PROCESOS = int(os.getenv('FACTURAS_PDF_PROCESOS', 0)) or None
+
+# ===================================================================
+# Archivo de LogAFIP (ver finanzas_reportes/logs_afip.py)
+# ===================================================================
+# Meses de logs que quedan en la base, contando el actual
+LOGS_AFIP_MESES_RETENCION = int(os.getenv('LOGS_AFIP_MESES_RETENCION', 6))
+LOGS_AFIP_ARCHIVO_DIR = Path(os.getenv('LOGS_AFIP_ARCHIVO_DIR', BASE_DIR / 'archivo' / 'logs_afip'))
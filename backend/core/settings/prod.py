@@ -134,8 +134,30 @@ else:
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
             'LOCATION': 'unique-snowflake',
-        }
+        },
+        # Tickets WSAA: tienen que verse desde todos los workers
+        'afip': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('AFIP_TICKETS_DIR', str(BASE_DIR / '.cache' / 'afip')),
+        },
+        # Reportes cacheados y sus versiones: un cambio en un worker tiene
+        # que invalidar los reportes de todos
+        'reportes': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('REPORTES_CACHE_DIR', str(BASE_DIR / '.cache' / 'reportes')),
+            'TIMEOUT': 300,
+        },
+        # Para procesos que no comparten disco con el web (worker de reportes)
+        'sin_cache': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
     }
+    AFIP_TICKETS_CACHE = 'afip'
+    REPORTES_CACHE = os.getenv('REPORTES_CACHE', 'reportes')
+
+# Un cache por proceso no invalida los reportes cacheados en los demás workers
+if 'locmem' in CACHES.get(REPORTES_CACHE, {}).get('BACKEND', '').lower():
+    raise ValueError("REPORTES_CACHE must point to a shared cache (Redis, database or file based) in production")
 
 # Session - Use cache if available
 if os.getenv('REDIS_URL'):
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import (
+    MovimientoCuentaCorriente,
     MovimientoFinanciero,
     PagoCliente,
     PagoProveedor,
@@ -30,6 +31,22 @@ class MovimientoFinancieroAdmin(admin.ModelAdmin):
     list_filter = ("fecha", "tipo")
     search_fields = ("descripcion", "referencia_extra")
 
+@admin.register(MovimientoCuentaCorriente)
+class MovimientoCuentaCorrienteAdmin(admin.ModelAdmin):
+    list_display = ("id", "fecha", "cliente", "tipo", "debe", "haber", "saldo")
+    search_fields = ("cliente__razon_social", "cliente__nombre_fantasia", "descripcion")
+    list_filter = ("fecha", "tipo")
+
+    # Libro de solo alta: se escribe desde cuenta_corriente.py
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(PagoProveedor)
 class PagoProveedorAdmin(admin.ModelAdmin):
     list_display = ("id", "fecha", "proveedor", "monto")
@@ -0,0 +1,206 @@
+"""
+Transporte SOAP para los web services de AFIP (WSAA y WSFEv1).
+
+Sólo biblioteca estándar (http.client + xml.etree): el proyecto no
+depende de requests ni de zeep.
+
+- Conexiones persistentes: cada hilo guarda una conexión HTTP/1.1 por
+  host y la reutiliza mientras el servidor no la cierre, así un lote de
+  solicitudes no paga un handshake TLS por llamada.
+- Reintentos: errores de red, timeouts y HTTP 5xx sin SOAP Fault se
+  reintentan hasta MAX_REINTENTOS veces con espera exponencial (con
+  jitter). Un SOAP Fault es una respuesta de AFIP y no se reintenta.
+
+La respuesta indica cuántos reintentos hizo falta: si hubo alguno, AFIP
+pudo haber procesado un intento anterior (ver wsfe.py).
+"""
+
+import http.client
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+
+MAX_REINTENTOS = 3
+
+# Segundos de espera antes del primer reintento; se duplica en cada uno
+ESPERA_BASE = 0.5
+
+ET.register_namespace("soap", SOAP_ENV)
+
+
+class ErrorAFIP(Exception):
+    """AFIP rechazó la solicitud (SOAP Fault o error de negocio)."""
+
+    def __init__(self, mensaje, codigo=""):
+        super().__init__(mensaje)
+        self.codigo = str(codigo)
+
+
+class ErrorComunicacion(ErrorAFIP):
+    """No se obtuvo respuesta de AFIP (red, timeout o HTTP 5xx) luego de los reintentos."""
+
+
+class RespuestaSOAP:
+    """Resultado de una llamada: XML enviado y recibido y el elemento de respuesta."""
+
+    def __init__(self, request_xml, response_xml, cuerpo, reintentos):
+        self.request_xml = request_xml
+        self.response_xml = response_xml
+        self.cuerpo = cuerpo
+        self.reintentos = reintentos
+
+
+def timeout():
+    return getattr(settings, "AFIP_TIMEOUT", 30)
+
+
+# ============================================================================
+# CONEXIONES
+# ============================================================================
+
+_local = threading.local()
+
+
+def _conexiones():
+    if not hasattr(_local, "conexiones"):
+        _local.conexiones = {}
+    return _local.conexiones
+
+
+def _conexion(partes):
+    clave = (partes.scheme, partes.hostname, partes.port)
+    conexiones = _conexiones()
+    if clave not in conexiones:
+        clase = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+        conexiones[clave] = clase(partes.hostname, partes.port, timeout=timeout())
+    return clave, conexiones[clave]
+
+
+def _descartar(clave):
+    conexion = _conexiones().pop(clave, None)
+    if conexion is not None:
+        conexion.close()
+
+
+def cerrar_conexiones():
+    """Cierra las conexiones abiertas por el hilo actual."""
+    for clave in list(_conexiones()):
+        _descartar(clave)
+
+
+def _enviar(url, accion, datos):
+    partes = urlsplit(url)
+    ruta = partes.path or "/"
+    if partes.query:
+        ruta += f"?{partes.query}"
+
+    clave, conexion = _conexion(partes)
+    try:
+        conexion.request("POST", ruta, body=datos, headers={
+            "Content-Type": "text/xml; charset=utf-8",
+            "SOAPAction": f'"{accion}"',
+        })
+        respuesta = conexion.getresponse()
+        contenido = respuesta.read()
+    except (OSError, http.client.HTTPException):
+        _descartar(clave)
+        raise
+    if respuesta.will_close:
+        _descartar(clave)
+    return respuesta.status, contenido
+
+
+# ============================================================================
+# XML
+# ============================================================================
+
+def sobre(cuerpo):
+    """Serializa un Envelope SOAP 1.1 con `cuerpo` (Element) en el Body."""
+    envelope = ET.Element(f"{{{SOAP_ENV}}}Envelope")
+    ET.SubElement(envelope, f"{{{SOAP_ENV}}}Body").append(cuerpo)
+    return ET.tostring(envelope, encoding="utf-8", xml_declaration=True)
+
+
+def agregar(padre, ns, nombre, texto=None):
+    """Agrega el hijo `nombre` (en el namespace `ns`) y lo devuelve."""
+    elemento = ET.SubElement(padre, f"{{{ns}}}{nombre}")
+    if texto is not None:
+        elemento.text = str(texto)
+    return elemento
+
+
+def texto(elemento, ns, *ruta, default=""):
+    """Texto del descendiente `ruta` (nombres sin namespace), o `default`."""
+    if elemento is None:
+        return default
+    hallado = elemento.find("/".join(f"{{{ns}}}{nombre}" for nombre in ruta))
+    if hallado is None or hallado.text is None:
+        return default
+    return hallado.text.strip()
+
+
+def _cuerpo(contenido):
+    """Primer elemento del Body. Raises ErrorAFIP si es un Fault o el XML no es válido."""
+    try:
+        raiz = ET.fromstring(contenido)
+    except ET.ParseError as e:
+        raise ErrorAFIP(f"Respuesta de AFIP inválida: {e}")
+    body = raiz.find(f"{{{SOAP_ENV}}}Body")
+    if body is None or len(body) == 0:
+        raise ErrorAFIP("Respuesta de AFIP sin cuerpo SOAP")
+    cuerpo = body[0]
+    if cuerpo.tag == f"{{{SOAP_ENV}}}Fault":
+        raise ErrorAFIP(
+            cuerpo.findtext("faultstring", "").strip() or "SOAP Fault",
+            codigo=cuerpo.findtext("faultcode", "").strip(),
+        )
+    return cuerpo
+
+
+def _es_fault(contenido):
+    try:
+        _cuerpo(contenido)
+    except ErrorAFIP as e:
+        return bool(e.codigo)
+    return False
+
+
+# ============================================================================
+# LLAMADA
+# ============================================================================
+
+def llamar(url, accion, cuerpo):
+    """
+    Envía `cuerpo` (Element) a `url` con el SOAPAction `accion`.
+
+    Returns:
+        RespuestaSOAP
+
+    Raises:
+        ErrorAFIP: SOAP Fault o respuesta inválida.
+        ErrorComunicacion: Sin respuesta válida luego de MAX_REINTENTOS.
+    """
+    datos = sobre(cuerpo)
+    reintentos = 0
+    while True:
+        try:
+            estado, contenido = _enviar(url, accion, datos)
+        except (OSError, http.client.HTTPException) as e:
+            error = ErrorComunicacion(f"Error de comunicación con AFIP: {e}")
+        else:
+            if estado < 500 or _es_fault(contenido):
+                return RespuestaSOAP(
+                    datos.decode(), contenido.decode("utf-8", "replace"), _cuerpo(contenido), reintentos
+                )
+            error = ErrorComunicacion(f"AFIP respondió HTTP {estado}", codigo=estado)
+
+        if reintentos >= MAX_REINTENTOS:
+            raise error
+        time.sleep(ESPERA_BASE * 2 ** reintentos * (1 + random.random()))
+        reintentos += 1
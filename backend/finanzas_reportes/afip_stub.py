@@ -0,0 +1,322 @@
+"""
+Servidor local que imita el WSAA y el WSFEv1 de AFIP.
+
+Sirve para probar la autorización sin conexión a AFIP (tests, desarrollo y
+pruebas de rendimiento). Responde loginCms, FEDummy,
+FECompUltimoAutorizado, FECompConsultar y FECAESolicitar con las mismas
+validaciones de numeración que AFIP: cada comprobante debe ser el
+siguiente al último autorizado de su punto de venta y tipo, así un
+rechazo hace fallar por numeración a los siguientes de la solicitud.
+
+Uso:
+    python manage.py run_afip_stub --puerto 8765
+
+    AFIP_WSAA_URL=http://127.0.0.1:8765/ws/services/LoginCms
+    AFIP_WSFE_URL=http://127.0.0.1:8765/wsfev1/service.asmx
+
+En tests se levanta en un hilo con ServidorAFIPStub().iniciar(). Permite
+simular fallas: `fallas` respuestas HTTP 503 seguidas (de cualquier
+operación o sólo de `operacion_con_fallas`), documentos a rechazar
+(`documentos_rechazados`) y `latencia` por solicitud.
+"""
+
+import itertools
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.utils import timezone
+
+from .afip_soap import SOAP_ENV
+from .wsaa import NS as NS_WSAA
+from .wsfe import ERROR_NUMERACION, ERROR_TICKET, MAX_POR_SOLICITUD, NS as NS_WSFE
+
+RUTA_WSAA = "/ws/services/LoginCms"
+RUTA_WSFE = "/wsfev1/service.asmx"
+
+# Rechazo del documento del receptor
+ERROR_DOCUMENTO = "10015"
+ERROR_IMPORTES = "10048"
+ERROR_CANTIDAD = "10001"
+ERROR_NO_EXISTE = "602"
+
+
+def _sobre(cuerpo):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<soap:Envelope xmlns:soap="{SOAP_ENV}"><soap:Body>{cuerpo}</soap:Body></soap:Envelope>'
+    ).encode()
+
+
+def _fault(mensaje):
+    return _sobre(
+        f"<soap:Fault><faultcode>soap:Client</faultcode><faultstring>{mensaje}</faultstring></soap:Fault>"
+    )
+
+
+def _errores(errores):
+    if not errores:
+        return ""
+    return "<Errors>" + "".join(
+        f"<Err><Code>{codigo}</Code><Msg>{mensaje}</Msg></Err>" for codigo, mensaje in errores
+    ) + "</Errors>"
+
+
+class ServidorAFIPStub:
+    """Estado del stub: numeración y comprobantes autorizados, contadores y fallas simuladas."""
+
+    def __init__(self, puerto=0, latencia=0):
+        self.puerto = puerto
+        self.latencia = latencia
+        self.fallas = 0
+        # None = cualquier operación
+        self.operacion_con_fallas = None
+        self.documentos_rechazados = set()
+        self.comprobantes = {}
+        self.ultimos = {}
+        self.solicitudes = []
+        self.conexiones = set()
+        self.logins = 0
+        # Tokens emitidos por loginCms; vaciarlo simula tickets revocados
+        self.tokens = set()
+        self._cae = itertools.count(70000000000001)
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.puerto}"
+
+    @property
+    def url_wsaa(self):
+        return self.url + RUTA_WSAA
+
+    @property
+    def url_wsfe(self):
+        return self.url + RUTA_WSFE
+
+    def crear_servidor(self):
+        estado = self
+
+        class Manejador(_Manejador):
+            stub = estado
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        return self._servidor
+
+    def iniciar(self):
+        """Levanta el servidor en un hilo (puerto libre si puerto=0)."""
+        self.crear_servidor()
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+    def ultimo(self, punto_venta, tipo):
+        return self.ultimos.get((punto_venta, tipo), 0)
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def login(self, operacion):
+        with self._lock:
+            self.logins += 1
+            numero = self.logins
+            self.tokens.add(f"token-{numero}")
+        expiracion = timezone.now() + timedelta(hours=12)
+        ticket = (
+            "<loginTicketResponse version=\"1.0\"><header>"
+            f"<expirationTime>{expiracion.isoformat()}</expirationTime></header>"
+            f"<credentials><token>token-{numero}</token><sign>sign-{numero}</sign></credentials>"
+            "</loginTicketResponse>"
+        )
+        escapado = ticket.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        return f'<loginCmsResponse xmlns="{NS_WSAA}"><loginCmsReturn>{escapado}</loginCmsReturn></loginCmsResponse>'
+
+    def fe_dummy(self, operacion):
+        return (
+            f'<FEDummyResponse xmlns="{NS_WSFE}"><FEDummyResult>'
+            "<AppServer>OK</AppServer><DbServer>OK</DbServer><AuthServer>OK</AuthServer>"
+            "</FEDummyResult></FEDummyResponse>"
+        )
+
+    def fe_comp_ultimo_autorizado(self, operacion):
+        dato = _lector(operacion)
+        punto_venta, tipo = int(dato("PtoVta")), int(dato("CbteTipo"))
+        with self._lock:
+            ultimo = self.ultimo(punto_venta, tipo)
+        return (
+            f'<FECompUltimoAutorizadoResponse xmlns="{NS_WSFE}"><FECompUltimoAutorizadoResult>'
+            f"<PtoVta>{punto_venta}</PtoVta><CbteTipo>{tipo}</CbteTipo><CbteNro>{ultimo}</CbteNro>"
+            "</FECompUltimoAutorizadoResult></FECompUltimoAutorizadoResponse>"
+        )
+
+    def fe_comp_consultar(self, operacion):
+        dato = _lector(operacion)
+        clave = (int(dato("FeCompConsReq", "PtoVta")), int(dato("FeCompConsReq", "CbteTipo")),
+                 int(dato("FeCompConsReq", "CbteNro")))
+        with self._lock:
+            comprobante = self.comprobantes.get(clave)
+        if comprobante is None:
+            contenido = _errores([(ERROR_NO_EXISTE, "No existen datos en nuestros registros")])
+        else:
+            contenido = "<ResultGet>" + "".join(
+                f"<{campo}>{valor}</{campo}>" for campo, valor in comprobante.items()
+            ) + "</ResultGet>"
+        return (
+            f'<FECompConsultarResponse xmlns="{NS_WSFE}"><FECompConsultarResult>{contenido}'
+            "</FECompConsultarResult></FECompConsultarResponse>"
+        )
+
+    def fe_cae_solicitar(self, operacion):
+        dato = _lector(operacion)
+        punto_venta = int(dato("FeCAEReq", "FeCabReq", "PtoVta"))
+        tipo = int(dato("FeCAEReq", "FeCabReq", "CbteTipo"))
+        detalles = operacion.findall(f"{{{NS_WSFE}}}FeCAEReq/{{{NS_WSFE}}}FeDetReq/{{{NS_WSFE}}}FECAEDetRequest")
+
+        cabecera = f"<FeCabResp><PtoVta>{punto_venta}</PtoVta><CbteTipo>{tipo}</CbteTipo>"
+        if len(detalles) != int(dato("FeCAEReq", "FeCabReq", "CantReg")) or len(detalles) > MAX_POR_SOLICITUD:
+            return self._respuesta_cae(cabecera + "<Resultado>R</Resultado></FeCabResp>", "", [
+                (ERROR_CANTIDAD, "CantReg no coincide con los comprobantes informados o supera el máximo"),
+            ])
+
+        respuestas, resultados = [], set()
+        with self._lock:
+            self.solicitudes.append(len(detalles))
+            for detalle in detalles:
+                respuesta = self._autorizar_detalle(punto_venta, tipo, _lector(detalle))
+                resultados.add(respuesta[1])
+                respuestas.append(respuesta[0])
+        resultado = "P" if len(resultados) > 1 else resultados.pop()
+        return self._respuesta_cae(
+            cabecera + f"<Resultado>{resultado}</Resultado></FeCabResp>",
+            "<FeDetResp>" + "".join(respuestas) + "</FeDetResp>",
+        )
+
+    def _autorizar_detalle(self, punto_venta, tipo, dato):
+        numero = int(dato("CbteDesde"))
+        fecha = dato("CbteFch")
+        observaciones = []
+        if numero != int(dato("CbteHasta")) or numero != self.ultimo(punto_venta, tipo) + 1:
+            observaciones.append((ERROR_NUMERACION, "El número o fecha del comprobante no se corresponde "
+                                                    "con el próximo a autorizar"))
+        if dato("DocNro") in self.documentos_rechazados:
+            observaciones.append((ERROR_DOCUMENTO, "DocNro inválido"))
+        componentes = sum(Decimal(dato(campo) or "0") for campo in (
+            "ImpTotConc", "ImpNeto", "ImpOpEx", "ImpTrib", "ImpIVA",
+        ))
+        if componentes != Decimal(dato("ImpTotal")):
+            observaciones.append((ERROR_IMPORTES, "ImpTotal no es la suma de los importes"))
+
+        cae, vencimiento = "", ""
+        if not observaciones:
+            cae = str(next(self._cae))
+            vencimiento = (datetime.strptime(fecha, "%Y%m%d") + timedelta(days=10)).strftime("%Y%m%d")
+            self.ultimos[(punto_venta, tipo)] = numero
+            self.comprobantes[(punto_venta, tipo, numero)] = {
+                "Concepto": dato("Concepto"), "DocTipo": dato("DocTipo"), "DocNro": dato("DocNro"),
+                "CbteDesde": numero, "CbteHasta": numero, "CbteFch": fecha,
+                "ImpTotal": dato("ImpTotal"), "Resultado": "A", "CodAutorizacion": cae,
+                "EmisionTipo": "CAE", "FchVto": vencimiento, "PtoVta": punto_venta, "CbteTipo": tipo,
+            }
+        resultado = "R" if observaciones else "A"
+        obs = ""
+        if observaciones:
+            obs = "<Observaciones>" + "".join(
+                f"<Obs><Code>{codigo}</Code><Msg>{mensaje}</Msg></Obs>" for codigo, mensaje in observaciones
+            ) + "</Observaciones>"
+        return (
+            "<FECAEDetResponse>"
+            f"<Concepto>{dato('Concepto')}</Concepto><DocTipo>{dato('DocTipo')}</DocTipo>"
+            f"<DocNro>{dato('DocNro')}</DocNro><CbteDesde>{numero}</CbteDesde><CbteHasta>{numero}</CbteHasta>"
+            f"<CbteFch>{fecha}</CbteFch><Resultado>{resultado}</Resultado>{obs}"
+            f"<CAE>{cae}</CAE><CAEFchVto>{vencimiento}</CAEFchVto>"
+            "</FECAEDetResponse>"
+        ), resultado
+
+    def _respuesta_cae(self, cabecera, detalle, errores=()):
+        return (
+            f'<FECAESolicitarResponse xmlns="{NS_WSFE}"><FECAESolicitarResult>'
+            f"{cabecera}{detalle}{_errores(errores)}"
+            "</FECAESolicitarResult></FECAESolicitarResponse>"
+        )
+
+
+OPERACIONES = {
+    (NS_WSAA, "loginCms"): ServidorAFIPStub.login,
+    (NS_WSFE, "FEDummy"): ServidorAFIPStub.fe_dummy,
+    (NS_WSFE, "FECompUltimoAutorizado"): ServidorAFIPStub.fe_comp_ultimo_autorizado,
+    (NS_WSFE, "FECompConsultar"): ServidorAFIPStub.fe_comp_consultar,
+    (NS_WSFE, "FECAESolicitar"): ServidorAFIPStub.fe_cae_solicitar,
+}
+
+# Operaciones que exigen Auth (Token, Sign, Cuit)
+CON_TICKET = {"FECompUltimoAutorizado", "FECompConsultar", "FECAESolicitar"}
+
+
+def _lector(elemento):
+    def dato(*ruta):
+        hallado = elemento.find("/".join(f"{{{NS_WSFE}}}{nombre}" for nombre in ruta))
+        return (hallado.text or "").strip() if hallado is not None else ""
+    return dato
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    # HTTP/1.1: la conexión queda abierta entre solicitudes
+    protocol_version = "HTTP/1.1"
+    stub = None
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, estado, contenido):
+        self.send_response(estado)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_POST(self):
+        stub = self.stub
+        datos = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            cuerpo = ET.fromstring(datos).find(f"{{{SOAP_ENV}}}Body")[0]
+        except (ET.ParseError, TypeError, IndexError):
+            self._responder(500, _fault("XML inválido"))
+            return
+        ns, _, nombre = cuerpo.tag[1:].partition("}")
+
+        with stub._lock:
+            stub.conexiones.add(self.client_address)
+            fallar = stub.fallas > 0 and stub.operacion_con_fallas in (None, nombre)
+            if fallar:
+                stub.fallas -= 1
+        if stub.latencia:
+            time.sleep(stub.latencia)
+        if fallar:
+            self._responder(503, b"Service Unavailable")
+            return
+
+        operacion = OPERACIONES.get((ns, nombre))
+        if operacion is None:
+            self._responder(500, _fault(f"Operación desconocida {nombre}"))
+            return
+        if nombre in CON_TICKET and _lector(cuerpo)("Auth", "Token") not in stub.tokens:
+            self._responder(200, _sobre(
+                f'<{nombre}Response xmlns="{NS_WSFE}"><{nombre}Result>'
+                f'{_errores([(ERROR_TICKET, "ValidacionDeToken: token inválido o vencido")])}'
+                f"</{nombre}Result></{nombre}Response>"
+            ))
+            return
+        self._responder(200, _sobre(operacion(stub, cuerpo)))
@@ -0,0 +1,378 @@
+"""
+Mantenimiento de las alertas persistidas del dashboard (modelo Alerta).
+
+Cada fuente (producto, materia prima, venta, cuenta por pagar, empleado)
+define:
+- un evaluador que, dado un objeto y la fecha de hoy, devuelve los campos de
+  su alerta o None si no corresponde alerta;
+- un queryset de candidatos: los objetos que podrían tener alerta hoy.
+
+Las señales (ver signals.py) llaman a `sincronizar(objeto)` cuando cambia una
+fila origen. El comando `actualizar_alertas` recorre los candidatos de las
+fuentes que dependen de la fecha (vencimientos, aniversarios) una vez por día.
+"""
+
+from datetime import date, timedelta
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Alerta, MovimientoFinanciero
+
+DIAS_AVISO_VENCIMIENTO = 7
+
+CAMPOS_ALERTA = ("tipo", "categoria", "urgencia", "prioridad", "entidad_id", "titulo", "descripcion", "fecha", "datos")
+
+
+def _alerta(tipo, categoria, urgencia, entidad_id, titulo, descripcion, fecha=None, datos=None):
+    return {
+        "tipo": tipo,
+        "categoria": categoria,
+        "urgencia": urgencia,
+        "prioridad": Alerta.PRIORIDADES[urgencia],
+        "entidad_id": entidad_id,
+        "titulo": titulo,
+        "descripcion": descripcion,
+        "fecha": fecha,
+        "datos": datos or {},
+    }
+
+
+def _como_fecha(objeto, campo):
+    """Valor de un DateField como date (puede venir como str si no se recargó de la BD)."""
+    return objeto._meta.get_field(campo).to_python(getattr(objeto, campo))
+
+
+def urgencia_por_dias_vencido(dias):
+    """Urgencia de una deuda vencida según los días de atraso."""
+    if dias > 30:
+        return Alerta.Urgencia.ALTA
+    if dias > 7:
+        return Alerta.Urgencia.MEDIA
+    return Alerta.Urgencia.BAJA
+
+
+def _urgencia_proximo_vencer(dias):
+    return Alerta.Urgencia.MEDIA if dias <= 3 else Alerta.Urgencia.BAJA
+
+
+# ============================================================================
+# EVALUADORES POR FUENTE
+# ============================================================================
+
+def evaluar_producto(producto, hoy):
+    if not (producto.activo and producto.stock_minimo > 0 and producto.stock <= producto.stock_minimo):
+        return None
+    return _alerta(
+        Alerta.Tipo.STOCK_BAJO, "producto",
+        Alerta.Urgencia.ALTA if producto.stock == 0 else Alerta.Urgencia.MEDIA,
+        producto.id,
+        f"Stock bajo: {producto.nombre}",
+        f"Quedan {producto.stock} unidades (mínimo: {producto.stock_minimo})",
+        datos={
+            "stock_actual": str(producto.stock),
+            "stock_minimo": str(producto.stock_minimo),
+            "sku": producto.sku,
+        },
+    )
+
+
+def evaluar_materia_prima(materia, hoy):
+    if not (materia.activo and materia.stock_minimo > 0 and materia.stock <= materia.stock_minimo):
+        return None
+    return _alerta(
+        Alerta.Tipo.STOCK_BAJO, "materia_prima",
+        Alerta.Urgencia.ALTA if materia.stock == 0 else Alerta.Urgencia.MEDIA,
+        materia.id,
+        f"Stock bajo: {materia.nombre}",
+        f"Quedan {materia.stock} {materia.get_unidad_medida_display()} (mínimo: {materia.stock_minimo})",
+        datos={
+            "stock_actual": str(materia.stock),
+            "stock_minimo": str(materia.stock_minimo),
+            "unidad_medida": materia.unidad_medida,
+            "sku": materia.sku,
+        },
+    )
+
+
+def evaluar_venta(venta, hoy):
+    fecha_vencimiento = _como_fecha(venta, "fecha_vencimiento")
+    if (
+        venta.anulada
+        or not fecha_vencimiento
+        or venta.estado_pago not in (venta.EstadoPago.PENDIENTE, venta.EstadoPago.PARCIAL)
+    ):
+        return None
+
+    saldo_pendiente = venta.saldo_pendiente
+    datos = {
+        "saldo_pendiente": str(saldo_pendiente),
+        "venta_id": venta.id,
+        "venta_numero": venta.numero,
+        "estado_pago": venta.estado_pago,
+        "puede_enviar_recordatorio": venta.puede_enviar_recordatorio(),
+    }
+
+    if fecha_vencimiento < hoy:
+        dias_vencida = (hoy - fecha_vencimiento).days
+        datos.update({"dias_vencida": dias_vencida, "condicion_pago": venta.condicion_pago})
+        return _alerta(
+            Alerta.Tipo.PAGO_VENCIDO, "cliente", urgencia_por_dias_vencido(dias_vencida),
+            venta.cliente_id,
+            f"Pago vencido: {venta.cliente.nombre}",
+            f"Venta #{venta.numero or venta.id} - Saldo: ${saldo_pendiente} - {dias_vencida} días vencido",
+            fecha=fecha_vencimiento,
+            datos=datos,
+        )
+
+    dias_hasta_vencimiento = (fecha_vencimiento - hoy).days
+    if dias_hasta_vencimiento > DIAS_AVISO_VENCIMIENTO:
+        return None
+    datos["dias_hasta_vencimiento"] = dias_hasta_vencimiento
+    return _alerta(
+        Alerta.Tipo.PAGO_PROXIMO_VENCER, "cliente", _urgencia_proximo_vencer(dias_hasta_vencimiento),
+        venta.cliente_id,
+        f"Pago próximo a vencer: {venta.cliente.nombre}",
+        f"Venta #{venta.numero or venta.id} - Vence en {dias_hasta_vencimiento} días - Saldo: ${saldo_pendiente}",
+        fecha=fecha_vencimiento,
+        datos=datos,
+    )
+
+
+def evaluar_cuenta_por_pagar(movimiento, hoy):
+    fecha_vencimiento = _como_fecha(movimiento, "fecha_vencimiento")
+    if (
+        movimiento.tipo != MovimientoFinanciero.Tipo.EGRESO
+        or movimiento.estado not in (MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL)
+        or not fecha_vencimiento
+    ):
+        return None
+
+    proveedor_nombre = movimiento.proveedor.nombre if movimiento.proveedor_id else "Proveedor"
+    datos = {
+        "monto_pendiente": str(movimiento.monto_pendiente),
+        "movimiento_id": movimiento.id,
+        "descripcion": movimiento.descripcion,
+    }
+
+    if fecha_vencimiento < hoy:
+        dias_vencida = (hoy - fecha_vencimiento).days
+        datos["dias_vencida"] = dias_vencida
+        return _alerta(
+            Alerta.Tipo.PAGO_PROVEEDOR_VENCIDO, "proveedor", urgencia_por_dias_vencido(dias_vencida),
+            movimiento.proveedor_id,
+            f"Pago vencido: {proveedor_nombre}",
+            f"Vencido hace {dias_vencida} días - Monto pendiente: ${movimiento.monto_pendiente}",
+            fecha=fecha_vencimiento,
+            datos=datos,
+        )
+
+    dias_hasta_vencimiento = (fecha_vencimiento - hoy).days
+    if dias_hasta_vencimiento > DIAS_AVISO_VENCIMIENTO:
+        return None
+    datos["dias_hasta_vencimiento"] = dias_hasta_vencimiento
+    return _alerta(
+        Alerta.Tipo.PAGO_PROVEEDOR_PROXIMO_VENCER, "proveedor", _urgencia_proximo_vencer(dias_hasta_vencimiento),
+        movimiento.proveedor_id,
+        f"Pago próximo a vencer: {proveedor_nombre}",
+        f"Vence en {dias_hasta_vencimiento} días - Monto: ${movimiento.monto_pendiente}",
+        fecha=fecha_vencimiento,
+        datos=datos,
+    )
+
+
+def _aniversario(fecha_ingreso, anio):
+    try:
+        return fecha_ingreso.replace(year=anio)
+    except ValueError:
+        # Ingreso un 29/02: en años no bisiestos se toma el 28/02
+        return date(anio, 2, 28)
+
+
+def evaluar_empleado(empleado, hoy):
+    fecha_ingreso = _como_fecha(empleado, "fecha_ingreso")
+    if not empleado.activo or not fecha_ingreso:
+        return None
+
+    proximo_aniversario = _aniversario(fecha_ingreso, hoy.year)
+    if proximo_aniversario < hoy:
+        proximo_aniversario = _aniversario(fecha_ingreso, hoy.year + 1)
+
+    dias_hasta_aniversario = (proximo_aniversario - hoy).days
+    if dias_hasta_aniversario > DIAS_AVISO_VENCIMIENTO:
+        return None
+
+    anios = proximo_aniversario.year - fecha_ingreso.year
+    if anios <= 0:
+        return None
+    return _alerta(
+        Alerta.Tipo.ANIVERSARIO_LABORAL, "empleado", Alerta.Urgencia.BAJA,
+        empleado.id,
+        f"Aniversario laboral: {empleado.nombre_completo}",
+        f"Cumple {anios} años en la empresa en {dias_hasta_aniversario} días",
+        fecha=proximo_aniversario,
+        datos={
+            "años_trabajando": anios,
+            "dias_hasta_aniversario": dias_hasta_aniversario,
+            "puesto": empleado.puesto,
+        },
+    )
+
+
+# ============================================================================
+# FUENTES
+# ============================================================================
+
+def _candidatos_productos(hoy):
+    return apps.get_model("productos", "Producto").productos_con_stock_bajo()
+
+
+def _candidatos_materias_primas(hoy):
+    return apps.get_model("compras", "MateriaPrima").materias_primas_con_stock_bajo()
+
+
+def _candidatos_ventas(hoy):
+    Venta = apps.get_model("ventas", "Venta")
+    return Venta.objects.filter(
+        anulada=False,
+        estado_pago__in=[Venta.EstadoPago.PENDIENTE, Venta.EstadoPago.PARCIAL],
+        fecha_vencimiento__lte=hoy + timedelta(days=DIAS_AVISO_VENCIMIENTO),
+    ).select_related("cliente")
+
+
+def _candidatos_cuentas_por_pagar(hoy):
+    return MovimientoFinanciero.objects.filter(
+        tipo=MovimientoFinanciero.Tipo.EGRESO,
+        estado__in=[MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL],
+        fecha_vencimiento__lte=hoy + timedelta(days=DIAS_AVISO_VENCIMIENTO),
+    ).select_related("proveedor")
+
+
+def _candidatos_empleados(hoy):
+    return apps.get_model("recursos_humanos", "Empleado").objects.filter(activo=True)
+
+
+# etiqueta -> (evaluador, candidatos, depende_de_la_fecha)
+FUENTES = {
+    "productos.Producto": (evaluar_producto, _candidatos_productos, False),
+    "compras.MateriaPrima": (evaluar_materia_prima, _candidatos_materias_primas, False),
+    "ventas.Venta": (evaluar_venta, _candidatos_ventas, True),
+    "finanzas_reportes.MovimientoFinanciero": (evaluar_cuenta_por_pagar, _candidatos_cuentas_por_pagar, True),
+    "recursos_humanos.Empleado": (evaluar_empleado, _candidatos_empleados, True),
+}
+
+
+# ============================================================================
+# SINCRONIZACIÓN
+# ============================================================================
+
+def _hoy():
+    return date.today()
+
+
+def sincronizar(objeto, hoy=None):
+    """
+    Crea, actualiza o elimina la alerta de un objeto origen.
+
+    Solo escribe si la alerta cambió, así el ETag del dashboard
+    no se invalida por guardados que no afectan alertas.
+    """
+    evaluador = FUENTES[objeto._meta.label][0]
+    content_type = ContentType.objects.get_for_model(objeto)
+    campos = evaluador(objeto, hoy or _hoy())
+
+    if campos is None:
+        Alerta.objects.filter(content_type=content_type, object_id=objeto.pk).delete()
+        return None
+
+    alerta = Alerta.objects.filter(content_type=content_type, object_id=objeto.pk).first()
+    if alerta is None:
+        return Alerta.objects.create(content_type=content_type, object_id=objeto.pk, **campos)
+
+    if any(getattr(alerta, campo) != valor for campo, valor in campos.items()):
+        for campo, valor in campos.items():
+            setattr(alerta, campo, valor)
+        alerta.save()
+    return alerta
+
+
+def retirar(objeto):
+    """Elimina la alerta de un objeto origen borrado."""
+    Alerta.objects.filter(
+        content_type=ContentType.objects.get_for_model(objeto), object_id=objeto.pk
+    ).delete()
+
+
+@transaction.atomic
+def sincronizar_fuente(etiqueta, hoy=None):
+    """
+    Sincroniza en bloque todas las alertas de una fuente.
+
+    Evalúa los candidatos de hoy, crea/actualiza sus alertas con escrituras
+    masivas y elimina las alertas de objetos que ya no califican.
+
+    Returns:
+        dict: Cantidad de alertas creadas, actualizadas y eliminadas
+    """
+    hoy = hoy or _hoy()
+    evaluador, candidatos, _ = FUENTES[etiqueta]
+    content_type = ContentType.objects.get_for_model(apps.get_model(etiqueta))
+
+    deseadas = {}
+    for objeto in candidatos(hoy).iterator(chunk_size=1000):
+        campos = evaluador(objeto, hoy)
+        if campos is not None:
+            deseadas[objeto.pk] = campos
+
+    existentes = {
+        alerta.object_id: alerta
+        for alerta in Alerta.objects.filter(content_type=content_type)
+    }
+
+    nuevas = [
+        Alerta(content_type=content_type, object_id=object_id, **campos)
+        for object_id, campos in deseadas.items()
+        if object_id not in existentes
+    ]
+    modificadas = []
+    for object_id, campos in deseadas.items():
+        alerta = existentes.get(object_id)
+        if alerta is None or all(getattr(alerta, campo) == valor for campo, valor in campos.items()):
+            continue
+        for campo, valor in campos.items():
+            setattr(alerta, campo, valor)
+        modificadas.append(alerta)
+    obsoletas = [object_id for object_id in existentes if object_id not in deseadas]
+
+    Alerta.objects.bulk_create(nuevas, batch_size=500)
+    if modificadas:
+        # bulk_update no pasa por auto_now: se actualiza explícitamente
+        ahora = timezone.now()
+        for alerta in modificadas:
+            alerta.fecha_actualizacion = ahora
+        Alerta.objects.bulk_update(modificadas, list(CAMPOS_ALERTA) + ["fecha_actualizacion"], batch_size=500)
+    eliminadas = 0
+    if obsoletas:
+        eliminadas, _ = Alerta.objects.filter(content_type=content_type, object_id__in=obsoletas).delete()
+
+    return {"creadas": len(nuevas), "actualizadas": len(modificadas), "eliminadas": eliminadas}
+
+
+def actualizar_por_fecha(hoy=None, completo=False):
+    """
+    Recalcula las alertas que dependen de la fecha (tarea nocturna).
+
+    Args:
+        hoy: Fecha de referencia (default: hoy)
+        completo: Si True, también resincroniza las alertas de stock
+
+    Returns:
+        dict: etiqueta de fuente -> estadísticas de sincronizar_fuente
+    """
+    return {
+        etiqueta: sincronizar_fuente(etiqueta, hoy)
+        for etiqueta, (_, _, depende_de_fecha) in FUENTES.items()
+        if completo or depende_de_fecha
+    }
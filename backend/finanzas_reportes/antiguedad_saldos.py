@@ -0,0 +1,116 @@
+"""
+Antigüedad de saldos de cuentas por cobrar por cliente.
+
+Un único query agrupado por cliente reparte el saldo abierto de cada venta
+(total - monto_pagado) en tramos de días con agregación condicional
+(SUM ... FILTER / CASE WHEN). Los tramos se comparan contra fechas límite
+calculadas antes del query, así la base no hace aritmética de fechas por
+fila y el query es el mismo en PostgreSQL y SQLite.
+
+- Los días se cuentan desde el vencimiento de la venta o, si no tiene,
+  desde su fecha.
+- Las ventas todavía no vencidas cuentan en el primer tramo (0-30).
+- Sólo entran ventas pendientes (PENDIENTE o PARCIAL, no anuladas) con
+  saldo mayor a cero.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+# (clave, desde, hasta) en días; hasta None = sin tope
+TRAMOS = (
+    ("0_30", None, 30),
+    ("31_60", 31, 60),
+    ("61_90", 61, 90),
+    ("mas_90", 91, None),
+)
+
+CERO = Decimal("0")
+CENTAVO = Decimal("0.01")
+
+
+def _filtro_tramo(desde, hasta, hoy):
+    """Q sobre la fecha de referencia para `desde` <= días <= `hasta`."""
+    filtro = Q()
+    if hasta is not None:
+        filtro &= Q(fecha_referencia__gte=hoy - timedelta(days=hasta))
+    if desde is not None:
+        filtro &= Q(fecha_referencia__lte=hoy - timedelta(days=desde))
+    return filtro
+
+
+def antiguedad_saldos(hoy=None, localidad=None, cliente=None):
+    """
+    Saldo abierto de cada cliente por tramo de antigüedad.
+
+    Args:
+        hoy: Fecha de referencia (por defecto hoy)
+        localidad: Filtra por localidad fiscal del cliente (sin distinguir mayúsculas)
+        cliente: Filtra por id de cliente
+
+    Returns:
+        dict: `clientes` (uno por cliente, de mayor a menor saldo, con
+        saldo por tramo, saldo_total, cantidad_ventas y fecha_mas_antigua)
+        y `totales` por tramo.
+    """
+    from ventas.models import Venta
+
+    hoy = hoy or date.today()
+    importe = DecimalField(max_digits=14, decimal_places=2)
+
+    ventas = (
+        Venta.objects.pendientes()
+        .filter(total__gt=F("monto_pagado"))
+        .annotate(
+            fecha_referencia=Coalesce("fecha_vencimiento", "fecha"),
+            saldo=F("total") - F("monto_pagado"),
+        )
+    )
+    if localidad:
+        ventas = ventas.filter(cliente__localidad_fiscal__iexact=localidad)
+    if cliente:
+        ventas = ventas.filter(cliente_id=cliente)
+
+    agregados = {
+        clave: Coalesce(
+            Sum("saldo", filter=_filtro_tramo(desde, hasta, hoy), output_field=importe),
+            Value(CERO),
+            output_field=importe,
+        )
+        for clave, desde, hasta in TRAMOS
+    }
+    filas = (
+        ventas.values(
+            "cliente_id", "cliente__razon_social", "cliente__nombre_fantasia", "cliente__localidad_fiscal",
+        )
+        .annotate(
+            saldo_total=Sum("saldo", output_field=importe),
+            cantidad_ventas=Count("id"),
+            fecha_mas_antigua=Min("fecha_referencia"),
+            **agregados,
+        )
+        .order_by("-saldo_total", "cliente_id")
+    )
+
+    clientes = []
+    totales = {clave: CERO.quantize(CENTAVO) for clave, _, _ in TRAMOS}
+    totales["saldo_total"] = CERO.quantize(CENTAVO)
+    for fila in filas:
+        for clave in totales:
+            # SQLite no conserva la escala de los decimales en los SUM
+            fila[clave] = fila[clave].quantize(CENTAVO)
+            totales[clave] += fila[clave]
+        clientes.append({
+            "cliente_id": fila["cliente_id"],
+            "cliente": fila["cliente__razon_social"] or fila["cliente__nombre_fantasia"],
+            "localidad": fila["cliente__localidad_fiscal"],
+            **{clave: fila[clave] for clave, _, _ in TRAMOS},
+            "saldo_total": fila["saldo_total"],
+            "cantidad_ventas": fila["cantidad_ventas"],
+            "fecha_mas_antigua": fila["fecha_mas_antigua"],
+            "dias_mas_antigua": max((hoy - fila["fecha_mas_antigua"]).days, 0),
+        })
+    return {"clientes": clientes, "totales": totales}
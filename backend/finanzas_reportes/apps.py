@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class FinanzasReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finanzas_reportes'
+
+    def ready(self):
+        from . import signals
+
+        signals.conectar()
@@ -0,0 +1,197 @@
+"""
+Cache de resultados de los reportes de finanzas.
+
+Cada acción de reporte que se decora con @cachear_reporte guarda su
+respuesta en el cache de Django de alias REPORTES_CACHE con una clave que
+combina:
+
+- la acción (viewset + método) y sus kwargs (pk en acciones de detalle),
+- los query params ordenados,
+- la fecha de hoy (varios reportes usan rangos relativos a hoy),
+- la versión de cada tabla de la que depende el reporte.
+
+Las versiones son contadores en el mismo cache que las señales incrementan
+después del commit de cada save/delete de los modelos en
+MODELOS_VERSIONADOS (ver signals.py). Cambiar un dato invalida sólo los
+reportes que dependen de esa tabla, sin borrar claves: las entradas viejas
+expiran por TIMEOUT.
+
+La invalidación sólo llega a los procesos que ven el mismo cache: con
+varios workers, REPORTES_CACHE tiene que ser compartido (Redis, base de
+datos o archivos; en producción sin REDIS_URL es un cache en archivos).
+Con un LocMem por proceso, un cambio atendido por un worker no invalida
+los reportes guardados en los otros hasta el TIMEOUT. Los
+queryset.update() tampoco disparan señales; ahí también el TIMEOUT acota
+cuánto puede quedar desactualizado un reporte.
+
+Si el cache no responde, el reporte se calcula igual sin cachear.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "finanzas_reportes"
+
+MODELOS_VERSIONADOS = (
+    "ventas.Venta",
+    "ventas.LineaVenta",
+    "compras.Compra",
+    "finanzas_reportes.PagoCliente",
+    "finanzas_reportes.MovimientoFinanciero",
+    "finanzas_reportes.FacturaElectronica",
+    "finanzas_reportes.PeriodoIVA",
+    "finanzas_reportes.PagoIVA",
+    "inventario.MovimientoStock",
+    "inventario.ValorizacionInventario",
+    "clientes.Cliente",
+    "proveedores.Proveedor",
+    "productos.Producto",
+)
+
+RESULTADOS = ("hit", "miss", "error")
+
+# Endpoints decorados, para reportar estadísticas
+ENDPOINTS = []
+
+
+def _cache():
+    return caches[getattr(settings, "REPORTES_CACHE", "default")]
+
+
+def _clave_version(etiqueta):
+    return f"{PREFIJO}:version:{etiqueta}"
+
+
+def _clave_estadistica(endpoint, resultado):
+    return f"{PREFIJO}:stats:{endpoint}:{resultado}"
+
+
+def incrementar_version(etiqueta):
+    """Invalida los reportes que dependen del modelo `etiqueta`."""
+    clave = _clave_version(etiqueta)
+    try:
+        try:
+            _cache().incr(clave)
+        except ValueError:
+            # La clave no existe (primer cambio o fue desalojada)
+            _cache().set(clave, time.time_ns(), timeout=None)
+    except Exception:
+        logger.warning("No se pudo incrementar la versión de %s en el cache", etiqueta, exc_info=True)
+
+
+def versiones(etiquetas):
+    """
+    Versión actual de cada modelo.
+
+    Una versión ausente se inicializa con un valor basado en el reloj, así
+    un contador desalojado nunca vuelve a un número ya usado.
+    """
+    claves = {_clave_version(etiqueta): etiqueta for etiqueta in etiquetas}
+    actuales = _cache().get_many(list(claves))
+    for clave in claves:
+        if clave not in actuales:
+            _cache().add(clave, time.time_ns(), timeout=None)
+            actuales[clave] = _cache().get(clave)
+    return [actuales[clave] for clave in claves]
+
+
+def _registrar(endpoint, resultado):
+    clave = _clave_estadistica(endpoint, resultado)
+    try:
+        try:
+            _cache().incr(clave)
+        except ValueError:
+            _cache().set(clave, 1, timeout=None)
+    except Exception:
+        pass
+
+
+def estadisticas():
+    """
+    Aciertos y fallos del cache por endpoint.
+
+    Returns:
+        dict: endpoint -> {'hit', 'miss', 'error', 'tasa_acierto'}
+    """
+    claves = {
+        _clave_estadistica(endpoint, resultado): (endpoint, resultado)
+        for endpoint in ENDPOINTS
+        for resultado in RESULTADOS
+    }
+    valores = _cache().get_many(list(claves))
+    resultado = {}
+    for clave, (endpoint, tipo) in claves.items():
+        resultado.setdefault(endpoint, dict.fromkeys(RESULTADOS, 0))[tipo] = valores.get(clave, 0)
+    for datos in resultado.values():
+        consultas = datos["hit"] + datos["miss"]
+        datos["tasa_acierto"] = round(datos["hit"] / consultas * 100, 2) if consultas else None
+    return resultado
+
+
+def cachear_reporte(depende_de, timeout=DEFAULT_TIMEOUT):
+    """
+    Decorador opt-in para acciones de reporte (sólo GET).
+
+    Args:
+        depende_de: Etiquetas de modelos (de MODELOS_VERSIONADOS) que leen
+            el reporte; un cambio en cualquiera invalida el resultado
+        timeout: Segundos de vida; por defecto el TIMEOUT del cache
+
+    Sólo se cachean las respuestas 200. La respuesta lleva el header
+    X-Cache: HIT o MISS.
+    """
+    desconocidos = set(depende_de) - set(MODELOS_VERSIONADOS)
+    if desconocidos:
+        raise ValueError(f"Modelos sin versión: {', '.join(sorted(desconocidos))}")
+
+    def decorador(metodo):
+        endpoint = metodo.__qualname__
+        ENDPOINTS.append(endpoint)
+
+        @functools.wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            try:
+                parametros = sorted(
+                    (clave, request.query_params.getlist(clave)) for clave in request.query_params
+                )
+                firma = json.dumps(
+                    [endpoint, kwargs, parametros, date.today().isoformat(), versiones(depende_de)],
+                    sort_keys=True,
+                    default=str,
+                )
+                clave = f"{PREFIJO}:resultado:{hashlib.md5(firma.encode()).hexdigest()}"
+                guardado = _cache().get(clave)
+            except Exception:
+                logger.warning("Cache de reportes no disponible para %s", endpoint, exc_info=True)
+                _registrar(endpoint, "error")
+                return metodo(self, request, *args, **kwargs)
+
+            if guardado is not None:
+                _registrar(endpoint, "hit")
+                return Response(guardado, headers={"X-Cache": "HIT"})
+
+            _registrar(endpoint, "miss")
+            response = metodo(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                try:
+                    _cache().set(clave, response.data, timeout=timeout)
+                except Exception:
+                    logger.warning("No se pudo guardar %s en el cache", endpoint, exc_info=True)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return envoltura
+
+    return decorador
@@ -0,0 +1,339 @@
+"""
+Códigos para imprimir en los comprobantes: QR y barras Interleaved 2 of 5.
+
+QR (ISO/IEC 18004) en modo byte con corrección de errores nivel M: la
+versión se elige según el largo del texto y la máscara por el puntaje de
+penalización estándar. Devuelve la matriz de módulos; el dibujo queda a
+cargo de quien la usa (facturas_pdf.py la dibuja como rectángulos del PDF).
+
+Interleaved 2 of 5: el código de barras del CAE (RG 1702) con su dígito
+verificador.
+
+Sin dependencias: las bibliotecas de QR no son parte del proyecto y el
+codificador es chico.
+"""
+
+# ============================================================================
+# QR
+# ============================================================================
+
+# Nivel M, por versión (índice 0 sin uso)
+_EC_POR_BLOQUE = (
+    None, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+    26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28,
+)
+_BLOQUES = (
+    None, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+    17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49,
+)
+# Bits de formato del nivel M
+_NIVEL_M = 0
+
+_MASCARAS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+
+def _modulos_datos(version):
+    """Módulos disponibles para datos y corrección en una versión."""
+    resultado = (16 * version + 128) * version + 64
+    if version >= 2:
+        alineacion = version // 7 + 2
+        resultado -= (25 * alineacion - 10) * alineacion - 55
+        if version >= 7:
+            resultado -= 36
+    return resultado
+
+
+def _capacidad(version):
+    """Codewords de datos de una versión en nivel M."""
+    return _modulos_datos(version) // 8 - _EC_POR_BLOQUE[version] * _BLOQUES[version]
+
+
+def _posiciones_alineacion(version, tamano):
+    if version == 1:
+        return []
+    cantidad = version // 7 + 2
+    paso = (version * 8 + cantidad * 3 + 5) // (cantidad * 4 - 4) * 2
+    return [6] + sorted(tamano - 7 - i * paso for i in range(cantidad - 1))
+
+
+def _gf_mul(x, y):
+    z = 0
+    for i in reversed(range(8)):
+        z = (z << 1) ^ ((z >> 7) * 0x11D)
+        z ^= ((y >> i) & 1) * x
+    return z
+
+
+def _divisor_rs(grado):
+    resultado = [0] * (grado - 1) + [1]
+    raiz = 1
+    for _ in range(grado):
+        for j in range(grado):
+            resultado[j] = _gf_mul(resultado[j], raiz)
+            if j + 1 < grado:
+                resultado[j] ^= resultado[j + 1]
+        raiz = _gf_mul(raiz, 0x02)
+    return resultado
+
+
+def _resto_rs(datos, divisor):
+    resultado = [0] * len(divisor)
+    for byte in datos:
+        factor = byte ^ resultado.pop(0)
+        resultado.append(0)
+        for i, coeficiente in enumerate(divisor):
+            resultado[i] ^= _gf_mul(coeficiente, factor)
+    return resultado
+
+
+def _codewords(datos, version):
+    """Bytes de datos con relleno, bloques de corrección y entrelazado."""
+    bits = []
+
+    def agregar(valor, largo):
+        bits.extend((valor >> i) & 1 for i in reversed(range(largo)))
+
+    agregar(0b0100, 4)
+    agregar(len(datos), 8 if version < 10 else 16)
+    for byte in datos:
+        agregar(byte, 8)
+    capacidad = _capacidad(version) * 8
+    agregar(0, min(4, capacidad - len(bits)))
+    agregar(0, -len(bits) % 8)
+    relleno = (0xEC, 0x11)
+    palabras = [int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    palabras += [relleno[i % 2] for i in range(capacidad // 8 - len(palabras))]
+
+    cantidad_bloques, largo_ec = _BLOQUES[version], _EC_POR_BLOQUE[version]
+    total = _modulos_datos(version) // 8
+    cortos = cantidad_bloques - total % cantidad_bloques
+    largo_corto = total // cantidad_bloques
+    divisor = _divisor_rs(largo_ec)
+
+    bloques, inicio = [], 0
+    for i in range(cantidad_bloques):
+        largo = largo_corto - largo_ec + (0 if i < cortos else 1)
+        bloque = palabras[inicio:inicio + largo]
+        inicio += largo
+        correccion = _resto_rs(bloque, divisor)
+        if i < cortos:
+            bloque.append(0)
+        bloques.append(bloque + correccion)
+
+    resultado = []
+    for i in range(len(bloques[0])):
+        for j, bloque in enumerate(bloques):
+            # Los bloques cortos tienen un hueco en la posición del último dato
+            if i != largo_corto - largo_ec or j >= cortos:
+                resultado.append(bloque[i])
+    return resultado
+
+
+class _Matriz:
+    def __init__(self, version):
+        self.version = version
+        self.tamano = version * 4 + 17
+        self.modulos = [[False] * self.tamano for _ in range(self.tamano)]
+        self.funcion = [[False] * self.tamano for _ in range(self.tamano)]
+
+    def fijar(self, x, y, oscuro):
+        self.modulos[y][x] = oscuro
+        self.funcion[y][x] = True
+
+    def patrones(self):
+        tamano = self.tamano
+        for i in range(tamano):
+            self.fijar(6, i, i % 2 == 0)
+            self.fijar(i, 6, i % 2 == 0)
+        for cx, cy in ((3, 3), (tamano - 4, 3), (3, tamano - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < tamano and 0 <= y < tamano:
+                        self.fijar(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+        posiciones = _posiciones_alineacion(self.version, tamano)
+        ultima = len(posiciones) - 1
+        for i, cx in enumerate(posiciones):
+            for j, cy in enumerate(posiciones):
+                if (i, j) in ((0, 0), (0, ultima), (ultima, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self.fijar(cx + dx, cy + dy, max(abs(dx), abs(dy)) != 1)
+        # Reserva el lugar del formato; se escribe al elegir la máscara
+        self.formato(0)
+        if self.version >= 7:
+            resto = self.version
+            for _ in range(12):
+                resto = (resto << 1) ^ ((resto >> 11) * 0x1F25)
+            bits = self.version << 12 | resto
+            for i in range(18):
+                oscuro = (bits >> i) & 1 == 1
+                a, b = tamano - 11 + i % 3, i // 3
+                self.fijar(a, b, oscuro)
+                self.fijar(b, a, oscuro)
+
+    def formato(self, mascara):
+        datos = _NIVEL_M << 3 | mascara
+        resto = datos
+        for _ in range(10):
+            resto = (resto << 1) ^ ((resto >> 9) * 0x537)
+        bits = (datos << 10 | resto) ^ 0x5412
+
+        def bit(i):
+            return (bits >> i) & 1 == 1
+
+        tamano = self.tamano
+        for i in range(6):
+            self.fijar(8, i, bit(i))
+        self.fijar(8, 7, bit(6))
+        self.fijar(8, 8, bit(7))
+        self.fijar(7, 8, bit(8))
+        for i in range(9, 15):
+            self.fijar(14 - i, 8, bit(i))
+        for i in range(8):
+            self.fijar(tamano - 1 - i, 8, bit(i))
+        for i in range(8, 15):
+            self.fijar(8, tamano - 15 + i, bit(i))
+        self.fijar(8, tamano - 8, True)
+
+    def datos(self, codewords):
+        tamano, i, total = self.tamano, 0, len(codewords) * 8
+        derecha = tamano - 1
+        while derecha >= 1:
+            if derecha == 6:
+                derecha = 5
+            for vertical in range(tamano):
+                for j in range(2):
+                    x = derecha - j
+                    subiendo = (derecha + 1) & 2 == 0
+                    y = tamano - 1 - vertical if subiendo else vertical
+                    if not self.funcion[y][x] and i < total:
+                        self.modulos[y][x] = (codewords[i >> 3] >> (7 - (i & 7))) & 1 == 1
+                        i += 1
+            derecha -= 2
+
+    def enmascarar(self, mascara):
+        condicion = _MASCARAS[mascara]
+        for y in range(self.tamano):
+            for x in range(self.tamano):
+                if not self.funcion[y][x] and condicion(x, y):
+                    self.modulos[y][x] = not self.modulos[y][x]
+
+    def penalizacion(self):
+        modulos, tamano, puntaje = self.modulos, self.tamano, 0
+        lineas = modulos + [list(columna) for columna in zip(*modulos)]
+        patron = (True, False, True, True, True, False, True)
+        for linea in lineas:
+            # Tramos de 5 o más del mismo color
+            tramo = 1
+            for anterior, actual in zip(linea, linea[1:]):
+                if actual == anterior:
+                    tramo += 1
+                else:
+                    if tramo >= 5:
+                        puntaje += tramo - 2
+                    tramo = 1
+            if tramo >= 5:
+                puntaje += tramo - 2
+            # Patrones parecidos a los de posición con 4 claros a un lado
+            for i in range(tamano - 6):
+                if tuple(linea[i:i + 7]) == patron:
+                    antes = not any(linea[max(0, i - 4):i])
+                    despues = not any(linea[i + 7:i + 11])
+                    if antes or despues:
+                        puntaje += 40
+        for y in range(tamano - 1):
+            for x in range(tamano - 1):
+                color = modulos[y][x]
+                if color == modulos[y][x + 1] == modulos[y + 1][x] == modulos[y + 1][x + 1]:
+                    puntaje += 3
+        oscuros = sum(map(sum, modulos))
+        total = tamano * tamano
+        puntaje += ((abs(oscuros * 20 - total * 10) + total - 1) // total - 1) * 10
+        return puntaje
+
+
+def qr(texto):
+    """
+    Matriz del código QR de `texto` (nivel M).
+
+    Returns:
+        list: filas de bool (True = módulo oscuro), sin zona de silencio
+
+    Raises:
+        ValueError: Si el texto no entra en un QR.
+    """
+    datos = texto.encode("utf-8") if isinstance(texto, str) else bytes(texto)
+    for version in range(1, 41):
+        encabezado = 4 + (8 if version < 10 else 16)
+        if encabezado + len(datos) * 8 <= _capacidad(version) * 8:
+            break
+    else:
+        raise ValueError("El texto es demasiado largo para un código QR")
+
+    codewords = _codewords(datos, version)
+    mejor = None
+    for mascara in range(8):
+        matriz = _Matriz(version)
+        matriz.patrones()
+        matriz.datos(codewords)
+        matriz.enmascarar(mascara)
+        matriz.formato(mascara)
+        puntaje = matriz.penalizacion()
+        if mejor is None or puntaje < mejor[0]:
+            mejor = (puntaje, matriz)
+    return mejor[1].modulos
+
+
+# ============================================================================
+# INTERLEAVED 2 OF 5
+# ============================================================================
+
+# Ancho de cada elemento por dígito: 1 = angosto, 3 = ancho
+_I2OF5 = {
+    "0": (1, 1, 3, 3, 1),
+    "1": (3, 1, 1, 1, 3),
+    "2": (1, 3, 1, 1, 3),
+    "3": (3, 3, 1, 1, 1),
+    "4": (1, 1, 3, 1, 3),
+    "5": (3, 1, 3, 1, 1),
+    "6": (1, 3, 3, 1, 1),
+    "7": (1, 1, 1, 3, 3),
+    "8": (3, 1, 1, 3, 1),
+    "9": (1, 3, 1, 3, 1),
+}
+
+
+def digito_verificador(numero):
+    """Dígito verificador de AFIP (RG 1702) para el código de barras."""
+    impares = sum(int(digito) for digito in numero[0::2])
+    pares = sum(int(digito) for digito in numero[1::2])
+    return str((10 - (impares * 3 + pares) % 10) % 10)
+
+
+def interleaved_2_of_5(numero):
+    """
+    Anchos alternados barra/espacio (en módulos angostos), empezando por barra.
+
+    Raises:
+        ValueError: Si `numero` no son sólo dígitos.
+    """
+    if not numero.isdigit():
+        raise ValueError("Interleaved 2 of 5 sólo admite dígitos")
+    if len(numero) % 2:
+        numero = "0" + numero
+    anchos = [1, 1, 1, 1]
+    for barras, espacios in zip(numero[0::2], numero[1::2]):
+        for barra, espacio in zip(_I2OF5[barras], _I2OF5[espacios]):
+            anchos += [barra, espacio]
+    return anchos + [3, 1, 1]
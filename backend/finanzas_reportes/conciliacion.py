@@ -0,0 +1,166 @@
+"""
+Conciliación automática de un extracto bancario.
+
+En lugar de una consulta por línea del extracto, se cargan una vez todos
+los MovimientoFinanciero sin conciliar de la ventana de fechas del
+extracto (± TOLERANCIA_DIAS) y se indexan por (tipo, monto). Cada línea
+sólo se compara con los candidatos de su mismo tipo y monto exacto
+(crédito = INGRESO, débito = EGRESO).
+
+La asignación es uno a uno: se recorren los pares (línea, candidato) del
+mejor al peor —menor diferencia de días y, a igualdad, mayor similitud de
+descripción— y se toma cada par cuyos dos extremos siguen libres. Si para
+una línea hay otro candidato igual de bueno (o para un candidato otra
+línea igual de buena), el par no se aplica y se informa como ambiguo para
+revisión manual y sus candidatos no se asignan a otra línea peor.
+
+Los pares elegidos se guardan con un único bulk_update.
+"""
+
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+
+TOLERANCIA_DIAS = 3
+
+# Diferencia de similitud por debajo de la cual dos opciones se consideran empatadas
+MARGEN_SIMILITUD = 0.2
+
+OBSERVACION = "Conciliado automáticamente"
+
+
+def _palabras(texto):
+    return set(re.findall(r"\w+", (texto or "").casefold()))
+
+
+def similitud(a, b):
+    """Coeficiente de Jaccard entre las palabras de dos descripciones (0 a 1)."""
+    palabras_a, palabras_b = _palabras(a), _palabras(b)
+    if not palabras_a or not palabras_b:
+        return 0.0
+    return len(palabras_a & palabras_b) / len(palabras_a | palabras_b)
+
+
+def _clave_linea(linea):
+    from .models import MovimientoFinanciero
+
+    if linea.credito:
+        return MovimientoFinanciero.Tipo.INGRESO, linea.credito
+    return MovimientoFinanciero.Tipo.EGRESO, linea.debito
+
+
+def _candidatos(lineas):
+    """MovimientoFinanciero libres de la ventana del extracto, indexados por (tipo, monto)."""
+    from .models import MovimientoFinanciero
+
+    fechas = [linea.fecha for linea in lineas]
+    montos = {_clave_linea(linea)[1] for linea in lineas}
+    candidatos = (
+        MovimientoFinanciero.objects.select_for_update()
+        .filter(
+            fecha__gte=min(fechas) - timedelta(days=TOLERANCIA_DIAS),
+            fecha__lte=max(fechas) + timedelta(days=TOLERANCIA_DIAS),
+            monto__in=montos,
+            movimiento_bancario__isnull=True,
+        )
+        .only("id", "fecha", "tipo", "monto", "descripcion")
+    )
+    indice = defaultdict(list)
+    for candidato in candidatos:
+        indice[(candidato.tipo, candidato.monto)].append(candidato)
+    return indice
+
+
+def _pares(lineas, indice):
+    """Pares posibles con su puntaje, ordenados del mejor al peor."""
+    pares = []
+    for linea in lineas:
+        for candidato in indice.get(_clave_linea(linea), ()):
+            dias = abs((candidato.fecha - linea.fecha).days)
+            if dias <= TOLERANCIA_DIAS:
+                pares.append((dias, -similitud(linea.descripcion, candidato.descripcion), linea, candidato))
+    pares.sort(key=lambda par: (par[0], par[1], par[2].id, par[3].id))
+    return pares
+
+
+def _empatan(par, otro):
+    return otro[0] == par[0] and abs(otro[1] - par[1]) < MARGEN_SIMILITUD
+
+
+def conciliar_extracto(extracto):
+    """
+    Concilia las líneas pendientes de `extracto`.
+
+    Returns:
+        dict: conciliados (cantidad), total (líneas pendientes al empezar) y
+        ambiguos (líneas con más de una opción equivalente y sus candidatos)
+    """
+    from .models import MovimientoBancario
+
+    lineas = list(extracto.movimientos.filter(conciliado=False).exclude(debito__isnull=True, credito__isnull=True))
+    resultado = {"conciliados": 0, "total": len(lineas), "ambiguos": []}
+    if not lineas:
+        return resultado
+
+    with transaction.atomic():
+        pares = _pares(lineas, _candidatos(lineas))
+
+        por_linea = defaultdict(list)
+        por_candidato = defaultdict(list)
+        for par in pares:
+            por_linea[par[2].id].append(par)
+            por_candidato[par[3].id].append(par)
+
+        lineas_usadas, candidatos_usados, ambiguas = set(), set(), {}
+        # Candidatos disputados por líneas ambiguas: no se asignan a una opción peor
+        en_revision = set()
+        conciliadas = []
+        for par in pares:
+            _, _, linea, candidato = par
+            if linea.id in lineas_usadas or linea.id in ambiguas:
+                continue
+            if candidato.id in candidatos_usados or candidato.id in en_revision:
+                continue
+            otros_candidatos = [
+                otro for otro in por_linea[linea.id]
+                if otro is not par and otro[3].id not in candidatos_usados and _empatan(par, otro)
+            ]
+            otras_lineas = [
+                otro[2] for otro in por_candidato[candidato.id]
+                if otro is not par and otro[2].id not in lineas_usadas and otro[2].id not in ambiguas
+                and _empatan(par, otro)
+            ]
+            if otros_candidatos or otras_lineas:
+                # Todas las líneas que se disputan el candidato quedan para revisión
+                for ambigua in [linea, *otras_lineas]:
+                    ambiguas[ambigua.id] = ambigua
+                en_revision.update([candidato.id, *(otro[3].id for otro in otros_candidatos)])
+                continue
+
+            linea.movimiento_financiero = candidato
+            linea.conciliado = True
+            linea.observaciones = OBSERVACION
+            conciliadas.append(linea)
+            lineas_usadas.add(linea.id)
+            candidatos_usados.add(candidato.id)
+
+        MovimientoBancario.objects.bulk_update(
+            conciliadas, ["movimiento_financiero", "conciliado", "observaciones"]
+        )
+
+    resultado["conciliados"] = len(conciliadas)
+    resultado["ambiguos"] = [
+        {
+            "movimiento_bancario": linea.id,
+            "fecha": linea.fecha,
+            "descripcion": linea.descripcion,
+            "monto": linea.monto,
+            "candidatos": [
+                par[3].id for par in por_linea[linea.id] if par[3].id not in candidatos_usados
+            ],
+        }
+        for linea in ambiguas.values()
+    ]
+    return resultado
@@ -0,0 +1,342 @@
+"""
+Cuenta corriente de clientes: libro de movimientos con saldo acumulado.
+
+MovimientoCuentaCorriente es de solo alta. VentaService y PagoService
+agregan una fila por cada venta (al debe) y cada pago (al haber), y los
+handlers de undo agregan la contrapartida de una anulación. Si una venta
+o un pago ya cargado se modifica o se elimina, se agrega un ajuste por la
+diferencia de su aporte al saldo (ver registrar_ajuste). Cada fila guarda
+el saldo del cliente después del movimiento:
+
+    saldo = saldo de la fila anterior + debe - haber
+
+La fila anterior es la última del cliente por (fecha, id). La fecha es la
+de registro del movimiento (la del comprobante va en fecha_comprobante),
+así las filas nuevas siempre quedan al final y ningún saldo ya guardado
+cambia. La fila del cliente se bloquea mientras se agrega el movimiento
+para que dos altas simultáneas no partan del mismo saldo.
+
+El estado de cuenta de un rango de fechas lee sólo las filas del rango
+por el índice (cliente, fecha, id); el saldo anterior es el de la última
+fila antes del rango, sin sumar la historia.
+
+Los clientes con ventas o pagos previos al libro se inicializan con una
+fila SALDO_INICIAL: `python manage.py inicializar_cuenta_corriente`.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+CERO = Decimal("0")
+CENTAVO = Decimal("0.01")
+
+
+def saldo_al(cliente_id, fecha=None, antes=False):
+    """
+    Saldo del cliente al cierre de `fecha` (o antes de `fecha` con
+    antes=True): el de la última fila hasta esa fecha. Sin `fecha`, el
+    saldo actual.
+    """
+    from .models import MovimientoCuentaCorriente
+
+    movimientos = MovimientoCuentaCorriente.objects.filter(cliente_id=cliente_id)
+    if fecha is not None:
+        movimientos = movimientos.filter(**{"fecha__lt" if antes else "fecha__lte": fecha})
+    saldo = movimientos.order_by("-fecha", "-id").values_list("saldo", flat=True).first()
+    return CERO if saldo is None else saldo
+
+
+def _bloquear_clientes(clientes):
+    """Serializa las altas de esos clientes hasta el fin de la transacción."""
+    from clientes.models import Cliente
+
+    list(Cliente.objects.select_for_update().filter(pk__in=clientes).order_by("pk").values_list("pk", flat=True))
+
+
+def _final(cliente_id):
+    """(fecha, saldo) con que empieza el próximo movimiento del cliente."""
+    from .models import MovimientoCuentaCorriente
+
+    ultimo = (
+        MovimientoCuentaCorriente.objects.filter(cliente_id=cliente_id)
+        .order_by("-fecha", "-id")
+        .values("fecha", "saldo")
+        .first()
+    )
+    hoy = timezone.localdate()
+    if ultimo is None:
+        return hoy, CERO
+    return max(hoy, ultimo["fecha"]), ultimo["saldo"]
+
+
+@transaction.atomic
+def registrar(cliente_id, tipo, debe=CERO, haber=CERO, venta=None, pago=None,
+              fecha_comprobante=None, descripcion=""):
+    """
+    Agrega un movimiento al final de la cuenta del cliente.
+
+    Returns:
+        MovimientoCuentaCorriente creado
+    """
+    from .models import MovimientoCuentaCorriente
+
+    _bloquear_clientes([cliente_id])
+    fecha, saldo = _final(cliente_id)
+
+    # Redondeados como los guarda la base, así el saldo acumulado no arrastra decimales
+    debe, haber = Decimal(debe).quantize(CENTAVO), Decimal(haber).quantize(CENTAVO)
+    return MovimientoCuentaCorriente.objects.create(
+        cliente_id=cliente_id,
+        fecha=fecha,
+        tipo=tipo,
+        venta=venta,
+        pago=pago,
+        fecha_comprobante=fecha_comprobante,
+        descripcion=descripcion[:200],
+        debe=debe,
+        haber=haber,
+        saldo=saldo + debe - haber,
+    )
+
+
+def _fecha(instance):
+    return instance._meta.get_field("fecha").to_python(instance.fecha)
+
+
+def _movimiento_venta(venta, fecha, saldo):
+    from .models import MovimientoCuentaCorriente
+
+    total = Decimal(venta.total).quantize(CENTAVO)
+    return MovimientoCuentaCorriente(
+        cliente_id=venta.cliente_id,
+        fecha=fecha,
+        tipo=MovimientoCuentaCorriente.Tipo.VENTA,
+        venta=venta,
+        fecha_comprobante=_fecha(venta),
+        descripcion=f"Venta #{venta.numero or venta.id}",
+        debe=total,
+        saldo=saldo + total,
+    )
+
+
+@transaction.atomic
+def registrar_venta(venta):
+    """Venta al debe por su total."""
+    _bloquear_clientes([venta.cliente_id])
+    movimiento = _movimiento_venta(venta, *_final(venta.cliente_id))
+    movimiento.save()
+    return movimiento
+
+
+@transaction.atomic
+def registrar_ventas(ventas):
+    """
+    Varias ventas al debe, en su orden, para altas masivas (bulk_create)
+    que no pasan por VentaService: una lectura del saldo por cliente y un
+    único INSERT.
+
+    Returns:
+        list: MovimientoCuentaCorriente creados
+    """
+    from .models import MovimientoCuentaCorriente
+
+    clientes = {venta.cliente_id for venta in ventas}
+    _bloquear_clientes(clientes)
+    finales = {cliente_id: _final(cliente_id) for cliente_id in clientes}
+
+    movimientos = []
+    for venta in ventas:
+        movimiento = _movimiento_venta(venta, *finales[venta.cliente_id])
+        finales[venta.cliente_id] = (movimiento.fecha, movimiento.saldo)
+        movimientos.append(movimiento)
+    return MovimientoCuentaCorriente.objects.bulk_create(movimientos)
+
+
+def registrar_anulacion_venta(venta):
+    """Contrapartida de una venta anulada, al haber."""
+    from .models import MovimientoCuentaCorriente
+
+    return registrar(
+        venta.cliente_id,
+        MovimientoCuentaCorriente.Tipo.ANULACION_VENTA,
+        haber=venta.total,
+        venta=venta,
+        fecha_comprobante=_fecha(venta),
+        descripcion=f"Anulación venta #{venta.numero or venta.id}",
+    )
+
+
+def registrar_pago(pago):
+    """Pago al haber por su monto."""
+    from .models import MovimientoCuentaCorriente
+
+    return registrar(
+        pago.cliente_id,
+        MovimientoCuentaCorriente.Tipo.PAGO,
+        haber=pago.monto,
+        pago=pago,
+        venta=pago.venta,
+        fecha_comprobante=_fecha(pago),
+        descripcion=f"Pago {pago.get_medio_display()}",
+    )
+
+
+def registrar_anulacion_pago(pago):
+    """Contrapartida de un pago anulado, al debe."""
+    from .models import MovimientoCuentaCorriente
+
+    return registrar(
+        pago.cliente_id,
+        MovimientoCuentaCorriente.Tipo.ANULACION_PAGO,
+        debe=pago.monto,
+        pago=pago,
+        venta=pago.venta,
+        fecha_comprobante=_fecha(pago),
+        descripcion=f"Anulación pago {pago.get_medio_display()}",
+    )
+
+
+def aporte(instance):
+    """
+    (cliente_id, importe) con que una venta (al debe) o un pago (al haber,
+    en negativo) pesa en el saldo del cliente; 0 si está anulado.
+    """
+    from ventas.models import Venta
+
+    if isinstance(instance, Venta):
+        return instance.cliente_id, CERO if instance.anulada else Decimal(instance.total).quantize(CENTAVO)
+    return instance.cliente_id, CERO if instance.anulado else -Decimal(instance.monto).quantize(CENTAVO)
+
+
+@transaction.atomic
+def registrar_ajuste(anterior, instance, eliminado=False):
+    """
+    Ajusta la cuenta por una venta o un pago ya cargado que se modificó o
+    se va a eliminar: la diferencia entre su aporte `anterior` (ver
+    aporte()) y el actual va al debe o al haber. Si cambió de cliente, el
+    anterior recibe la contrapartida y el nuevo el importe completo.
+
+    Con eliminado=True el aporte actual es 0; se llama antes de borrar,
+    así el ajuste queda referenciado hasta que el borrado lo pone en NULL.
+
+    Returns:
+        list: MovimientoCuentaCorriente creados (ninguno si no cambió el aporte)
+    """
+    from ventas.models import Venta
+    from .models import MovimientoCuentaCorriente
+
+    actual = (instance.cliente_id, CERO) if eliminado else aporte(instance)
+    diferencias = defaultdict(Decimal)
+    diferencias[anterior[0]] -= anterior[1]
+    diferencias[actual[0]] += actual[1]
+
+    if isinstance(instance, Venta):
+        tipo = MovimientoCuentaCorriente.Tipo.AJUSTE_VENTA
+        referencias = {"venta": instance}
+        nombre = f"venta #{instance.numero or instance.pk}"
+    else:
+        tipo = MovimientoCuentaCorriente.Tipo.AJUSTE_PAGO
+        referencias = {"pago": instance, "venta": instance.venta}
+        nombre = f"pago #{instance.pk}"
+    descripcion = f"{'Eliminación' if eliminado else 'Modificación'} {nombre}"
+
+    return [
+        registrar(
+            cliente_id,
+            tipo,
+            debe=max(diferencia, CERO),
+            haber=max(-diferencia, CERO),
+            fecha_comprobante=_fecha(instance),
+            descripcion=descripcion,
+            **referencias,
+        )
+        for cliente_id, diferencia in sorted(diferencias.items())
+        if diferencia
+    ]
+
+
+def movimientos(cliente_id, desde=None, hasta=None):
+    """Queryset de los movimientos del cliente entre `desde` y `hasta` (inclusive)."""
+    from .models import MovimientoCuentaCorriente
+
+    filas = MovimientoCuentaCorriente.objects.filter(cliente_id=cliente_id)
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    return filas
+
+
+# ============================================================================
+# INICIALIZACIÓN Y VERIFICACIÓN
+# ============================================================================
+
+def saldo_calculado(clientes):
+    """{cliente_id: ventas no anuladas - pagos no anulados} sumando la historia."""
+    from finanzas_reportes.models import PagoCliente
+    from ventas.models import Venta
+
+    saldos = {cliente_id: CERO for cliente_id in clientes}
+    for modelo, campo, signo, filtro in (
+        (Venta, "total", 1, {"anulada": False}),
+        (PagoCliente, "monto", -1, {"anulado": False}),
+    ):
+        filas = (
+            modelo.objects.filter(cliente_id__in=saldos, **filtro)
+            .values("cliente_id")
+            .annotate(total=Sum(campo))
+            .order_by()
+        )
+        for fila in filas:
+            saldos[fila["cliente_id"]] += signo * (fila["total"] or CERO)
+    return saldos
+
+
+def inicializar(clientes):
+    """
+    Agrega una fila SALDO_INICIAL con el saldo calculado a los clientes de
+    `clientes` (ids) que todavía no tienen movimientos y tienen saldo.
+
+    Returns:
+        int: Clientes inicializados
+    """
+    from .models import MovimientoCuentaCorriente
+
+    con_movimientos = set(
+        MovimientoCuentaCorriente.objects.filter(cliente_id__in=clientes)
+        .values_list("cliente_id", flat=True).distinct()
+    )
+    pendientes = [cliente_id for cliente_id in clientes if cliente_id not in con_movimientos]
+
+    inicializados = 0
+    for cliente_id, saldo in saldo_calculado(pendientes).items():
+        if not saldo:
+            continue
+        registrar(
+            cliente_id,
+            MovimientoCuentaCorriente.Tipo.SALDO_INICIAL,
+            debe=max(saldo, CERO),
+            haber=max(-saldo, CERO),
+            descripcion="Saldo inicial",
+        )
+        inicializados += 1
+    return inicializados
+
+
+def verificar(clientes):
+    """
+    Compara el saldo actual del libro con el calculado desde ventas y pagos.
+
+    Returns:
+        list: Un dict por cliente con diferencias (cliente, libro, calculado)
+    """
+    diferencias = []
+    for cliente_id, calculado in saldo_calculado(clientes).items():
+        libro = saldo_al(cliente_id)
+        if libro != calculado:
+            diferencias.append({"cliente": cliente_id, "libro": libro, "calculado": calculado})
+    return diferencias
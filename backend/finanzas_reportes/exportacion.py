@@ -0,0 +1,295 @@
+"""
+Exportación en streaming (CSV y XLSX) de los libros IVA.
+
+Las filas se leen con `.values().iterator(chunk_size=...)` (cursor del lado
+del servidor en PostgreSQL) y se escriben a medida que llegan en un
+StreamingHttpResponse, así la memoria no crece con la cantidad de
+comprobantes del período. Los totales se acumulan en la misma pasada y se
+agregan al final del archivo.
+
+El XLSX se arma con zipfile de la biblioteca estándar (una hoja con
+celdas inline), escribiendo el ZIP sobre un stream no posicionable: no
+hace falta openpyxl ni tener el libro completo en memoria.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+# Cada cuántas filas se entrega lo ya comprimido del XLSX
+FILAS_POR_ENVIO = 500
+
+CERO = Decimal("0")
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+# ============================================================================
+# LIBROS IVA
+# ============================================================================
+
+class TotalesLibroIVA:
+    """Totales del libro acumulados fila a fila (mismos criterios que METRICAS_LIBRO_IVA)."""
+
+    def __init__(self):
+        self.total_operaciones = 0
+        self.operaciones_con_iva = 0
+        self.operaciones_sin_iva = 0
+        self.total_gravado = CERO
+        self.total_iva = CERO
+        self.total_exento = CERO
+        self.total_general = CERO
+
+    def agregar(self, subtotal, iva_monto, total, incluye_iva):
+        self.total_operaciones += 1
+        self.total_general += total
+        if incluye_iva:
+            self.operaciones_con_iva += 1
+            self.total_gravado += subtotal
+            self.total_iva += iva_monto
+        else:
+            self.operaciones_sin_iva += 1
+            self.total_exento += total
+
+    def filas(self):
+        return [
+            [],
+            ["Total operaciones", self.total_operaciones],
+            ["Operaciones con IVA", self.operaciones_con_iva],
+            ["Operaciones sin IVA", self.operaciones_sin_iva],
+            ["Total gravado", self.total_gravado],
+            ["Total IVA", self.total_iva],
+            ["Total exento", self.total_exento],
+            ["Total general", self.total_general],
+        ]
+
+
+ENCABEZADOS_VENTAS = [
+    "Fecha", "Número", "Cliente", "CUIT/DNI", "Subtotal", "IVA", "Total", "Incluye IVA",
+]
+
+ENCABEZADOS_COMPRAS = [
+    "Fecha", "Número", "Proveedor", "CUIT/DNI", "Categoría", "Subtotal", "IVA", "Total", "Incluye IVA",
+]
+
+
+def _filas_libro(queryset, campos, armar_fila):
+    totales = TotalesLibroIVA()
+    for fila in queryset.values(*campos).iterator(chunk_size=CHUNK_SIZE):
+        totales.agregar(fila["subtotal"], fila["iva_monto"], fila["total"], fila["incluye_iva"])
+        yield armar_fila(fila)
+    yield from totales.filas()
+
+
+def filas_libro_iva_ventas(periodo):
+    """Encabezados y filas (generador) del libro IVA ventas, con totales al final."""
+    from ventas.models import Venta
+
+    ventas = Venta.objects.filter(
+        fecha__gte=periodo.fecha_desde,
+        fecha__lte=periodo.fecha_hasta,
+    ).order_by("fecha", "id")
+    campos = (
+        "id", "fecha", "numero", "cliente__nombre_fantasia", "cliente__razon_social",
+        "cliente__identificacion", "subtotal", "iva_monto", "total", "incluye_iva",
+    )
+
+    def armar_fila(venta):
+        return [
+            venta["fecha"],
+            venta["numero"] or f"V-{venta['id']}",
+            venta["cliente__nombre_fantasia"] or venta["cliente__razon_social"] or "",
+            venta["cliente__identificacion"],
+            venta["subtotal"],
+            venta["iva_monto"],
+            venta["total"],
+            venta["incluye_iva"],
+        ]
+
+    return ENCABEZADOS_VENTAS, _filas_libro(ventas, campos, armar_fila)
+
+
+def filas_libro_iva_compras(periodo):
+    """Encabezados y filas (generador) del libro IVA compras, con totales al final."""
+    from compras.models import Compra
+
+    compras = Compra.objects.filter(
+        fecha__gte=periodo.fecha_desde,
+        fecha__lte=periodo.fecha_hasta,
+    ).order_by("fecha", "id")
+    campos = (
+        "id", "fecha", "numero", "proveedor__nombre", "proveedor__identificacion",
+        "categoria__nombre", "subtotal", "iva_monto", "total", "incluye_iva",
+    )
+
+    def armar_fila(compra):
+        return [
+            compra["fecha"],
+            compra["numero"] or f"C-{compra['id']}",
+            compra["proveedor__nombre"],
+            compra["proveedor__identificacion"],
+            compra["categoria__nombre"] or "",
+            compra["subtotal"],
+            compra["iva_monto"],
+            compra["total"],
+            compra["incluye_iva"],
+        ]
+
+    return ENCABEZADOS_COMPRAS, _filas_libro(compras, campos, armar_fila)
+
+
+# ============================================================================
+# FORMATOS
+# ============================================================================
+
+def _texto(valor):
+    if isinstance(valor, bool):
+        return "Sí" if valor else "No"
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return "" if valor is None else str(valor)
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(encabezados, filas):
+    """Genera el CSV línea por línea (con BOM para que Excel detecte UTF-8)."""
+    writer = csv.writer(_Eco())
+    yield "\ufeff" + writer.writerow(encabezados)
+    for fila in filas:
+        yield writer.writerow([_texto(valor) for valor in fila])
+
+
+class SalidaZip(io.RawIOBase):
+    """Stream de sólo escritura que acumula lo que zipfile escribe hasta vaciarlo."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+# Caracteres de control no permitidos en XML 1.0
+_CONTROL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_CONTENT_TYPES = _XML + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_RELS = _XML + (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = _XML + (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _workbook(nombre_hoja):
+    nombre = re.sub(r"[\[\]:*?/\\]", "", nombre_hoja)[:31] or "Hoja1"
+    return _XML + (
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(nombre, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _celda(valor):
+    if isinstance(valor, (int, Decimal, float)) and not isinstance(valor, bool):
+        return f"<c><v>{valor}</v></c>"
+    texto = _CONTROL_XML.sub("", _texto(valor))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(texto)}</t></is></c>'
+
+
+def _fila_xml(fila):
+    return ("<row>" + "".join(_celda(valor) for valor in fila) + "</row>").encode()
+
+
+def generar_xlsx(nombre_hoja, encabezados, filas):
+    """Genera el XLSX en bloques de bytes a medida que se escriben las filas."""
+    salida = SalidaZip()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+        archivo.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archivo.writestr("_rels/.rels", _RELS)
+        archivo.writestr("xl/workbook.xml", _workbook(nombre_hoja))
+        archivo.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield salida.vaciar()
+
+        with archivo.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            hoja.write((
+                _XML + '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            ).encode())
+            hoja.write(_fila_xml(encabezados))
+            for numero, fila in enumerate(filas, start=1):
+                hoja.write(_fila_xml(fila))
+                if numero % FILAS_POR_ENVIO == 0:
+                    yield salida.vaciar()
+            hoja.write(b"</sheetData></worksheet>")
+    yield salida.vaciar()
+
+
+def respuesta_streaming(formato, nombre_archivo, encabezados, filas):
+    """
+    StreamingHttpResponse con el archivo en el formato pedido.
+
+    Raises:
+        ValueError: Si el formato no es csv ni xlsx.
+    """
+    if formato == "csv":
+        contenido = generar_csv(encabezados, filas)
+    elif formato == "xlsx":
+        contenido = generar_xlsx(nombre_archivo, encabezados, filas)
+    else:
+        raise ValueError(f"formato debe ser uno de: {', '.join(FORMATOS)}")
+
+    response = StreamingHttpResponse(contenido, content_type=FORMATOS[formato])
+    response["Content-Disposition"] = f'attachment; filename="{nombre_archivo}.{formato}"'
+    return response
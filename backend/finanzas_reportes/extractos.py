@@ -0,0 +1,367 @@
+"""
+Importación de extractos bancarios.
+
+El archivo se procesa en una sola pasada: las filas se leen en streaming
+(CSV) o desde la hoja (Excel), se normalizan y validan, y se insertan con
+bulk_create en lotes de TAMANO_LOTE, cada lote en su propia transacción.
+Un error a mitad de archivo deja insertados los lotes anteriores y el
+extracto sin marcar como procesado; al reimportar, esos movimientos se
+saltean por su huella.
+
+Huella: hash de la cuenta, fecha, descripción, referencia, importes, saldo
+y el número de aparición de esa misma combinación dentro del archivo (dos
+débitos idénticos el mismo día son dos movimientos). Importar un extracto
+que se superpone con otro ya cargado no duplica los movimientos en común.
+
+Las columnas de cada banco se describen con un FormatoExtracto y se
+registran con registrar_formato(); el formato se elige al importar.
+"""
+
+import codecs
+import csv
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import saldos_cuentas
+
+TAMANO_LOTE = 1000
+
+# Cantidad máxima de errores de fila que se devuelven al usuario
+MAX_ERRORES = 50
+
+CENTAVOS = Decimal("0.01")
+
+CAMPOS = ("fecha", "descripcion", "referencia", "debito", "credito", "importe", "saldo")
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar con el formato elegido."""
+
+
+def _normalizar_encabezado(texto):
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+
+class FormatoExtracto:
+    """
+    Cómo leer el extracto de un banco.
+
+    Args:
+        nombre: Clave con la que se elige el formato
+        columnas: campo -> encabezados posibles en el archivo (sin importar
+            mayúsculas ni acentos). Se necesita fecha, descripcion y debito +
+            credito o un importe con signo (negativo = débito)
+        formatos_fecha: Formatos strptime que se prueban en orden
+        separador: Separador de campos del CSV
+        separador_decimal / separador_miles: Para importes como texto
+        codificacion: Codificación del CSV
+    """
+
+    def __init__(self, nombre, columnas, formatos_fecha=("%Y-%m-%d",), separador=",",
+                 separador_decimal=".", separador_miles="", codificacion="utf-8-sig"):
+        desconocidos = set(columnas) - set(CAMPOS)
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+        self.nombre = nombre
+        self.columnas = {
+            campo: tuple(_normalizar_encabezado(alias) for alias in alias_campo)
+            for campo, alias_campo in columnas.items()
+        }
+        self.formatos_fecha = formatos_fecha
+        self.separador = separador
+        self.separador_decimal = separador_decimal
+        self.separador_miles = separador_miles
+        self.codificacion = codificacion
+
+    def indices(self, encabezados):
+        """
+        Posición de cada campo en la fila de encabezados.
+
+        Raises:
+            ErrorImportacion: Si faltan columnas obligatorias.
+        """
+        normalizados = [_normalizar_encabezado(encabezado) for encabezado in encabezados]
+        indices = {}
+        for campo, alias_campo in self.columnas.items():
+            for alias in alias_campo:
+                if alias in normalizados:
+                    indices[campo] = normalizados.index(alias)
+                    break
+
+        faltantes = [campo for campo in ("fecha", "descripcion") if campo not in indices]
+        if "importe" not in indices and not ("debito" in indices or "credito" in indices):
+            faltantes.append("debito/credito o importe")
+        if faltantes:
+            raise ErrorImportacion(
+                f"Faltan columnas para el formato '{self.nombre}': {', '.join(faltantes)}"
+            )
+        return indices
+
+    def fecha(self, valor):
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        texto = str(valor).strip()
+        for formato in self.formatos_fecha:
+            try:
+                return datetime.strptime(texto, formato).date()
+            except ValueError:
+                continue
+        raise ValueError(f"fecha inválida '{texto}'")
+
+    def importe(self, valor):
+        if valor is None or valor != valor:  # NaN de Excel
+            return None
+        if isinstance(valor, (int, float, Decimal)):
+            return Decimal(str(valor)).quantize(CENTAVOS)
+        texto = str(valor).strip().replace("$", "").replace(" ", "")
+        if not texto:
+            return None
+        negativo = texto.startswith("(") and texto.endswith(")")
+        texto = texto.strip("()")
+        if self.separador_miles:
+            texto = texto.replace(self.separador_miles, "")
+        texto = texto.replace(self.separador_decimal, ".")
+        try:
+            numero = Decimal(texto).quantize(CENTAVOS)
+        except InvalidOperation:
+            raise ValueError(f"importe inválido '{valor}'")
+        return -numero if negativo else numero
+
+
+FORMATOS = {}
+
+
+def registrar_formato(formato):
+    """Agrega (o reemplaza) un formato de extracto disponible para importar."""
+    FORMATOS[formato.nombre] = formato
+    return formato
+
+
+registrar_formato(FormatoExtracto(
+    "generico",
+    columnas={
+        "fecha": ("fecha",),
+        "descripcion": ("descripcion",),
+        "referencia": ("referencia",),
+        "debito": ("debito",),
+        "credito": ("credito",),
+        "importe": ("importe", "monto"),
+        "saldo": ("saldo",),
+    },
+))
+
+# Exportación típica de home banking local: "31/01/2025;Transferencia;1.234,56"
+registrar_formato(FormatoExtracto(
+    "homebanking_ar",
+    columnas={
+        "fecha": ("fecha", "fecha movimiento", "fecha operacion"),
+        "descripcion": ("concepto", "descripcion", "detalle"),
+        "referencia": ("comprobante", "nro. comprobante", "referencia"),
+        "debito": ("debito", "debitos", "debe"),
+        "credito": ("credito", "creditos", "haber"),
+        "importe": ("importe", "monto"),
+        "saldo": ("saldo",),
+    },
+    formatos_fecha=("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d"),
+    separador=";",
+    separador_decimal=",",
+    separador_miles=".",
+))
+
+
+# ============================================================================
+# LECTURA
+# ============================================================================
+
+def _filas_csv(archivo, formato):
+    """Encabezados y filas del CSV, leído línea por línea."""
+    lector = csv.reader(codecs.iterdecode(archivo, formato.codificacion), delimiter=formato.separador)
+    try:
+        encabezados = next(lector)
+    except StopIteration:
+        raise ErrorImportacion("El archivo está vacío")
+    except UnicodeDecodeError:
+        raise ErrorImportacion(f"El archivo no está en {formato.codificacion}")
+    return encabezados, lector
+
+
+def _filas_excel(archivo):
+    """Encabezados y filas de la primera hoja, con las celdas ya tipadas."""
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ErrorImportacion("Para importar Excel se necesita pandas instalado; exportar el extracto como CSV")
+
+    # dtype=object conserva el tipo de cada celda (fecha, número o texto)
+    hoja = pd.read_excel(archivo, dtype=object)
+    hoja = hoja.astype(object).where(hoja.notna(), None)
+    return [str(columna) for columna in hoja.columns], hoja.itertuples(index=False, name=None)
+
+
+def _valor(fila, indices, campo):
+    indice = indices.get(campo)
+    if indice is None or indice >= len(fila):
+        return None
+    valor = fila[indice]
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    return valor
+
+
+def normalizar_fila(fila, indices, formato):
+    """
+    Datos de MovimientoBancario a partir de una fila del archivo.
+
+    Returns:
+        dict | None: None si la fila está vacía
+
+    Raises:
+        ValueError: Si la fila no es válida.
+    """
+    if all(_valor(fila, indices, campo) is None for campo in indices):
+        return None
+
+    fecha = _valor(fila, indices, "fecha")
+    if fecha is None:
+        raise ValueError("falta la fecha")
+    descripcion = _valor(fila, indices, "descripcion")
+    if descripcion is None:
+        raise ValueError("falta la descripción")
+
+    debito = formato.importe(_valor(fila, indices, "debito"))
+    credito = formato.importe(_valor(fila, indices, "credito"))
+    importe = formato.importe(_valor(fila, indices, "importe"))
+    if importe is not None and debito is None and credito is None:
+        if importe < 0:
+            debito = -importe
+        else:
+            credito = importe
+    # Algunos bancos exportan los débitos con signo negativo
+    debito = abs(debito) if debito else None
+    credito = credito or None
+    if debito is None and credito is None:
+        raise ValueError("sin importe")
+
+    return {
+        "fecha": formato.fecha(fecha),
+        "descripcion": " ".join(str(descripcion).split())[:255],
+        "referencia": str(_valor(fila, indices, "referencia") or "")[:100],
+        "debito": debito,
+        "credito": credito,
+        "saldo": formato.importe(_valor(fila, indices, "saldo")) or Decimal("0"),
+    }
+
+
+def huella(cuenta_id, datos, ocurrencia):
+    clave = "|".join(str(valor) for valor in (
+        cuenta_id,
+        datos["fecha"].isoformat(),
+        datos["descripcion"].casefold(),
+        datos["referencia"].casefold(),
+        datos["debito"] or "",
+        datos["credito"] or "",
+        datos["saldo"],
+        ocurrencia,
+    ))
+    return hashlib.sha256(clave.encode()).hexdigest()
+
+
+# ============================================================================
+# IMPORTACIÓN
+# ============================================================================
+
+def _huellas_existentes(huellas):
+    """Huellas de `huellas` que ya tienen movimiento cargado."""
+    from .models import MovimientoBancario
+
+    return set(MovimientoBancario.objects.filter(huella__in=huellas).values_list("huella", flat=True))
+
+
+def _guardar_lote(extracto, lote):
+    """Inserta los movimientos del lote cuya huella no existe. Devuelve cuántos insertó."""
+    from .models import MovimientoBancario
+
+    existentes = _huellas_existentes([h for h, _ in lote])
+    nuevos = [
+        MovimientoBancario(extracto=extracto, cuenta_bancaria_id=extracto.cuenta_bancaria_id, huella=h, **datos)
+        for h, datos in lote
+        if h not in existentes
+    ]
+    if not nuevos:
+        return 0
+    with transaction.atomic():
+        # ignore_conflicts cubre otra importación simultánea del mismo archivo:
+        # las filas que ésa insertó primero se saltean sin error, así que los
+        # insertados se leen de vuelta por huella en vez de contar `nuevos`
+        MovimientoBancario.objects.bulk_create(nuevos, batch_size=TAMANO_LOTE, ignore_conflicts=True)
+        fechas = list(
+            MovimientoBancario.objects.filter(extracto=extracto, huella__in=[m.huella for m in nuevos])
+            .values_list("fecha", flat=True)
+        )
+        # bulk_create no dispara señales: se actualizan los saldos diarios de lo insertado
+        saldos_cuentas.recalcular_dias(extracto.cuenta_bancaria_id, saldos_cuentas.BANCO, fechas)
+    return len(fechas)
+
+
+def importar(extracto, archivo, formato, tamano_lote=TAMANO_LOTE):
+    """
+    Carga los movimientos de `archivo` en `extracto`.
+
+    Returns:
+        dict: creados, duplicados, rechazados y errores (línea y motivo,
+        hasta MAX_ERRORES)
+
+    Raises:
+        ErrorImportacion: Si el archivo no tiene las columnas del formato.
+    """
+    if archivo.name.lower().endswith(".csv"):
+        encabezados, filas = _filas_csv(archivo, formato)
+    else:
+        encabezados, filas = _filas_excel(archivo)
+    indices = formato.indices(encabezados)
+
+    cuenta_id = extracto.cuenta_bancaria_id
+    ocurrencias = Counter()
+    resultado = {"creados": 0, "duplicados": 0, "rechazados": 0, "errores": []}
+    lote = []
+
+    def vaciar():
+        creados = _guardar_lote(extracto, lote)
+        resultado["creados"] += creados
+        resultado["duplicados"] += len(lote) - creados
+        lote.clear()
+
+    try:
+        # La línea 1 es el encabezado
+        for linea, fila in enumerate(filas, start=2):
+            try:
+                datos = normalizar_fila(fila, indices, formato)
+            except (ValueError, TypeError) as e:
+                resultado["rechazados"] += 1
+                if len(resultado["errores"]) < MAX_ERRORES:
+                    resultado["errores"].append({"linea": linea, "error": str(e)})
+                continue
+            if datos is None:
+                continue
+
+            base = huella(cuenta_id, datos, 0)
+            lote.append((huella(cuenta_id, datos, ocurrencias[base]), datos))
+            ocurrencias[base] += 1
+            if len(lote) >= tamano_lote:
+                vaciar()
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ErrorImportacion(f"No se pudo leer el archivo: {e}")
+
+    if lote:
+        vaciar()
+    return resultado
@@ -0,0 +1,501 @@
+"""
+PDF de las facturas electrónicas autorizadas.
+
+El PDF se escribe directamente (PDF 1.4 con Helvetica/Helvetica-Bold, que
+todo lector trae, así no hay fuentes que embeber): encabezado con logo y
+letra, receptor, detalle, totales, el QR de AFIP (RG 4892) y el código de
+barras del CAE (Interleaved 2 of 5, ver codigos_barras.py).
+
+Lo fijo se prepara una vez por proceso (functools.lru_cache): el logo
+(FACTURAS_PDF_LOGO) ya achicado y comprimido, los objetos de fuente y el
+dibujo de la plantilla. En los procesos del pool se precarga al iniciarlos.
+
+Almacenamiento por contenido: el archivo se guarda en
+FACTURAS_PDF_DIR/<hh>/<huella>.pdf, donde la huella es el SHA-256 de los
+datos que se imprimen, la versión de la plantilla y el logo. Si la factura
+no cambió el PDF ya existe y se devuelve sin volver a dibujarlo.
+
+generar_lote() dibuja muchas facturas en paralelo con un
+ProcessPoolExecutor: los datos se leen de la base en el proceso web y a
+los procesos del pool sólo se les pasan dicts, no tocan la base.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+
+from . import codigos_barras
+
+# Cambiarla invalida todos los PDF guardados
+VERSION_PLANTILLA = "1"
+
+URL_QR = "https://www.afip.gob.ar/fe/qr/?p="
+
+# A4 en puntos
+ANCHO, ALTO = 595, 842
+MARGEN = 36
+
+# Lo que entra sobre el recuadro de totales
+FILAS_POR_PAGINA = 18
+
+# Por debajo de esta cantidad no conviene levantar procesos
+MINIMO_PARA_POOL = 8
+
+ANCHO_LOGO_PX = 360
+
+# Ancho de Helvetica (milésimas del tamaño) para alinear importes a la derecha
+_ANCHOS = {**{digito: 556 for digito in "0123456789"}, ".": 278, ",": 278, " ": 278, "$": 556, "-": 333, "%": 889}
+
+
+# ============================================================================
+# DATOS
+# ============================================================================
+
+def datos_factura(factura):
+    """Lo que se imprime de `factura`, como dict serializable (para la huella y el pool)."""
+    configuracion = factura.configuracion_afip
+    tipo_nombre = factura.get_tipo_comprobante_display()
+    return {
+        "id": factura.id,
+        "tipo": factura.tipo_comprobante,
+        "tipo_nombre": tipo_nombre[:-2].upper(),
+        "letra": tipo_nombre[-1],
+        "punto_venta": factura.punto_venta,
+        "numero": factura.numero_comprobante,
+        "fecha_emision": factura.fecha_emision.isoformat(),
+        "emisor": {"razon_social": configuracion.razon_social, "cuit": configuracion.cuit},
+        "receptor": {
+            "razon_social": factura.cliente_razon_social,
+            "tipo_documento": factura.cliente_tipo_documento,
+            "tipo_documento_nombre": factura.get_cliente_tipo_documento_display(),
+            "numero_documento": factura.cliente_numero_documento,
+            "domicilio": factura.cliente_domicilio,
+        },
+        "importe_neto": _importe(factura.importe_neto),
+        "importe_iva": _importe(factura.importe_iva),
+        "importe_otros_tributos": _importe(factura.importe_otros_tributos),
+        "importe_total": _importe(factura.importe_total),
+        "cae": factura.cae,
+        "vencimiento_cae": factura.fecha_vencimiento_cae.isoformat() if factura.fecha_vencimiento_cae else "",
+        "detalles": [
+            {
+                "descripcion": detalle.descripcion,
+                "cantidad": _importe(detalle.cantidad),
+                "precio_unitario": _importe(detalle.precio_unitario),
+                "alicuota_iva": _importe(detalle.alicuota_iva),
+                "importe_neto": _importe(detalle.importe_neto),
+            }
+            for detalle in factura.detalles.all()
+        ],
+    }
+
+
+def _importe(valor):
+    # Igual para una instancia recién creada (Decimal("2")) y una leída ("2.00")
+    return f"{Decimal(valor):.2f}"
+
+
+@functools.lru_cache(maxsize=None)
+def _huella_logo(ruta):
+    try:
+        with open(ruta, "rb") as archivo:
+            return hashlib.sha256(archivo.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def huella(datos):
+    contenido = json.dumps(datos, sort_keys=True, ensure_ascii=False)
+    clave = f"{VERSION_PLANTILLA}|{_huella_logo(str(settings.FACTURAS_PDF_LOGO))}|{contenido}"
+    return hashlib.sha256(clave.encode()).hexdigest()
+
+
+def texto_qr(datos):
+    """URL del QR de AFIP con los datos del comprobante (RG 4892)."""
+    receptor = datos["receptor"]
+    documento = "".join(c for c in receptor["numero_documento"] if c.isdigit()) or "0"
+    contenido = {
+        "ver": 1,
+        "fecha": datos["fecha_emision"],
+        "cuit": int(datos["emisor"]["cuit"]),
+        "ptoVta": datos["punto_venta"],
+        "tipoCmp": int(datos["tipo"]),
+        "nroCmp": datos["numero"],
+        "importe": float(Decimal(datos["importe_total"])),
+        "moneda": "PES",
+        "ctz": 1,
+        "tipoDocRec": int(receptor["tipo_documento"]),
+        "nroDocRec": int(documento),
+        "tipoCodAut": "E",
+        "codAut": int(datos["cae"]),
+    }
+    return URL_QR + b64encode(json.dumps(contenido, separators=(",", ":")).encode()).decode()
+
+
+def numero_codigo_barras(datos):
+    """CUIT + tipo + punto de venta + CAE + vencimiento + dígito verificador (RG 1702)."""
+    numero = "".join((
+        datos["emisor"]["cuit"],
+        f"{int(datos['tipo']):02d}",
+        f"{datos['punto_venta']:04d}",
+        datos["cae"],
+        datos["vencimiento_cae"].replace("-", ""),
+    ))
+    return numero + codigos_barras.digito_verificador(numero)
+
+
+# ============================================================================
+# DIBUJO
+# ============================================================================
+
+def _cadena(texto):
+    crudo = str(texto).encode("cp1252", "replace")
+    return b"(" + crudo.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _moneda(valor):
+    entero, _, decimales = f"{Decimal(valor):,.2f}".partition(".")
+    return f"$ {entero.replace(',', '.')},{decimales}"
+
+
+def _ancho(texto, tamano):
+    return sum(_ANCHOS.get(caracter, 556) for caracter in texto) * tamano / 1000
+
+
+class _Lienzo:
+    """Operadores de un content stream."""
+
+    def __init__(self):
+        self.partes = []
+
+    def texto(self, x, y, texto, tamano=9, negrita=False, derecha=False):
+        if derecha:
+            x -= _ancho(str(texto), tamano)
+        fuente = b"/F2" if negrita else b"/F1"
+        self.partes.append(
+            b"BT " + fuente + b" %d Tf %.2f %.2f Td " % (tamano, x, y) + _cadena(texto) + b" Tj ET"
+        )
+
+    def rectangulo(self, x, y, ancho, alto, relleno=False):
+        self.partes.append(b"%.2f %.2f %.2f %.2f re %s" % (x, y, ancho, alto, b"f" if relleno else b"S"))
+
+    def linea(self, x1, y1, x2, y2):
+        self.partes.append(b"%.2f %.2f m %.2f %.2f l S" % (x1, y1, x2, y2))
+
+    def imagen(self, nombre, x, y, ancho, alto):
+        self.partes.append(b"q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q" % (ancho, alto, x, y, nombre))
+
+    def qr(self, modulos, x, y, lado):
+        modulo = lado / len(modulos)
+        rectangulos = []
+        for fila, valores in enumerate(modulos):
+            columna = 0
+            while columna < len(valores):
+                if not valores[columna]:
+                    columna += 1
+                    continue
+                inicio = columna
+                while columna < len(valores) and valores[columna]:
+                    columna += 1
+                rectangulos.append(b"%.3f %.3f %.3f %.3f re" % (
+                    x + inicio * modulo, y + lado - (fila + 1) * modulo, (columna - inicio) * modulo, modulo,
+                ))
+        self.partes.append(b" ".join(rectangulos) + b" f")
+
+    def barras(self, anchos, x, y, ancho_total, alto):
+        modulo = ancho_total / sum(anchos)
+        rectangulos = []
+        for posicion, ancho in enumerate(anchos):
+            if posicion % 2 == 0:
+                rectangulos.append(b"%.3f %.2f %.3f %.2f re" % (x, y, ancho * modulo, alto))
+            x += ancho * modulo
+        self.partes.append(b" ".join(rectangulos) + b" f")
+
+    def contenido(self):
+        return b"\n".join(self.partes)
+
+
+@functools.lru_cache(maxsize=None)
+def _logo(ruta):
+    """(ancho_px, alto_px, RGB comprimido) del logo achicado, o None si no hay logo."""
+    from PIL import Image
+
+    try:
+        imagen = Image.open(ruta)
+        imagen.load()
+    except OSError:
+        return None
+    imagen.thumbnail((ANCHO_LOGO_PX, ANCHO_LOGO_PX))
+    if imagen.mode in ("RGBA", "LA", "P"):
+        imagen = imagen.convert("RGBA")
+        fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.split()[3])
+        imagen = fondo
+    else:
+        imagen = imagen.convert("RGB")
+    return imagen.width, imagen.height, zlib.compress(imagen.tobytes(), 9)
+
+
+# Columnas del detalle: (título, x, alineado a la derecha)
+_COLUMNAS = (
+    ("Descripción", MARGEN + 4, False),
+    ("Cantidad", 340, True),
+    ("Precio unit.", 420, True),
+    ("IVA %", 470, True),
+    ("Subtotal", ANCHO - MARGEN - 4, True),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _plantilla():
+    """Marcos y títulos fijos de cada página."""
+    lienzo = _Lienzo()
+    lienzo.partes.append(b"0.6 w")
+    lienzo.rectangulo(MARGEN, ALTO - 170, ANCHO - 2 * MARGEN, 130)
+    lienzo.linea(ANCHO / 2, ALTO - 170, ANCHO / 2, ALTO - 90)
+    lienzo.rectangulo(ANCHO / 2 - 25, ALTO - 90, 50, 50)
+    lienzo.rectangulo(MARGEN, ALTO - 240, ANCHO - 2 * MARGEN, 62)
+    lienzo.rectangulo(MARGEN, ALTO - 268, ANCHO - 2 * MARGEN, 20)
+    for titulo, x, derecha in _COLUMNAS:
+        lienzo.texto(x, ALTO - 261, titulo, 9, negrita=True, derecha=derecha)
+    return lienzo.contenido()
+
+
+def _pagina(datos, filas, ultima, numero_pagina, total_paginas):
+    lienzo = _Lienzo()
+    lienzo.partes.append(_plantilla())
+    emisor, receptor = datos["emisor"], datos["receptor"]
+
+    logo = _logo(str(settings.FACTURAS_PDF_LOGO))
+    if logo:
+        ancho_px, alto_px, _ = logo
+        escala = min(150 / ancho_px, 45 / alto_px)
+        lienzo.imagen(b"Logo", MARGEN + 10, ALTO - 95, ancho_px * escala, alto_px * escala)
+    lienzo.texto(MARGEN + 10, ALTO - 115, emisor["razon_social"], 12, negrita=True)
+    lienzo.texto(MARGEN + 10, ALTO - 132, f"CUIT: {emisor['cuit']}")
+
+    lienzo.texto(ANCHO / 2 - 9, ALTO - 72, datos["letra"], 26, negrita=True)
+    lienzo.texto(ANCHO / 2 - 17, ALTO - 86, f"COD. {int(datos['tipo']):03d}", 7)
+    derecha = ANCHO / 2 + 30
+    lienzo.texto(derecha, ALTO - 65, datos["tipo_nombre"], 16, negrita=True)
+    lienzo.texto(derecha, ALTO - 110, (
+        f"Punto de venta: {datos['punto_venta']:05d}   Comp. Nro: {datos['numero']:08d}"
+    ), 9, negrita=True)
+    lienzo.texto(derecha, ALTO - 126, f"Fecha de emisión: {_fecha(datos['fecha_emision'])}")
+    lienzo.texto(ANCHO - MARGEN - 4, ALTO - 160, f"Página {numero_pagina} de {total_paginas}", 7, derecha=True)
+
+    lienzo.texto(MARGEN + 6, ALTO - 195, f"{receptor['tipo_documento_nombre']}: {receptor['numero_documento']}")
+    lienzo.texto(MARGEN + 200, ALTO - 195, f"Apellido y nombre / Razón social: {receptor['razon_social'][:45]}")
+    lienzo.texto(MARGEN + 6, ALTO - 215, f"Domicilio: {receptor['domicilio'][:90]}")
+
+    y = ALTO - 284
+    for detalle in filas:
+        valores = (
+            detalle["descripcion"][:55],
+            _numero(detalle["cantidad"]),
+            _moneda(detalle["precio_unitario"]),
+            _numero(detalle["alicuota_iva"]),
+            _moneda(detalle["importe_neto"]),
+        )
+        for (_, x, alineado), valor in zip(_COLUMNAS, valores):
+            lienzo.texto(x, y, valor, 9, derecha=alineado)
+        y -= 16
+
+    if ultima:
+        _pie(lienzo, datos)
+    return lienzo.contenido()
+
+
+def _pie(lienzo, datos):
+    totales = [("Importe neto gravado", datos["importe_neto"])]
+    if datos["letra"] != "C":
+        totales.append(("IVA", datos["importe_iva"]))
+    totales += [("Otros tributos", datos["importe_otros_tributos"]), ("Importe total", datos["importe_total"])]
+
+    lienzo.rectangulo(MARGEN, 150, ANCHO - 2 * MARGEN, 90)
+    y = 220
+    for posicion, (titulo, valor) in enumerate(totales):
+        negrita = posicion == len(totales) - 1
+        lienzo.texto(400, y, f"{titulo}:", 10, negrita=negrita, derecha=True)
+        lienzo.texto(ANCHO - MARGEN - 6, y, _moneda(valor), 10, negrita=negrita, derecha=True)
+        y -= 18
+
+    lienzo.qr(codigos_barras.qr(texto_qr(datos)), MARGEN, 40, 95)
+    lienzo.texto(MARGEN + 110, 118, "Comprobante autorizado", 10, negrita=True)
+    lienzo.texto(ANCHO - MARGEN - 6, 128, f"CAE N°: {datos['cae']}", 10, negrita=True, derecha=True)
+    lienzo.texto(ANCHO - MARGEN - 6, 113, (
+        f"Fecha de vto. de CAE: {_fecha(datos['vencimiento_cae'])}"
+    ), 10, negrita=True, derecha=True)
+    numero = numero_codigo_barras(datos)
+    lienzo.barras(codigos_barras.interleaved_2_of_5(numero), MARGEN + 150, 58, 280, 40)
+    lienzo.texto(MARGEN + 150, 46, numero, 8)
+
+
+def _fecha(iso):
+    anio, mes, dia = iso.split("-") if iso else ("", "", "")
+    return f"{dia}/{mes}/{anio}" if iso else ""
+
+
+def _numero(valor):
+    entero, _, decimales = _moneda(valor)[2:].partition(",")
+    decimales = decimales.rstrip("0")
+    return f"{entero},{decimales}" if decimales else entero
+
+
+def _armar_pdf(contenidos, logo):
+    """Bytes del PDF con una página por content stream."""
+    objetos = {}
+    cantidad = len(contenidos)
+    # 1 catálogo, 2 páginas, 3-4 fuentes, 5 logo, luego (página, contenido) por página
+    paginas = [6 + 2 * i for i in range(cantidad)]
+    objetos[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % numero for numero in paginas), cantidad,
+    )
+    objetos[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    objetos[4] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"
+    recursos = b"/Font << /F1 3 0 R /F2 4 0 R >>"
+    if logo:
+        ancho_px, alto_px, rgb = logo
+        objetos[5] = b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB " \
+                     b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream" % (
+                         ancho_px, alto_px, len(rgb), rgb)
+        recursos += b" /XObject << /Logo 5 0 R >>"
+    else:
+        objetos[5] = b"null"
+    for numero, contenido in zip(paginas, contenidos):
+        comprimido = zlib.compress(contenido)
+        objetos[numero] = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << %s >> " \
+                          b"/Contents %d 0 R >>" % (ANCHO, ALTO, recursos, numero + 1)
+        objetos[numero + 1] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (
+            len(comprimido), comprimido)
+
+    salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posiciones = []
+    for numero in range(1, len(objetos) + 1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n%s\nendobj\n" % (numero, objetos[numero])
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % posicion for posicion in posiciones)
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(salida)
+
+
+def renderizar(datos):
+    """Bytes del PDF de la factura."""
+    detalles = datos["detalles"]
+    bloques = [detalles[i:i + FILAS_POR_PAGINA] for i in range(0, len(detalles), FILAS_POR_PAGINA)] or [[]]
+    contenidos = [
+        _pagina(datos, filas, posicion == len(bloques) - 1, posicion + 1, len(bloques))
+        for posicion, filas in enumerate(bloques)
+    ]
+    return _armar_pdf(contenidos, _logo(str(settings.FACTURAS_PDF_LOGO)))
+
+
+# ============================================================================
+# ALMACENAMIENTO
+# ============================================================================
+
+def ruta(huella_pdf, directorio=None):
+    directorio = str(directorio or settings.FACTURAS_PDF_DIR)
+    return os.path.join(directorio, huella_pdf[:2], f"{huella_pdf}.pdf")
+
+
+def guardar(datos, directorio=None):
+    """
+    Dibuja y guarda el PDF, salvo que ya exista uno con la misma huella.
+
+    Returns:
+        tuple: (ruta del archivo, True si se reutilizó)
+    """
+    destino = ruta(huella(datos), directorio)
+    if os.path.exists(destino):
+        return destino, True
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    # Archivo temporal + rename: un lector nunca ve un PDF a medio escribir
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(renderizar(datos))
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return destino, False
+
+
+def generar(factura):
+    """PDF de una factura autorizada: (ruta, reutilizado)."""
+    return guardar(datos_factura(factura))
+
+
+# ============================================================================
+# LOTES
+# ============================================================================
+
+_pool = None
+
+
+def _precargar():
+    """Inicializador de los procesos del pool: logo y plantilla una sola vez."""
+    _logo(str(settings.FACTURAS_PDF_LOGO))
+    _plantilla()
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, "FACTURAS_PDF_PROCESOS", None) or os.cpu_count(),
+            initializer=_precargar,
+        )
+    return _pool
+
+
+def cerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def generar_lote(facturas):
+    """
+    PDF de muchas facturas: las que ya tienen PDF se reutilizan y el resto
+    se dibuja en paralelo en el pool de procesos.
+
+    Returns:
+        list: (factura_id, ruta, reutilizado) en el orden recibido
+    """
+    directorio = str(settings.FACTURAS_PDF_DIR)
+    resultados, pendientes = {}, []
+    for factura in facturas:
+        datos = datos_factura(factura)
+        destino = ruta(huella(datos), directorio)
+        if os.path.exists(destino):
+            resultados[factura.id] = (destino, True)
+        else:
+            pendientes.append(datos)
+
+    if len(pendientes) >= MINIMO_PARA_POOL:
+        guardados = _obtener_pool().map(
+            guardar, pendientes, [directorio] * len(pendientes),
+            chunksize=max(1, len(pendientes) // (4 * (os.cpu_count() or 1))),
+        )
+    else:
+        guardados = (guardar(datos, directorio) for datos in pendientes)
+    for datos, guardado in zip(pendientes, guardados):
+        resultados[datos["id"]] = guardado
+
+    return [(factura.id, *resultados[factura.id]) for factura in facturas]
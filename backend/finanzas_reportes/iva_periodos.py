@@ -0,0 +1,152 @@
+"""
+Acumuladores de IVA de los períodos (PeriodoIVA) mantenidos por deltas.
+
+Cada vez que se crea, modifica, anula o elimina una venta o compra con
+IVA, las señales (ver signals.py) calculan cuánto cambia su aporte al
+débito o crédito fiscal del mes y lo suman al período con un UPDATE con
+expresiones F(), sin releer las ventas y compras del mes. Los saldos a
+favor se recalculan en el mismo UPDATE.
+
+- Aporte de un comprobante: su iva_monto, si incluye IVA y no está
+  anulado, al período de su fecha. Si cambia de mes se resta de uno y se
+  suma al otro.
+- Sólo los períodos ABIERTO reciben deltas. Un cambio que alteraría un
+  período CERRADO o PRESENTADO se rechaza con PeriodoIVACerrado antes de
+  guardar el comprobante.
+- Si el período del mes todavía no existe no hay nada que actualizar: se
+  calcula completo al crearlo (PeriodoIVA.obtener_o_crear_periodo_actual).
+
+Los cambios hechos con queryset.update() o bulk_* no disparan señales; el
+comando `manage.py verificar_periodos_iva` compara los acumuladores con un
+recálculo completo y, con --corregir, ajusta los períodos abiertos.
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.backends.utils import format_number
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+# Acumulador de PeriodoIVA que alimenta cada modelo
+MODELOS = {
+    "ventas.Venta": "iva_debito_fiscal",
+    "compras.Compra": "iva_credito_fiscal",
+}
+
+CAMPOS_RELEVANTES = {"fecha", "incluye_iva", "iva_monto", "anulada"}
+
+CERO = Decimal("0")
+
+
+class PeriodoIVACerrado(ValidationError):
+    """El cambio alteraría el IVA de un período cerrado o presentado."""
+
+
+def aporte(instance):
+    """
+    ((año, mes), monto) con que `instance` aporta al IVA del período, o None.
+
+    El monto se redondea como lo guarda la base, así el delta coincide con
+    lo que después suma un recálculo completo.
+    """
+    if not instance.incluye_iva or instance.anulada:
+        return None
+    campo = instance._meta.get_field("iva_monto")
+    monto = Decimal(format_number(Decimal(instance.iva_monto), campo.max_digits, campo.decimal_places))
+    if not monto:
+        return None
+    # Ventas: fecha es auto_now_add y en pre_save de un alta todavía no tiene valor
+    fecha = instance._meta.get_field("fecha").to_python(instance.fecha) or date.today()
+    return (fecha.year, fecha.month), monto
+
+
+def deltas(anterior, nuevo):
+    """{(año, mes): delta} para pasar del aporte `anterior` al `nuevo`."""
+    resultado = defaultdict(Decimal)
+    if anterior:
+        resultado[anterior[0]] -= anterior[1]
+    if nuevo:
+        resultado[nuevo[0]] += nuevo[1]
+    return {periodo: delta for periodo, delta in resultado.items() if delta}
+
+
+def validar(cambios):
+    """
+    Raises:
+        PeriodoIVACerrado: Si algún período con delta no está ABIERTO.
+    """
+    from .models import PeriodoIVA
+
+    if not cambios:
+        return
+    for periodo in PeriodoIVA.objects.exclude(estado=PeriodoIVA.Estado.ABIERTO).filter(
+        anio__in={anio for anio, _ in cambios}, mes__in={mes for _, mes in cambios},
+    ):
+        if (periodo.anio, periodo.mes) in cambios:
+            raise PeriodoIVACerrado(
+                f"El período IVA {periodo.mes:02d}/{periodo.anio} está {periodo.get_estado_display().lower()}: "
+                "no se pueden modificar sus ventas ni compras con IVA"
+            )
+
+
+def aplicar(campo, cambios):
+    """Suma cada delta al acumulador `campo` de su período, si está ABIERTO."""
+    from .models import PeriodoIVA
+
+    salida = DecimalField(max_digits=12, decimal_places=2)
+    for (anio, mes), delta in cambios.items():
+        debito = F("iva_debito_fiscal") + (delta if campo == "iva_debito_fiscal" else CERO)
+        credito = F("iva_credito_fiscal") + (delta if campo == "iva_credito_fiscal" else CERO)
+        # Del lado derecho de un UPDATE las columnas tienen el valor anterior
+        PeriodoIVA.objects.filter(anio=anio, mes=mes, estado=PeriodoIVA.Estado.ABIERTO).update(
+            iva_debito_fiscal=debito,
+            iva_credito_fiscal=credito,
+            saldo_favor_fisco=Greatest(debito - credito, Value(CERO), output_field=salida),
+            saldo_favor_contribuyente=Greatest(credito - debito, Value(CERO), output_field=salida),
+            fecha_actualizacion=timezone.now(),
+        )
+
+
+# ============================================================================
+# RECÁLCULO Y VERIFICACIÓN
+# ============================================================================
+
+def calcular(periodo):
+    """(débito, crédito) del período sumando sus ventas y compras."""
+    from compras.models import Compra
+    from ventas.models import Venta
+
+    totales = []
+    for modelo in (Venta, Compra):
+        totales.append(
+            modelo.objects.filter(
+                fecha__gte=periodo.fecha_desde,
+                fecha__lte=periodo.fecha_hasta,
+                incluye_iva=True,
+                anulada=False,
+            ).aggregate(total=Sum("iva_monto"))["total"] or CERO
+        )
+    return tuple(totales)
+
+
+def verificar(periodos):
+    """
+    Compara los acumuladores con un recálculo completo.
+
+    Returns:
+        list: Un dict por período con diferencias (periodo, campo, acumulado, calculado)
+    """
+    diferencias = []
+    for periodo in periodos:
+        calculados = dict(zip(("iva_debito_fiscal", "iva_credito_fiscal"), calcular(periodo)))
+        for campo, calculado in calculados.items():
+            acumulado = getattr(periodo, campo)
+            if acumulado != calculado:
+                diferencias.append({
+                    "periodo": periodo, "campo": campo, "acumulado": acumulado, "calculado": calculado,
+                })
+    return diferencias
@@ -0,0 +1,388 @@
+"""
+Exportación del Libro IVA Digital (RG 4597) de un período.
+
+Genera los cuatro TXT de ancho fijo que importa el aplicativo de AFIP:
+
+- LIBRO_IVA_DIGITAL_VENTAS_CBTE.txt (registros de 266 caracteres)
+- LIBRO_IVA_DIGITAL_VENTAS_ALICUOTAS.txt (62)
+- LIBRO_IVA_DIGITAL_COMPRAS_CBTE.txt (325)
+- LIBRO_IVA_DIGITAL_COMPRAS_ALICUOTAS.txt (84)
+
+comprimidos en un ZIP que se escribe mientras se leen los comprobantes:
+una sola pasada por ventas y otra por compras con `.values_list().iterator()`
+(cursor del lado del servidor en PostgreSQL). Las alícuotas de la pasada se
+van guardando en un SpooledTemporaryFile (pasa a disco si crece) y se copian
+al ZIP cuando termina el archivo de comprobantes, así ambos salen de la
+misma lectura y la memoria no depende de la cantidad de comprobantes.
+
+Cada tipo de registro es un Registro: la plantilla de formato se arma una
+sola vez y cada línea es un único str.format.
+
+Datos que el sistema no guarda:
+
+- Ventas con factura electrónica aprobada usan su tipo, punto de venta,
+  número y documento del receptor. El resto se informa como Factura B, con
+  punto de venta y número tomados de `numero` ("0001-00001234") o, si no se
+  pueden leer, punto de venta 0 y el id de la venta.
+- Compras: Factura A si discriminan IVA y Factura C si no.
+- La alícuota se deduce de iva_monto / subtotal (la más cercana de la tabla).
+
+Las ventas y compras anuladas no se informan.
+"""
+
+import re
+import shutil
+import tempfile
+import zipfile
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.http import StreamingHttpResponse
+
+from .exportacion import CHUNK_SIZE, FILAS_POR_ENVIO, SalidaZip
+
+CODIFICACION = "latin-1"
+
+# Tope en memoria de las alícuotas de una pasada antes de pasar a disco
+ALICUOTAS_EN_MEMORIA = 1024 * 1024
+
+NUMERICO = "N"
+ALFANUMERICO = "A"
+
+# Código AFIP de cada alícuota de IVA (en %)
+ALICUOTAS = {
+    Decimal("0"): 3,
+    Decimal("2.5"): 9,
+    Decimal("5"): 8,
+    Decimal("10.5"): 4,
+    Decimal("21"): 5,
+    Decimal("27"): 6,
+}
+
+FACTURA_A = 1
+FACTURA_B = 6
+FACTURA_C = 11
+
+DOCUMENTO_CUIT = 80
+DOCUMENTO_DNI = 96
+DOCUMENTO_SIN_IDENTIFICAR = 99
+
+MONEDA = "PES"
+TIPO_CAMBIO = 1000000  # 1,000000
+
+OPERACION_GRAVADA = "0"
+OPERACION_EXENTA = "E"
+
+_NUMERO_COMPROBANTE = re.compile(r"(\d{1,5})\D+(\d{1,8})\s*$")
+_NO_DIGITOS = re.compile(r"\D")
+_SALTOS = re.compile(r"[\r\n\t]+")
+
+ARCHIVOS = {
+    "ventas_cbte": "LIBRO_IVA_DIGITAL_VENTAS_CBTE.txt",
+    "ventas_alicuotas": "LIBRO_IVA_DIGITAL_VENTAS_ALICUOTAS.txt",
+    "compras_cbte": "LIBRO_IVA_DIGITAL_COMPRAS_CBTE.txt",
+    "compras_alicuotas": "LIBRO_IVA_DIGITAL_COMPRAS_ALICUOTAS.txt",
+}
+
+
+class Registro:
+    """
+    Tipo de registro de ancho fijo.
+
+    Los campos son (nombre, ancho, tipo): los NUMERICO reciben int y se
+    completan con ceros a la izquierda; los ALFANUMERICO reciben str y se
+    completan con espacios a la derecha (o se cortan).
+    """
+
+    def __init__(self, campos):
+        self.campos = campos
+        self.largo = sum(ancho for _, ancho, _ in campos)
+        self._plantilla = "".join(
+            f"{{{indice}:0{ancho}d}}" if tipo == NUMERICO else f"{{{indice}:<{ancho}.{ancho}}}"
+            for indice, (_, ancho, tipo) in enumerate(campos)
+        ) + "\r\n"
+
+    def formatear(self, *valores):
+        """
+        Línea del registro (con CRLF).
+
+        Raises:
+            ValueError: Si un valor numérico no entra en su ancho.
+        """
+        linea = self._plantilla.format(*valores)
+        if len(linea) != self.largo + 2:
+            for (nombre, ancho, tipo), valor in zip(self.campos, valores):
+                if tipo == NUMERICO and len(f"{valor:0{ancho}d}") > ancho:
+                    raise ValueError(f"{nombre}: {valor} no entra en {ancho} posiciones")
+        return linea
+
+
+def _importe(nombre):
+    return (nombre, 15, NUMERICO)
+
+
+VENTAS_CBTE = Registro([
+    ("fecha", 8, NUMERICO),
+    ("tipo_comprobante", 3, NUMERICO),
+    ("punto_venta", 5, NUMERICO),
+    ("numero_desde", 20, NUMERICO),
+    ("numero_hasta", 20, NUMERICO),
+    ("codigo_documento", 2, NUMERICO),
+    ("numero_documento", 20, NUMERICO),
+    ("denominacion", 30, ALFANUMERICO),
+    _importe("importe_total"),
+    _importe("no_gravado"),
+    _importe("percepcion_no_categorizados"),
+    _importe("exento"),
+    _importe("percepciones_nacionales"),
+    _importe("percepciones_iibb"),
+    _importe("percepciones_municipales"),
+    _importe("impuestos_internos"),
+    ("moneda", 3, ALFANUMERICO),
+    ("tipo_cambio", 10, NUMERICO),
+    ("cantidad_alicuotas", 1, NUMERICO),
+    ("codigo_operacion", 1, ALFANUMERICO),
+    _importe("otros_tributos"),
+    ("fecha_vencimiento_pago", 8, NUMERICO),
+])
+
+VENTAS_ALICUOTAS = Registro([
+    ("tipo_comprobante", 3, NUMERICO),
+    ("punto_venta", 5, NUMERICO),
+    ("numero", 20, NUMERICO),
+    _importe("neto_gravado"),
+    ("alicuota", 4, NUMERICO),
+    _importe("impuesto_liquidado"),
+])
+
+COMPRAS_CBTE = Registro([
+    ("fecha", 8, NUMERICO),
+    ("tipo_comprobante", 3, NUMERICO),
+    ("punto_venta", 5, NUMERICO),
+    ("numero", 20, NUMERICO),
+    ("despacho_importacion", 16, ALFANUMERICO),
+    ("codigo_documento", 2, NUMERICO),
+    ("numero_documento", 20, NUMERICO),
+    ("denominacion", 30, ALFANUMERICO),
+    _importe("importe_total"),
+    _importe("no_gravado"),
+    _importe("exento"),
+    _importe("percepciones_iva"),
+    _importe("percepciones_nacionales"),
+    _importe("percepciones_iibb"),
+    _importe("percepciones_municipales"),
+    _importe("impuestos_internos"),
+    ("moneda", 3, ALFANUMERICO),
+    ("tipo_cambio", 10, NUMERICO),
+    ("cantidad_alicuotas", 1, NUMERICO),
+    ("codigo_operacion", 1, ALFANUMERICO),
+    _importe("credito_fiscal_computable"),
+    _importe("otros_tributos"),
+    ("cuit_emisor_corredor", 11, NUMERICO),
+    ("denominacion_emisor_corredor", 30, ALFANUMERICO),
+    _importe("iva_comision"),
+])
+
+COMPRAS_ALICUOTAS = Registro([
+    ("tipo_comprobante", 3, NUMERICO),
+    ("punto_venta", 5, NUMERICO),
+    ("numero", 20, NUMERICO),
+    ("codigo_documento", 2, NUMERICO),
+    ("numero_documento", 20, NUMERICO),
+    _importe("neto_gravado"),
+    ("alicuota", 4, NUMERICO),
+    _importe("impuesto_liquidado"),
+])
+
+
+# ============================================================================
+# CONVERSIONES
+# ============================================================================
+
+def _centavos(valor):
+    return int((valor * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _fecha(valor):
+    return valor.year * 10000 + valor.month * 100 + valor.day
+
+
+def _texto(valor):
+    return _SALTOS.sub(" ", valor or "").strip()
+
+
+def _documento(identificacion):
+    """(código, número) de un CUIT/DNI cargado a mano."""
+    digitos = _NO_DIGITOS.sub("", identificacion or "")
+    if len(digitos) == 11:
+        return DOCUMENTO_CUIT, int(digitos)
+    if 7 <= len(digitos) <= 8:
+        return DOCUMENTO_DNI, int(digitos)
+    return DOCUMENTO_SIN_IDENTIFICAR, 0
+
+
+def _punto_venta_y_numero(numero, id_comprobante):
+    coincidencia = _NUMERO_COMPROBANTE.search(numero or "")
+    if coincidencia:
+        return int(coincidencia.group(1)), int(coincidencia.group(2))
+    return 0, id_comprobante
+
+
+def codigo_alicuota(subtotal, iva_monto):
+    """Código AFIP de la alícuota más cercana a iva_monto / subtotal."""
+    if not subtotal:
+        return ALICUOTAS[Decimal("21")]
+    tasa = iva_monto * 100 / subtotal
+    return ALICUOTAS[min(ALICUOTAS, key=lambda alicuota: abs(alicuota - tasa))]
+
+
+# ============================================================================
+# REGISTROS
+# ============================================================================
+
+CAMPOS_VENTAS = (
+    "id", "fecha", "numero", "incluye_iva", "subtotal", "iva_monto", "total",
+    "cliente__identificacion", "cliente__razon_social", "cliente__nombre_fantasia",
+    "factura_electronica__estado", "factura_electronica__tipo_comprobante",
+    "factura_electronica__punto_venta", "factura_electronica__numero_comprobante",
+    "factura_electronica__cliente_tipo_documento", "factura_electronica__cliente_numero_documento",
+    "factura_electronica__cliente_razon_social",
+)
+
+
+def lineas_ventas(fila):
+    """(línea de comprobante, líneas de alícuotas) de una fila de CAMPOS_VENTAS."""
+    from .models import FacturaElectronica
+
+    (id_venta, fecha, numero, incluye_iva, subtotal, iva_monto, total,
+     identificacion, razon_social, nombre_fantasia,
+     estado_factura, tipo_factura, punto_venta_factura, numero_factura,
+     tipo_documento_factura, documento_factura, razon_social_factura) = fila
+
+    if estado_factura == FacturaElectronica.Estado.APROBADO and numero_factura is not None:
+        tipo, punto_venta, numero = int(tipo_factura), punto_venta_factura, numero_factura
+        codigo_documento = int(tipo_documento_factura)
+        documento = int(_NO_DIGITOS.sub("", documento_factura) or 0)
+        denominacion = razon_social_factura
+    else:
+        tipo = FACTURA_B
+        punto_venta, numero = _punto_venta_y_numero(numero, id_venta)
+        codigo_documento, documento = _documento(identificacion)
+        denominacion = razon_social or nombre_fantasia
+
+    exento = 0 if incluye_iva else _centavos(total)
+    comprobante = VENTAS_CBTE.formatear(
+        _fecha(fecha), tipo, punto_venta, numero, numero, codigo_documento, documento,
+        _texto(denominacion), _centavos(total), 0, 0, exento, 0, 0, 0, 0,
+        MONEDA, TIPO_CAMBIO, 1, OPERACION_GRAVADA if incluye_iva else OPERACION_EXENTA, 0, 0,
+    )
+    if incluye_iva:
+        alicuota = VENTAS_ALICUOTAS.formatear(
+            tipo, punto_venta, numero, _centavos(subtotal), codigo_alicuota(subtotal, iva_monto),
+            _centavos(iva_monto),
+        )
+    else:
+        alicuota = VENTAS_ALICUOTAS.formatear(tipo, punto_venta, numero, 0, ALICUOTAS[Decimal("0")], 0)
+    return comprobante, (alicuota,)
+
+
+CAMPOS_COMPRAS = (
+    "id", "fecha", "numero", "incluye_iva", "subtotal", "iva_monto", "total",
+    "proveedor__identificacion", "proveedor__nombre",
+)
+
+
+def lineas_compras(fila):
+    """(línea de comprobante, líneas de alícuotas) de una fila de CAMPOS_COMPRAS."""
+    id_compra, fecha, numero, incluye_iva, subtotal, iva_monto, total, identificacion, nombre = fila
+
+    tipo = FACTURA_A if incluye_iva else FACTURA_C
+    punto_venta, numero = _punto_venta_y_numero(numero, id_compra)
+    codigo_documento, documento = _documento(identificacion)
+    iva = _centavos(iva_monto) if incluye_iva else 0
+
+    comprobante = COMPRAS_CBTE.formatear(
+        _fecha(fecha), tipo, punto_venta, numero, "", codigo_documento, documento,
+        _texto(nombre), _centavos(total), 0, 0, 0, 0, 0, 0, 0,
+        MONEDA, TIPO_CAMBIO, 1 if incluye_iva else 0, OPERACION_GRAVADA, iva, 0, 0, "", 0,
+    )
+    if not incluye_iva:
+        return comprobante, ()
+    alicuota = COMPRAS_ALICUOTAS.formatear(
+        tipo, punto_venta, numero, codigo_documento, documento, _centavos(subtotal),
+        codigo_alicuota(subtotal, iva_monto), iva,
+    )
+    return comprobante, (alicuota,)
+
+
+def ventas(periodo):
+    from ventas.models import Venta
+
+    return Venta.objects.filter(
+        fecha__gte=periodo.fecha_desde,
+        fecha__lte=periodo.fecha_hasta,
+        anulada=False,
+    ).order_by("fecha", "id").values_list(*CAMPOS_VENTAS)
+
+
+def compras(periodo):
+    from compras.models import Compra
+
+    return Compra.objects.filter(
+        fecha__gte=periodo.fecha_desde,
+        fecha__lte=periodo.fecha_hasta,
+        anulada=False,
+    ).order_by("fecha", "id").values_list(*CAMPOS_COMPRAS)
+
+
+# ============================================================================
+# ZIP
+# ============================================================================
+
+def _escribir_libro(archivo, salida, filas, lineas, nombre_cbte, nombre_alicuotas):
+    """Escribe comprobantes y alícuotas de `filas` en una pasada."""
+    with tempfile.SpooledTemporaryFile(max_size=ALICUOTAS_EN_MEMORIA) as alicuotas:
+        with archivo.open(nombre_cbte, "w", force_zip64=True) as destino:
+            for numero, fila in enumerate(filas.iterator(chunk_size=CHUNK_SIZE), start=1):
+                comprobante, lineas_alicuotas = lineas(fila)
+                destino.write(comprobante.encode(CODIFICACION, "replace"))
+                for linea in lineas_alicuotas:
+                    alicuotas.write(linea.encode(CODIFICACION, "replace"))
+                if numero % FILAS_POR_ENVIO == 0:
+                    yield salida.vaciar()
+        yield salida.vaciar()
+
+        alicuotas.seek(0)
+        with archivo.open(nombre_alicuotas, "w", force_zip64=True) as destino:
+            while True:
+                bloque = alicuotas.read(shutil.COPY_BUFSIZE)
+                if not bloque:
+                    break
+                destino.write(bloque)
+                yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def generar_zip(periodo):
+    """Genera el ZIP con los cuatro TXT en bloques de bytes."""
+    salida = SalidaZip()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+        yield from _escribir_libro(
+            archivo, salida, ventas(periodo), lineas_ventas,
+            ARCHIVOS["ventas_cbte"], ARCHIVOS["ventas_alicuotas"],
+        )
+        yield from _escribir_libro(
+            archivo, salida, compras(periodo), lineas_compras,
+            ARCHIVOS["compras_cbte"], ARCHIVOS["compras_alicuotas"],
+        )
+    yield salida.vaciar()
+
+
+def respuesta_streaming(periodo):
+    """StreamingHttpResponse con el ZIP del Libro IVA Digital del período."""
+    response = StreamingHttpResponse(
+        (bloque for bloque in generar_zip(periodo) if bloque), content_type="application/zip"
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="libro_iva_digital_{periodo.anio}_{periodo.mes:02d}.zip"'
+    )
+    return response
@@ -0,0 +1,297 @@
+"""
+Almacenamiento de LogAFIP por mes y archivo de los meses viejos.
+
+Cada intento de autorización deja logs con el XML de ida y vuelta, así
+que la tabla crece todos los días. Se divide por mes de fecha_hora:
+
+- PostgreSQL: particionado nativo (PARTITION BY RANGE). Hay una partición
+  por mes (<tabla>_pAAAAMM) y una DEFAULT para lo que llegue a un mes sin
+  partición. La migración 0023 convierte la tabla; crear_particiones() crea
+  las de los próximos meses (lo hace también el comando de archivo).
+- SQLite: se emula con el índice por fecha_hora. Cada mes es un rango de
+  ese índice y archivarlo es un DELETE del rango.
+
+archivar() pasa los meses anteriores a la retención a archivos JSON Lines
+comprimidos (logafip-AAAA-MM.jsonl.gz) y después los borra: en PostgreSQL
+con DETACH + DROP de la partición, sin recorrer filas. El archivo se
+escribe completo (temporal + rename) antes de borrar.
+
+Los meses son del huso horario local (TIME_ZONE), igual que TruncMonth.
+
+Uso:
+    python manage.py archivar_logs_afip
+"""
+
+import gzip
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+TABLA = "finanzas_reportes_logafip"
+
+CAMPOS_ARCHIVO = (
+    "id", "factura_id", "fecha_hora", "accion", "resultado", "mensaje",
+    "codigo_error", "request_xml", "response_xml",
+)
+
+
+def particionada(conexion=None):
+    """True si la tabla usa particionado nativo (PostgreSQL)."""
+    return (conexion or connection).vendor == "postgresql"
+
+
+def inicio_mes(anio, mes):
+    return timezone.make_aware(datetime(anio, mes, 1))
+
+
+def mes_siguiente(anio, mes):
+    return (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def nombre_particion(anio, mes):
+    return f"{TABLA}_p{anio}{mes:02d}"
+
+
+# ============================================================================
+# POSTGRESQL
+# ============================================================================
+
+def _rango(anio, mes):
+    desde, hasta = inicio_mes(anio, mes), inicio_mes(*mes_siguiente(anio, mes))
+    return f"'{desde.isoformat()}'", f"'{hasta.isoformat()}'"
+
+
+def _existe(cursor, tabla):
+    cursor.execute("SELECT to_regclass(%s)", [tabla])
+    return cursor.fetchone()[0] is not None
+
+
+def _crear_particion(cursor, anio, mes):
+    """
+    Crea la partición del mes. Si la DEFAULT ya tiene filas de ese mes,
+    PostgreSQL no deja crearla: se separa la DEFAULT, se crea y se mueven.
+
+    Returns:
+        bool: True si la creó
+    """
+    nombre = nombre_particion(anio, mes)
+    if _existe(cursor, nombre):
+        return False
+
+    desde, hasta = _rango(anio, mes)
+    defecto = f"{TABLA}_default"
+    cursor.execute(f"SELECT 1 FROM {defecto} WHERE fecha_hora >= {desde} AND fecha_hora < {hasta} LIMIT 1")
+    crear = f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM ({desde}) TO ({hasta})"
+    if cursor.fetchone() is None:
+        cursor.execute(crear)
+        return True
+
+    with transaction.atomic():
+        cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {defecto}")
+        cursor.execute(crear)
+        cursor.execute(
+            f"INSERT INTO {TABLA} SELECT * FROM {defecto} WHERE fecha_hora >= {desde} AND fecha_hora < {hasta}"
+        )
+        cursor.execute(f"DELETE FROM {defecto} WHERE fecha_hora >= {desde} AND fecha_hora < {hasta}")
+        cursor.execute(f"ALTER TABLE {TABLA} ATTACH PARTITION {defecto} DEFAULT")
+    return True
+
+
+def crear_particiones(meses_adelante=2, conexion=None):
+    """
+    Particiones del mes actual y los `meses_adelante` siguientes (sólo
+    PostgreSQL; en SQLite no hace nada).
+
+    Returns:
+        list: Nombres de las particiones creadas
+    """
+    conexion = conexion or connection
+    if not particionada(conexion):
+        return []
+
+    hoy = timezone.localdate()
+    anio, mes = hoy.year, hoy.month
+    creadas = []
+    with conexion.cursor() as cursor:
+        for _ in range(meses_adelante + 1):
+            if _crear_particion(cursor, anio, mes):
+                creadas.append(nombre_particion(anio, mes))
+            anio, mes = mes_siguiente(anio, mes)
+    return creadas
+
+
+def _reconstruir(schema_editor, particionar):
+    """
+    Vuelve a crear la tabla de LogAFIP, particionada por mes o simple, con
+    los mismos datos, índices y claves foráneas (migración 0023).
+    """
+    anterior = f"{TABLA}_anterior"
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME TO {anterior}")
+        # Índices (salvo la clave primaria) y FK, para recrearlos con sus nombres
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p')",
+            [anterior, anterior],
+        )
+        indices = [
+            re.sub(rf" ON (ONLY )?(\S+\.)?{anterior} ", f" ON {TABLA} ", definicion)
+            for definicion, in cursor.fetchall()
+        ]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [anterior],
+        )
+        claves = cursor.fetchall()
+
+        cursor.execute(
+            f"CREATE TABLE {TABLA} (LIKE {anterior})" + (" PARTITION BY RANGE (fecha_hora)" if particionar else "")
+        )
+        if particionar:
+            cursor.execute(f"CREATE TABLE {TABLA}_default PARTITION OF {TABLA} DEFAULT")
+            cursor.execute(
+                f"SELECT DISTINCT EXTRACT(YEAR FROM fecha_hora AT TIME ZONE %s)::int, "
+                f"EXTRACT(MONTH FROM fecha_hora AT TIME ZONE %s)::int FROM {anterior}",
+                [timezone.get_current_timezone_name()] * 2,
+            )
+            for anio, mes in cursor.fetchall():
+                _crear_particion(cursor, anio, mes)
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {anterior}")
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {anterior}")
+        ultimo_id = cursor.fetchone()[0]
+        # Borra también la secuencia del id y los nombres de índices y constraints
+        cursor.execute(f"DROP TABLE {anterior}")
+
+        if particionar:
+            # La clave de partición tiene que estar en la clave primaria, y
+            # las columnas identity en tablas particionadas recién existen en
+            # PostgreSQL 17: el id sale de una secuencia común
+            cursor.execute(f"ALTER TABLE {TABLA} ADD PRIMARY KEY (id, fecha_hora)")
+            cursor.execute(f"CREATE SEQUENCE {TABLA}_id_seq OWNED BY {TABLA}.id")
+            cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id SET DEFAULT nextval('{TABLA}_id_seq')")
+        else:
+            cursor.execute(f"ALTER TABLE {TABLA} ADD PRIMARY KEY (id)")
+            cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, false)", [TABLA, ultimo_id + 1])
+
+        for definicion in indices:
+            cursor.execute(definicion)
+        for nombre, definicion in claves:
+            cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}")
+        if particionar:
+            crear_particiones(conexion=schema_editor.connection)
+
+
+def particionar(apps, schema_editor):
+    if particionada(schema_editor.connection):
+        _reconstruir(schema_editor, particionar=True)
+
+
+def desparticionar(apps, schema_editor):
+    if particionada(schema_editor.connection):
+        _reconstruir(schema_editor, particionar=False)
+
+
+# ============================================================================
+# ARCHIVO
+# ============================================================================
+
+def meses_con_logs():
+    """(año, mes, cantidad) de cada mes con logs, del más viejo al más nuevo."""
+    from .models import LogAFIP
+
+    filas = (
+        LogAFIP.objects.annotate(mes=TruncMonth("fecha_hora"))
+        .values("mes")
+        .annotate(cantidad=Count("id"))
+        .order_by("mes")
+    )
+    return [(fila["mes"].year, fila["mes"].month, fila["cantidad"]) for fila in filas]
+
+
+def _destino(directorio, anio, mes):
+    """Ruta libre para el archivo del mes (sufijo -2, -3, ... si ya se archivó antes)."""
+    base = os.path.join(directorio, f"logafip-{anio}-{mes:02d}")
+    destino, numero = f"{base}.jsonl.gz", 1
+    while os.path.exists(destino):
+        numero += 1
+        destino = f"{base}-{numero}.jsonl.gz"
+    return destino
+
+
+def _exportar(logs, destino):
+    """Escribe `logs` en JSON Lines comprimido; devuelve cuántos escribió."""
+    cantidad = 0
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as crudo, gzip.GzipFile(fileobj=crudo, mode="wb") as archivo:
+            for log in logs.values(*CAMPOS_ARCHIVO).iterator(chunk_size=2000):
+                archivo.write(json.dumps(log, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b"\n")
+                cantidad += 1
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return cantidad
+
+
+def _borrar_mes(logs, anio, mes):
+    """Borra los logs del mes: la partición entera si existe, y el resto por rango."""
+    if particionada():
+        nombre = nombre_particion(anio, mes)
+        with connection.cursor() as cursor:
+            if _existe(cursor, nombre):
+                cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}")
+                cursor.execute(f"DROP TABLE {nombre}")
+    # Sin señales ni cascadas: Django lo hace con un único DELETE
+    logs.delete()
+
+
+def archivar(meses_retencion, directorio, simular=False):
+    """
+    Archiva y borra los logs de los meses anteriores a los últimos
+    `meses_retencion` (contando el actual).
+
+    Returns:
+        list: Un dict por mes (anio, mes, cantidad, archivo)
+    """
+    from .models import LogAFIP
+
+    hoy = timezone.localdate()
+    indice_corte = hoy.year * 12 + hoy.month - 1 - (meses_retencion - 1)
+    limite = (indice_corte // 12, indice_corte % 12 + 1)
+
+    archivados = []
+    if not simular:
+        os.makedirs(directorio, exist_ok=True)
+    for anio, mes, cantidad in meses_con_logs():
+        if (anio, mes) >= limite:
+            break
+        logs = LogAFIP.objects.filter(
+            fecha_hora__gte=inicio_mes(anio, mes),
+            fecha_hora__lt=inicio_mes(*mes_siguiente(anio, mes)),
+        ).order_by("fecha_hora", "id")
+        destino = _destino(directorio, anio, mes)
+        if not simular:
+            with transaction.atomic():
+                cantidad = _exportar(logs, destino)
+                _borrar_mes(logs.order_by(), anio, mes)
+        archivados.append({"anio": anio, "mes": mes, "cantidad": cantidad, "archivo": destino})
+    return archivados
+
+
+def leer_archivo(ruta):
+    """Logs de un archivo generado por archivar(), como dicts, de a uno."""
+    with gzip.open(ruta, "rt", encoding="utf-8") as archivo:
+        for linea in archivo:
+            yield json.loads(linea)
@@ -0,0 +1,56 @@
+"""
+Comando de Django para recalcular las alertas del dashboard que dependen de la fecha.
+
+Pensado para correr una vez por día (cron / tarea programada), por ejemplo:
+    0 3 * * * cd /app/backend && python manage.py actualizar_alertas
+
+Los cambios de stock, ventas, cobros y cuentas por pagar ya actualizan las
+alertas en el momento; este comando mueve las que cambian solo por el paso
+del tiempo (días de vencimiento, próximos vencimientos, aniversarios).
+
+Uso:
+    python manage.py actualizar_alertas [--completo] [--fecha AAAA-MM-DD]
+
+Opciones:
+    --completo: También resincroniza las alertas de stock (reconstrucción total)
+    --fecha: Fecha de referencia (default: hoy)
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas_reportes import alertas
+
+
+def _parse_fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor}. Usa formato AAAA-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las alertas del dashboard que dependen de la fecha'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='También resincroniza las alertas de stock',
+        )
+        parser.add_argument('--fecha', type=_parse_fecha, help='Fecha de referencia (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("ACTUALIZACIÓN DE ALERTAS"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+
+        resultado = alertas.actualizar_por_fecha(hoy=options['fecha'], completo=options['completo'])
+
+        for fuente, stats in resultado.items():
+            self.stdout.write(
+                f"  {fuente}: {stats['creadas']} creadas, "
+                f"{stats['actualizadas']} actualizadas, {stats['eliminadas']} eliminadas"
+            )
+        self.stdout.write(self.style.SUCCESS("Alertas actualizadas"))
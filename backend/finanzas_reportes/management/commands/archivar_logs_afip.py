@@ -0,0 +1,67 @@
+"""
+Comando de Django para archivar los LogAFIP viejos.
+
+Pasa los logs de los meses anteriores a la retención a archivos JSON Lines
+comprimidos (uno por mes) y los borra de la base. En PostgreSQL además crea
+las particiones de los próximos meses. Conviene correrlo una vez por mes.
+
+Uso:
+    python manage.py archivar_logs_afip [--meses N] [--directorio DIR] [--simular]
+
+Opciones:
+    --meses: Meses que quedan en la base, contando el actual (default: LOGS_AFIP_MESES_RETENCION)
+    --directorio: Carpeta de los archivos (default: LOGS_AFIP_ARCHIVO_DIR)
+    --simular: Muestra qué meses se archivarían, sin escribir ni borrar
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas_reportes import logs_afip
+
+
+class Command(BaseCommand):
+    help = 'Archiva en JSON Lines comprimido los logs de AFIP de meses viejos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=settings.LOGS_AFIP_MESES_RETENCION,
+            help='Meses que quedan en la base, contando el actual',
+        )
+        parser.add_argument(
+            '--directorio',
+            default=str(settings.LOGS_AFIP_ARCHIVO_DIR),
+            help='Carpeta donde se guardan los archivos',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo muestra qué se archivaría',
+        )
+
+    def handle(self, *args, **options):
+        if options['meses'] < 1:
+            raise CommandError("--meses tiene que ser al menos 1 (el mes actual)")
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("ARCHIVO DE LOGS AFIP"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(f"Retención: {options['meses']} meses")
+        self.stdout.write(f"Directorio: {options['directorio']}")
+        self.stdout.write("")
+
+        if not options['simular']:
+            for particion in logs_afip.crear_particiones():
+                self.stdout.write(f"  Partición creada: {particion}")
+
+        archivados = logs_afip.archivar(options['meses'], options['directorio'], simular=options['simular'])
+        for mes in archivados:
+            self.stdout.write(f"  {mes['anio']}-{mes['mes']:02d}: {mes['cantidad']} logs -> {mes['archivo']}")
+
+        total = sum(mes['cantidad'] for mes in archivados)
+        if options['simular']:
+            self.stdout.write(self.style.WARNING(f"SIMULACIÓN: se archivarían {total} logs de {len(archivados)} meses"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Logs archivados: {total} de {len(archivados)} meses"))
@@ -0,0 +1,70 @@
+"""
+Comando de Django para inicializar y verificar la cuenta corriente de clientes.
+
+A los clientes que todavía no tienen movimientos en MovimientoCuentaCorriente
+les agrega una fila SALDO_INICIAL con el saldo de sus ventas y pagos no
+anulados. Después compara el saldo actual del libro de cada cliente con el
+calculado desde ventas y pagos.
+
+Uso:
+    python manage.py inicializar_cuenta_corriente [--cliente ID] [--verificar] [--verbose]
+
+Opciones:
+    --cliente: Limita a un cliente (se puede repetir)
+    --verificar: Solo compara los saldos, sin escribir
+    --verbose: Muestra cada diferencia encontrada
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes.models import Cliente
+from finanzas_reportes import cuenta_corriente
+
+
+class Command(BaseCommand):
+    help = 'Inicializa o verifica la cuenta corriente de los clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            action='append',
+            dest='clientes',
+            help='ID de cliente (default: todos)',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo verifica los saldos contra ventas y pagos, sin escribir',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Muestra información detallada',
+        )
+
+    def handle(self, *args, **options):
+        clientes = options['clientes'] or list(Cliente.objects.values_list('id', flat=True))
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("CUENTA CORRIENTE DE CLIENTES"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(f"Clientes: {', '.join(map(str, options['clientes'])) if options['clientes'] else 'todos'}")
+        self.stdout.write("")
+
+        if not options['verificar']:
+            inicializados = cuenta_corriente.inicializar(clientes)
+            self.stdout.write(self.style.SUCCESS(f"Clientes inicializados: {inicializados}"))
+
+        diferencias = cuenta_corriente.verificar(clientes)
+        if options['verbose']:
+            for diferencia in diferencias:
+                self.stdout.write(
+                    f"  [cliente {diferencia['cliente']}] "
+                    f"libro={diferencia['libro']} calculado={diferencia['calculado']}"
+                )
+
+        if diferencias:
+            raise CommandError(f"La cuenta corriente tiene {len(diferencias)} diferencias con ventas y pagos")
+
+        self.stdout.write(self.style.SUCCESS("Cuenta corriente consistente con ventas y pagos"))
@@ -0,0 +1,75 @@
+"""
+Comando de Django para reconstruir y verificar el rollup financiero diario.
+
+Recalcula ResumenDiarioOperaciones y ResumenDiarioMovimiento desde Venta,
+PagoCliente, Compra y MovimientoFinanciero.
+
+Uso:
+    python manage.py reconstruir_resumen_financiero [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD] [--verificar] [--verbose]
+
+Opciones:
+    --desde / --hasta: Limita el rango de fechas (default: toda la historia)
+    --verificar: Solo compara el rollup contra las tablas origen, sin escribir
+    --verbose: Muestra cada diferencia encontrada
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas_reportes import resumen_diario
+
+
+def _parse_fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor}. Usa formato AAAA-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye o verifica el rollup financiero diario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_parse_fecha, help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=_parse_fecha, help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo verifica el rollup contra las tablas origen, sin escribir',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Muestra información detallada',
+        )
+
+    def handle(self, *args, **options):
+        desde = options['desde']
+        hasta = options['hasta']
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("ROLLUP FINANCIERO DIARIO"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(f"Rango: {desde or 'inicio'} -> {hasta or 'hoy'}")
+        self.stdout.write("")
+
+        if not options['verificar']:
+            filas = resumen_diario.reconstruir(desde, hasta)
+            self.stdout.write(self.style.SUCCESS(
+                f"Rollup reconstruido: {filas['operaciones']} días de operaciones, "
+                f"{filas['movimientos']} filas de movimientos"
+            ))
+
+        diferencias = resumen_diario.verificar(desde, hasta)
+        if options['verbose']:
+            for diferencia in diferencias:
+                self.stdout.write(
+                    f"  [{diferencia['tabla']}] {diferencia['clave']}: "
+                    f"esperado={diferencia['esperado']} guardado={diferencia['guardado']}"
+                )
+
+        if diferencias:
+            raise CommandError(f"El rollup tiene {len(diferencias)} diferencias con las tablas origen")
+
+        self.stdout.write(self.style.SUCCESS("Rollup consistente con las tablas origen"))
@@ -0,0 +1,67 @@
+"""
+Comando de Django para reconstruir y verificar los saldos diarios por cuenta.
+
+Recalcula SaldoDiarioCuenta (libros y banco) desde MovimientoFinanciero y
+MovimientoBancario, y actualiza CuentaBancaria.saldo_actual.
+
+Uso:
+    python manage.py reconstruir_saldos_cuentas [--cuenta ID] [--verificar] [--verbose]
+
+Opciones:
+    --cuenta: Limita a una cuenta bancaria (se puede repetir)
+    --verificar: Solo compara los saldos contra las tablas origen, sin escribir
+    --verbose: Muestra cada diferencia encontrada
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas_reportes import saldos_cuentas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye o verifica los saldos diarios por cuenta bancaria'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cuenta',
+            type=int,
+            action='append',
+            dest='cuentas',
+            help='ID de cuenta bancaria (default: todas)',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo verifica los saldos contra las tablas origen, sin escribir',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Muestra información detallada',
+        )
+
+    def handle(self, *args, **options):
+        cuentas = options['cuentas']
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("SALDOS DIARIOS POR CUENTA BANCARIA"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(f"Cuentas: {', '.join(map(str, cuentas)) if cuentas else 'todas'}")
+        self.stdout.write("")
+
+        if not options['verificar']:
+            filas = saldos_cuentas.reconstruir(cuentas)
+            self.stdout.write(self.style.SUCCESS(f"Saldos reconstruidos: {filas} días"))
+
+        diferencias = saldos_cuentas.verificar(cuentas)
+        if options['verbose']:
+            for diferencia in diferencias:
+                self.stdout.write(
+                    f"  [cuenta {diferencia['cuenta']} {diferencia['fuente']}] {diferencia['fecha']}: "
+                    f"esperado={diferencia['esperado']} guardado={diferencia['guardado']}"
+                )
+
+        if diferencias:
+            raise CommandError(f"Los saldos tienen {len(diferencias)} diferencias con las tablas origen")
+
+        self.stdout.write(self.style.SUCCESS("Saldos consistentes con las tablas origen"))
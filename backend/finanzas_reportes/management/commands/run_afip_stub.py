@@ -0,0 +1,65 @@
+"""
+Comando de Django que levanta el stub local de AFIP (WSAA + WSFEv1).
+
+Permite probar la autorización de facturas sin conexión a AFIP. Apuntar
+AFIP_WSAA_URL y AFIP_WSFE_URL a las URLs que muestra al iniciar.
+
+Uso:
+    python manage.py run_afip_stub [--puerto 8765] [--latencia 0.05]
+
+Opciones:
+    --puerto: Puerto en 127.0.0.1 (default: 8765)
+    --latencia: Segundos de demora por solicitud, para simular la red
+    --rechazar-documento: DocNro que el stub rechaza (se puede repetir)
+"""
+
+from django.core.management.base import BaseCommand
+
+from finanzas_reportes.afip_stub import ServidorAFIPStub
+
+
+class Command(BaseCommand):
+    help = 'Levanta un servidor local que imita el WSAA y el WSFEv1 de AFIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--puerto',
+            type=int,
+            default=8765,
+            help='Puerto donde escuchar (default: 8765)',
+        )
+        parser.add_argument(
+            '--latencia',
+            type=float,
+            default=0,
+            help='Segundos de demora por solicitud',
+        )
+        parser.add_argument(
+            '--rechazar-documento',
+            action='append',
+            default=[],
+            help='Número de documento que se rechaza con observación 10015',
+        )
+
+    def handle(self, *args, **options):
+        stub = ServidorAFIPStub(puerto=options['puerto'], latencia=options['latencia'])
+        stub.documentos_rechazados.update(options['rechazar_documento'])
+        servidor = stub.crear_servidor()
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("STUB AFIP (WSAA + WSFEv1)"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(f"  AFIP_WSAA_URL={stub.url_wsaa}")
+        self.stdout.write(f"  AFIP_WSFE_URL={stub.url_wsfe}")
+
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrumpido"))
+        finally:
+            servidor.server_close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Solicitudes FECAESolicitar: {len(stub.solicitudes)}, "
+            f"comprobantes autorizados: {len(stub.comprobantes)}"
+        ))
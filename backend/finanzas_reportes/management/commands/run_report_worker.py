@@ -0,0 +1,94 @@
+"""
+Comando de Django que procesa la cola de reportes en segundo plano.
+
+Toma los TrabajoReporte pendientes (creados por las acciones de reporte
+llamadas con ?asincrono=1), los ejecuta fuera de gunicorn y guarda el
+resultado comprimido. No necesita broker: la cola es la base de datos.
+Se pueden correr varios workers en paralelo (en PostgreSQL cada trabajo
+se reserva con SELECT FOR UPDATE SKIP LOCKED).
+
+En cada vuelta también reencola los trabajos abandonados por un worker
+caído y elimina los resultados vencidos.
+
+Uso:
+    python manage.py run_report_worker [--una-vez] [--intervalo 2] [--max-trabajos N]
+
+Opciones:
+    --una-vez: Procesa lo pendiente y termina (útil para cron o pruebas)
+    --intervalo: Segundos de espera cuando la cola está vacía (default: 2)
+    --max-trabajos: Termina después de N trabajos (para reciclar el proceso)
+"""
+
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from finanzas_reportes import trabajos
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de reportes en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2,
+            help='Segundos de espera cuando no hay trabajos (default: 2)',
+        )
+        parser.add_argument(
+            '--max-trabajos',
+            type=int,
+            default=None,
+            help='Cantidad máxima de trabajos antes de terminar',
+        )
+
+    def handle(self, *args, **options):
+        trabajador = f"{socket.gethostname()}:{os.getpid()}"
+        procesados = 0
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING(f"WORKER DE REPORTES {trabajador}"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+
+        try:
+            while options['max_trabajos'] is None or procesados < options['max_trabajos']:
+                close_old_connections()
+                self._mantenimiento()
+
+                trabajo = trabajos.tomar_siguiente(trabajador)
+                if trabajo is None:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+
+                inicio = time.monotonic()
+                trabajo = trabajos.ejecutar(trabajo)
+                procesados += 1
+                estilo = self.style.SUCCESS if trabajo.estado == trabajo.Estado.COMPLETADO else self.style.ERROR
+                self.stdout.write(estilo(
+                    f"  #{trabajo.id} {trabajo.metodo} {trabajo.ruta}: {trabajo.estado} "
+                    f"({time.monotonic() - inicio:.1f}s, {trabajo.tamano_resultado} bytes)"
+                ))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrumpido"))
+
+        self.stdout.write(self.style.SUCCESS(f"Trabajos procesados: {procesados}"))
+
+    def _mantenimiento(self):
+        reencolados, agotados = trabajos.recuperar_abandonados()
+        vencidos = trabajos.purgar_vencidos()
+        if reencolados or agotados or vencidos:
+            self.stdout.write(
+                f"  Mantenimiento: {reencolados} reencolados, {agotados} con error, "
+                f"{vencidos} vencidos eliminados"
+            )
@@ -0,0 +1,73 @@
+"""
+Comando de Django para verificar los acumuladores de IVA de los períodos.
+
+Compara iva_debito_fiscal e iva_credito_fiscal de cada PeriodoIVA (que se
+mantienen por deltas, ver iva_periodos.py) con un recálculo completo desde
+las ventas y compras del mes.
+
+Uso:
+    python manage.py verificar_periodos_iva [--periodo ID] [--corregir]
+
+Opciones:
+    --periodo: Limita a un período IVA (se puede repetir)
+    --corregir: Reemplaza los acumuladores con diferencias por el recálculo
+                (sólo períodos abiertos)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas_reportes import iva_periodos
+from finanzas_reportes.models import PeriodoIVA
+
+
+class Command(BaseCommand):
+    help = 'Verifica los acumuladores de IVA de los períodos contra un recálculo completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            type=int,
+            action='append',
+            dest='periodos',
+            help='ID de período IVA (default: todos)',
+        )
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Corrige los períodos abiertos con diferencias',
+        )
+
+    def handle(self, *args, **options):
+        periodos = PeriodoIVA.objects.order_by('anio', 'mes')
+        if options['periodos']:
+            periodos = periodos.filter(pk__in=options['periodos'])
+
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("VERIFICACIÓN DE PERÍODOS IVA"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+
+        diferencias = iva_periodos.verificar(periodos)
+        for diferencia in diferencias:
+            periodo = diferencia['periodo']
+            self.stdout.write(
+                f"  [{periodo.mes:02d}/{periodo.anio} {periodo.estado}] {diferencia['campo']}: "
+                f"acumulado={diferencia['acumulado']} calculado={diferencia['calculado']} "
+                f"(desvío {diferencia['acumulado'] - diferencia['calculado']})"
+            )
+
+        if options['corregir']:
+            abiertos = {
+                diferencia['periodo'].pk: diferencia['periodo'] for diferencia in diferencias
+                if diferencia['periodo'].estado == PeriodoIVA.Estado.ABIERTO
+            }
+            for periodo in abiertos.values():
+                periodo.recalcular_desde_ventas_compras()
+            self.stdout.write(self.style.SUCCESS(f"Períodos corregidos: {len(abiertos)}"))
+            diferencias = [
+                diferencia for diferencia in diferencias if diferencia['periodo'].pk not in abiertos
+            ]
+
+        if diferencias:
+            raise CommandError(f"Los acumuladores de IVA tienen {len(diferencias)} diferencias")
+
+        self.stdout.write(self.style.SUCCESS("Acumuladores de IVA consistentes"))
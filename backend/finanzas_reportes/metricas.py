@@ -0,0 +1,165 @@
+"""
+Compilador declarativo de métricas para reportes.
+
+Un reporte declara métricas con nombre (Suma/Conteo más un filtro Q opcional)
+y los conjuntos de agrupación que necesita. El compilador las resuelve en
+UNA sola consulta con agregación condicional:
+
+    reporte = Reporte(
+        FacturaElectronica.objects.filter(fecha_emision__gte=desde),
+        metricas={
+            'cantidad': Conteo(),
+            'total_importe': Suma('importe_total'),
+            'autorizadas': Conteo(filtro=Q(estado='APROBADO')),
+        },
+        agrupaciones=[(), ('estado',), ('tipo_comprobante',)],
+    )
+    resultado = reporte.ejecutar()
+    resultado['cantidad']               # total general
+    resultado.por('estado')             # filas agrupadas por estado
+
+Los GROUPING SETS se emulan agrupando por la unión de todas las claves
+pedidas y consolidando en Python cada conjunto: Suma y Conteo son
+aditivos, así que el resultado es idéntico y funciona igual en SQLite y
+PostgreSQL. Conviene para dimensiones de baja cardinalidad (estado, tipo,
+medio de pago); para claves de alta cardinalidad usar reportes separados.
+
+Los resultados vienen tipados: Conteo devuelve int y Suma devuelve el tipo
+del campo (Decimal para DecimalField), con cero en lugar de None.
+"""
+
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Count, Sum
+
+
+class Metrica:
+    """Métrica aditiva de un reporte. Usar Suma() o Conteo()."""
+
+    def __init__(self, funcion, campo, filtro=None):
+        self.funcion = funcion
+        self.campo = campo
+        self.filtro = filtro
+
+    def expresion(self):
+        return self.funcion(self.campo, filter=self.filtro)
+
+    def cero(self, modelo):
+        """Valor neutro tipado según el campo agregado."""
+        if self.funcion is Count:
+            return 0
+        try:
+            campo = modelo._meta.get_field(self.campo)
+        except FieldDoesNotExist:
+            return Decimal("0")
+        if isinstance(campo, models.DecimalField):
+            return Decimal("0")
+        if isinstance(campo, models.FloatField):
+            return 0.0
+        return 0
+
+
+def Suma(campo, filtro=None):
+    return Metrica(Sum, campo, filtro)
+
+
+def Conteo(campo="id", filtro=None):
+    return Metrica(Count, campo, filtro)
+
+
+class ResultadoReporte:
+    """Totales y filas agrupadas de un reporte ejecutado."""
+
+    def __init__(self, totales, grupos):
+        self.totales = totales
+        self.grupos = grupos
+
+    def __getitem__(self, nombre):
+        return self.totales[nombre]
+
+    def por(self, *claves):
+        """Filas de un conjunto de agrupación, ordenadas por sus claves."""
+        return self.grupos[tuple(claves)]
+
+
+def _orden_clave(valor):
+    # None al final y sin comparar None contra otros tipos
+    return (valor is None, valor)
+
+
+class Reporte:
+    """
+    Reporte declarativo compilado a una única consulta de agregación.
+
+    Args:
+        queryset: Filas sobre las que se calculan las métricas
+        metricas: dict nombre -> Metrica
+        agrupaciones: Conjuntos de agrupación; () es el total general
+    """
+
+    def __init__(self, queryset, metricas, agrupaciones=((),)):
+        self.queryset = queryset
+        self.metricas = metricas
+        self.agrupaciones = [tuple(agrupacion) for agrupacion in agrupaciones]
+
+    @property
+    def claves(self):
+        """Unión ordenada de todas las claves de agrupación."""
+        claves = []
+        for agrupacion in self.agrupaciones:
+            for clave in agrupacion:
+                if clave not in claves:
+                    claves.append(clave)
+        return claves
+
+    def _ceros(self):
+        modelo = self.queryset.model
+        return {nombre: metrica.cero(modelo) for nombre, metrica in self.metricas.items()}
+
+    def _tipar(self, fila, ceros):
+        for nombre, cero in ceros.items():
+            if fila[nombre] is None:
+                fila[nombre] = cero
+        return fila
+
+    def ejecutar(self):
+        ceros = self._ceros()
+        agregados = {nombre: metrica.expresion() for nombre, metrica in self.metricas.items()}
+        queryset = self.queryset.order_by()
+        claves = self.claves
+
+        if not claves:
+            totales = self._tipar(queryset.aggregate(**agregados), ceros)
+            return ResultadoReporte(totales, {(): [dict(totales)]})
+
+        filas = [self._tipar(fila, ceros) for fila in queryset.values(*claves).annotate(**agregados)]
+
+        totales = dict(ceros)
+        for fila in filas:
+            for nombre in self.metricas:
+                totales[nombre] += fila[nombre]
+
+        grupos = {(): [totales]}
+        for agrupacion in self.agrupaciones:
+            if not agrupacion:
+                continue
+            acumulado = {}
+            for fila in filas:
+                llave = tuple(fila[clave] for clave in agrupacion)
+                destino = acumulado.get(llave)
+                if destino is None:
+                    acumulado[llave] = {
+                        **dict(zip(agrupacion, llave)),
+                        **{nombre: fila[nombre] for nombre in self.metricas},
+                    }
+                else:
+                    for nombre in self.metricas:
+                        destino[nombre] += fila[nombre]
+            grupos[agrupacion] = [
+                acumulado[llave]
+                for llave in sorted(acumulado, key=lambda llave: tuple(_orden_clave(v) for v in llave))
+            ]
+
+        return ResultadoReporte(totales, grupos)
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:51
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def poblar_resumen_diario(apps, schema_editor):
+    """Construye el rollup diario desde los datos existentes"""
+    from finanzas_reportes import resumen_diario
+
+    resumen_diario.reconstruir(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0014_add_payment_allocation_system'),
+        ('ventas', '0011_add_payment_allocation_system'),
+        ('compras', '0010_add_anulacion_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioOperaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('ventas_cantidad', models.PositiveIntegerField(default=0)),
+                ('ventas_subtotal', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('ventas_iva', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('ventas_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('pagos_cantidad', models.PositiveIntegerField(default=0)),
+                ('pagos_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('compras_cantidad', models.PositiveIntegerField(default=0)),
+                ('compras_subtotal', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('compras_iva', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('compras_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'resumen diario de operaciones',
+                'verbose_name_plural': 'resúmenes diarios de operaciones',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioMovimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('EGRESO', 'Egreso')], max_length=10)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PAGADO', 'Pagado'), ('COBRADO', 'Cobrado'), ('PARCIAL', 'Pago Parcial'), ('CANCELADO', 'Cancelado')], max_length=15)),
+                ('origen', models.CharField(choices=[('MANUAL', 'Manual'), ('SERVICIO', 'Servicio'), ('GASTOS_VARIOS', 'Gastos varios'), ('IMPUESTO', 'Impuesto'), ('COMPRA', 'Compra'), ('VENTA', 'Venta'), ('PAGO_EMPLEADO', 'Pago empleado'), ('PAGO_PROVEEDOR', 'Pago proveedor')], max_length=20)),
+                ('medio_pago', models.CharField(blank=True, default='', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'resumen diario de movimientos',
+                'verbose_name_plural': 'resúmenes diarios de movimientos',
+                'ordering': ['-fecha', 'tipo', 'estado'],
+                'indexes': [models.Index(fields=['tipo', 'estado', 'fecha'], name='idx_resumen_mov_tipo_est')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumendiariomovimiento',
+            constraint=models.UniqueConstraint(fields=('fecha', 'tipo', 'estado', 'origen', 'medio_pago'), name='uniq_resumen_mov_dia'),
+        ),
+        migrations.RunPython(poblar_resumen_diario, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('finanzas_reportes', '0015_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Alerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('stock_bajo', 'Stock bajo'), ('pago_vencido', 'Pago vencido'), ('pago_proximo_vencer', 'Pago próximo a vencer'), ('pago_proveedor_vencido', 'Pago a proveedor vencido'), ('pago_proveedor_proximo_vencer', 'Pago a proveedor próximo a vencer'), ('aniversario_laboral', 'Aniversario laboral')], max_length=40)),
+                ('categoria', models.CharField(max_length=20)),
+                ('urgencia', models.CharField(choices=[('alta', 'Alta'), ('media', 'Media'), ('baja', 'Baja')], max_length=10)),
+                ('prioridad', models.PositiveSmallIntegerField(help_text='0 = alta, 1 = media, 2 = baja (para ordenar por índice)')),
+                ('object_id', models.PositiveIntegerField()),
+                ('entidad_id', models.PositiveIntegerField(blank=True, help_text='Id mostrado en el dashboard (cliente, proveedor, producto...)', null=True)),
+                ('titulo', models.CharField(max_length=255)),
+                ('descripcion', models.CharField(max_length=255)),
+                ('fecha', models.DateField(blank=True, null=True)),
+                ('datos', models.JSONField(blank=True, default=dict)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'alerta',
+                'verbose_name_plural': 'alertas',
+                'ordering': ['prioridad', 'fecha', 'id'],
+                'indexes': [models.Index(fields=['prioridad', 'fecha', 'id'], name='idx_alerta_prioridad'), models.Index(fields=['tipo', 'prioridad'], name='idx_alerta_tipo')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='alerta',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='uniq_alerta_origen'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:03
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0016_alerta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotVentasPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidad', models.CharField(choices=[('dia', 'Día'), ('semana', 'Semana'), ('mes', 'Mes'), ('trimestre', 'Trimestre')], max_length=10)),
+                ('inicio', models.DateField()),
+                ('fin', models.DateField()),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('cantidad_ventas', models.PositiveIntegerField(default=0)),
+                ('top_productos', models.JSONField(blank=True, default=list, help_text='Productos más vendidos del período')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'snapshot de ventas',
+                'verbose_name_plural': 'snapshots de ventas',
+                'ordering': ['granularidad', 'inicio'],
+                'indexes': [models.Index(fields=['inicio', 'fin'], name='idx_snapshot_ventas_rango')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='snapshotventasperiodo',
+            constraint=models.UniqueConstraint(fields=('granularidad', 'inicio'), name='uniq_snapshot_ventas_periodo'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0017_snapshot_ventas_periodo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=15)),
+                ('metodo', models.CharField(default='GET', max_length=10)),
+                ('ruta', models.CharField(max_length=255)),
+                ('parametros', models.JSONField(blank=True, default=dict, help_text='Query params (clave -> lista de valores)')),
+                ('cuerpo', models.JSONField(blank=True, null=True)),
+                ('host', models.CharField(blank=True, max_length=255)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('trabajador', models.CharField(blank=True, max_length=100)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('codigo_respuesta', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('tipo_contenido', models.CharField(blank=True, max_length=100)),
+                ('resultado', models.BinaryField(blank=True, help_text='Respuesta comprimida con zlib', null=True)),
+                ('tamano_resultado', models.PositiveIntegerField(default=0, help_text='Bytes sin comprimir')),
+                ('error', models.TextField(blank=True)),
+                ('expira_en', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'trabajo de reporte',
+                'verbose_name_plural': 'trabajos de reporte',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='idx_trabajo_cola'), models.Index(fields=['expira_en'], name='idx_trabajo_expira')],
+            },
+        ),
+    ]
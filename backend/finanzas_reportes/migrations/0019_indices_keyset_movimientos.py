@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0010_add_anulacion_fields'),
+        ('finanzas_reportes', '0018_trabajo_reporte'),
+        ('proveedores', '0001_initial'),
+        ('ventas', '0011_add_payment_allocation_system'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientofinanciero',
+            index=models.Index(fields=['tipo', 'estado', 'fecha', 'id'], name='idx_mov_tipo_estado_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientofinanciero',
+            index=models.Index(fields=['origen', 'fecha', 'id'], name='idx_mov_origen_fecha'),
+        ),
+    ]
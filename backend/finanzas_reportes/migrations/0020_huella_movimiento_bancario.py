@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0019_indices_keyset_movimientos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientobancario',
+            name='huella',
+            field=models.CharField(blank=True, editable=False, help_text='Hash de la línea del extracto, para no duplicarla al reimportar', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='movimientobancario',
+            constraint=models.UniqueConstraint(fields=('huella',), name='uniq_movimiento_bancario_huella'),
+        ),
+    ]
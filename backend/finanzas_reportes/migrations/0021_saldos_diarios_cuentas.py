@@ -0,0 +1,77 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:17
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def poblar_saldos_diarios(apps, schema_editor):
+    """Copia la cuenta de cada extracto a sus movimientos y construye los saldos diarios"""
+    from django.db.models import F, OuterRef, Subquery
+
+    from finanzas_reportes import saldos_cuentas
+
+    ExtractoBancario = apps.get_model("finanzas_reportes", "ExtractoBancario")
+    MovimientoBancario = apps.get_model("finanzas_reportes", "MovimientoBancario")
+    CuentaBancaria = apps.get_model("finanzas_reportes", "CuentaBancaria")
+
+    MovimientoBancario.objects.update(cuenta_bancaria=Subquery(
+        ExtractoBancario.objects.filter(pk=OuterRef("extracto_id")).values("cuenta_bancaria_id")[:1]
+    ))
+    # Todavía no hay movimientos financieros con cuenta: el saldo cargado a mano
+    # pasa a ser el saldo inicial
+    CuentaBancaria.objects.update(saldo_inicial=F("saldo_actual"))
+    saldos_cuentas.reconstruir(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0020_huella_movimiento_bancario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuentabancaria',
+            name='saldo_inicial',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Saldo anterior al primer movimiento registrado en la cuenta', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='movimientobancario',
+            name='cuenta_bancaria',
+            field=models.ForeignKey(editable=False, help_text='Copia de extracto.cuenta_bancaria, para el saldo diario por cuenta', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_bancarios', to='finanzas_reportes.cuentabancaria'),
+        ),
+        migrations.AddField(
+            model_name='movimientofinanciero',
+            name='cuenta_bancaria',
+            field=models.ForeignKey(blank=True, help_text='Cuenta en la que impacta el movimiento (saldo diario por cuenta)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_financieros', to='finanzas_reportes.cuentabancaria'),
+        ),
+        migrations.AlterField(
+            model_name='cuentabancaria',
+            name='saldo_actual',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Saldo en libros; se actualiza con los movimientos financieros de la cuenta', max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='SaldoDiarioCuenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fuente', models.CharField(choices=[('LIBRO', 'Libros (movimientos financieros)'), ('BANCO', 'Banco (extractos)')], max_length=5)),
+                ('fecha', models.DateField()),
+                ('ingresos', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('egresos', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('saldo', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('cuenta_bancaria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_diarios', to='finanzas_reportes.cuentabancaria')),
+            ],
+            options={
+                'verbose_name': 'saldo diario de cuenta',
+                'verbose_name_plural': 'saldos diarios de cuentas',
+                'ordering': ['cuenta_bancaria', 'fuente', 'fecha'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='saldodiariocuenta',
+            constraint=models.UniqueConstraint(fields=('cuenta_bancaria', 'fuente', 'fecha'), name='uniq_saldo_diario_cuenta'),
+        ),
+        migrations.RunPython(poblar_saldos_diarios, migrations.RunPython.noop),
+    ]
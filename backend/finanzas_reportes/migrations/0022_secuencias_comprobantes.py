@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0021_saldos_diarios_cuentas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaComprobante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('punto_venta', models.IntegerField()),
+                ('tipo_comprobante', models.CharField(choices=[('1', 'Factura A'), ('6', 'Factura B'), ('11', 'Factura C'), ('2', 'Nota de Débito A'), ('7', 'Nota de Débito B'), ('12', 'Nota de Débito C'), ('3', 'Nota de Crédito A'), ('8', 'Nota de Crédito B'), ('13', 'Nota de Crédito C')], max_length=2)),
+                ('ultimo_numero', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('configuracion_afip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='secuencias', to='finanzas_reportes.configuracionafip')),
+            ],
+            options={
+                'verbose_name': 'secuencia de comprobantes',
+                'verbose_name_plural': 'secuencias de comprobantes',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='secuenciacomprobante',
+            constraint=models.UniqueConstraint(fields=('configuracion_afip', 'punto_venta', 'tipo_comprobante'), name='uniq_secuencia_comprobante'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+def particionar(apps, schema_editor):
+    """En PostgreSQL convierte la tabla a particionada por mes (ver logs_afip.py)"""
+    from finanzas_reportes import logs_afip
+
+    logs_afip.particionar(apps, schema_editor)
+
+
+def desparticionar(apps, schema_editor):
+    from finanzas_reportes import logs_afip
+
+    logs_afip.desparticionar(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0022_secuencias_comprobantes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logafip',
+            index=models.Index(fields=['fecha_hora'], name='logafip_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logafip',
+            index=models.Index(fields=['factura', '-fecha_hora'], name='logafip_factura_fecha_idx'),
+        ),
+        migrations.RunPython(particionar, desparticionar),
+    ]
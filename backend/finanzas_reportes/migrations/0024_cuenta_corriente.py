@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0007_copy_razon_social_to_nombre_fantasia'),
+        ('finanzas_reportes', '0023_logs_afip_por_mes'),
+        ('ventas', '0012_clasificacion_cobranza'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoCuentaCorriente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(default=django.utils.timezone.localdate, help_text='Fecha de registro del movimiento')),
+                ('tipo', models.CharField(choices=[('VENTA', 'Venta'), ('PAGO', 'Pago'), ('ANULACION_VENTA', 'Anulación de venta'), ('ANULACION_PAGO', 'Anulación de pago'), ('SALDO_INICIAL', 'Saldo inicial')], max_length=20)),
+                ('fecha_comprobante', models.DateField(blank=True, help_text='Fecha de la venta o del pago', null=True)),
+                ('descripcion', models.CharField(blank=True, max_length=200)),
+                ('debe', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('haber', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('saldo', models.DecimalField(decimal_places=2, help_text='Saldo del cliente después del movimiento', max_digits=14)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos_cuenta_corriente', to='clientes.cliente')),
+                ('pago', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_cuenta_corriente', to='finanzas_reportes.pagocliente')),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_cuenta_corriente', to='ventas.venta')),
+            ],
+            options={
+                'verbose_name': 'movimiento de cuenta corriente',
+                'verbose_name_plural': 'movimientos de cuenta corriente',
+                'ordering': ['cliente', 'fecha', 'id'],
+                'indexes': [models.Index(fields=['cliente', 'fecha', 'id'], name='ctacte_cliente_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0024_cuenta_corriente'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientocuentacorriente',
+            name='tipo',
+            field=models.CharField(choices=[('VENTA', 'Venta'), ('PAGO', 'Pago'), ('ANULACION_VENTA', 'Anulación de venta'), ('ANULACION_PAGO', 'Anulación de pago'), ('AJUSTE_VENTA', 'Ajuste de venta'), ('AJUSTE_PAGO', 'Ajuste de pago'), ('SALDO_INICIAL', 'Saldo inicial')], max_length=20),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from decimal import Decimal
 
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils import timezone
-from django.db.models import Sum
 
 from clientes.models import Cliente
 from proveedores.models import Proveedor
@@ -188,6 +189,63 @@ class ImputacionPago(models.Model):
         self.save(update_fields=['revertida', 'fecha_reversion'])
 
 
+class MovimientoCuentaCorriente(models.Model):
+    """
+    Movimiento de la cuenta corriente de un cliente (libro mayor de solo alta).
+
+    Cada venta, pago y anulación agrega una fila con su importe al debe o
+    al haber y el saldo acumulado del cliente después del movimiento. Las
+    filas no se modifican: una anulación agrega la contrapartida y una
+    modificación o eliminación, un ajuste por la diferencia. Ver
+    cuenta_corriente.py.
+    """
+
+    class Tipo(models.TextChoices):
+        VENTA = "VENTA", "Venta"
+        PAGO = "PAGO", "Pago"
+        ANULACION_VENTA = "ANULACION_VENTA", "Anulación de venta"
+        ANULACION_PAGO = "ANULACION_PAGO", "Anulación de pago"
+        AJUSTE_VENTA = "AJUSTE_VENTA", "Ajuste de venta"
+        AJUSTE_PAGO = "AJUSTE_PAGO", "Ajuste de pago"
+        SALDO_INICIAL = "SALDO_INICIAL", "Saldo inicial"
+
+    cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name="movimientos_cuenta_corriente")
+    fecha = models.DateField(default=timezone.localdate, help_text="Fecha de registro del movimiento")
+    tipo = models.CharField(max_length=20, choices=Tipo.choices)
+    venta = models.ForeignKey(
+        "ventas.Venta",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="movimientos_cuenta_corriente",
+    )
+    pago = models.ForeignKey(
+        PagoCliente,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="movimientos_cuenta_corriente",
+    )
+    fecha_comprobante = models.DateField(null=True, blank=True, help_text="Fecha de la venta o del pago")
+    descripcion = models.CharField(max_length=200, blank=True)
+    debe = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    haber = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, help_text="Saldo del cliente después del movimiento")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["cliente", "fecha", "id"]
+        verbose_name = "movimiento de cuenta corriente"
+        verbose_name_plural = "movimientos de cuenta corriente"
+        indexes = [
+            # Estado de cuenta por rango de fechas y saldo anterior a una fecha
+            models.Index(fields=["cliente", "fecha", "id"], name="ctacte_cliente_fecha_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente} {self.fecha} {self.get_tipo_display()}: {self.saldo}"
+
+
 class PagoProveedor(models.Model):
     Medio = MedioPago
 
@@ -268,11 +326,24 @@ class MovimientoFinanciero(models.Model):
         blank=True,
         help_text="Medio con el que se registró el cobro/pago real",
     )
+    cuenta_bancaria = models.ForeignKey(
+        "CuentaBancaria",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="movimientos_financieros",
+        help_text="Cuenta en la que impacta el movimiento (saldo diario por cuenta)",
+    )
 
     class Meta:
         ordering = ["-fecha", "-id"]
         verbose_name = "movimiento financiero"
         verbose_name_plural = "movimientos financieros"
+        indexes = [
+            # Listados paginados por keyset sobre (fecha, id)
+            models.Index(fields=["tipo", "estado", "fecha", "id"], name="idx_mov_tipo_estado_fecha"),
+            models.Index(fields=["origen", "fecha", "id"], name="idx_mov_origen_fecha"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.get_tipo_display()} - {self.monto} ({self.get_origen_display()})"
@@ -332,6 +403,224 @@ class MovimientoFinanciero(models.Model):
         return sum(mov.monto_pendiente for mov in movimientos)
 
 
+class ResumenDiarioMovimiento(models.Model):
+    """
+    Rollup diario de MovimientoFinanciero por tipo, estado, origen y medio de pago.
+
+    Se mantiene desde las señales de finanzas_reportes (ver resumen_diario.py)
+    y se reconstruye con `python manage.py reconstruir_resumen_financiero`.
+    Un medio de pago nulo se guarda como cadena vacía.
+    """
+    fecha = models.DateField()
+    tipo = models.CharField(max_length=10, choices=MovimientoFinanciero.Tipo.choices)
+    estado = models.CharField(max_length=15, choices=MovimientoFinanciero.Estado.choices)
+    origen = models.CharField(max_length=20, choices=MovimientoFinanciero.Origen.choices)
+    medio_pago = models.CharField(max_length=20, blank=True, default="")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-fecha", "tipo", "estado"]
+        verbose_name = "resumen diario de movimientos"
+        verbose_name_plural = "resúmenes diarios de movimientos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fecha", "tipo", "estado", "origen", "medio_pago"],
+                name="uniq_resumen_mov_dia",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tipo", "estado", "fecha"], name="idx_resumen_mov_tipo_est"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.tipo}/{self.estado} {self.origen}: {self.total}"
+
+
+class ResumenDiarioOperaciones(models.Model):
+    """
+    Totales diarios de ventas, cobros y compras (incluye IVA discriminado).
+
+    Cada fila también actúa como lock del día: las actualizaciones
+    incrementales la bloquean antes de recalcular sus agregados.
+    """
+    fecha = models.DateField(unique=True)
+
+    ventas_cantidad = models.PositiveIntegerField(default=0)
+    ventas_subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    ventas_iva = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    ventas_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    pagos_cantidad = models.PositiveIntegerField(default=0)
+    pagos_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    compras_cantidad = models.PositiveIntegerField(default=0)
+    compras_subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    compras_iva = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    compras_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-fecha"]
+        verbose_name = "resumen diario de operaciones"
+        verbose_name_plural = "resúmenes diarios de operaciones"
+
+    def __str__(self):
+        return f"Resumen {self.fecha}: ventas {self.ventas_total} / compras {self.compras_total}"
+
+
+class Alerta(models.Model):
+    """
+    Alerta persistida del dashboard.
+
+    Se mantiene por eventos (señales sobre stock, ventas, cobros y cuentas
+    por pagar, ver alertas.py) y el comando nocturno `actualizar_alertas`
+    recalcula las alertas que dependen de la fecha (vencimientos, aniversarios).
+    Cada objeto origen tiene como máximo una alerta.
+    """
+
+    class Tipo(models.TextChoices):
+        STOCK_BAJO = "stock_bajo", "Stock bajo"
+        PAGO_VENCIDO = "pago_vencido", "Pago vencido"
+        PAGO_PROXIMO_VENCER = "pago_proximo_vencer", "Pago próximo a vencer"
+        PAGO_PROVEEDOR_VENCIDO = "pago_proveedor_vencido", "Pago a proveedor vencido"
+        PAGO_PROVEEDOR_PROXIMO_VENCER = "pago_proveedor_proximo_vencer", "Pago a proveedor próximo a vencer"
+        ANIVERSARIO_LABORAL = "aniversario_laboral", "Aniversario laboral"
+
+    class Urgencia(models.TextChoices):
+        ALTA = "alta", "Alta"
+        MEDIA = "media", "Media"
+        BAJA = "baja", "Baja"
+
+    PRIORIDADES = {Urgencia.ALTA: 0, Urgencia.MEDIA: 1, Urgencia.BAJA: 2}
+
+    tipo = models.CharField(max_length=40, choices=Tipo.choices)
+    categoria = models.CharField(max_length=20)
+    urgencia = models.CharField(max_length=10, choices=Urgencia.choices)
+    prioridad = models.PositiveSmallIntegerField(help_text="0 = alta, 1 = media, 2 = baja (para ordenar por índice)")
+
+    # Objeto que origina la alerta (producto, venta, movimiento, empleado...)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    origen = GenericForeignKey('content_type', 'object_id')
+
+    entidad_id = models.PositiveIntegerField(null=True, blank=True, help_text="Id mostrado en el dashboard (cliente, proveedor, producto...)")
+    titulo = models.CharField(max_length=255)
+    descripcion = models.CharField(max_length=255)
+    fecha = models.DateField(null=True, blank=True)
+    datos = models.JSONField(default=dict, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["prioridad", "fecha", "id"]
+        verbose_name = "alerta"
+        verbose_name_plural = "alertas"
+        constraints = [
+            models.UniqueConstraint(fields=["content_type", "object_id"], name="uniq_alerta_origen"),
+        ]
+        indexes = [
+            models.Index(fields=["prioridad", "fecha", "id"], name="idx_alerta_prioridad"),
+            models.Index(fields=["tipo", "prioridad"], name="idx_alerta_tipo"),
+        ]
+
+    def __str__(self):
+        return f"[{self.urgencia}] {self.titulo}"
+
+
+class SnapshotVentasPeriodo(models.Model):
+    """
+    Totales de ventas de un período cerrado (día, semana, mes o trimestre).
+
+    Los genera series_ventas.py la primera vez que se consulta un período
+    ya cerrado y desde entonces se leen sin recalcular. Si se modifica una
+    venta de un período cerrado, las señales descartan sus snapshots y se
+    regeneran en la próxima consulta.
+    """
+
+    class Granularidad(models.TextChoices):
+        DIA = "dia", "Día"
+        SEMANA = "semana", "Semana"
+        MES = "mes", "Mes"
+        TRIMESTRE = "trimestre", "Trimestre"
+
+    granularidad = models.CharField(max_length=10, choices=Granularidad.choices)
+    inicio = models.DateField()
+    fin = models.DateField()
+    total_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    cantidad_ventas = models.PositiveIntegerField(default=0)
+    top_productos = models.JSONField(default=list, blank=True, help_text="Productos más vendidos del período")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["granularidad", "inicio"]
+        verbose_name = "snapshot de ventas"
+        verbose_name_plural = "snapshots de ventas"
+        constraints = [
+            models.UniqueConstraint(fields=["granularidad", "inicio"], name="uniq_snapshot_ventas_periodo"),
+        ]
+        indexes = [
+            models.Index(fields=["inicio", "fin"], name="idx_snapshot_ventas_rango"),
+        ]
+
+    def __str__(self):
+        return f"Ventas {self.get_granularidad_display()} {self.inicio}: {self.total_ventas}"
+
+
+class TrabajoReporte(models.Model):
+    """
+    Reporte pesado encolado para ejecutarse fuera del request.
+
+    Lo crea una acción de reporte decorada con @en_segundo_plano cuando se
+    pide con ?asincrono=1, y lo ejecuta `python manage.py run_report_worker`
+    (ver trabajos.py). El resultado se guarda comprimido con zlib y se
+    elimina al vencer `expira_en`.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "PENDIENTE", "Pendiente"
+        EN_PROCESO = "EN_PROCESO", "En proceso"
+        COMPLETADO = "COMPLETADO", "Completado"
+        ERROR = "ERROR", "Error"
+
+    usuario = models.ForeignKey("usuarios.Usuario", on_delete=models.CASCADE, related_name="trabajos_reporte")
+    estado = models.CharField(max_length=15, choices=Estado.choices, default=Estado.PENDIENTE)
+
+    # Request original a reproducir en el worker
+    metodo = models.CharField(max_length=10, default="GET")
+    ruta = models.CharField(max_length=255)
+    parametros = models.JSONField(default=dict, blank=True, help_text="Query params (clave -> lista de valores)")
+    cuerpo = models.JSONField(null=True, blank=True)
+    host = models.CharField(max_length=255, blank=True)
+
+    # Ejecución
+    intentos = models.PositiveSmallIntegerField(default=0)
+    trabajador = models.CharField(max_length=100, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    # Resultado
+    codigo_respuesta = models.PositiveSmallIntegerField(null=True, blank=True)
+    tipo_contenido = models.CharField(max_length=100, blank=True)
+    resultado = models.BinaryField(null=True, blank=True, help_text="Respuesta comprimida con zlib")
+    tamano_resultado = models.PositiveIntegerField(default=0, help_text="Bytes sin comprimir")
+    error = models.TextField(blank=True)
+    expira_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-fecha_creacion"]
+        verbose_name = "trabajo de reporte"
+        verbose_name_plural = "trabajos de reporte"
+        indexes = [
+            models.Index(fields=["estado", "fecha_creacion"], name="idx_trabajo_cola"),
+            models.Index(fields=["expira_en"], name="idx_trabajo_expira"),
+        ]
+
+    def __str__(self):
+        return f"Trabajo #{self.id} {self.ruta} ({self.estado})"
+
+
 class CuentaBancaria(models.Model):
     """Modelo para representar cuentas bancarias de la empresa"""
     banco = models.CharField(max_length=100)
@@ -344,7 +633,18 @@ class CuentaBancaria(models.Model):
     titular = models.CharField(max_length=100)
     cbu = models.CharField(max_length=22, blank=True)
     alias = models.CharField(max_length=20, blank=True)
-    saldo_actual = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
+    saldo_actual = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal("0"),
+        help_text="Saldo en libros; se actualiza con los movimientos financieros de la cuenta",
+    )
+    saldo_inicial = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal("0"),
+        help_text="Saldo anterior al primer movimiento registrado en la cuenta",
+    )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     activa = models.BooleanField(default=True)
 
@@ -381,6 +681,14 @@ class ExtractoBancario(models.Model):
 class MovimientoBancario(models.Model):
     """Modelo para movimientos individuales del extracto bancario"""
     extracto = models.ForeignKey(ExtractoBancario, on_delete=models.CASCADE, related_name="movimientos")
+    cuenta_bancaria = models.ForeignKey(
+        CuentaBancaria,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        related_name="movimientos_bancarios",
+        help_text="Copia de extracto.cuenta_bancaria, para el saldo diario por cuenta",
+    )
     fecha = models.DateField()
     descripcion = models.CharField(max_length=255)
     referencia = models.CharField(max_length=100, blank=True)
@@ -396,17 +704,36 @@ class MovimientoBancario(models.Model):
         related_name="movimiento_bancario"
     )
     observaciones = models.TextField(blank=True)
+    huella = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Hash de la línea del extracto, para no duplicarla al reimportar",
+    )
 
     class Meta:
         ordering = ['fecha', 'id']
         verbose_name = "movimiento bancario"
         verbose_name_plural = "movimientos bancarios"
+        constraints = [
+            models.UniqueConstraint(fields=["huella"], name="uniq_movimiento_bancario_huella"),
+        ]
 
     def __str__(self):
         tipo = "Débito" if self.debito else "Crédito"
         monto = self.debito or self.credito
         return f"{tipo} {monto} - {self.descripcion[:50]}"
 
+    def save(self, *args, **kwargs):
+        if self.cuenta_bancaria_id is None and self.extracto_id:
+            self.cuenta_bancaria_id = (
+                ExtractoBancario.objects.filter(pk=self.extracto_id)
+                .values_list("cuenta_bancaria_id", flat=True)
+                .first()
+            )
+        super().save(*args, **kwargs)
+
     @property
     def monto(self):
         """Devuelve el monto del movimiento (positivo para créditos, negativo para débitos)"""
@@ -443,6 +770,42 @@ class ConciliacionBancaria(models.Model):
         super().save(*args, **kwargs)
 
 
+class SaldoDiarioCuenta(models.Model):
+    """
+    Saldo de cierre diario de una cuenta bancaria, en libros o según el banco.
+
+    Una fila por día con movimientos: ingresos y egresos del día y el saldo
+    acumulado al cierre (sin CuentaBancaria.saldo_inicial). Se mantiene desde
+    las señales (ver saldos_cuentas.py) y se reconstruye con
+    `python manage.py reconstruir_saldos_cuentas`.
+    """
+
+    class Fuente(models.TextChoices):
+        LIBRO = "LIBRO", "Libros (movimientos financieros)"
+        BANCO = "BANCO", "Banco (extractos)"
+
+    cuenta_bancaria = models.ForeignKey(CuentaBancaria, on_delete=models.CASCADE, related_name="saldos_diarios")
+    fuente = models.CharField(max_length=5, choices=Fuente.choices)
+    fecha = models.DateField()
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    egresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["cuenta_bancaria", "fuente", "fecha"]
+        verbose_name = "saldo diario de cuenta"
+        verbose_name_plural = "saldos diarios de cuentas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cuenta_bancaria", "fuente", "fecha"], name="uniq_saldo_diario_cuenta"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cuenta_bancaria} {self.fuente} {self.fecha}: {self.saldo}"
+
+
 class ConfiguracionAFIP(models.Model):
     """Configuración para integración con AFIP"""
     cuit = models.CharField(max_length=11, unique=True)
@@ -609,11 +972,38 @@ class LogAFIP(models.Model):
         ordering = ['-fecha_hora']
         verbose_name = "log AFIP"
         verbose_name_plural = "logs AFIP"
+        # En PostgreSQL la tabla está particionada por mes de fecha_hora (ver logs_afip.py)
+        indexes = [
+            models.Index(fields=["fecha_hora"], name="logafip_fecha_hora_idx"),
+            models.Index(fields=["factura", "-fecha_hora"], name="logafip_factura_fecha_idx"),
+        ]
 
     def __str__(self):
         return f"{self.accion} - {self.resultado} ({self.fecha_hora})"
 
 
+class SecuenciaComprobante(models.Model):
+    """Último número entregado por configuración, punto de venta y tipo (ver numeracion.py)"""
+    configuracion_afip = models.ForeignKey(ConfiguracionAFIP, on_delete=models.CASCADE, related_name="secuencias")
+    punto_venta = models.IntegerField()
+    tipo_comprobante = models.CharField(max_length=2, choices=FacturaElectronica.TipoComprobante.choices)
+    ultimo_numero = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "secuencia de comprobantes"
+        verbose_name_plural = "secuencias de comprobantes"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["configuracion_afip", "punto_venta", "tipo_comprobante"],
+                name="uniq_secuencia_comprobante",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_comprobante_display()} {self.punto_venta:04d}: {self.ultimo_numero}"
+
+
 class PeriodoIVA(models.Model):
     """Modelo para períodos de IVA (mensuales)"""
 
@@ -695,26 +1085,14 @@ class PeriodoIVA(models.Model):
         self.save()
 
     def recalcular_desde_ventas_compras(self):
-        """Recalcula el IVA del período desde las ventas y compras registradas"""
-        from ventas.models import Venta
-        from compras.models import Compra
-
-        # Calcular IVA débito fiscal (ventas con IVA)
-        ventas = Venta.objects.filter(
-            fecha__gte=self.fecha_desde,
-            fecha__lte=self.fecha_hasta,
-            incluye_iva=True
-        )
-        self.iva_debito_fiscal = ventas.aggregate(total=Sum('iva_monto'))['total'] or Decimal("0")
-
-        # Calcular IVA crédito fiscal (compras con IVA)
-        compras = Compra.objects.filter(
-            fecha__gte=self.fecha_desde,
-            fecha__lte=self.fecha_hasta,
-            incluye_iva=True
-        )
-        self.iva_credito_fiscal = compras.aggregate(total=Sum('iva_monto'))['total'] or Decimal("0")
+        """
+        Recalcula el IVA del período desde las ventas y compras registradas
+        (sin las anuladas). Normalmente no hace falta: los acumuladores se
+        actualizan con cada venta o compra (ver iva_periodos.py).
+        """
+        from .iva_periodos import calcular
 
+        self.iva_debito_fiscal, self.iva_credito_fiscal = calcular(self)
         self.calcular_saldos()
 
     @classmethod
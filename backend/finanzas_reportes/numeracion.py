@@ -0,0 +1,136 @@
+"""
+Numeración de comprobantes por (configuración AFIP, punto de venta, tipo).
+
+Cada combinación tiene una fila SecuenciaComprobante con el último número
+entregado. Para entregar números se bloquea sólo esa fila y sólo mientras
+dura la transacción que los asigna (nunca durante la llamada a AFIP), así
+que autorizaciones de otros puntos de venta o tipos no se esperan entre sí
+y no hace falta bloquear la tabla de facturas. Un lote toma todo su bloque
+de números con un único lock.
+
+El lock es un UPDATE sobre la fila: lock de fila en PostgreSQL y de
+escritura en SQLite, donde SELECT ... FOR UPDATE no existe.
+
+AFIP sólo acepta el siguiente a su último autorizado, así que numerar()
+continúa desde FECompUltimoAutorizado: los números entregados antes y no
+usados (rechazos, envíos sin respuesta ya resueltos) se vuelven a usar en
+lugar de quedar como huecos. Sólo se saltean los que otra autorización en
+curso tiene asignados (facturas ENVIADO sin CAE).
+
+huecos() lista los números que faltan entre los comprobantes numerados.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from . import cache_reportes
+
+
+def _bloquear(configuracion, punto_venta, tipo):
+    """Fila de la secuencia, bloqueada hasta el final de la transacción."""
+    from .models import SecuenciaComprobante
+
+    filtro = {"configuracion_afip": configuracion, "punto_venta": punto_venta, "tipo_comprobante": tipo}
+    secuencias = SecuenciaComprobante.objects.filter(**filtro)
+    if not secuencias.update(fecha_actualizacion=timezone.now()):
+        SecuenciaComprobante.objects.get_or_create(**filtro)
+        secuencias.update(fecha_actualizacion=timezone.now())
+    return secuencias.get()
+
+
+def reservar(configuracion, punto_venta, tipo, cantidad=1, desde=None):
+    """
+    Reserva `cantidad` números consecutivos.
+
+    Args:
+        desde: Primer número del bloque (por ejemplo, el siguiente al último
+        autorizado por AFIP). Por defecto, el siguiente al último entregado.
+
+    Si se llama dentro de una transacción, el lock dura hasta que termina:
+    conviene guardar ahí mismo los números en las facturas.
+
+    Returns:
+        range: Los números reservados
+    """
+    with transaction.atomic():
+        secuencia = _bloquear(configuracion, punto_venta, tipo)
+        primero = secuencia.ultimo_numero + 1 if desde is None else desde
+        secuencia.ultimo_numero = primero + cantidad - 1
+        secuencia.save(update_fields=["ultimo_numero", "fecha_actualizacion"])
+    return range(primero, primero + cantidad)
+
+
+def numerar(facturas, ultimo_autorizado):
+    """
+    Numera `facturas` (mismo grupo) a continuación de `ultimo_autorizado`
+    y las deja ENVIADO, en la misma transacción que la reserva.
+
+    Returns:
+        range: Los números asignados, en el orden de `facturas`
+    """
+    from .models import FacturaElectronica
+
+    primera = facturas[0]
+    grupo = (primera.configuracion_afip, primera.punto_venta, primera.tipo_comprobante)
+
+    with transaction.atomic():
+        _bloquear(*grupo)
+        en_curso = (
+            FacturaElectronica.objects.filter(
+                configuracion_afip=grupo[0],
+                punto_venta=grupo[1],
+                tipo_comprobante=grupo[2],
+                estado=FacturaElectronica.Estado.ENVIADO,
+                cae__isnull=True,
+                numero_comprobante__gt=ultimo_autorizado,
+            )
+            .exclude(pk__in=[factura.pk for factura in facturas])
+            .aggregate(ultimo=Max("numero_comprobante"))["ultimo"]
+        )
+        numeros = reservar(*grupo, cantidad=len(facturas), desde=max(ultimo_autorizado, en_curso or 0) + 1)
+        for factura, numero in zip(facturas, numeros):
+            factura.numero_comprobante = numero
+            factura.estado = FacturaElectronica.Estado.ENVIADO
+        FacturaElectronica.objects.bulk_update(facturas, ["numero_comprobante", "estado"])
+        # bulk_update no dispara señales: se invalida el cache de reportes a mano
+        transaction.on_commit(partial(cache_reportes.incrementar_version, FacturaElectronica._meta.label))
+    return numeros
+
+
+def huecos(facturas=None):
+    """
+    Números faltantes entre comprobantes numerados, con un solo query
+    (LAG por grupo). No incluye los anteriores al primer número registrado.
+
+    Returns:
+        list: Un dict por hueco (configuracion_afip, punto_venta,
+        tipo_comprobante, desde, hasta)
+    """
+    from .models import FacturaElectronica
+
+    facturas = FacturaElectronica.objects.all() if facturas is None else facturas
+    filas = (
+        facturas.filter(numero_comprobante__isnull=False)
+        .annotate(anterior=Window(
+            Lag("numero_comprobante"),
+            partition_by=[F("configuracion_afip"), F("punto_venta"), F("tipo_comprobante")],
+            order_by=F("numero_comprobante").asc(),
+        ))
+        .filter(numero_comprobante__gt=F("anterior") + 1)
+        .order_by("configuracion_afip", "punto_venta", "tipo_comprobante", "numero_comprobante")
+        .values_list("configuracion_afip", "punto_venta", "tipo_comprobante", "anterior", "numero_comprobante")
+    )
+    return [
+        {
+            "configuracion_afip": configuracion,
+            "punto_venta": punto_venta,
+            "tipo_comprobante": tipo,
+            "desde": anterior + 1,
+            "hasta": numero - 1,
+        }
+        for configuracion, punto_venta, tipo, anterior, numero in filas
+    ]
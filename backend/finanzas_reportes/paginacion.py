@@ -0,0 +1,118 @@
+"""
+Paginación por keyset (cursor) sobre (fecha, id).
+
+PageNumberPagination hace COUNT(*) y OFFSET: en tablas grandes cada página
+cuesta más que la anterior y las filas se corren si se insertan
+movimientos mientras se recorre el listado. Acá el cursor es la última
+(fecha, id) devuelta y la página siguiente se pide con
+
+    WHERE fecha <= :fecha AND (fecha < :fecha OR id < :id)
+    ORDER BY fecha DESC, id DESC LIMIT :n
+
+que con un índice que termine en (fecha, id) es un range scan acotado,
+sin importar en qué página se esté.
+
+Respuesta: {"next": url|null, "previous": url|null, "results": [...]}.
+"""
+
+import base64
+import json
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PaginacionKeyset(BasePagination):
+    """Paginación por (fecha, id) descendente, con cursores opacos."""
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    campo_fecha = "fecha"
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK.get("PAGE_SIZE") or 100
+        return max(1, min(tamano, self.max_page_size))
+
+    def _codificar(self, fila, hacia_atras):
+        datos = {"f": getattr(fila, self.campo_fecha).isoformat(), "i": fila.pk, "a": int(hacia_atras)}
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+    def _decodificar(self, cursor):
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return date.fromisoformat(datos["f"]), int(datos["i"]), bool(datos.get("a"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound("Cursor inválido")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        fecha = self.campo_fecha
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        hacia_atras = False
+        if cursor:
+            valor_fecha, valor_id, hacia_atras = self._decodificar(cursor)
+            if hacia_atras:
+                queryset = queryset.filter(
+                    Q(**{f"{fecha}__gt": valor_fecha}) | Q(**{fecha: valor_fecha, "id__gt": valor_id}),
+                    **{f"{fecha}__gte": valor_fecha},
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f"{fecha}__lt": valor_fecha}) | Q(**{fecha: valor_fecha, "id__lt": valor_id}),
+                    **{f"{fecha}__lte": valor_fecha},
+                )
+
+        # El orden lo fija la paginación: un ?ordering distinto rompería el cursor
+        orden = (fecha, "id") if hacia_atras else (f"-{fecha}", "-id")
+        filas = list(queryset.order_by(*orden)[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if hacia_atras:
+            filas.reverse()
+
+        self.hay_siguiente = bool(filas) and (hay_mas or hacia_atras)
+        self.hay_anterior = bool(filas) and (hay_mas if hacia_atras else bool(cursor))
+        self.primera = filas[0] if filas else None
+        self.ultima = filas[-1] if filas else None
+        return filas
+
+    def get_next_link(self):
+        if not self.hay_siguiente:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._codificar(self.ultima, False))
+
+    def get_previous_link(self):
+        if not self.hay_anterior:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._codificar(self.primera, True))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,162 @@
+"""
+Motor de rentabilidad por producto con costo real de mercadería vendida (CMV).
+
+Calcula ingresos, CMV y margen por producto (y opcionalmente por período)
+con una cantidad fija de consultas, sin importar cuántos productos o
+líneas de venta haya:
+
+1. Ingresos por producto desde LineaVenta (agrupado en la BD).
+2. Costo de las salidas por venta registradas en MovimientoStock
+   (tipo SALIDA_VENTA): es el costo efectivamente consumido.
+3. Costo promedio ponderado de los lotes de ValorizacionInventario,
+   usado para las unidades vendidas que no tienen salida registrada.
+
+Fuente del costo informada en cada fila (`costo_fuente`):
+- "salidas": todas las unidades vendidas tienen SALIDA_VENTA con costo
+- "lotes": al menos parte del costo sale del promedio de lotes
+- "sin_costo": no hay salidas ni lotes para el producto
+"""
+
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+
+CERO = Decimal("0")
+
+PERIODOS = {
+    "mes": TruncMonth,
+    "trimestre": TruncQuarter,
+    "anio": TruncYear,
+}
+
+
+def _rango(queryset, campo_fecha, desde=None, hasta=None):
+    if desde:
+        queryset = queryset.filter(**{f"{campo_fecha}__gte": desde})
+    if hasta:
+        queryset = queryset.filter(**{f"{campo_fecha}__lte": hasta})
+    return queryset
+
+
+def rentabilidad_por_producto(desde=None, hasta=None, periodo=None):
+    """
+    Calcula la rentabilidad por producto con CMV desde inventario.
+
+    Args:
+        desde, hasta: Rango de fechas de venta (inclusivo)
+        periodo: None, "mes", "trimestre" o "anio" para abrir por período
+
+    Returns:
+        list[dict]: Una fila por producto (y período), ordenada por ingresos
+        descendente, con: producto_id, producto_nombre, producto_sku, periodo,
+        total_vendido, cantidad_vendida, ventas_count, precio_promedio,
+        costo_total, costo_unitario, margen_total, margen_porcentaje,
+        costo_fuente.
+
+    Raises:
+        ValueError: Si el período no es válido.
+    """
+    from inventario.models import MovimientoStock, ValorizacionInventario
+    from productos.models import Producto
+    from ventas.models import LineaVenta
+
+    if periodo and periodo not in PERIODOS:
+        raise ValueError(f"periodo debe ser uno de: {', '.join(PERIODOS)}")
+
+    ct_producto = ContentType.objects.get_for_model(Producto)
+
+    # 1. Ingresos por producto (y período)
+    claves_venta = ["producto_id", "producto__nombre", "producto__sku"]
+    lineas = _rango(
+        LineaVenta.objects.filter(producto__isnull=False, venta__anulada=False),
+        "venta__fecha", desde, hasta,
+    )
+    if periodo:
+        lineas = lineas.annotate(periodo=PERIODOS[periodo]("venta__fecha"))
+        claves_venta.append("periodo")
+    ventas = lineas.order_by().values(*claves_venta).annotate(
+        total_vendido=Sum(F("cantidad_kg") * F("precio_unitario")),
+        cantidad_vendida=Sum("cantidad"),
+        ventas_count=Count("venta", distinct=True),
+        precio_promedio=Avg("precio_unitario"),
+    )
+
+    # 2. Costo de las salidas por venta registradas
+    salidas_qs = _rango(
+        MovimientoStock.objects.filter(
+            tipo_movimiento=MovimientoStock.TipoMovimiento.SALIDA_VENTA,
+            content_type=ct_producto,
+            venta__isnull=False,
+            venta__anulada=False,
+        ),
+        "venta__fecha", desde, hasta,
+    )
+    claves_salida = ["object_id"]
+    if periodo:
+        salidas_qs = salidas_qs.annotate(periodo=PERIODOS[periodo]("venta__fecha"))
+        claves_salida.append("periodo")
+    con_costo = Q(costo_total__isnull=False)
+    salidas = {
+        tuple(fila[clave] for clave in claves_salida): fila
+        for fila in salidas_qs.order_by().values(*claves_salida).annotate(
+            cantidad_con_costo=Sum("cantidad", filter=con_costo),
+            costo=Sum("costo_total", filter=con_costo),
+        )
+    }
+
+    # 3. Costo promedio ponderado de los lotes ingresados hasta el fin del rango
+    lotes_qs = ValorizacionInventario.objects.filter(content_type=ct_producto, cantidad_inicial__gt=0)
+    if hasta:
+        lotes_qs = lotes_qs.filter(fecha_entrada__date__lte=hasta)
+    costo_lotes = {
+        fila["object_id"]: fila["costo"] / fila["cantidad"]
+        for fila in lotes_qs.order_by().values("object_id").annotate(
+            costo=Sum("costo_total_inicial"), cantidad=Sum("cantidad_inicial")
+        )
+        if fila["cantidad"]
+    }
+
+    resultado = []
+    for fila in ventas:
+        producto_id = fila["producto_id"]
+        llave = (producto_id, fila["periodo"]) if periodo else (producto_id,)
+
+        total_vendido = fila["total_vendido"] or CERO
+        cantidad_vendida = fila["cantidad_vendida"] or CERO
+
+        salida = salidas.get(llave)
+        cantidad_con_costo = (salida and salida["cantidad_con_costo"]) or CERO
+        costo_total = (salida and salida["costo"]) or CERO
+        faltante = max(cantidad_vendida - cantidad_con_costo, CERO)
+
+        if faltante == 0 and cantidad_con_costo > 0:
+            costo_fuente = "salidas"
+        elif producto_id in costo_lotes:
+            costo_total += faltante * costo_lotes[producto_id]
+            costo_fuente = "lotes"
+        else:
+            costo_fuente = "salidas" if cantidad_con_costo > 0 else "sin_costo"
+
+        costo_total = costo_total.quantize(Decimal("0.01"))
+        margen_total = total_vendido - costo_total
+        resultado.append({
+            "producto_id": producto_id,
+            "producto_nombre": fila["producto__nombre"],
+            "producto_sku": fila["producto__sku"],
+            "periodo": fila["periodo"] if periodo else None,
+            "total_vendido": total_vendido,
+            "cantidad_vendida": cantidad_vendida,
+            "ventas_count": fila["ventas_count"],
+            "precio_promedio": fila["precio_promedio"] or CERO,
+            "costo_total": costo_total,
+            "costo_unitario": costo_total / cantidad_vendida if cantidad_vendida else CERO,
+            "margen_total": margen_total,
+            "margen_porcentaje": margen_total / total_vendido * 100 if total_vendido else CERO,
+            "costo_fuente": costo_fuente,
+        })
+
+    resultado.sort(key=lambda fila: fila["total_vendido"], reverse=True)
+    return resultado
+
@@ -0,0 +1,307 @@
+"""
+Rollup diario de información financiera.
+
+Mantiene dos tablas de hechos por día:
+
+- ResumenDiarioMovimiento: MovimientoFinanciero agrupado por
+  fecha × tipo × estado × origen × medio_pago.
+- ResumenDiarioOperaciones: totales diarios de ventas, cobros (PagoCliente)
+  y compras, con el IVA discriminado.
+
+Las señales (ver signals.py) recalculan el día afectado dentro de la misma
+transacción que modifica la fila origen, así que los endpoints de resumen
+pueden sumar pocas filas por día en lugar de recorrer toda la historia.
+
+El recálculo es por día completo (no por deltas): si una actualización se
+pierde (por ejemplo un queryset.update()), el próximo cambio del mismo día
+la corrige, y `reconstruir_resumen_financiero` repara cualquier rango.
+"""
+
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .metricas import Reporte, Suma
+
+CERO = Decimal("0")
+
+# Fuentes que alimentan ResumenDiarioOperaciones: modelo -> agregados por día.
+# Los agregados usan los mismos nombres que las columnas del rollup.
+FUENTES_OPERACIONES = {
+    "ventas.Venta": {
+        "ventas_cantidad": Count("id"),
+        "ventas_subtotal": Sum("subtotal"),
+        "ventas_iva": Sum("iva_monto"),
+        "ventas_total": Sum("total"),
+    },
+    "finanzas_reportes.PagoCliente": {
+        "pagos_cantidad": Count("id"),
+        "pagos_total": Sum("monto"),
+    },
+    "compras.Compra": {
+        "compras_cantidad": Count("id"),
+        "compras_subtotal": Sum("subtotal"),
+        "compras_iva": Sum("iva_monto"),
+        "compras_total": Sum("total"),
+    },
+}
+
+MODELO_MOVIMIENTOS = "finanzas_reportes.MovimientoFinanciero"
+
+# Campos que, si no cambian en un save(update_fields=...), no afectan el rollup
+CAMPOS_RELEVANTES = {
+    "ventas.Venta": {"fecha", "subtotal", "iva_monto", "total"},
+    "finanzas_reportes.PagoCliente": {"fecha", "monto"},
+    "compras.Compra": {"fecha", "subtotal", "iva_monto", "total"},
+    MODELO_MOVIMIENTOS: {"fecha", "tipo", "estado", "origen", "medio_pago", "monto"},
+}
+
+CAMPOS_OPERACIONES = [
+    campo for agregados in FUENTES_OPERACIONES.values() for campo in agregados
+]
+
+DIMENSIONES_MOVIMIENTO = ("tipo", "estado", "origen", "medio_pago")
+
+
+def _valor_cero(campo):
+    return 0 if campo.endswith("_cantidad") else CERO
+
+
+def _filtrar_rango(queryset, desde=None, hasta=None):
+    if desde:
+        queryset = queryset.filter(fecha__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha__lte=hasta)
+    return queryset
+
+
+# ============================================================================
+# CÁLCULO DESDE LAS TABLAS ORIGEN
+# ============================================================================
+
+def calcular_operaciones(desde=None, hasta=None, fuentes=None, apps=django_apps):
+    """
+    Calcula los totales diarios de operaciones desde las tablas origen.
+
+    Args:
+        desde, hasta: Rango de fechas inclusivo (None = sin límite)
+        fuentes: Etiquetas de modelo a calcular (default: todas)
+        apps: Registro de modelos (permite usarlo desde migraciones)
+
+    Returns:
+        dict: {fecha: {campo: valor}} solo con los campos de las fuentes pedidas
+    """
+    resultado = {}
+    for etiqueta in fuentes or FUENTES_OPERACIONES:
+        agregados = FUENTES_OPERACIONES[etiqueta]
+        modelo = apps.get_model(etiqueta)
+        filas = (
+            _filtrar_rango(modelo._default_manager.all(), desde, hasta)
+            .order_by()
+            .values("fecha")
+            .annotate(**agregados)
+        )
+        for fila in filas:
+            dia = resultado.setdefault(fila.pop("fecha"), {})
+            for campo, valor in fila.items():
+                dia[campo] = valor if valor is not None else _valor_cero(campo)
+    return resultado
+
+
+def calcular_movimientos(desde=None, hasta=None, apps=django_apps):
+    """
+    Calcula el rollup de movimientos financieros desde la tabla origen.
+
+    Returns:
+        dict: {(fecha, tipo, estado, origen, medio_pago): (total, cantidad)}
+    """
+    modelo = apps.get_model(MODELO_MOVIMIENTOS)
+    filas = (
+        _filtrar_rango(modelo._default_manager.all(), desde, hasta)
+        .order_by()
+        .values("fecha", *DIMENSIONES_MOVIMIENTO)
+        .annotate(total=Sum("monto"), cantidad=Count("id"))
+    )
+    resultado = {}
+    for fila in filas:
+        clave = (
+            fila["fecha"], fila["tipo"], fila["estado"], fila["origen"], fila["medio_pago"] or ""
+        )
+        total, cantidad = resultado.get(clave, (CERO, 0))
+        # NULL y "" comparten clave: se acumulan
+        resultado[clave] = (total + (fila["total"] or CERO), cantidad + fila["cantidad"])
+    return resultado
+
+
+# ============================================================================
+# MANTENIMIENTO INCREMENTAL
+# ============================================================================
+
+def _bloquear_dia(fecha, apps=django_apps):
+    """Obtiene (o crea) la fila de operaciones del día bloqueándola hasta el commit."""
+    Operaciones = apps.get_model("finanzas_reportes", "ResumenDiarioOperaciones")
+    Operaciones._default_manager.get_or_create(fecha=fecha)
+    return Operaciones._default_manager.select_for_update().get(fecha=fecha)
+
+
+@transaction.atomic
+def recalcular_dia(fecha, fuente):
+    """
+    Recalcula el rollup de un día para una fuente.
+
+    Args:
+        fecha: Día a recalcular
+        fuente: Etiqueta del modelo que cambió (ej: "ventas.Venta")
+    """
+    Movimiento = django_apps.get_model("finanzas_reportes", "ResumenDiarioMovimiento")
+
+    dia = _bloquear_dia(fecha)
+
+    if fuente == MODELO_MOVIMIENTOS:
+        Movimiento.objects.filter(fecha=fecha).delete()
+        Movimiento.objects.bulk_create([
+            Movimiento(
+                fecha=clave[0], tipo=clave[1], estado=clave[2], origen=clave[3],
+                medio_pago=clave[4], total=total, cantidad=cantidad,
+            )
+            for clave, (total, cantidad) in calcular_movimientos(fecha, fecha).items()
+        ])
+        return
+
+    campos = list(FUENTES_OPERACIONES[fuente])
+    valores = calcular_operaciones(fecha, fecha, fuentes=[fuente]).get(fecha, {})
+    for campo in campos:
+        setattr(dia, campo, valores.get(campo, _valor_cero(campo)))
+    dia.save(update_fields=campos + ["fecha_actualizacion"])
+
+
+def recalcular_dias(fechas, fuente):
+    """Recalcula varios días para una fuente (para escrituras masivas sin señales)."""
+    for fecha in sorted(set(fechas)):
+        recalcular_dia(fecha, fuente)
+
+
+# ============================================================================
+# RECONSTRUCCIÓN Y VERIFICACIÓN
+# ============================================================================
+
+@transaction.atomic
+def reconstruir(desde=None, hasta=None, apps=django_apps):
+    """
+    Reconstruye el rollup completo de un rango desde las tablas origen.
+
+    Returns:
+        dict: Cantidad de filas escritas por tabla
+    """
+    Operaciones = apps.get_model("finanzas_reportes", "ResumenDiarioOperaciones")
+    Movimiento = apps.get_model("finanzas_reportes", "ResumenDiarioMovimiento")
+
+    operaciones = calcular_operaciones(desde, hasta, apps=apps)
+    movimientos = calcular_movimientos(desde, hasta, apps=apps)
+
+    _filtrar_rango(Operaciones._default_manager.all(), desde, hasta).delete()
+    _filtrar_rango(Movimiento._default_manager.all(), desde, hasta).delete()
+
+    Operaciones._default_manager.bulk_create([
+        Operaciones(fecha=fecha, **valores) for fecha, valores in operaciones.items()
+    ], batch_size=500)
+    Movimiento._default_manager.bulk_create([
+        Movimiento(
+            fecha=clave[0], tipo=clave[1], estado=clave[2], origen=clave[3],
+            medio_pago=clave[4], total=total, cantidad=cantidad,
+        )
+        for clave, (total, cantidad) in movimientos.items()
+    ], batch_size=500)
+
+    return {"operaciones": len(operaciones), "movimientos": len(movimientos)}
+
+
+def verificar(desde=None, hasta=None):
+    """
+    Compara el rollup guardado contra las tablas origen.
+
+    Returns:
+        list: Diferencias encontradas, cada una como dict con
+        tabla, clave, esperado y guardado. Lista vacía si está consistente.
+    """
+    from .models import ResumenDiarioMovimiento, ResumenDiarioOperaciones
+
+    diferencias = []
+
+    esperado_ops = calcular_operaciones(desde, hasta)
+    guardado_ops = {
+        fila.pop("fecha"): fila
+        for fila in _filtrar_rango(ResumenDiarioOperaciones.objects.all(), desde, hasta)
+        .values("fecha", *CAMPOS_OPERACIONES)
+    }
+    for fecha in sorted(set(esperado_ops) | set(guardado_ops)):
+        esperado = {c: esperado_ops.get(fecha, {}).get(c, _valor_cero(c)) for c in CAMPOS_OPERACIONES}
+        guardado = {c: guardado_ops.get(fecha, {}).get(c, _valor_cero(c)) for c in CAMPOS_OPERACIONES}
+        if esperado != guardado:
+            diferencias.append({
+                "tabla": "operaciones", "clave": fecha, "esperado": esperado, "guardado": guardado,
+            })
+
+    esperado_mov = calcular_movimientos(desde, hasta)
+    guardado_mov = {
+        (f["fecha"], f["tipo"], f["estado"], f["origen"], f["medio_pago"]): (f["total"], f["cantidad"])
+        for f in _filtrar_rango(ResumenDiarioMovimiento.objects.all(), desde, hasta)
+        .values("fecha", *DIMENSIONES_MOVIMIENTO, "total", "cantidad")
+        if f["cantidad"]
+    }
+    for clave in sorted(set(esperado_mov) | set(guardado_mov)):
+        esperado = esperado_mov.get(clave, (CERO, 0))
+        guardado = guardado_mov.get(clave, (CERO, 0))
+        if esperado != guardado:
+            diferencias.append({
+                "tabla": "movimientos", "clave": clave, "esperado": esperado, "guardado": guardado,
+            })
+
+    return diferencias
+
+
+# ============================================================================
+# LECTURA (usada por los endpoints de resumen)
+# ============================================================================
+
+def totales_operaciones(desde=None, hasta=None):
+    """Suma los totales de operaciones de un rango en una sola consulta."""
+    from .models import ResumenDiarioOperaciones
+
+    totales = _filtrar_rango(ResumenDiarioOperaciones.objects.all(), desde, hasta).aggregate(
+        **{campo: Sum(campo) for campo in CAMPOS_OPERACIONES}
+    )
+    return {campo: valor if valor is not None else _valor_cero(campo) for campo, valor in totales.items()}
+
+
+def totales_movimientos(desde=None, hasta=None, agrupar_por=(), **metricas):
+    """
+    Agrega el rollup de movimientos de un rango.
+
+    Args:
+        desde, hasta: Rango de fechas inclusivo
+        agrupar_por: Dimensiones para agrupar (tipo, estado, origen, medio_pago)
+        **metricas: nombre -> Q sobre las dimensiones; todas se resuelven
+            con agregación condicional en la misma consulta
+
+    Returns:
+        dict o list: Si no se agrupa, {nombre: total, nombre_cantidad: n};
+        si se agrupa, una fila por grupo con las dimensiones y las métricas
+    """
+    from .models import ResumenDiarioMovimiento
+
+    definiciones = {}
+    for nombre, filtro in metricas.items():
+        definiciones[nombre] = Suma("total", filtro)
+        definiciones[f"{nombre}_cantidad"] = Suma("cantidad", filtro)
+
+    resultado = Reporte(
+        _filtrar_rango(ResumenDiarioMovimiento.objects.all(), desde, hasta),
+        definiciones,
+        agrupaciones=[tuple(agrupar_por)],
+    ).ejecutar()
+    if not agrupar_por:
+        return resultado.totales
+    return resultado.por(*agrupar_por)
@@ -0,0 +1,266 @@
+"""
+Saldos diarios por cuenta bancaria.
+
+SaldoDiarioCuenta guarda, por cuenta y por día con movimientos, los
+ingresos, egresos y el saldo acumulado al cierre, en dos fuentes:
+
+- LIBRO: MovimientoFinanciero de la cuenta, por lo efectivamente
+  cobrado/pagado (monto si está PAGADO/COBRADO, monto_pagado si es PARCIAL).
+- BANCO: MovimientoBancario de los extractos de la cuenta.
+
+El saldo a una fecha es el de la última fila anterior o igual más
+CuentaBancaria.saldo_inicial: una consulta por índice, sin sumar la
+historia.
+
+Cuando cambia un movimiento se recalcula su día desde la tabla origen (como
+en resumen_diario.py, sin deltas acumulados) y la diferencia con el neto
+anterior se traslada a los saldos de los días siguientes con un único
+UPDATE. La fila de la cuenta se bloquea durante el recálculo para que dos
+cambios simultáneos no se pisen. `reconstruir_saldos_cuentas` reconstruye
+y verifica todo.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+
+CERO = Decimal("0")
+
+LIBRO = "LIBRO"
+BANCO = "BANCO"
+
+MODELOS = {
+    LIBRO: "finanzas_reportes.MovimientoFinanciero",
+    BANCO: "finanzas_reportes.MovimientoBancario",
+}
+
+# Campos que, si no cambian en un save(update_fields=...), no afectan el saldo
+CAMPOS_RELEVANTES = {
+    MODELOS[LIBRO]: {"fecha", "tipo", "estado", "monto", "monto_pagado", "cuenta_bancaria"},
+    MODELOS[BANCO]: {"fecha", "debito", "credito", "cuenta_bancaria"},
+}
+
+
+def _agregados(fuente):
+    """Ingresos y egresos del día para cada fuente."""
+    if fuente == BANCO:
+        return {"ingresos": Sum("credito"), "egresos": Sum("debito")}
+
+    efectivo = Case(
+        When(estado__in=["PAGADO", "COBRADO"], then=F("monto")),
+        When(estado="PARCIAL", then=F("monto_pagado")),
+        default=Value(CERO),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    return {
+        "ingresos": Sum(efectivo, filter=Q(tipo="INGRESO")),
+        "egresos": Sum(efectivo, filter=Q(tipo="EGRESO")),
+    }
+
+
+def calcular_dias(cuenta_id, fuente, desde=None, hasta=None, apps=django_apps):
+    """
+    Ingresos y egresos por día desde la tabla origen.
+
+    Returns:
+        dict: {fecha: (ingresos, egresos)} solo con días con movimientos
+    """
+    modelo = apps.get_model(MODELOS[fuente])
+    filas = modelo._default_manager.filter(cuenta_bancaria_id=cuenta_id)
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    resultado = {}
+    for fila in filas.order_by().values("fecha").annotate(**_agregados(fuente)):
+        ingresos, egresos = fila["ingresos"] or CERO, fila["egresos"] or CERO
+        if ingresos or egresos:
+            resultado[fila["fecha"]] = (ingresos, egresos)
+    return resultado
+
+
+def _actualizar_saldo_actual(cuenta, apps=django_apps):
+    Saldo = apps.get_model("finanzas_reportes", "SaldoDiarioCuenta")
+    ultimo = (
+        Saldo._default_manager.filter(cuenta_bancaria=cuenta, fuente=LIBRO)
+        .order_by("-fecha").values_list("saldo", flat=True).first()
+    )
+    cuenta.saldo_actual = cuenta.saldo_inicial + (ultimo or CERO)
+    cuenta.save(update_fields=["saldo_actual"])
+
+
+def ajustar_saldo_actual(cuenta, nuevo_saldo):
+    """
+    Corrige a mano el saldo actual de la cuenta.
+
+    La diferencia se imputa al saldo inicial, así los saldos diarios siguen
+    siendo la suma de los movimientos.
+    """
+    cuenta.saldo_inicial += nuevo_saldo - cuenta.saldo_actual
+    cuenta.saldo_actual = nuevo_saldo
+    cuenta.save(update_fields=["saldo_inicial", "saldo_actual"])
+
+
+# ============================================================================
+# MANTENIMIENTO INCREMENTAL
+# ============================================================================
+
+@transaction.atomic
+def recalcular_dia(cuenta_id, fuente, fecha):
+    """Recalcula el día `fecha` de una cuenta y traslada la diferencia a los días siguientes."""
+    from .models import CuentaBancaria, SaldoDiarioCuenta
+
+    cuenta = CuentaBancaria.objects.select_for_update().filter(pk=cuenta_id).first()
+    if cuenta is None:
+        return
+
+    saldos = SaldoDiarioCuenta.objects.filter(cuenta_bancaria=cuenta, fuente=fuente)
+    ingresos, egresos = calcular_dias(cuenta_id, fuente, fecha, fecha).get(fecha, (CERO, CERO))
+    fila = saldos.filter(fecha=fecha).first()
+    neto_anterior = fila.ingresos - fila.egresos if fila else CERO
+    diferencia = (ingresos - egresos) - neto_anterior
+
+    if ingresos or egresos:
+        if fila is None:
+            saldo_previo = (
+                saldos.filter(fecha__lt=fecha).order_by("-fecha").values_list("saldo", flat=True).first()
+                or CERO
+            )
+            fila = SaldoDiarioCuenta(cuenta_bancaria=cuenta, fuente=fuente, fecha=fecha, saldo=saldo_previo)
+        fila.ingresos, fila.egresos = ingresos, egresos
+        fila.saldo += diferencia
+        fila.save()
+    elif fila is not None:
+        fila.delete()
+
+    if diferencia:
+        saldos.filter(fecha__gt=fecha).update(saldo=F("saldo") + diferencia)
+    if fuente == LIBRO:
+        _actualizar_saldo_actual(cuenta)
+
+
+def recalcular_dias(cuenta_id, fuente, fechas):
+    """Recalcula varios días de una cuenta (para escrituras masivas sin señales)."""
+    for fecha in sorted(set(fechas)):
+        recalcular_dia(cuenta_id, fuente, fecha)
+
+
+# ============================================================================
+# LECTURA
+# ============================================================================
+
+def saldo_al(cuenta, fecha, fuente=LIBRO):
+    """Saldo de la cuenta al cierre de `fecha`."""
+    from .models import SaldoDiarioCuenta
+
+    ultimo = (
+        SaldoDiarioCuenta.objects.filter(cuenta_bancaria=cuenta, fuente=fuente, fecha__lte=fecha)
+        .order_by("-fecha").values_list("saldo", flat=True).first()
+    )
+    return cuenta.saldo_inicial + (ultimo or CERO)
+
+
+def serie(cuenta, desde, hasta, fuente=LIBRO):
+    """
+    Saldos diarios de un rango (solo días con movimientos).
+
+    Returns:
+        tuple: (saldo al cierre del día anterior a `desde`, lista de días)
+    """
+    from .models import SaldoDiarioCuenta
+
+    apertura = saldo_al(cuenta, desde - timedelta(days=1), fuente)
+    dias = [
+        {
+            "fecha": fila["fecha"],
+            "ingresos": fila["ingresos"],
+            "egresos": fila["egresos"],
+            "saldo": cuenta.saldo_inicial + fila["saldo"],
+        }
+        for fila in SaldoDiarioCuenta.objects.filter(
+            cuenta_bancaria=cuenta, fuente=fuente, fecha__gte=desde, fecha__lte=hasta
+        ).order_by("fecha").values("fecha", "ingresos", "egresos", "saldo")
+    ]
+    return apertura, dias
+
+
+# ============================================================================
+# RECONSTRUCCIÓN Y VERIFICACIÓN
+# ============================================================================
+
+def _acumular(dias):
+    saldo = CERO
+    for fecha in sorted(dias):
+        ingresos, egresos = dias[fecha]
+        saldo += ingresos - egresos
+        yield fecha, ingresos, egresos, saldo
+
+
+@transaction.atomic
+def reconstruir(cuentas=None, apps=django_apps):
+    """
+    Reconstruye los saldos diarios desde las tablas origen.
+
+    Args:
+        cuentas: ids de cuentas (default: todas)
+
+    Returns:
+        int: Cantidad de filas escritas
+    """
+    CuentaBancaria = apps.get_model("finanzas_reportes", "CuentaBancaria")
+    Saldo = apps.get_model("finanzas_reportes", "SaldoDiarioCuenta")
+
+    filas = 0
+    consulta = CuentaBancaria._default_manager.select_for_update()
+    if cuentas is not None:
+        consulta = consulta.filter(pk__in=cuentas)
+    for cuenta in consulta:
+        Saldo._default_manager.filter(cuenta_bancaria=cuenta).delete()
+        nuevas = [
+            Saldo(cuenta_bancaria=cuenta, fuente=fuente, fecha=fecha,
+                  ingresos=ingresos, egresos=egresos, saldo=saldo)
+            for fuente in MODELOS
+            for fecha, ingresos, egresos, saldo in _acumular(calcular_dias(cuenta.pk, fuente, apps=apps))
+        ]
+        Saldo._default_manager.bulk_create(nuevas, batch_size=500)
+        filas += len(nuevas)
+        _actualizar_saldo_actual(cuenta, apps=apps)
+    return filas
+
+
+def verificar(cuentas=None):
+    """
+    Compara los saldos guardados contra las tablas origen.
+
+    Returns:
+        list: Diferencias (cuenta, fuente, fecha, esperado, guardado); vacía si
+        está consistente
+    """
+    from .models import CuentaBancaria, SaldoDiarioCuenta
+
+    consulta = CuentaBancaria.objects.all()
+    if cuentas is not None:
+        consulta = consulta.filter(pk__in=cuentas)
+
+    diferencias = []
+    for cuenta in consulta:
+        for fuente in MODELOS:
+            esperado = {
+                fecha: (ingresos, egresos, saldo)
+                for fecha, ingresos, egresos, saldo in _acumular(calcular_dias(cuenta.pk, fuente))
+            }
+            guardado = {
+                fila[0]: fila[1:]
+                for fila in SaldoDiarioCuenta.objects.filter(cuenta_bancaria=cuenta, fuente=fuente)
+                .values_list("fecha", "ingresos", "egresos", "saldo")
+            }
+            for fecha in sorted(set(esperado) | set(guardado)):
+                if esperado.get(fecha) != guardado.get(fecha):
+                    diferencias.append({
+                        "cuenta": cuenta.pk, "fuente": fuente, "fecha": fecha,
+                        "esperado": esperado.get(fecha), "guardado": guardado.get(fecha),
+                    })
+    return diferencias
@@ -0,0 +1,174 @@
+"""
+Segmentación de clientes (rentabilidad + RFM) en bloque.
+
+Trae un único result set agrupado por cliente (cantidad, total, primera y
+última venta) más los pagos agrupados, y calcula en memoria:
+
+- Las categorías de rentabilidad (VIP / Premium / Regular / Ocasional)
+  con umbrales configurables.
+- Los puntajes RFM (recencia, frecuencia, monto) de 1 a 5 por quintil,
+  y el percentil de ventas de cada cliente dentro del período.
+
+Son dos consultas en total sin importar la cantidad de clientes.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from django.db.models import Count, Max, Min, Sum
+
+UMBRALES_POR_DEFECTO = {
+    "vip_ticket": 10000,
+    "vip_frecuencia": 2,
+    "premium_ticket": 5000,
+    "premium_frecuencia": 1,
+    "regular_frecuencia": 0.5,
+    # Margen estimado sobre ventas mientras no haya costo por cliente
+    "margen": 0.20,
+}
+
+CATEGORIAS = ("VIP", "Premium", "Regular", "Ocasional")
+
+
+def categorizar(ticket_promedio, frecuencia_mensual, umbrales):
+    """Clasifica un cliente según ticket promedio y frecuencia mensual."""
+    if ticket_promedio > umbrales["vip_ticket"] and frecuencia_mensual > umbrales["vip_frecuencia"]:
+        return "VIP"
+    if ticket_promedio > umbrales["premium_ticket"] and frecuencia_mensual > umbrales["premium_frecuencia"]:
+        return "Premium"
+    if frecuencia_mensual > umbrales["regular_frecuencia"]:
+        return "Regular"
+    return "Ocasional"
+
+
+def _percentiles(valores):
+    """
+    Percentil (0-100) de cada valor dentro de la serie.
+
+    Los empates reciben el mismo percentil (rango promedio).
+    """
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    if n == 1:
+        return [100.0]
+    resultado = []
+    for valor in valores:
+        debajo = bisect_left(ordenados, valor)
+        hasta = bisect_right(ordenados, valor)
+        rango_medio = (debajo + hasta - 1) / 2
+        resultado.append(rango_medio / (n - 1) * 100)
+    return resultado
+
+
+def _quintil(percentil):
+    """Convierte un percentil en un puntaje de 1 a 5."""
+    return min(int(percentil // 20) + 1, 5)
+
+
+def segmentar_clientes(fecha_desde, fecha_hasta, umbrales=None, hoy=None):
+    """
+    Calcula rentabilidad y segmentación RFM de los clientes con ventas.
+
+    Args:
+        fecha_desde, fecha_hasta: Período analizado (date, inclusivo)
+        umbrales: dict que pisa claves de UMBRALES_POR_DEFECTO
+        hoy: Fecha de referencia para la recencia (por defecto hoy)
+
+    Returns:
+        list[dict]: Un registro por cliente con ventas no anuladas en el
+        período, ordenado por rentabilidad_score descendente.
+    """
+    from ventas.models import Venta
+    from .models import PagoCliente
+
+    umbrales = {**UMBRALES_POR_DEFECTO, **(umbrales or {})}
+    hoy = hoy or date.today()
+
+    ventas = list(
+        Venta.objects.activas()
+        .filter(fecha__gte=fecha_desde, fecha__lte=fecha_hasta)
+        .order_by()
+        .values(
+            "cliente_id",
+            "cliente__nombre_fantasia",
+            "cliente__razon_social",
+            "cliente__identificacion",
+        )
+        .annotate(
+            total=Sum("total"),
+            cantidad=Count("id"),
+            primera=Min("fecha"),
+            ultima=Max("fecha"),
+        )
+    )
+    if not ventas:
+        return []
+
+    pagos = dict(
+        PagoCliente.objects.filter(
+            cliente_id__in=[fila["cliente_id"] for fila in ventas],
+            fecha__gte=fecha_desde,
+            fecha__lte=fecha_hasta,
+        )
+        .order_by()
+        .values("cliente_id")
+        .annotate(total=Sum("monto"))
+        .values_list("cliente_id", "total")
+    )
+
+    meses = (fecha_hasta - fecha_desde).days / 30
+
+    totales = [float(fila["total"] or 0) for fila in ventas]
+    cantidades = [fila["cantidad"] for fila in ventas]
+    recencias = [(hoy - fila["ultima"]).days for fila in ventas]
+
+    percentil_monto = _percentiles(totales)
+    percentil_frecuencia = _percentiles(cantidades)
+    # Menos días desde la última compra es mejor: se invierte la serie
+    percentil_recencia = _percentiles([-dias for dias in recencias])
+
+    clientes = []
+    for i, fila in enumerate(ventas):
+        total_ventas = totales[i]
+        cantidad_ventas = cantidades[i]
+        total_pagos = float(pagos.get(fila["cliente_id"]) or 0)
+
+        ticket_promedio = total_ventas / cantidad_ventas
+        frecuencia_mensual = cantidad_ventas / meses if meses > 0 else 0
+        margen_estimado = total_ventas * umbrales["margen"]
+
+        r, f, m = (
+            _quintil(percentil_recencia[i]),
+            _quintil(percentil_frecuencia[i]),
+            _quintil(percentil_monto[i]),
+        )
+
+        clientes.append({
+            "cliente_id": fila["cliente_id"],
+            "cliente_nombre": fila["cliente__nombre_fantasia"] or fila["cliente__razon_social"] or "",
+            "cliente_identificacion": fila["cliente__identificacion"],
+            "total_ventas": total_ventas,
+            "total_pagos": total_pagos,
+            "saldo_pendiente": total_ventas - total_pagos,
+            "cantidad_ventas": cantidad_ventas,
+            "ticket_promedio": round(ticket_promedio, 2),
+            "frecuencia_mensual": round(frecuencia_mensual, 2),
+            "margen_estimado": round(margen_estimado, 2),
+            "primera_compra": fila["primera"].isoformat(),
+            "ultima_compra": fila["ultima"].isoformat(),
+            "dias_ultima_compra": recencias[i],
+            "categoria": categorizar(ticket_promedio, frecuencia_mensual, umbrales),
+            "rentabilidad_score": round(
+                (ticket_promedio * 0.4 + frecuencia_mensual * 0.3 + margen_estimado * 0.3) / 100, 2
+            ),
+            "rfm": {
+                "recencia": r,
+                "frecuencia": f,
+                "monto": m,
+                "segmento": f"{r}{f}{m}",
+            },
+            "percentil_ventas": round(percentil_monto[i], 1),
+        })
+
+    clientes.sort(key=lambda c: c["rentabilidad_score"], reverse=True)
+    return clientes
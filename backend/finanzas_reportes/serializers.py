@@ -1,6 +1,11 @@
-﻿from rest_framework import serializers
+﻿from decimal import Decimal
 
+from django.db import transaction
+from rest_framework import serializers
+
+from . import cuenta_corriente, saldos_cuentas
 from .models import (
+    MovimientoCuentaCorriente,
     MovimientoFinanciero,
     PagoCliente,
     PagoProveedor,
@@ -14,7 +19,8 @@ from .models import (
     DetalleFacturaElectronica,
     LogAFIP,
     PeriodoIVA,
-    PagoIVA
+    PagoIVA,
+    TrabajoReporte,
 )
 
 
@@ -39,6 +45,13 @@ class PagoClienteSerializer(serializers.ModelSerializer):
             "observacion",
         )
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        aporte_anterior = cuenta_corriente.aporte(instance)
+        pago = super().update(instance, validated_data)
+        cuenta_corriente.registrar_ajuste(aporte_anterior, pago)
+        return pago
+
     def create(self, validated_data):
         """
         Crea un pago de cliente con soporte opcional de undo.
@@ -125,6 +138,7 @@ class PagoClienteSerializer(serializers.ModelSerializer):
                 medio_pago=pago.medio,
             )
 
+            cuenta_corriente.registrar_pago(pago)
             return pago
 
     def _aplicar_pago_fifo(self, pago):
@@ -245,6 +259,7 @@ class MovimientoFinancieroSerializer(serializers.ModelSerializer):
             "referencia_extra",
             "medio_pago",
             "medio_pago_display",
+            "cuenta_bancaria",
         )
 class GastoManualSerializer(serializers.Serializer):
     fecha = serializers.DateField(required=False)
@@ -361,10 +376,23 @@ class CuentaBancariaSerializer(serializers.ModelSerializer):
             "cbu",
             "alias",
             "saldo_actual",
+            "saldo_inicial",
             "fecha_creacion",
             "activa",
         )
-        read_only_fields = ("fecha_creacion",)
+        read_only_fields = ("fecha_creacion", "saldo_inicial")
+
+    def create(self, validated_data):
+        # Sin movimientos todavía, el saldo cargado es el saldo inicial
+        validated_data["saldo_inicial"] = validated_data.get("saldo_actual", Decimal("0"))
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        nuevo_saldo = validated_data.pop("saldo_actual", None)
+        instance = super().update(instance, validated_data)
+        if nuevo_saldo is not None and nuevo_saldo != instance.saldo_actual:
+            saldos_cuentas.ajustar_saldo_actual(instance, nuevo_saldo)
+        return instance
 
 
 class MovimientoBancarioSerializer(serializers.ModelSerializer):
@@ -439,6 +467,7 @@ class ImportarExtractoSerializer(serializers.Serializer):
     fecha_hasta = serializers.DateField()
     saldo_inicial = serializers.DecimalField(max_digits=12, decimal_places=2)
     saldo_final = serializers.DecimalField(max_digits=12, decimal_places=2)
+    formato = serializers.CharField(required=False, default="generico")
 
     def validate_archivo(self, value):
         """Validar que el archivo sea CSV o Excel"""
@@ -446,6 +475,16 @@ class ImportarExtractoSerializer(serializers.Serializer):
             raise serializers.ValidationError("Solo se permiten archivos CSV o Excel (.csv, .xlsx, .xls)")
         return value
 
+    def validate_formato(self, value):
+        """Validar que el formato de banco esté registrado"""
+        from .extractos import FORMATOS
+
+        if value not in FORMATOS:
+            raise serializers.ValidationError(
+                f"Formato desconocido. Opciones: {', '.join(sorted(FORMATOS))}"
+            )
+        return FORMATOS[value]
+
     def validate(self, attrs):
         """Validar fechas y saldos"""
         if attrs['fecha_desde'] > attrs['fecha_hasta']:
@@ -497,6 +536,28 @@ class DetalleFacturaElectronicaSerializer(serializers.ModelSerializer):
         )
 
 
+class MovimientoCuentaCorrienteSerializer(serializers.ModelSerializer):
+    tipo_display = serializers.CharField(source="get_tipo_display", read_only=True)
+
+    class Meta:
+        model = MovimientoCuentaCorriente
+        fields = (
+            "id",
+            "cliente",
+            "fecha",
+            "tipo",
+            "tipo_display",
+            "venta",
+            "pago",
+            "fecha_comprobante",
+            "descripcion",
+            "debe",
+            "haber",
+            "saldo",
+        )
+        read_only_fields = fields
+
+
 class LogAFIPSerializer(serializers.ModelSerializer):
     class Meta:
         model = LogAFIP
@@ -577,6 +638,17 @@ class FacturaElectronicaSerializer(serializers.ModelSerializer):
         return None
 
 
+class FacturaElectronicaListSerializer(FacturaElectronicaSerializer):
+    """Serializer para listados: en lugar de los logs, cuántos hay y el último resultado"""
+    cantidad_logs = serializers.IntegerField(read_only=True)
+    ultimo_resultado_afip = serializers.CharField(read_only=True, allow_null=True)
+
+    class Meta(FacturaElectronicaSerializer.Meta):
+        fields = tuple(
+            campo for campo in FacturaElectronicaSerializer.Meta.fields if campo != "logs"
+        ) + ("cantidad_logs", "ultimo_resultado_afip")
+
+
 class CrearFacturaElectronicaSerializer(serializers.Serializer):
     """Serializer para crear facturas electrónicas desde ventas existentes"""
     venta_id = serializers.IntegerField()
@@ -675,6 +747,7 @@ class AutorizarFacturaSerializer(serializers.Serializer):
             estado__in=[
                 FacturaElectronica.Estado.BORRADOR,
                 FacturaElectronica.Estado.PENDIENTE,
+                FacturaElectronica.Estado.ENVIADO,
                 FacturaElectronica.Estado.RECHAZADO
             ]
         )
@@ -685,6 +758,25 @@ class AutorizarFacturaSerializer(serializers.Serializer):
         return value
 
 
+class GenerarPDFsSerializer(serializers.Serializer):
+    """Serializer para generar los PDF de un lote de facturas autorizadas"""
+    facturas_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=1000,
+        help_text="Lista de IDs de facturas autorizadas"
+    )
+
+    def validate_facturas_ids(self, value):
+        value = list(dict.fromkeys(value))
+        autorizadas = FacturaElectronica.objects.filter(id__in=value, cae__isnull=False).exclude(cae="")
+
+        if autorizadas.count() != len(value):
+            raise serializers.ValidationError("Algunas facturas no existen o no están autorizadas")
+
+        return value
+
+
 class PeriodoIVASerializer(serializers.ModelSerializer):
     """Serializer para períodos de IVA"""
     nombre_mes = serializers.CharField(read_only=True)
@@ -781,3 +873,29 @@ class RecalcularIVASerializer(serializers.Serializer):
         except PeriodoIVA.DoesNotExist:
             raise serializers.ValidationError("El período no existe")
         return value
+
+
+class TrabajoReporteSerializer(serializers.ModelSerializer):
+    """Estado de un reporte ejecutado en segundo plano (sin el resultado)"""
+    estado_display = serializers.CharField(source="get_estado_display", read_only=True)
+
+    class Meta:
+        model = TrabajoReporte
+        fields = (
+            "id",
+            "estado",
+            "estado_display",
+            "metodo",
+            "ruta",
+            "parametros",
+            "intentos",
+            "fecha_creacion",
+            "fecha_inicio",
+            "fecha_fin",
+            "codigo_respuesta",
+            "tipo_contenido",
+            "tamano_resultado",
+            "error",
+            "expira_en",
+        )
+        read_only_fields = fields
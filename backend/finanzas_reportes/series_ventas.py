@@ -0,0 +1,276 @@
+"""
+Series temporales de ventas por día, semana, mes o trimestre.
+
+Los períodos ya cerrados se guardan como SnapshotVentasPeriodo la primera
+vez que se consultan y después se leen tal cual; sólo el período abierto
+(el que contiene a hoy) y los que todavía no tienen snapshot se calculan
+en vivo. El cálculo en vivo son dos consultas agrupadas por período: una
+sobre Venta (total y cantidad) y otra sobre LineaVenta (ranking de
+productos), así que el top-N de cada período sale de la misma pasada.
+
+Los períodos siempre son completos: un rango que empieza a mitad de mes
+incluye el mes entero. La comparación interanual usa el mismo período un
+año antes (364 días para día y semana, así coincide el día de la semana).
+
+Se excluyen las ventas anuladas. Si se modifica una venta de un período
+cerrado, las señales descartan los snapshots que la contienen.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc
+
+CERO = Decimal("0")
+
+GRANULARIDADES = {
+    "dia": "day",
+    "semana": "week",
+    "mes": "month",
+    "trimestre": "quarter",
+}
+
+# Productos guardados por período; el top-N pedido no puede superarlo
+TOP_GUARDADO = 10
+
+# Campos de Venta que cambian los totales de un período
+CAMPOS_RELEVANTES = {"fecha", "total", "anulada"}
+
+
+def _sumar_meses(fecha, meses):
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def inicio_periodo(fecha, granularidad):
+    """Primer día del período que contiene a `fecha`."""
+    if granularidad == "dia":
+        return fecha
+    if granularidad == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == "mes":
+        return fecha.replace(day=1)
+    if granularidad == "trimestre":
+        return date(fecha.year, (fecha.month - 1) // 3 * 3 + 1, 1)
+    raise ValueError(f"granularidad debe ser una de: {', '.join(GRANULARIDADES)}")
+
+
+def siguiente_periodo(inicio, granularidad):
+    """Primer día del período siguiente."""
+    if granularidad == "dia":
+        return inicio + timedelta(days=1)
+    if granularidad == "semana":
+        return inicio + timedelta(days=7)
+    return _sumar_meses(inicio, 1 if granularidad == "mes" else 3)
+
+
+def periodo_anio_anterior(inicio, granularidad):
+    """Inicio del período equivalente del año anterior."""
+    if granularidad in ("dia", "semana"):
+        return inicio - timedelta(days=364)
+    return _sumar_meses(inicio, -12)
+
+
+def _inicios(desde, hasta, granularidad):
+    inicio = inicio_periodo(desde, granularidad)
+    ultimo = inicio_periodo(hasta, granularidad)
+    inicios = []
+    while inicio <= ultimo:
+        inicios.append(inicio)
+        inicio = siguiente_periodo(inicio, granularidad)
+    return inicios
+
+
+def _calcular(desde, hasta, granularidad):
+    """
+    Totales y ranking de productos por período entre dos fechas.
+
+    Returns:
+        dict: inicio -> {'total_ventas', 'cantidad_ventas', 'top_productos'}
+    """
+    from ventas.models import LineaVenta, Venta
+
+    periodo = Trunc("fecha", GRANULARIDADES[granularidad], output_field=DateField())
+    totales = (
+        Venta.objects.activas()
+        .filter(fecha__gte=desde, fecha__lte=hasta)
+        .annotate(periodo=periodo)
+        .order_by()
+        .values("periodo")
+        .annotate(total=Sum("total"), cantidad=Count("id"))
+    )
+    resultado = {
+        fila["periodo"]: {
+            "total_ventas": fila["total"] or CERO,
+            "cantidad_ventas": fila["cantidad"],
+            "top_productos": [],
+        }
+        for fila in totales
+    }
+
+    productos = (
+        LineaVenta.objects.filter(
+            venta__anulada=False,
+            venta__fecha__gte=desde,
+            venta__fecha__lte=hasta,
+            producto__isnull=False,
+        )
+        .annotate(periodo=Trunc("venta__fecha", GRANULARIDADES[granularidad], output_field=DateField()))
+        .order_by()
+        .values("periodo", "producto_id", "producto__nombre", "producto__sku")
+        .annotate(total=Sum(F("cantidad_kg") * F("precio_unitario")), cantidad=Sum("cantidad"))
+    )
+    for fila in productos:
+        datos = resultado.get(fila["periodo"])
+        if datos is None:
+            continue
+        datos["top_productos"].append({
+            "producto_id": fila["producto_id"],
+            "producto_nombre": fila["producto__nombre"],
+            "producto_sku": fila["producto__sku"],
+            "total_vendido": fila["total"] or CERO,
+            "cantidad_vendida": fila["cantidad"] or CERO,
+        })
+
+    for datos in resultado.values():
+        datos["top_productos"].sort(key=lambda p: (-p["total_vendido"], p["producto_id"]))
+        del datos["top_productos"][TOP_GUARDADO:]
+    return resultado
+
+
+def _producto_desde_snapshot(producto):
+    return {
+        **producto,
+        "total_vendido": Decimal(producto["total_vendido"]),
+        "cantidad_vendida": Decimal(producto["cantidad_vendida"]),
+    }
+
+
+def _producto_para_snapshot(producto):
+    return {
+        **producto,
+        "total_vendido": str(producto["total_vendido"]),
+        "cantidad_vendida": str(producto["cantidad_vendida"]),
+    }
+
+
+def _periodos(inicios, granularidad, hoy):
+    """Datos de cada período: desde snapshot si está cerrado, en vivo si no."""
+    from .models import SnapshotVentasPeriodo
+
+    if not inicios:
+        return {}
+
+    abierto_desde = inicio_periodo(hoy, granularidad)
+    datos = {}
+
+    cerrados = [inicio for inicio in inicios if inicio < abierto_desde]
+    if cerrados:
+        snapshots = SnapshotVentasPeriodo.objects.filter(
+            granularidad=granularidad, inicio__gte=cerrados[0], inicio__lte=cerrados[-1]
+        )
+        for snapshot in snapshots:
+            datos[snapshot.inicio] = {
+                "total_ventas": snapshot.total_ventas,
+                "cantidad_ventas": snapshot.cantidad_ventas,
+                "top_productos": [_producto_desde_snapshot(p) for p in snapshot.top_productos],
+            }
+
+    faltantes = [inicio for inicio in inicios if inicio not in datos]
+    if not faltantes:
+        return datos
+
+    fin = siguiente_periodo(faltantes[-1], granularidad) - timedelta(days=1)
+    calculados = _calcular(faltantes[0], fin, granularidad)
+    vacio = {"total_ventas": CERO, "cantidad_ventas": 0, "top_productos": []}
+
+    nuevos = []
+    for inicio in faltantes:
+        datos[inicio] = calculados.get(inicio, vacio)
+        if inicio < abierto_desde:
+            nuevos.append(SnapshotVentasPeriodo(
+                granularidad=granularidad,
+                inicio=inicio,
+                fin=siguiente_periodo(inicio, granularidad) - timedelta(days=1),
+                total_ventas=datos[inicio]["total_ventas"],
+                cantidad_ventas=datos[inicio]["cantidad_ventas"],
+                top_productos=[_producto_para_snapshot(p) for p in datos[inicio]["top_productos"]],
+            ))
+    if nuevos:
+        SnapshotVentasPeriodo.objects.bulk_create(nuevos, ignore_conflicts=True)
+    return datos
+
+
+def serie(desde, hasta, granularidad="mes", top_n=5, interanual=True, hoy=None):
+    """
+    Serie de ventas por período entre dos fechas.
+
+    Args:
+        desde, hasta: Rango (se extiende a períodos completos)
+        granularidad: "dia", "semana", "mes" o "trimestre"
+        top_n: Productos por período (máximo TOP_GUARDADO)
+        interanual: Incluir el mismo período del año anterior
+        hoy: Fecha de referencia para decidir qué períodos están cerrados
+
+    Returns:
+        list[dict]: Un registro por período con inicio, fin, cerrado,
+        total_ventas, cantidad_ventas, venta_promedio, top_productos y,
+        si se pidió, anio_anterior y variacion_interanual (None si el año
+        anterior no tuvo ventas).
+
+    Raises:
+        ValueError: Si la granularidad o top_n no son válidos.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"granularidad debe ser una de: {', '.join(GRANULARIDADES)}")
+    if not 0 <= top_n <= TOP_GUARDADO:
+        raise ValueError(f"top debe estar entre 0 y {TOP_GUARDADO}")
+
+    hoy = hoy or date.today()
+    inicios = _inicios(desde, hasta, granularidad)
+    datos = _periodos(inicios, granularidad, hoy)
+
+    anteriores = {}
+    if interanual:
+        equivalentes = {inicio: periodo_anio_anterior(inicio, granularidad) for inicio in inicios}
+        previos = _periodos(sorted(set(equivalentes.values())), granularidad, hoy)
+        anteriores = {inicio: previos[previo] for inicio, previo in equivalentes.items()}
+
+    abierto_desde = inicio_periodo(hoy, granularidad)
+    resultado = []
+    for inicio in inicios:
+        actual = datos[inicio]
+        cantidad = actual["cantidad_ventas"]
+        fila = {
+            "inicio": inicio,
+            "fin": siguiente_periodo(inicio, granularidad) - timedelta(days=1),
+            "cerrado": inicio < abierto_desde,
+            "total_ventas": actual["total_ventas"],
+            "cantidad_ventas": cantidad,
+            "venta_promedio": actual["total_ventas"] / cantidad if cantidad else CERO,
+            "top_productos": actual["top_productos"][:top_n],
+        }
+        if interanual:
+            anterior = anteriores[inicio]
+            fila["anio_anterior"] = {
+                "inicio": periodo_anio_anterior(inicio, granularidad),
+                "total_ventas": anterior["total_ventas"],
+                "cantidad_ventas": anterior["cantidad_ventas"],
+            }
+            fila["variacion_interanual"] = (
+                (actual["total_ventas"] - anterior["total_ventas"]) / anterior["total_ventas"] * 100
+                if anterior["total_ventas"] else None
+            )
+        resultado.append(fila)
+    return resultado
+
+
+def descartar_snapshots(fecha, hoy=None):
+    """Elimina los snapshots de períodos cerrados que contienen a `fecha`."""
+    from .models import SnapshotVentasPeriodo
+
+    if fecha >= (hoy or date.today()):
+        # Todo período que contiene a hoy (o al futuro) sigue abierto
+        return
+    SnapshotVentasPeriodo.objects.filter(inicio__lte=fecha, fin__gte=fecha).delete()
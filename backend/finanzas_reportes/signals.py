@@ -0,0 +1,227 @@
+"""
+Señales de finanzas_reportes.
+
+- Mantienen el rollup diario (ver resumen_diario.py) cada vez que se guarda
+  o elimina una venta, compra, cobro o movimiento financiero.
+- Mantienen las alertas del dashboard (ver alertas.py) cuando cambian stock,
+  ventas, cuentas por pagar o empleados.
+- Mantienen los saldos diarios por cuenta bancaria (ver saldos_cuentas.py)
+  cuando cambia un movimiento financiero o bancario con cuenta.
+- Mantienen los acumuladores de IVA de los períodos abiertos (ver
+  iva_periodos.py) y rechazan cambios en períodos cerrados o presentados.
+- Descartan los snapshots de ventas (ver series_ventas.py) de períodos
+  cerrados cuando se modifica una venta o una línea de esos períodos.
+- Incrementan la versión de cada tabla en el cache de reportes (ver
+  cache_reportes.py) después del commit.
+
+Se conectan en FinanzasReportesConfig.ready().
+"""
+
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from . import alertas, cache_reportes, iva_periodos, resumen_diario, saldos_cuentas, series_ventas
+
+
+def _fecha(instance):
+    """Normaliza `fecha` a date (los defaults con timezone.now dejan un datetime)."""
+    return instance._meta.get_field("fecha").to_python(instance.fecha)
+
+
+_SIN_LEER = object()
+
+
+def olvidar_anterior(sender, instance, **kwargs):
+    """Se conecta antes que los demás pre_save: la fila previa se vuelve a leer en cada save()."""
+    instance._anterior = _SIN_LEER
+
+
+def _anterior(sender, instance):
+    """Fila previa de la instancia (None si es nueva), leída una sola vez por save()."""
+    anterior = getattr(instance, "_anterior", _SIN_LEER)
+    if anterior is _SIN_LEER:
+        anterior = None
+        if instance.pk is not None:
+            anterior = sender._default_manager.filter(pk=instance.pk).first()
+        instance._anterior = anterior
+    return anterior
+
+
+def _afecta_rollup(sender, update_fields):
+    if update_fields is None:
+        return True
+    return bool(resumen_diario.CAMPOS_RELEVANTES[sender._meta.label] & set(update_fields))
+
+
+def guardar_fecha_anterior(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Recuerda la fecha previa para recalcular también el día de origen si cambia."""
+    instance._resumen_fecha_anterior = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and "fecha" not in update_fields:
+        return
+    anterior = _anterior(sender, instance)
+    instance._resumen_fecha_anterior = anterior and _fecha(anterior)
+
+
+def actualizar_resumen_al_guardar(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not _afecta_rollup(sender, update_fields):
+        return
+    fuente = sender._meta.label
+    fecha = _fecha(instance)
+    fecha_anterior = getattr(instance, "_resumen_fecha_anterior", None)
+    if fecha_anterior and fecha_anterior != fecha:
+        resumen_diario.recalcular_dia(fecha_anterior, fuente)
+    resumen_diario.recalcular_dia(fecha, fuente)
+
+
+def actualizar_resumen_al_eliminar(sender, instance, **kwargs):
+    resumen_diario.recalcular_dia(_fecha(instance), sender._meta.label)
+
+
+def guardar_saldo_anterior(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Recuerda cuenta y fecha previas para recalcular también ese día si cambian."""
+    instance._saldo_anterior = None
+    if raw or instance.pk is None:
+        return
+    anterior = _anterior(sender, instance)
+    instance._saldo_anterior = anterior and (anterior.cuenta_bancaria_id, _fecha(anterior))
+
+
+def actualizar_saldo_al_guardar(sender, instance, update_fields=None, raw=False, **kwargs):
+    etiqueta = sender._meta.label
+    if raw:
+        return
+    if update_fields is not None and not saldos_cuentas.CAMPOS_RELEVANTES[etiqueta] & set(update_fields):
+        return
+    fuente = next(fuente for fuente, modelo in saldos_cuentas.MODELOS.items() if modelo == etiqueta)
+    actual = (instance.cuenta_bancaria_id, _fecha(instance))
+    anterior = getattr(instance, "_saldo_anterior", None)
+    if anterior and anterior[0] and anterior != actual:
+        saldos_cuentas.recalcular_dia(anterior[0], fuente, anterior[1])
+    if actual[0]:
+        saldos_cuentas.recalcular_dia(actual[0], fuente, actual[1])
+
+
+def actualizar_saldo_al_eliminar(sender, instance, **kwargs):
+    if not instance.cuenta_bancaria_id:
+        return
+    fuente = next(fuente for fuente, modelo in saldos_cuentas.MODELOS.items() if modelo == sender._meta.label)
+    saldos_cuentas.recalcular_dia(instance.cuenta_bancaria_id, fuente, _fecha(instance))
+
+
+def preparar_delta_iva(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Calcula el cambio de aporte al IVA y lo rechaza si toca un período cerrado."""
+    instance._iva_deltas = None
+    if raw:
+        return
+    if update_fields is not None and not iva_periodos.CAMPOS_RELEVANTES & set(update_fields):
+        return
+    anterior = _anterior(sender, instance)
+    cambios = iva_periodos.deltas(anterior and iva_periodos.aporte(anterior), iva_periodos.aporte(instance))
+    iva_periodos.validar(cambios)
+    instance._iva_deltas = cambios
+
+
+def preparar_delta_iva_al_eliminar(sender, instance, **kwargs):
+    cambios = iva_periodos.deltas(iva_periodos.aporte(instance), None)
+    iva_periodos.validar(cambios)
+    instance._iva_deltas = cambios
+
+
+def aplicar_delta_iva(sender, instance, raw=False, **kwargs):
+    cambios = getattr(instance, "_iva_deltas", None)
+    instance._iva_deltas = None
+    if raw or not cambios:
+        return
+    iva_periodos.aplicar(iva_periodos.MODELOS[sender._meta.label], cambios)
+
+
+def actualizar_alerta_al_guardar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    alertas.sincronizar(instance)
+
+
+def retirar_alerta_al_eliminar(sender, instance, **kwargs):
+    alertas.retirar(instance)
+
+
+def descartar_snapshots_venta(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not series_ventas.CAMPOS_RELEVANTES & set(update_fields):
+        return
+    fecha_anterior = getattr(instance, "_resumen_fecha_anterior", None)
+    if fecha_anterior:
+        series_ventas.descartar_snapshots(fecha_anterior)
+    series_ventas.descartar_snapshots(_fecha(instance))
+
+
+def descartar_snapshots_linea(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from ventas.models import Venta
+
+    fecha = Venta.objects.filter(pk=instance.venta_id).values_list("fecha", flat=True).first()
+    if fecha:
+        series_ventas.descartar_snapshots(fecha)
+
+
+def invalidar_cache_reportes(sender, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(partial(cache_reportes.incrementar_version, sender._meta.label))
+
+
+def conectar():
+    modelos = list(resumen_diario.FUENTES_OPERACIONES) + [resumen_diario.MODELO_MOVIMIENTOS]
+    # Primero, para que guardar_fecha_anterior, guardar_saldo_anterior y
+    # preparar_delta_iva compartan una única lectura de la fila previa.
+    for etiqueta in {*modelos, *saldos_cuentas.MODELOS.values(), *iva_periodos.MODELOS}:
+        pre_save.connect(olvidar_anterior, sender=apps.get_model(etiqueta), dispatch_uid=f"anterior:{etiqueta}")
+
+    for etiqueta in modelos:
+        modelo = apps.get_model(etiqueta)
+        uid = f"resumen_diario:{etiqueta}"
+        pre_save.connect(guardar_fecha_anterior, sender=modelo, dispatch_uid=uid)
+        post_save.connect(actualizar_resumen_al_guardar, sender=modelo, dispatch_uid=uid)
+        post_delete.connect(actualizar_resumen_al_eliminar, sender=modelo, dispatch_uid=uid)
+
+    for etiqueta in saldos_cuentas.MODELOS.values():
+        modelo = apps.get_model(etiqueta)
+        uid = f"saldos_cuentas:{etiqueta}"
+        pre_save.connect(guardar_saldo_anterior, sender=modelo, dispatch_uid=uid)
+        post_save.connect(actualizar_saldo_al_guardar, sender=modelo, dispatch_uid=uid)
+        post_delete.connect(actualizar_saldo_al_eliminar, sender=modelo, dispatch_uid=uid)
+
+    for etiqueta in iva_periodos.MODELOS:
+        modelo = apps.get_model(etiqueta)
+        uid = f"iva_periodos:{etiqueta}"
+        pre_save.connect(preparar_delta_iva, sender=modelo, dispatch_uid=uid)
+        post_save.connect(aplicar_delta_iva, sender=modelo, dispatch_uid=uid)
+        pre_delete.connect(preparar_delta_iva_al_eliminar, sender=modelo, dispatch_uid=uid)
+        post_delete.connect(aplicar_delta_iva, sender=modelo, dispatch_uid=uid)
+
+    for etiqueta in alertas.FUENTES:
+        modelo = apps.get_model(etiqueta)
+        uid = f"alertas:{etiqueta}"
+        post_save.connect(actualizar_alerta_al_guardar, sender=modelo, dispatch_uid=uid)
+        post_delete.connect(retirar_alerta_al_eliminar, sender=modelo, dispatch_uid=uid)
+
+    venta = apps.get_model("ventas.Venta")
+    linea = apps.get_model("ventas.LineaVenta")
+    uid = "series_ventas"
+    post_save.connect(descartar_snapshots_venta, sender=venta, dispatch_uid=uid)
+    post_delete.connect(descartar_snapshots_venta, sender=venta, dispatch_uid=uid)
+    post_save.connect(descartar_snapshots_linea, sender=linea, dispatch_uid=uid)
+    post_delete.connect(descartar_snapshots_linea, sender=linea, dispatch_uid=uid)
+
+    for etiqueta in cache_reportes.MODELOS_VERSIONADOS:
+        modelo = apps.get_model(etiqueta)
+        uid = f"cache_reportes:{etiqueta}"
+        post_save.connect(invalidar_cache_reportes, sender=modelo, dispatch_uid=uid)
+        post_delete.connect(invalidar_cache_reportes, sender=modelo, dispatch_uid=uid)
@@ -1,3 +1,2040 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime as dt
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from clientes.models import Cliente
+from compras.models import Compra
+from inventario.models import MovimientoStock, ValorizacionInventario
+from productos.models import Producto
+from proveedores.models import Proveedor
+from ventas.models import LineaVenta, Venta
+from . import afip_soap, codigos_barras, conciliacion, cuenta_corriente, exportacion, extractos, facturas_pdf, iva_periodos, libro_iva_digital, logs_afip, numeracion, rentabilidad, resumen_diario, saldos_cuentas, segmentacion, series_ventas, trabajos, wsaa, wsfe
+from .afip_stub import ServidorAFIPStub
+from .metricas import Conteo, Reporte, Suma
+from .models import (
+    Alerta,
+    ConfiguracionAFIP,
+    CuentaBancaria,
+    DetalleFacturaElectronica,
+    ExtractoBancario,
+    FacturaElectronica,
+    LogAFIP,
+    MedioPago,
+    MovimientoBancario,
+    MovimientoCuentaCorriente,
+    MovimientoFinanciero,
+    PagoCliente,
+    PeriodoIVA,
+    ResumenDiarioMovimiento,
+    ResumenDiarioOperaciones,
+    SaldoDiarioCuenta,
+    SecuenciaComprobante,
+    SnapshotVentasPeriodo,
+    TrabajoReporte,
+)
+
+User = get_user_model()
+
+
+class ResumenDiarioTest(APITestCase):
+    """Pruebas del rollup financiero diario y los endpoints que lo leen"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # Venta.fecha es auto_now_add (date.today()); el resto recibe la fecha explícita
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(
+            nombre_fantasia="Cliente Test",
+            razon_social="Cliente Test SA",
+            identificacion="12345678"
+        )
+        self.proveedor = Proveedor.objects.create(nombre="Proveedor Test")
+
+        Venta.objects.create(
+            cliente=self.cliente, subtotal=Decimal('100'), iva_monto=Decimal('21'), total=Decimal('121')
+        )
+        PagoCliente.objects.create(cliente=self.cliente, fecha=self.hoy, monto=Decimal('50'), medio=MedioPago.EFECTIVO)
+        Compra.objects.create(proveedor=self.proveedor, fecha=self.hoy, subtotal=Decimal('40'), total=Decimal('40'))
+        MovimientoFinanciero.objects.create(
+            fecha=self.hoy,
+            tipo=MovimientoFinanciero.Tipo.INGRESO,
+            estado=MovimientoFinanciero.Estado.COBRADO,
+            monto=Decimal('50'),
+            medio_pago=MedioPago.EFECTIVO,
+        )
+        self.gasto = MovimientoFinanciero.objects.create(
+            fecha=self.hoy,
+            tipo=MovimientoFinanciero.Tipo.EGRESO,
+            estado=MovimientoFinanciero.Estado.PAGADO,
+            origen=MovimientoFinanciero.Origen.SERVICIO,
+            monto=Decimal('30'),
+            medio_pago=MedioPago.TRANSFERENCIA,
+        )
+
+    def test_rollup_se_actualiza_al_guardar(self):
+        """Las señales mantienen el rollup del día sin reconstrucción"""
+        dia = ResumenDiarioOperaciones.objects.get(fecha=self.hoy)
+        self.assertEqual(dia.ventas_cantidad, 1)
+        self.assertEqual(dia.ventas_total, Decimal('121'))
+        self.assertEqual(dia.ventas_iva, Decimal('21'))
+        self.assertEqual(dia.pagos_total, Decimal('50'))
+        self.assertEqual(dia.compras_total, Decimal('40'))
+        self.assertEqual(resumen_diario.verificar(), [])
+
+    def test_rollup_sigue_cambios_de_estado_fecha_y_borrado(self):
+        """Cambiar estado o fecha mueve el importe; borrar lo descuenta"""
+        self.gasto.estado = MovimientoFinanciero.Estado.CANCELADO
+        self.gasto.save(update_fields=['estado'])
+        self.assertTrue(ResumenDiarioMovimiento.objects.filter(
+            fecha=self.hoy, estado=MovimientoFinanciero.Estado.CANCELADO, total=Decimal('30')
+        ).exists())
+
+        ayer = self.hoy - timedelta(days=1)
+        self.gasto.fecha = ayer
+        self.gasto.save()
+        self.assertFalse(ResumenDiarioMovimiento.objects.filter(
+            fecha=self.hoy, tipo=MovimientoFinanciero.Tipo.EGRESO
+        ).exists())
+        self.assertTrue(ResumenDiarioMovimiento.objects.filter(fecha=ayer).exists())
+
+        self.gasto.delete()
+        self.assertFalse(ResumenDiarioMovimiento.objects.filter(fecha=ayer).exists())
+        self.assertEqual(resumen_diario.verificar(), [])
+
+    def test_comando_detecta_y_repara_diferencias(self):
+        """--verificar falla si el rollup quedó desfasado y la reconstrucción lo repara"""
+        # Un update() masivo no dispara señales
+        Venta.objects.update(total=Decimal('999'))
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_resumen_financiero', '--verificar', stdout=StringIO())
+
+        call_command('reconstruir_resumen_financiero', stdout=StringIO())
+        self.assertEqual(ResumenDiarioOperaciones.objects.get(fecha=self.hoy).ventas_total, Decimal('999'))
+        self.assertEqual(resumen_diario.verificar(), [])
+
+    def test_resumen_pendiente_desde_rollup(self):
+        response = self.client.get('/api/finanzas/movimientos/resumen/pendiente/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['total_ventas']), Decimal('121'))
+        self.assertEqual(Decimal(response.data['total_ventas_sin_iva']), Decimal('100'))
+        self.assertEqual(Decimal(response.data['pendiente_cobro']), Decimal('71'))
+        self.assertEqual(Decimal(response.data['total_gastos']), Decimal('30'))
+        self.assertEqual(Decimal(response.data['balance']['total_egresos']), Decimal('70'))
+
+    def test_resumen_liquidez_y_por_medio_desde_rollup(self):
+        liquidez = self.client.get('/api/finanzas/movimientos/resumen/liquidez/').data
+        self.assertEqual(Decimal(liquidez['liquidez']['efectivo_disponible']), Decimal('20'))
+
+        por_medio = self.client.get('/api/finanzas/movimientos/resumen/por-medio/').data
+        medios = {fila['medio']: fila for fila in por_medio['por_medio']}
+        self.assertEqual(Decimal(medios['EFECTIVO']['ingresos']), Decimal('50'))
+        self.assertEqual(medios['EFECTIVO']['cantidad_ingresos'], 1)
+        self.assertEqual(Decimal(medios['TRANSFERENCIA']['egresos']), Decimal('30'))
+        self.assertEqual(Decimal(por_medio['totales']['total_neto']), Decimal('20'))
+
+    def test_rango_sin_datos(self):
+        response = self.client.get(
+            '/api/finanzas/movimientos/resumen/pendiente/',
+            {'fecha_desde': '2000-01-01', 'fecha_hasta': '2000-01-31'}
+        )
+        self.assertEqual(Decimal(response.data['total_ventas']), Decimal('0'))
+        self.assertEqual(resumen_diario.totales_operaciones(date(2000, 1, 1), date(2000, 1, 31))['ventas_cantidad'], 0)
+
+
+class ReporteMetricasTest(APITestCase):
+    """Pruebas del compilador declarativo de métricas"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nombre_fantasia="Cliente Test",
+            razon_social="Cliente Test SA",
+            identificacion="12345678"
+        )
+        Venta.objects.create(
+            cliente=self.cliente, incluye_iva=True,
+            subtotal=Decimal('100'), iva_monto=Decimal('21'), total=Decimal('121')
+        )
+        Venta.objects.create(
+            cliente=self.cliente, incluye_iva=True,
+            subtotal=Decimal('200'), iva_monto=Decimal('42'), total=Decimal('242')
+        )
+        Venta.objects.create(cliente=self.cliente, subtotal=Decimal('50'), total=Decimal('50'))
+
+    def test_totales_en_una_consulta(self):
+        from .views import METRICAS_LIBRO_IVA
+
+        with self.assertNumQueries(1):
+            totales = Reporte(Venta.objects.all(), metricas=METRICAS_LIBRO_IVA).ejecutar()
+        self.assertEqual(totales['total_operaciones'], 3)
+        self.assertEqual(totales['operaciones_con_iva'], 2)
+        self.assertEqual(totales['total_gravado'], Decimal('300'))
+        self.assertEqual(totales['total_iva'], Decimal('63'))
+        self.assertEqual(totales['total_exento'], Decimal('50'))
+        self.assertEqual(totales['total_general'], Decimal('413'))
+
+    def test_agrupaciones_consolidadas_desde_una_consulta(self):
+        reporte = Reporte(
+            Venta.objects.all(),
+            metricas={'cantidad': Conteo(), 'total': Suma('total')},
+            agrupaciones=[(), ('incluye_iva',), ('incluye_iva', 'estado_pago')],
+        )
+        with self.assertNumQueries(1):
+            resultado = reporte.ejecutar()
+        self.assertEqual(resultado['cantidad'], 3)
+        self.assertEqual(
+            [(fila['incluye_iva'], fila['total']) for fila in resultado.por('incluye_iva')],
+            [(False, Decimal('50')), (True, Decimal('363'))]
+        )
+        self.assertEqual(len(resultado.por('incluye_iva', 'estado_pago')), 2)
+
+    def test_resultados_tipados_sin_filas(self):
+        resultado = Reporte(
+            Venta.objects.none(),
+            metricas={'cantidad': Conteo(), 'total': Suma('total')},
+            agrupaciones=[(), ('estado_pago',)],
+        ).ejecutar()
+        self.assertEqual(resultado['cantidad'], 0)
+        self.assertEqual(resultado['total'], Decimal('0'))
+        self.assertEqual(resultado.por('estado_pago'), [])
+
+    def test_endpoints_portados(self):
+        user = User.objects.create_user(
+            username='testuser', password='testpass123', nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=user)
+        periodo = PeriodoIVA.obtener_o_crear_periodo_actual()
+
+        libro = self.client.get(f'/api/finanzas/periodos-iva/{periodo.id}/libro-iva-ventas/')
+        self.assertEqual(libro.status_code, status.HTTP_200_OK)
+        self.assertEqual(libro.data['resumen']['operaciones_sin_iva'], 1)
+        self.assertEqual(Decimal(libro.data['resumen']['total_iva']), Decimal('63'))
+
+        resumen = self.client.get('/api/finanzas/periodos-iva/resumen-iva/')
+        self.assertEqual(resumen.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(resumen.data['total_iva_debito_fiscal']), Decimal('63'))
+
+        estadisticas = self.client.get('/api/finanzas/facturas-electronicas/estadisticas/')
+        self.assertEqual(estadisticas.status_code, status.HTTP_200_OK)
+        self.assertEqual(estadisticas.data['resumen']['total_facturas'], 0)
+
+
+class AlertaTest(APITestCase):
+    """Pruebas de las alertas persistidas del dashboard"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(
+            nombre_fantasia="Cliente Test",
+            razon_social="Cliente Test SA",
+            identificacion="12345678"
+        )
+
+    def test_stock_bajo_se_crea_y_se_retira_por_eventos(self):
+        producto = Producto.objects.create(
+            nombre="Queso", stock=Decimal('5'), stock_minimo=Decimal('10')
+        )
+        alerta = Alerta.objects.get(tipo=Alerta.Tipo.STOCK_BAJO)
+        self.assertEqual(alerta.entidad_id, producto.id)
+        self.assertEqual(alerta.urgencia, Alerta.Urgencia.MEDIA)
+
+        producto.quitar_stock(Decimal('5'))
+        self.assertEqual(Alerta.objects.get(tipo=Alerta.Tipo.STOCK_BAJO).urgencia, Alerta.Urgencia.ALTA)
+
+        producto.agregar_stock(Decimal('50'))
+        self.assertFalse(Alerta.objects.exists())
+
+    def test_venta_vencida_desaparece_al_pagarse(self):
+        venta = Venta.objects.create(
+            cliente=self.cliente, total=Decimal('100'), subtotal=Decimal('100'),
+            fecha_vencimiento=self.hoy - timedelta(days=40)
+        )
+        alerta = Alerta.objects.get()
+        self.assertEqual(alerta.tipo, Alerta.Tipo.PAGO_VENCIDO)
+        self.assertEqual(alerta.urgencia, Alerta.Urgencia.ALTA)
+        self.assertEqual(alerta.datos['dias_vencida'], 40)
+
+        venta.aplicar_pago(Decimal('100'), crear_imputacion=False)
+        self.assertFalse(Alerta.objects.exists())
+
+    def test_comando_nocturno_mueve_alertas_por_fecha(self):
+        Venta.objects.create(
+            cliente=self.cliente, total=Decimal('100'), subtotal=Decimal('100'),
+            fecha_vencimiento=self.hoy + timedelta(days=10)
+        )
+        self.assertFalse(Alerta.objects.exists())
+
+        fecha = (self.hoy + timedelta(days=5)).isoformat()
+        call_command('actualizar_alertas', '--fecha', fecha, stdout=StringIO())
+        self.assertEqual(Alerta.objects.get().tipo, Alerta.Tipo.PAGO_PROXIMO_VENCER)
+
+        fecha = (self.hoy + timedelta(days=11)).isoformat()
+        call_command('actualizar_alertas', '--fecha', fecha, stdout=StringIO())
+        self.assertEqual(Alerta.objects.get().tipo, Alerta.Tipo.PAGO_VENCIDO)
+
+    def test_endpoint_paginado_con_conteos_y_etag(self):
+        Producto.objects.create(nombre="Sin stock", stock=Decimal('0'), stock_minimo=Decimal('1'))
+        Producto.objects.create(nombre="Poco stock", stock=Decimal('1'), stock_minimo=Decimal('5'))
+
+        url = '/api/finanzas/movimientos/alertas_dashboard/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_alertas'], 2)
+        self.assertEqual(response.data['alertas_alta'], 1)
+        self.assertEqual(response.data['alertas'][0]['urgencia'], 'alta')
+
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Producto.objects.create(nombre="Otro", stock=Decimal('0'), stock_minimo=Decimal('1'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['alertas_alta'], 2)
+
+        response = self.client.get(url, {'urgencia': 'media'})
+        self.assertEqual(len(response.data['alertas']), 1)
+
+
+class RentabilidadProductosTest(APITestCase):
+    """Pruebas del motor de rentabilidad por producto con CMV de inventario"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cliente = Cliente.objects.create(
+            nombre_fantasia="Cliente Test",
+            razon_social="Cliente Test SA",
+            identificacion="12345678"
+        )
+        self.ct_producto = ContentType.objects.get_for_model(Producto)
+        self.queso = Producto.objects.create(nombre="Queso", sku="QUE-1")
+        self.leche = Producto.objects.create(nombre="Leche", sku="LEC-1")
+        self.manteca = Producto.objects.create(nombre="Manteca", sku="MAN-1")
+
+    def _vender(self, producto, cantidad, precio, fecha, anulada=False):
+        venta = Venta.objects.create(
+            cliente=self.cliente, anulada=anulada,
+            subtotal=cantidad * precio, total=cantidad * precio
+        )
+        # fecha es auto_now_add
+        Venta.objects.filter(pk=venta.pk).update(fecha=fecha)
+        LineaVenta.objects.create(
+            venta=venta, producto=producto, descripcion=producto.nombre,
+            cantidad=cantidad, cantidad_kg=cantidad, precio_unitario=precio
+        )
+        return venta
+
+    def _movimiento(self, producto, tipo, cantidad, costo_unitario, venta=None):
+        return MovimientoStock.objects.create(
+            content_type=self.ct_producto, object_id=producto.id,
+            tipo_movimiento=tipo, cantidad=cantidad, costo_unitario=costo_unitario,
+            cantidad_anterior=Decimal('0'), venta=venta
+        )
+
+    def _preparar(self):
+        venta = self._vender(self.queso, Decimal('10'), Decimal('100'), date(2024, 1, 10))
+        self._movimiento(
+            self.queso, MovimientoStock.TipoMovimiento.SALIDA_VENTA,
+            Decimal('10'), Decimal('40'), venta=venta
+        )
+
+        self._vender(self.leche, Decimal('4'), Decimal('50'), date(2024, 2, 5))
+        entrada = self._movimiento(
+            self.leche, MovimientoStock.TipoMovimiento.ENTRADA_COMPRA, Decimal('10'), Decimal('20')
+        )
+        ValorizacionInventario.objects.create(
+            content_type=self.ct_producto, object_id=self.leche.id,
+            fecha_entrada=timezone.now() - timedelta(days=365 * 5),
+            cantidad_inicial=Decimal('10'), cantidad_actual=Decimal('10'),
+            costo_unitario=Decimal('20'), costo_total_inicial=Decimal('200'),
+            costo_total_actual=Decimal('200'), movimiento_origen=entrada
+        )
+
+        self._vender(self.manteca, Decimal('2'), Decimal('30'), date(2024, 2, 6))
+        self._vender(self.queso, Decimal('99'), Decimal('100'), date(2024, 1, 11), anulada=True)
+
+    def test_cmv_desde_salidas_y_lotes(self):
+        self._preparar()
+
+        with self.assertNumQueries(3):
+            filas = rentabilidad.rentabilidad_por_producto()
+
+        por_producto = {fila['producto_id']: fila for fila in filas}
+        queso = por_producto[self.queso.id]
+        self.assertEqual(queso['total_vendido'], Decimal('1000'))
+        self.assertEqual(queso['costo_total'], Decimal('400'))
+        self.assertEqual(queso['costo_fuente'], 'salidas')
+        self.assertEqual(queso['margen_porcentaje'], Decimal('60'))
+
+        leche = por_producto[self.leche.id]
+        self.assertEqual(leche['costo_total'], Decimal('80'))
+        self.assertEqual(leche['costo_fuente'], 'lotes')
+
+        manteca = por_producto[self.manteca.id]
+        self.assertEqual(manteca['costo_total'], Decimal('0'))
+        self.assertEqual(manteca['costo_fuente'], 'sin_costo')
+
+    def test_apertura_por_periodo_y_endpoint(self):
+        self._preparar()
+
+        filas = rentabilidad.rentabilidad_por_producto(periodo='mes')
+        self.assertEqual(
+            {(fila['producto_id'], fila['periodo']) for fila in filas},
+            {
+                (self.queso.id, date(2024, 1, 1)),
+                (self.leche.id, date(2024, 2, 1)),
+                (self.manteca.id, date(2024, 2, 1)),
+            }
+        )
+
+        url = '/api/finanzas/movimientos/reporte_rentabilidad_productos/'
+        response = self.client.get(url, {'fecha_desde': '2024-01-01', 'fecha_hasta': '2024-01-31'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['productos']), 1)
+        producto = response.data['productos'][0]
+        self.assertEqual(producto['producto_sku'], 'QUE-1')
+        self.assertEqual(producto['costo_estimado'], 40.0)
+        self.assertEqual(producto['margen_bruto'], 60.0)
+        self.assertEqual(response.data['resumen']['margen_promedio'], 60.0)
+
+        response = self.client.get(url, {'periodo': 'semana'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SegmentacionClientesTest(APITestCase):
+    """Pruebas de la segmentación de clientes en bloque"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.hoy = date.today()
+        self.desde = self.hoy - timedelta(days=30)
+
+    def _cliente(self, identificacion, ventas, dias_atras=0):
+        cliente = Cliente.objects.create(nombre_fantasia=f"Cliente {identificacion}", identificacion=identificacion)
+        for total in ventas:
+            venta = Venta.objects.create(cliente=cliente, subtotal=total, total=total)
+            Venta.objects.filter(pk=venta.pk).update(fecha=self.hoy - timedelta(days=dias_atras))
+        return cliente
+
+    def test_categorias_y_rfm_en_dos_consultas(self):
+        vip = self._cliente('1', [Decimal('20000')] * 3)
+        premium = self._cliente('2', [Decimal('6000')] * 2, dias_atras=5)
+        regular = self._cliente('3', [Decimal('100')], dias_atras=10)
+        anulado = self._cliente('4', [Decimal('50000')])
+        Venta.objects.filter(cliente=anulado).update(anulada=True)
+        PagoCliente.objects.create(cliente=vip, fecha=self.hoy, monto=Decimal('1000'), medio=MedioPago.EFECTIVO)
+
+        with self.assertNumQueries(2):
+            clientes = segmentacion.segmentar_clientes(self.desde, self.hoy, hoy=self.hoy)
+
+        por_id = {c['cliente_id']: c for c in clientes}
+        self.assertNotIn(anulado.id, por_id)
+        self.assertEqual(por_id[vip.id]['categoria'], 'VIP')
+        self.assertEqual(por_id[vip.id]['saldo_pendiente'], 59000.0)
+        self.assertEqual(por_id[vip.id]['rfm']['segmento'], '555')
+        self.assertEqual(por_id[premium.id]['categoria'], 'Premium')
+        self.assertEqual(por_id[regular.id]['categoria'], 'Regular')
+        self.assertEqual(por_id[regular.id]['rfm']['segmento'], '111')
+        self.assertEqual(clientes[0]['cliente_id'], vip.id)
+
+        # Umbrales configurables
+        clientes = segmentacion.segmentar_clientes(
+            self.desde, self.hoy, umbrales={'vip_ticket': 1000, 'vip_frecuencia': 1}, hoy=self.hoy
+        )
+        self.assertEqual({c['cliente_id']: c['categoria'] for c in clientes}[premium.id], 'VIP')
+
+    def test_endpoint(self):
+        self._cliente('1', [Decimal('20000')] * 3)
+        url = '/api/finanzas/movimientos/analisis_rentabilidad_clientes/'
+
+        response = self.client.get(url, {'fecha_desde': self.desde.isoformat(), 'umbral_vip_ticket': '50000'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resumen_general']['total_clientes_activos'], 1)
+        self.assertEqual(response.data['distribucion_categorias']['VIP'], 0)
+        self.assertEqual(response.data['distribucion_categorias']['Premium'], 1)
+
+        response = self.client.get(url, {'umbral_vip_ticket': 'mucho'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SeriesVentasTest(APITestCase):
+    """Pruebas de las series de ventas con snapshots de períodos cerrados"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cliente = Cliente.objects.create(nombre_fantasia="Cliente Test", identificacion="12345678")
+        self.queso = Producto.objects.create(nombre="Queso", sku="QUE-1")
+        self.leche = Producto.objects.create(nombre="Leche", sku="LEC-1")
+        self.hoy = date(2024, 3, 15)
+
+    def _vender(self, fecha, total, producto=None, kg=Decimal('1')):
+        venta = Venta.objects.create(cliente=self.cliente, subtotal=total, total=total)
+        if producto:
+            LineaVenta.objects.create(
+                venta=venta, producto=producto, descripcion=producto.nombre,
+                cantidad=kg, cantidad_kg=kg, precio_unitario=total / kg
+            )
+        # fecha es auto_now_add
+        Venta.objects.filter(pk=venta.pk).update(fecha=fecha)
+        return venta
+
+    def test_granularidades_y_top_productos(self):
+        self._vender(date(2024, 1, 2), Decimal('100'), self.queso)
+        self._vender(date(2024, 1, 3), Decimal('300'), self.leche)
+        self._vender(date(2024, 2, 20), Decimal('50'), self.queso)
+
+        mensual = series_ventas.serie(date(2024, 1, 10), date(2024, 3, 1), 'mes', top_n=1, interanual=False, hoy=self.hoy)
+        self.assertEqual([p['inicio'] for p in mensual], [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertEqual(mensual[0]['total_ventas'], Decimal('400'))
+        self.assertEqual(mensual[0]['cantidad_ventas'], 2)
+        self.assertEqual([p['producto_sku'] for p in mensual[0]['top_productos']], ['LEC-1'])
+        self.assertEqual([p['cerrado'] for p in mensual], [True, True, False])
+
+        semanal = series_ventas.serie(date(2024, 1, 1), date(2024, 1, 7), 'semana', interanual=False, hoy=self.hoy)
+        self.assertEqual(len(semanal), 1)
+        self.assertEqual(semanal[0]['total_ventas'], Decimal('400'))
+
+        trimestral = series_ventas.serie(date(2024, 1, 1), date(2024, 3, 31), 'trimestre', interanual=False, hoy=self.hoy)
+        self.assertEqual(trimestral[0]['total_ventas'], Decimal('450'))
+        self.assertFalse(trimestral[0]['cerrado'])
+
+        with self.assertRaises(ValueError):
+            series_ventas.serie(date(2024, 1, 1), date(2024, 1, 31), 'hora')
+
+    def test_periodos_cerrados_se_leen_de_snapshot(self):
+        self._vender(date(2024, 1, 2), Decimal('100'), self.queso)
+        self._vender(date(2023, 1, 5), Decimal('80'))
+
+        serie = series_ventas.serie(date(2024, 1, 1), date(2024, 3, 31), 'mes', hoy=self.hoy)
+        self.assertEqual(serie[0]['anio_anterior']['total_ventas'], Decimal('80'))
+        self.assertEqual(serie[0]['variacion_interanual'], Decimal('25'))
+        self.assertIsNone(serie[1]['variacion_interanual'])
+        # Enero y febrero de 2024 más el primer trimestre de 2023; marzo de 2024 sigue abierto
+        self.assertEqual(SnapshotVentasPeriodo.objects.count(), 5)
+
+        # Todo desde snapshots salvo el mes abierto, que se calcula en vivo
+        with self.assertNumQueries(1 + 2 + 1):
+            series_ventas.serie(date(2024, 1, 1), date(2024, 3, 31), 'mes', hoy=self.hoy)
+
+        # Una venta modificada en un período cerrado descarta su snapshot
+        venta = Venta.objects.get(fecha=date(2024, 1, 2))
+        venta.anulada = True
+        venta.save(update_fields=['anulada'])
+        self.assertFalse(SnapshotVentasPeriodo.objects.filter(inicio=date(2024, 1, 1)).exists())
+        serie = series_ventas.serie(date(2024, 1, 1), date(2024, 1, 31), 'mes', hoy=self.hoy)
+        self.assertEqual(serie[0]['total_ventas'], Decimal('0'))
+
+    def test_endpoint_tendencias(self):
+        self._vender(date.today(), Decimal('100'), self.queso)
+        url = '/api/finanzas/movimientos/tendencias_ventas/'
+
+        response = self.client.get(url, {'granularidad': 'semana', 'top': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['granularidad'], 'semana')
+        self.assertEqual(response.data['serie'][-1]['total_ventas'], 100.0)
+        self.assertFalse(response.data['serie'][-1]['cerrado'])
+        self.assertEqual(response.data['ventas_mensuales'][-1]['total_ventas'], 100.0)
+        self.assertEqual(response.data['top_productos'][0]['producto_sku'], 'QUE-1')
+
+        response = self.client.get(url, {'granularidad': 'anio'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheReportesTest(APITestCase):
+    """Pruebas del cache de reportes por versión de tabla"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cliente = Cliente.objects.create(nombre_fantasia="Cliente Test", identificacion="12345678")
+        self.url = '/api/finanzas/movimientos/resumen/pendiente/'
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            'reportes': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'reportes'},
+        },
+        REPORTES_CACHE='reportes',
+    )
+    def test_usa_el_alias_de_reportes(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Venta.objects.create(cliente=self.cliente, subtotal=Decimal('100'), total=Decimal('121'))
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_hit_miss_e_invalidacion_por_tabla(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(Decimal(response.data['total_ventas']), Decimal('0'))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        # Otros parámetros son otra entrada
+        self.assertEqual(self.client.get(self.url, {'fecha_desde': '2024-01-01'})['X-Cache'], 'MISS')
+
+        # Un cambio en una tabla de la que no depende no invalida
+        with self.captureOnCommitCallbacks(execute=True):
+            Proveedor.objects.create(nombre="Proveedor Test")
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Venta.objects.create(cliente=self.cliente, subtotal=Decimal('100'), total=Decimal('121'))
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(Decimal(response.data['total_ventas']), Decimal('121'))
+
+        stats = self.client.get('/api/finanzas/movimientos/cache/estadisticas/').data
+        datos = stats['MovimientoFinancieroViewSet.resumen_pendiente']
+        self.assertEqual((datos['hit'], datos['miss']), (2, 3))
+        self.assertEqual(datos['tasa_acierto'], 40.0)
+
+    def test_errores_no_se_cachean(self):
+        url = '/api/finanzas/movimientos/tendencias_ventas/'
+        self.assertEqual(self.client.get(url, {'granularidad': 'anio'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'granularidad': 'anio'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+
+@override_settings(REPORTES_ASINCRONOS=True)
+class TrabajosReporteTest(APITestCase):
+    """Pruebas de los reportes ejecutados en segundo plano"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        cliente = Cliente.objects.create(nombre_fantasia="Cliente Test", identificacion="12345678")
+        Venta.objects.create(cliente=cliente, subtotal=Decimal('100'), total=Decimal('121'))
+
+    def _procesar(self):
+        call_command('run_report_worker', '--una-vez', stdout=StringIO())
+
+    def test_encolar_procesar_y_obtener_resultado(self):
+        url = '/api/finanzas/movimientos/analisis_rentabilidad_clientes/'
+        sincronico = self.client.get(url).json()
+
+        response = self.client.get(url, {'asincrono': '1'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        trabajo_url = f"/api/finanzas/trabajos-reportes/{response.data['trabajo_id']}/"
+        self.assertEqual(self.client.get(trabajo_url).data['estado'], TrabajoReporte.Estado.PENDIENTE)
+        self.assertEqual(self.client.get(trabajo_url + 'resultado/').status_code, status.HTTP_202_ACCEPTED)
+
+        self._procesar()
+
+        estado = self.client.get(trabajo_url).data
+        self.assertEqual(estado['estado'], TrabajoReporte.Estado.COMPLETADO)
+        self.assertEqual(estado['parametros'], {})
+        resultado = self.client.get(trabajo_url + 'resultado/')
+        self.assertEqual(resultado.status_code, status.HTTP_200_OK)
+        self.assertEqual(resultado.json(), sincronico)
+
+        # Otro usuario no ve el trabajo
+        otro = User.objects.create_user(username='otro', password='x', nivel_acceso=User.NivelAcceso.ADMIN_TOTAL)
+        self.client.force_authenticate(user=otro)
+        self.assertEqual(self.client.get(trabajo_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(trabajo_url + 'resultado/').status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(REPORTES_ASINCRONOS=False)
+    def test_sin_worker_se_calcula_en_el_request(self):
+        url = '/api/finanzas/movimientos/analisis_rentabilidad_clientes/'
+        response = self.client.get(url, {'asincrono': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.client.get(url).json())
+        self.assertFalse(TrabajoReporte.objects.exists())
+
+    def test_accion_de_detalle_y_post(self):
+        periodo = PeriodoIVA.obtener_o_crear_periodo_actual()
+        response = self.client.get(f'/api/finanzas/periodos-iva/{periodo.id}/libro-iva-ventas/', {'asincrono': 'si'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.post(
+            '/api/contabilidad/reportes/generar/?asincrono=1', {'tipo_reporte': 'resumen'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        self._procesar()
+
+        libro, reporte = TrabajoReporte.objects.order_by('id')
+        self.assertEqual(libro.estado, TrabajoReporte.Estado.COMPLETADO)
+        self.assertEqual(json.loads(trabajos.resultado(libro))['resumen']['total_operaciones'], 1)
+        self.assertEqual(reporte.cuerpo, {'tipo_reporte': 'resumen'})
+        self.assertEqual(reporte.codigo_respuesta, status.HTTP_200_OK)
+
+    def test_abandonados_y_vencidos(self):
+        trabajo = TrabajoReporte.objects.create(usuario=self.user, ruta='/api/no-existe/')
+        self._procesar()
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoReporte.Estado.ERROR)
+
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(
+            estado=TrabajoReporte.Estado.EN_PROCESO,
+            fecha_inicio=timezone.now() - timedelta(hours=1),
+            intentos=1,
+            expira_en=None,
+        )
+        self.assertEqual(trabajos.recuperar_abandonados(), (1, 0))
+
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(expira_en=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(trabajos.purgar_vencidos(), 1)
+
+
+class ExportacionLibroIVATest(APITestCase):
+    """Pruebas de la exportación en streaming de los libros IVA"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.periodo = PeriodoIVA.obtener_o_crear_periodo_actual()
+        cliente = Cliente.objects.create(nombre_fantasia="Cliente <Test>", identificacion="20123456789")
+        Venta.objects.create(
+            cliente=cliente, numero="A-0001", incluye_iva=True,
+            subtotal=Decimal('100'), iva_monto=Decimal('21'), total=Decimal('121')
+        )
+        Venta.objects.create(cliente=cliente, subtotal=Decimal('50'), total=Decimal('50'))
+        proveedor = Proveedor.objects.create(nombre="Proveedor Test", identificacion="30111111111")
+        Compra.objects.create(
+            proveedor=proveedor, fecha=date.today(), incluye_iva=True,
+            subtotal=Decimal('200'), iva_monto=Decimal('42'), total=Decimal('242')
+        )
+        self.url = f'/api/finanzas/periodos-iva/{self.periodo.id}/'
+
+    def _contenido(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_csv_ventas_con_totales(self):
+        response = self.client.get(self.url + 'libro-iva-ventas/exportar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('libro_iva_ventas_', response['Content-Disposition'])
+
+        filas = list(csv.reader(io.StringIO(self._contenido(response).decode('utf-8-sig'))))
+        self.assertEqual(filas[0], exportacion.ENCABEZADOS_VENTAS)
+        self.assertEqual(filas[1][1:], ['A-0001', 'Cliente <Test>', '20123456789', '100.00', '21.00', '121.00', 'Sí'])
+        self.assertTrue(filas[2][1].startswith('V-'))
+        totales = {fila[0]: fila[1] for fila in filas[4:]}
+        self.assertEqual(totales['Total operaciones'], '2')
+        self.assertEqual(totales['Total gravado'], '100.00')
+        self.assertEqual(totales['Total exento'], '50.00')
+        self.assertEqual(totales['Total general'], '171.00')
+
+    def test_xlsx_compras(self):
+        response = self.client.get(self.url + 'libro-iva-compras/exportar/', {'formato': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        archivo = zipfile.ZipFile(io.BytesIO(self._contenido(response)))
+        self.assertIsNone(archivo.testzip())
+        ns = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        hoja = ElementTree.fromstring(archivo.read('xl/worksheets/sheet1.xml'))
+        filas = [
+            [celda.findtext('x:v', namespaces=ns) or celda.findtext('x:is/x:t', namespaces=ns) for celda in fila]
+            for fila in hoja.iterfind('x:sheetData/x:row', ns)
+        ]
+        self.assertEqual(filas[0], exportacion.ENCABEZADOS_COMPRAS)
+        self.assertEqual(filas[1][2:], ['Proveedor Test', '30111111111', '', '200.00', '42.00', '242.00', 'Sí'])
+        self.assertIn(['Total IVA', '42.00'], filas)
+
+    def test_formato_invalido(self):
+        response = self.client.get(self.url + 'libro-iva-ventas/exportar/', {'formato': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_libro_iva_digital(self):
+        Compra.objects.create(
+            proveedor=Proveedor.objects.get(), fecha=date.today(), numero='0003-00000125', incluye_iva=True,
+            subtotal=Decimal('1000'), iva_monto=Decimal('105'), total=Decimal('1105'),
+        )
+        Venta.objects.filter(numero='A-0001').update(numero='0002-00000015')
+        anulada = Venta.objects.create(cliente=Cliente.objects.get(), subtotal=Decimal('9'), total=Decimal('9'))
+        Venta.objects.filter(pk=anulada.pk).update(anulada=True)
+
+        response = self.client.get(self.url + 'libro-iva-digital/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+
+        archivo = zipfile.ZipFile(io.BytesIO(self._contenido(response)))
+        self.assertIsNone(archivo.testzip())
+        archivos = {
+            clave: archivo.read(nombre).decode('latin-1').split('\r\n')[:-1]
+            for clave, nombre in libro_iva_digital.ARCHIVOS.items()
+        }
+        largos = {'ventas_cbte': 266, 'ventas_alicuotas': 62, 'compras_cbte': 325, 'compras_alicuotas': 84}
+        for clave, lineas in archivos.items():
+            self.assertTrue(all(len(linea) == largos[clave] for linea in lineas), clave)
+
+        gravada, exenta = archivos['ventas_cbte']
+        hoy = date.today().strftime('%Y%m%d')
+        self.assertEqual(gravada[:56], hoy + '006' + '00002' + '15'.zfill(20) + '15'.zfill(20))
+        self.assertEqual(gravada[56:78], '80' + '20123456789'.zfill(20))
+        self.assertEqual(gravada[108:123], '000000000012100')
+        self.assertEqual(gravada[228:243], 'PES00010000001' + '0')
+        self.assertEqual(exenta[153:168], '000000000005000')
+        self.assertEqual(exenta[242], 'E')
+        self.assertEqual(archivos['ventas_alicuotas'][0][28:], '000000000010000' + '0005' + '000000000002100')
+        self.assertEqual(archivos['ventas_alicuotas'][1][43:47], '0003')
+
+        self.assertEqual(len(archivos['compras_cbte']), 2)
+        self.assertEqual(len(archivos['compras_alicuotas']), 2)
+        reducida = archivos['compras_alicuotas'][1]
+        self.assertEqual(reducida[:28], '001' + '00003' + '125'.zfill(20))
+        self.assertEqual(reducida[50:], '000000000100000' + '0004' + '000000000010500')
+
+    def test_registro_ancho_fijo(self):
+        self.assertEqual(
+            libro_iva_digital.VENTAS_ALICUOTAS.formatear(6, 1, 7, 100, 5, 21),
+            '006' + '00001' + '7'.zfill(20) + '100'.zfill(15) + '0005' + '21'.zfill(15) + '\r\n',
+        )
+        with self.assertRaisesMessage(ValueError, 'punto_venta'):
+            libro_iva_digital.VENTAS_ALICUOTAS.formatear(6, 123456, 7, 100, 5, 21)
+
+
+class PaginacionKeysetTest(APITestCase):
+    """Pruebas de la paginación por (fecha, id) de los listados de movimientos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        hoy = date.today()
+        # Varias filas por fecha para ejercitar el desempate por id
+        for dia in range(4):
+            for _ in range(3):
+                MovimientoFinanciero.objects.create(
+                    fecha=hoy - timedelta(days=dia),
+                    tipo=MovimientoFinanciero.Tipo.INGRESO,
+                    origen=MovimientoFinanciero.Origen.MANUAL,
+                    monto=Decimal('10'),
+                )
+        MovimientoFinanciero.objects.create(
+            fecha=hoy,
+            tipo=MovimientoFinanciero.Tipo.EGRESO,
+            origen=MovimientoFinanciero.Origen.MANUAL,
+            monto=Decimal('99'),
+        )
+        self.esperados = list(
+            MovimientoFinanciero.objects.filter(tipo=MovimientoFinanciero.Tipo.INGRESO)
+            .order_by('-fecha', '-id').values_list('id', flat=True)
+        )
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        url = '/api/finanzas/movimientos/ingresos/?page_size=5'
+        vistos, paginas = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 5)
+            vistos += [fila['id'] for fila in response.data['results']]
+            paginas.append(response.data)
+            url = response.data['next']
+        self.assertEqual(vistos, self.esperados)
+        self.assertEqual(len(paginas), 3)
+        self.assertIsNone(paginas[0]['previous'])
+
+        # Volver desde la última página devuelve la anterior
+        anterior = self.client.get(paginas[2]['previous']).data
+        self.assertEqual([fila['id'] for fila in anterior['results']], self.esperados[5:10])
+        self.assertIsNotNone(anterior['previous'])
+        self.assertIsNotNone(anterior['next'])
+
+    def test_cursor_estable_con_inserciones(self):
+        primera = self.client.get('/api/finanzas/movimientos/ingresos/', {'page_size': 4}).data
+        # Un movimiento nuevo no corre las filas de las páginas siguientes
+        MovimientoFinanciero.objects.create(
+            fecha=date.today(), tipo=MovimientoFinanciero.Tipo.INGRESO, monto=Decimal('1')
+        )
+        segunda = self.client.get(primera['next']).data
+        self.assertEqual([fila['id'] for fila in segunda['results']], self.esperados[4:8])
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/finanzas/movimientos/efectivo-real/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportacionExtractoTest(APITestCase):
+    """Pruebas de la importación de extractos bancarios"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cuenta = CuentaBancaria.objects.create(banco="Banco Test", numero_cuenta="123", titular="Mi Pyme")
+        self.url = '/api/finanzas/extractos-bancarios/importar_extracto/'
+
+    def _importar(self, nombre, contenido, **extra):
+        datos = {
+            'cuenta_bancaria': self.cuenta.id,
+            'archivo': SimpleUploadedFile(nombre, contenido.encode('utf-8')),
+            'fecha_desde': '2025-01-01',
+            'fecha_hasta': '2025-01-31',
+            'saldo_inicial': '0',
+            'saldo_final': '0',
+            **extra,
+        }
+        return self.client.post(self.url, datos, format='multipart')
+
+    def test_csv_y_reimportacion_superpuesta(self):
+        enero = (
+            "fecha,descripcion,debito,credito,saldo\n"
+            "2025-01-02,Transferencia recibida,,1000.00,1000.00\n"
+            "2025-01-03,Comision,15.00,,985.00\n"
+            "2025-01-03,Comision,15.00,,985.00\n"
+            "2025-01-04,Sin importe,,,985.00\n"
+            "no-es-fecha,Pago,10,,975.00\n"
+        )
+        response = self._importar('enero.csv', enero)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['movimientos_procesados'], 3)
+        self.assertEqual(response.data['filas_rechazadas'], 2)
+        self.assertEqual([e['linea'] for e in response.data['errores']], [5, 6])
+        self.assertEqual(MovimientoBancario.objects.filter(descripcion='Comision').count(), 2)
+
+        # El segundo extracto repite los primeros días y agrega uno nuevo
+        superpuesto = (
+            "fecha,descripcion,debito,credito,saldo\n"
+            "2025-01-03,Comision,15.00,,985.00\n"
+            "2025-01-03,Comision,15.00,,985.00\n"
+            "2025-01-10,Deposito,,500.00,1485.00\n"
+        )
+        response = self._importar('superpuesto.csv', superpuesto)
+        self.assertEqual(response.data['movimientos_procesados'], 1)
+        self.assertEqual(response.data['movimientos_duplicados'], 2)
+        self.assertEqual(MovimientoBancario.objects.count(), 4)
+
+    def test_importacion_simultanea_del_mismo_archivo(self):
+        contenido = (
+            "fecha,descripcion,debito,credito,saldo\n"
+            "2025-01-02,Transferencia recibida,,1000.00,1000.00\n"
+            "2025-01-03,Comision,15.00,,985.00\n"
+        )
+        self._importar('primera.csv', contenido)
+        extracto = ExtractoBancario.objects.create(
+            cuenta_bancaria=self.cuenta, archivo_nombre='segunda.csv',
+            fecha_desde=date(2025, 1, 1), fecha_hasta=date(2025, 1, 31),
+            saldo_inicial=Decimal('0'), saldo_final=Decimal('0'),
+        )
+
+        # La otra importación inserta después de que ésta buscó las huellas
+        with mock.patch.object(extractos, '_huellas_existentes', return_value=set()), \
+                mock.patch.object(saldos_cuentas, 'recalcular_dias') as recalcular:
+            resultado = extractos.importar(
+                extracto, SimpleUploadedFile('segunda.csv', contenido.encode('utf-8')), extractos.FORMATOS['generico'],
+            )
+
+        self.assertEqual((resultado['creados'], resultado['duplicados']), (0, 2))
+        self.assertFalse(extracto.movimientos.exists())
+        recalcular.assert_called_once_with(self.cuenta.id, saldos_cuentas.BANCO, [])
+
+    def test_formato_homebanking_en_lotes(self):
+        contenido = "Fecha;Concepto;Importe;Saldo\n" + "".join(
+            f"{dia:02d}/01/2025;Movimiento {dia};-1.234,50;{dia}.000,00\n" for dia in range(1, 8)
+        )
+        archivo = SimpleUploadedFile('extracto.csv', contenido.encode('utf-8'))
+        extracto = ExtractoBancario.objects.create(
+            cuenta_bancaria=self.cuenta, archivo_nombre='extracto.csv',
+            fecha_desde=date(2025, 1, 1), fecha_hasta=date(2025, 1, 31),
+            saldo_inicial=Decimal('0'), saldo_final=Decimal('0'),
+        )
+        resultado = extractos.importar(extracto, archivo, extractos.FORMATOS['homebanking_ar'], tamano_lote=3)
+        self.assertEqual(resultado['creados'], 7)
+        movimiento = extracto.movimientos.get(fecha=date(2025, 1, 2))
+        self.assertEqual(movimiento.debito, Decimal('1234.50'))
+        self.assertIsNone(movimiento.credito)
+        self.assertEqual(movimiento.saldo, Decimal('2000.00'))
+
+    def test_columnas_faltantes(self):
+        response = self._importar('malo.csv', "dia,importe\n2025-01-01,10\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fecha', response.data['error'])
+        self.assertFalse(ExtractoBancario.objects.exists())
+
+        response = self._importar('x.csv', "fecha\n", formato='inexistente')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConciliacionAutomaticaTest(APITestCase):
+    """Pruebas de la conciliación automática de extractos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        cuenta = CuentaBancaria.objects.create(banco="Banco Test", numero_cuenta="123", titular="Mi Pyme")
+        self.extracto = ExtractoBancario.objects.create(
+            cuenta_bancaria=cuenta, archivo_nombre='enero.csv',
+            fecha_desde=date(2025, 1, 1), fecha_hasta=date(2025, 1, 31),
+            saldo_inicial=Decimal('0'), saldo_final=Decimal('0'),
+        )
+
+    def _linea(self, dia, descripcion, debito=None, credito=None):
+        return MovimientoBancario.objects.create(
+            extracto=self.extracto, fecha=date(2025, 1, dia), descripcion=descripcion,
+            debito=debito, credito=credito, saldo=Decimal('0'),
+        )
+
+    def _movimiento(self, dia, tipo, monto, descripcion):
+        return MovimientoFinanciero.objects.create(
+            fecha=date(2025, 1, dia), tipo=tipo, monto=Decimal(monto), descripcion=descripcion,
+        )
+
+    def test_asignacion_uno_a_uno_y_ambiguos(self):
+        ingreso, egreso = MovimientoFinanciero.Tipo.INGRESO, MovimientoFinanciero.Tipo.EGRESO
+        cobro = self._linea(10, "Transferencia Perez", credito=Decimal('1000'))
+        cobro_cercano = self._movimiento(11, ingreso, '1000', "Cobro Perez")
+        self._movimiento(13, ingreso, '1000', "Cobro Perez")
+
+        luz = self._linea(10, "Pago luz", debito=Decimal('500'))
+        pago_luz = self._movimiento(10, egreso, '500', "Pago luz Edesur")
+        self._movimiento(10, egreso, '500', "Compra insumos")
+        # Mismo monto pero otro tipo: no es candidato
+        self._movimiento(10, ingreso, '500', "Pago luz")
+
+        comision_1 = self._linea(15, "Comision", debito=Decimal('200'))
+        comision_2 = self._linea(15, "Comision", debito=Decimal('200'))
+        disputado = self._movimiento(15, egreso, '200', "Comision bancaria")
+        # Una línea peor no se queda con el candidato en revisión
+        self._linea(17, "Comision", debito=Decimal('200'))
+
+        ya_conciliado = self._movimiento(20, ingreso, '300', "Cobro")
+        MovimientoBancario.objects.filter(pk=self._linea(20, "Otro", credito=Decimal('300')).pk).update(
+            movimiento_financiero=ya_conciliado, conciliado=True
+        )
+        self._linea(20, "Cobro", credito=Decimal('300'))
+
+        response = self.client.post(f'/api/finanzas/extractos-bancarios/{self.extracto.id}/conciliar_automatico/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['movimientos_conciliados'], 2)
+        self.assertEqual(response.data['total_movimientos'], 6)
+
+        cobro.refresh_from_db()
+        luz.refresh_from_db()
+        self.assertEqual(cobro.movimiento_financiero, cobro_cercano)
+        self.assertEqual(luz.movimiento_financiero, pago_luz)
+        self.assertEqual(luz.observaciones, conciliacion.OBSERVACION)
+
+        ambiguos = {a['movimiento_bancario']: a['candidatos'] for a in response.data['ambiguos']}
+        self.assertEqual(ambiguos, {comision_1.id: [disputado.id], comision_2.id: [disputado.id]})
+        self.assertFalse(MovimientoBancario.objects.filter(movimiento_financiero=disputado).exists())
+
+    def test_similitud(self):
+        self.assertEqual(conciliacion.similitud("Pago LUZ", "pago luz"), 1.0)
+        self.assertEqual(conciliacion.similitud("", "pago"), 0.0)
+
+
+class SaldosCuentasTest(APITestCase):
+    """Pruebas de los saldos diarios por cuenta bancaria"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cuenta = CuentaBancaria.objects.create(
+            banco="Banco Test", numero_cuenta="123", titular="Mi Pyme", saldo_inicial=Decimal('1000')
+        )
+
+    def _movimiento(self, dia, tipo, monto, **extra):
+        return MovimientoFinanciero.objects.create(
+            fecha=date(2025, 1, dia), tipo=tipo, monto=Decimal(monto), cuenta_bancaria=self.cuenta, **extra
+        )
+
+    def test_saldos_incrementales_y_a_fecha(self):
+        ingreso, egreso = MovimientoFinanciero.Tipo.INGRESO, MovimientoFinanciero.Tipo.EGRESO
+        self._movimiento(5, ingreso, '500', estado=MovimientoFinanciero.Estado.COBRADO)
+        gasto = self._movimiento(10, egreso, '200')
+        self._movimiento(12, egreso, '300', estado=MovimientoFinanciero.Estado.PENDIENTE)
+        # Sin cuenta: no afecta
+        MovimientoFinanciero.objects.create(fecha=date(2025, 1, 6), tipo=ingreso, monto=Decimal('999'))
+
+        self.assertEqual(saldos_cuentas.saldo_al(self.cuenta, date(2025, 1, 4)), Decimal('1000'))
+        self.assertEqual(saldos_cuentas.saldo_al(self.cuenta, date(2025, 1, 9)), Decimal('1500'))
+        self.assertEqual(saldos_cuentas.saldo_al(self.cuenta, date(2025, 1, 31)), Decimal('1300'))
+
+        # Cambiar un movimiento viejo traslada la diferencia a los días siguientes
+        MovimientoFinanciero.objects.filter(fecha=date(2025, 1, 5)).first().delete()
+        gasto.fecha = date(2025, 1, 3)
+        gasto.save()
+        self.assertEqual(saldos_cuentas.saldo_al(self.cuenta, date(2025, 1, 31)), Decimal('800'))
+        self.assertEqual(saldos_cuentas.verificar(), [])
+        self.cuenta.refresh_from_db()
+        self.assertEqual(self.cuenta.saldo_actual, Decimal('800'))
+
+        with self.assertNumQueries(1):
+            saldos_cuentas.saldo_al(self.cuenta, date(2025, 1, 20))
+
+    def test_conciliacion_y_endpoint_de_saldos(self):
+        self._movimiento(5, MovimientoFinanciero.Tipo.INGRESO, '500')
+        extracto = ExtractoBancario.objects.create(
+            cuenta_bancaria=self.cuenta, archivo_nombre='enero.csv',
+            fecha_desde=date(2025, 1, 1), fecha_hasta=date(2025, 1, 31),
+            saldo_inicial=Decimal('0'), saldo_final=Decimal('0'),
+        )
+        MovimientoBancario.objects.create(
+            extracto=extracto, fecha=date(2025, 1, 6), descripcion="Deposito",
+            credito=Decimal('450'), saldo=Decimal('1450'),
+        )
+
+        response = self.client.post('/api/finanzas/conciliaciones-bancarias/generar_conciliacion/', {
+            'cuenta_bancaria_id': self.cuenta.id, 'fecha_conciliacion': '2025-01-31', 'saldo_banco': '1450',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['conciliacion']['saldo_libro']), Decimal('1500'))
+
+        response = self.client.get(
+            f'/api/finanzas/cuentas-bancarias/{self.cuenta.id}/saldos/',
+            {'fecha_desde': '2025-01-01', 'fecha_hasta': '2025-01-31'}
+        )
+        self.assertEqual(response.data['libro']['saldo_apertura'], '1000.00')
+        self.assertEqual(response.data['libro']['saldo_cierre'], '1500.00')
+        self.assertEqual(response.data['banco']['saldo_cierre'], '1450.00')
+        self.assertEqual(len(response.data['banco']['dias']), 1)
+
+    def test_ajuste_manual_y_comando(self):
+        self._movimiento(5, MovimientoFinanciero.Tipo.INGRESO, '500')
+        response = self.client.post(
+            f'/api/finanzas/cuentas-bancarias/{self.cuenta.id}/actualizar_saldo/', {'saldo': '2000'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.cuenta.refresh_from_db()
+        self.assertEqual(self.cuenta.saldo_inicial, Decimal('1500'))
+
+        SaldoDiarioCuenta.objects.update(saldo=Decimal('1'))
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_saldos_cuentas', '--verificar', stdout=StringIO())
+        call_command('reconstruir_saldos_cuentas', stdout=StringIO())
+        self.assertEqual(saldos_cuentas.saldo_al(self.cuenta, date(2025, 1, 31)), Decimal('2000'))
+
+
+def _certificado_prueba(directorio):
+    """Certificado autofirmado y clave para firmar el TRA contra el stub."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "mi-pyme-test")])
+    ahora = dt.datetime.now(dt.timezone.utc)
+    certificado = (
+        x509.CertificateBuilder().subject_name(nombre).issuer_name(nombre)
+        .public_key(clave.public_key()).serial_number(1)
+        .not_valid_before(ahora).not_valid_after(ahora + timedelta(days=1))
+        .sign(clave, hashes.SHA256())
+    )
+    ruta_certificado = os.path.join(directorio, "afip.crt")
+    ruta_clave = os.path.join(directorio, "afip.key")
+    with open(ruta_certificado, "wb") as archivo:
+        archivo.write(certificado.public_bytes(serialization.Encoding.PEM))
+    with open(ruta_clave, "wb") as archivo:
+        archivo.write(clave.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return ruta_certificado, ruta_clave
+
+
+class AutorizacionAFIPTest(APITestCase):
+    """Pruebas de la autorización por lotes contra el stub local de AFIP"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directorio = tempfile.TemporaryDirectory()
+        cls.certificado, cls.clave = _certificado_prueba(cls.directorio.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directorio.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.stub = ServidorAFIPStub().iniciar()
+        self.addCleanup(self.stub.detener)
+        self.addCleanup(afip_soap.cerrar_conexiones)
+        configuracion = override_settings(AFIP_WSAA_URL=self.stub.url_wsaa, AFIP_WSFE_URL=self.stub.url_wsfe)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        espera = mock.patch.object(afip_soap, 'ESPERA_BASE', 0)
+        espera.start()
+        self.addCleanup(espera.stop)
+
+        self.configuracion = ConfiguracionAFIP.objects.create(
+            cuit='20123456789', razon_social='Mi Pyme', certificado_path=self.certificado,
+            clave_privada_path=self.clave, punto_venta=3,
+        )
+
+    def _factura(self, documento='30111222', tipo=FacturaElectronica.TipoComprobante.FACTURA_B):
+        return FacturaElectronica.objects.create(
+            configuracion_afip=self.configuracion, tipo_comprobante=tipo, punto_venta=3,
+            cliente_numero_documento=documento, cliente_razon_social='Cliente',
+            importe_total=Decimal('121'), importe_neto=Decimal('100'), importe_iva=Decimal('21'),
+        )
+
+    def test_lote_agrupado_en_solicitudes_con_una_conexion(self):
+        facturas_b = [self._factura() for _ in range(5)]
+        facturas_a = [
+            self._factura('30712345678', FacturaElectronica.TipoComprobante.FACTURA_A) for _ in range(2)
+        ]
+
+        with mock.patch.object(wsfe, 'MAX_POR_SOLICITUD', 2):
+            response = self.client.post('/api/finanzas/facturas-electronicas/autorizar_lote/', {
+                'facturas_ids': [f.id for f in facturas_b + facturas_a],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['facturas_autorizadas'], 7)
+        self.assertEqual(self.stub.solicitudes, [2, 2, 1, 2])
+        self.assertEqual(self.stub.logins, 1)
+        self.assertEqual(len(self.stub.conexiones), 1)
+
+        numeros = list(
+            FacturaElectronica.objects.filter(tipo_comprobante='6').order_by('id')
+            .values_list('numero_comprobante', 'estado')
+        )
+        self.assertEqual(numeros, [(n, FacturaElectronica.Estado.APROBADO) for n in range(1, 6)])
+        self.assertEqual(
+            FacturaElectronica.objects.filter(tipo_comprobante='1', cae__isnull=False).count(), 2
+        )
+        self.assertEqual(LogAFIP.objects.filter(resultado='OK').count(), 7)
+
+    def test_rechazo_parcial_renumera_las_siguientes(self):
+        self.stub.documentos_rechazados.add('99999999')
+        facturas = [self._factura(), self._factura('99999999'), self._factura(), self._factura()]
+
+        resultados = wsfe.autorizar(facturas)
+
+        self.assertEqual(
+            [r['estado'] for r in resultados], ['AUTORIZADA', 'RECHAZADA', 'AUTORIZADA', 'AUTORIZADA']
+        )
+        # La segunda solicitud reenvía sólo las rechazadas por numeración
+        self.assertEqual(self.stub.solicitudes, [4, 2])
+        rechazada = FacturaElectronica.objects.get(pk=facturas[1].pk)
+        self.assertEqual(rechazada.estado, FacturaElectronica.Estado.RECHAZADO)
+        self.assertIsNone(rechazada.numero_comprobante)
+        self.assertIn('10015', rechazada.observaciones_afip)
+        self.assertEqual(
+            sorted(FacturaElectronica.objects.exclude(pk=rechazada.pk).values_list('numero_comprobante', flat=True)),
+            [1, 2, 3],
+        )
+
+    def test_reintentos_y_recuperacion_sin_duplicar(self):
+        # Dos 503 seguidos se reintentan
+        self.stub.fallas = 2
+        factura = self._factura()
+        resultado, = wsfe.autorizar([factura])
+        self.assertEqual(resultado['estado'], 'AUTORIZADA')
+
+        # Autorizada por AFIP pero sin respuesta guardada: se recupera el CAE
+        cae = FacturaElectronica.objects.get(pk=factura.pk).cae
+        FacturaElectronica.objects.filter(pk=factura.pk).update(
+            estado=FacturaElectronica.Estado.ENVIADO, cae=None
+        )
+        solicitudes = len(self.stub.solicitudes)
+        resultado, = wsfe.autorizar([FacturaElectronica.objects.get(pk=factura.pk)])
+        self.assertEqual(resultado['estado'], 'AUTORIZADA')
+        self.assertEqual(resultado['cae'], cae)
+        self.assertEqual(len(self.stub.solicitudes), solicitudes)
+
+        # AFIP caído: queda ENVIADO con su número y se reintenta después
+        otra = self._factura()
+        self.stub.fallas = afip_soap.MAX_REINTENTOS + 1
+        self.stub.operacion_con_fallas = 'FECAESolicitar'
+        resultado, = wsfe.autorizar([otra])
+        self.assertEqual(resultado['estado'], 'ERROR')
+        otra.refresh_from_db()
+        self.assertEqual((otra.estado, otra.numero_comprobante), (FacturaElectronica.Estado.ENVIADO, 2))
+
+        response = self.client.post(f'/api/finanzas/facturas-electronicas/{otra.id}/autorizar_individual/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['factura']['numero_comprobante'], 2)
+        self.assertEqual(len(self.stub.comprobantes), 2)
+
+    def test_autorizar_individual_rechazada(self):
+        self.stub.documentos_rechazados.add('99999999')
+        factura = self._factura('99999999')
+        response = self.client.post(f'/api/finanzas/facturas-electronicas/{factura.id}/autorizar_individual/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(LogAFIP.objects.get(factura=factura).accion, 'Autorización Individual')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_ticket_compartido_con_un_solo_login(self):
+        cache.clear()
+        self.stub.latencia = 0.2
+        tokens = []
+        hilos = [
+            threading.Thread(target=lambda: tokens.append(wsaa.obtener_ticket(self.configuracion).token))
+            for _ in range(5)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(tokens, ['token-1'] * 5)
+
+        self.stub.latencia = 0
+        wsfe.autorizar([self._factura()])
+        wsfe.autorizar([self._factura()])
+        self.assertEqual(self.stub.logins, 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_renovacion_anticipada_y_ticket_rechazado(self):
+        cache.clear()
+        por_vencer = wsaa.Ticket('viejo', 'sign', timezone.now() + timedelta(minutes=5))
+        cache.set(wsaa._clave(self.configuracion, wsaa.SERVICIO_WSFE), por_vencer.como_dict())
+        self.assertEqual(wsaa.obtener_ticket(self.configuracion).token, 'token-1')
+
+        # AFIP deja de aceptar el ticket guardado: se pide otro y se reintenta
+        self.stub.tokens.clear()
+        resultado, = wsfe.autorizar([self._factura()])
+        self.assertEqual(resultado['estado'], 'AUTORIZADA')
+        self.assertEqual(self.stub.logins, 2)
+
+    def test_conexion(self):
+        url = f'/api/finanzas/configuraciones-afip/{self.configuracion.id}/test_conexion/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['servidores']['app_server'], 'OK')
+
+        ConfiguracionAFIP.objects.filter(pk=self.configuracion.pk).update(certificado_path='/no/existe.crt')
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+
+
+class FacturasPDFTest(APITestCase):
+    """Pruebas del PDF de las facturas electrónicas"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        configuracion = override_settings(FACTURAS_PDF_DIR=self.directorio.name, FACTURAS_PDF_PROCESOS=2)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.addCleanup(facturas_pdf.cerrar_pool)
+
+        self.configuracion = ConfiguracionAFIP.objects.create(
+            cuit='20123456789', razon_social='Mi Pyme', certificado_path='cert.pem',
+            clave_privada_path='clave.key', punto_venta=3,
+        )
+
+    def _factura(self, numero, cae='71234567890123'):
+        factura = FacturaElectronica.objects.create(
+            configuracion_afip=self.configuracion, tipo_comprobante=FacturaElectronica.TipoComprobante.FACTURA_B,
+            punto_venta=3, numero_comprobante=numero, fecha_emision=dt.date(2024, 5, 10),
+            cliente_numero_documento='30111222', cliente_razon_social='Cliente (Ñandú)',
+            importe_total=Decimal('121'), importe_neto=Decimal('100'), importe_iva=Decimal('21'),
+            cae=cae, fecha_vencimiento_cae=dt.date(2024, 5, 20) if cae else None,
+            estado=FacturaElectronica.Estado.APROBADO if cae else FacturaElectronica.Estado.BORRADOR,
+        )
+        DetalleFacturaElectronica.objects.create(
+            factura=factura, descripcion='Servicio', cantidad=Decimal('2'), precio_unitario=Decimal('50'),
+            importe_neto=Decimal('100'), importe_iva=Decimal('21'), importe_total=Decimal('121'),
+        )
+        return factura
+
+    def test_codigos_qr_y_barras(self):
+        modulos = codigos_barras.qr('https://www.afip.gob.ar/fe/qr/?p=' + 'A' * 200)
+        self.assertEqual(len(modulos), len(modulos[0]))
+        self.assertEqual((len(modulos) - 17) % 4, 0)
+        # Patrón de posición arriba a la izquierda
+        self.assertEqual(modulos[0][:8], [True] * 7 + [False])
+
+        self.assertEqual(codigos_barras.digito_verificador('01234567890'), '5')
+        anchos = codigos_barras.interleaved_2_of_5('1234')
+        self.assertEqual(anchos[:4], [1, 1, 1, 1])
+        self.assertEqual(anchos[-3:], [3, 1, 1])
+        self.assertEqual(len(anchos), 4 + 2 * 10 + 3)
+
+    def test_pdf_reutilizado_si_no_cambia(self):
+        factura = self._factura(1)
+
+        response = self.client.get(f'/api/finanzas/facturas-electronicas/{factura.id}/generar_pdf/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['reutilizado'])
+
+        response = self.client.get(f'/api/finanzas/facturas-electronicas/{factura.id}/pdf/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        contenido = b''.join(response.streaming_content)
+        self.assertTrue(contenido.startswith(b'%PDF-1.4'))
+        self.assertTrue(contenido.rstrip().endswith(b'%%EOF'))
+
+        ruta, reutilizado = facturas_pdf.generar(factura)
+        self.assertTrue(reutilizado)
+
+        FacturaElectronica.objects.filter(pk=factura.pk).update(cliente_razon_social='Otro cliente')
+        factura.refresh_from_db()
+        otra_ruta, reutilizado = facturas_pdf.generar(factura)
+        self.assertFalse(reutilizado)
+        self.assertNotEqual(ruta, otra_ruta)
+
+    def test_datos_impresos(self):
+        datos = facturas_pdf.datos_factura(self._factura(7))
+
+        self.assertEqual(datos['letra'], 'B')
+        self.assertEqual(
+            facturas_pdf.numero_codigo_barras(datos)[:-1],
+            '20123456789' '06' '0003' '71234567890123' '20240520'
+        )
+        contenido = json.loads(base64.b64decode(facturas_pdf.texto_qr(datos).split('?p=')[1]))
+        self.assertEqual(contenido['nroCmp'], 7)
+        self.assertEqual(contenido['codAut'], 71234567890123)
+        self.assertEqual(contenido['tipoDocRec'], 96)
+
+    def test_lote_en_procesos(self):
+        facturas = [self._factura(numero) for numero in range(1, 4)]
+        self._factura(None, cae=None)
+        facturas_pdf.generar(facturas[0])
+
+        with mock.patch.object(facturas_pdf, 'MINIMO_PARA_POOL', 1):
+            response = self.client.post('/api/finanzas/facturas-electronicas/generar_pdfs_lote/', {
+                'facturas_ids': [f.id for f in facturas],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['generados'], 2)
+        self.assertEqual(response.data['reutilizados'], 1)
+        self.assertEqual([r['factura_id'] for r in response.data['resultados']], [f.id for f in facturas])
+        for factura in facturas:
+            ruta, reutilizado = facturas_pdf.generar(factura)
+            self.assertTrue(reutilizado)
+            with open(ruta, 'rb') as archivo:
+                self.assertTrue(archivo.read().startswith(b'%PDF'))
+
+    def test_lote_rechaza_no_autorizadas(self):
+        borrador = self._factura(None, cae=None)
+
+        response = self.client.post('/api/finanzas/facturas-electronicas/generar_pdfs_lote/', {
+            'facturas_ids': [borrador.id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NumeracionComprobantesTest(APITransactionTestCase):
+    """Pruebas de la numeración de comprobantes (con transacciones reales, para los hilos)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.configuracion = ConfiguracionAFIP.objects.create(
+            cuit='20123456789', razon_social='Mi Pyme', certificado_path='cert.pem',
+            clave_privada_path='clave.key', punto_venta=3,
+        )
+
+    def _factura(self, numero=None, estado=FacturaElectronica.Estado.BORRADOR, punto_venta=3):
+        return FacturaElectronica.objects.create(
+            configuracion_afip=self.configuracion, tipo_comprobante=FacturaElectronica.TipoComprobante.FACTURA_B,
+            punto_venta=punto_venta, numero_comprobante=numero, estado=estado,
+            cliente_numero_documento='30111222', cliente_razon_social='Cliente',
+            importe_total=Decimal('121'), importe_neto=Decimal('100'), importe_iva=Decimal('21'),
+        )
+
+    def test_reservas_concurrentes_sin_duplicados(self):
+        numeros, errores = [], []
+
+        def reservar(cantidad):
+            try:
+                for _ in range(25):
+                    while True:
+                        try:
+                            numeros.extend(numeracion.reservar(self.configuracion, 3, '6', cantidad))
+                            break
+                        except OperationalError as e:
+                            # SQLite en memoria no espera el lock: avisa que está tomado
+                            if 'locked' not in str(e):
+                                raise
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=reservar, args=(1 + i % 3,)) for i in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        total = 25 * sum(1 + i % 3 for i in range(8))
+        self.assertEqual(sorted(numeros), list(range(1, total + 1)))
+        self.assertEqual(SecuenciaComprobante.objects.get().ultimo_numero, total)
+
+    def test_numerar_continua_desde_afip_salteando_envios_en_curso(self):
+        numeracion.reservar(self.configuracion, 3, '6', 10)
+        self._factura(5, FacturaElectronica.Estado.APROBADO)
+        self._factura(6, FacturaElectronica.Estado.ENVIADO)
+        facturas = [self._factura() for _ in range(3)]
+
+        # Números 7 a 10 reservados sin usar: AFIP espera el 7
+        numeros = numeracion.numerar(facturas, ultimo_autorizado=5)
+
+        self.assertEqual(list(numeros), [7, 8, 9])
+        self.assertEqual(
+            list(FacturaElectronica.objects.filter(pk__in=[f.pk for f in facturas])
+                 .values_list('numero_comprobante', 'estado').order_by('numero_comprobante')),
+            [(numero, FacturaElectronica.Estado.ENVIADO) for numero in (7, 8, 9)]
+        )
+        self.assertEqual(SecuenciaComprobante.objects.get().ultimo_numero, 9)
+
+    def test_huecos_numeracion(self):
+        for numero in (1, 2, 5, 6, 9):
+            self._factura(numero, FacturaElectronica.Estado.APROBADO)
+        self._factura(1, FacturaElectronica.Estado.APROBADO, punto_venta=4)
+        self._factura(3, FacturaElectronica.Estado.APROBADO, punto_venta=4)
+
+        response = self.client.get('/api/finanzas/facturas-electronicas/huecos_numeracion/', {'punto_venta': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comprobantes_faltantes'], 4)
+        self.assertEqual(
+            [(hueco['desde'], hueco['hasta']) for hueco in response.data['huecos']],
+            [(3, 4), (7, 8)]
+        )
+        self.assertEqual(len(numeracion.huecos()), 3)
+
+
+class LogsAFIPTest(APITestCase):
+    """Pruebas del archivo de LogAFIP por mes y de los listados sin logs"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        configuracion = ConfiguracionAFIP.objects.create(
+            cuit='20123456789', razon_social='Mi Pyme', certificado_path='cert.pem',
+            clave_privada_path='clave.key', punto_venta=3,
+        )
+        self.factura = FacturaElectronica.objects.create(
+            configuracion_afip=configuracion, tipo_comprobante=FacturaElectronica.TipoComprobante.FACTURA_B,
+            punto_venta=3, cliente_numero_documento='30111222', cliente_razon_social='Cliente',
+            importe_total=Decimal('121'), importe_neto=Decimal('100'), importe_iva=Decimal('21'),
+        )
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def _log(self, fecha_hora, resultado='ERROR'):
+        log = LogAFIP.objects.create(
+            factura=self.factura, accion='Autorización', resultado=resultado,
+            request_xml='<soap/>', mensaje='Ñandú',
+        )
+        # fecha_hora es auto_now_add
+        LogAFIP.objects.filter(pk=log.pk).update(fecha_hora=fecha_hora)
+        return log
+
+    def test_listado_con_cantidad_y_ultimo_resultado(self):
+        ahora = timezone.now()
+        self._log(ahora - timedelta(hours=2), 'ERROR')
+        self._log(ahora - timedelta(hours=1), 'OK')
+        self._log(ahora - timedelta(hours=3), 'ERROR')
+
+        response = self.client.get('/api/finanzas/facturas-electronicas/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        factura, = response.data['results']
+        self.assertNotIn('logs', factura)
+        self.assertEqual(factura['cantidad_logs'], 3)
+        self.assertEqual(factura['ultimo_resultado_afip'], 'OK')
+
+        response = self.client.get(f'/api/finanzas/facturas-electronicas/{self.factura.id}/')
+        self.assertEqual(len(response.data['logs']), 3)
+
+    def test_archivar_meses_viejos(self):
+        self._log(timezone.make_aware(dt.datetime(2025, 1, 15, 10)))
+        self._log(timezone.make_aware(dt.datetime(2025, 1, 31, 23, 30)))
+        self._log(timezone.make_aware(dt.datetime(2025, 2, 1, 0, 30)))
+        reciente = self._log(timezone.now())
+
+        salida = StringIO()
+        call_command('archivar_logs_afip', meses=3, directorio=self.directorio.name, stdout=salida)
+
+        self.assertEqual(list(LogAFIP.objects.values_list('id', flat=True)), [reciente.id])
+        enero = os.path.join(self.directorio.name, 'logafip-2025-01.jsonl.gz')
+        logs = list(logs_afip.leer_archivo(enero))
+        self.assertEqual(len(logs), 2)
+        self.assertEqual(logs[0]['mensaje'], 'Ñandú')
+        self.assertEqual(logs[0]['request_xml'], '<soap/>')
+        self.assertEqual(len(list(logs_afip.leer_archivo(
+            os.path.join(self.directorio.name, 'logafip-2025-02.jsonl.gz')
+        ))), 1)
+
+        # Un log que llega tarde a un mes ya archivado va a otro archivo
+        self._log(timezone.make_aware(dt.datetime(2025, 1, 20)))
+        call_command('archivar_logs_afip', meses=3, directorio=self.directorio.name, stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(self.directorio.name, 'logafip-2025-01-2.jsonl.gz')))
+
+    def test_simular_no_borra(self):
+        self._log(timezone.make_aware(dt.datetime(2025, 1, 15, 10)))
+
+        salida = StringIO()
+        call_command('archivar_logs_afip', meses=1, directorio=self.directorio.name, simular=True, stdout=salida)
+
+        self.assertEqual(LogAFIP.objects.count(), 1)
+        self.assertEqual(os.listdir(self.directorio.name), [])
+        self.assertIn('2025-01: 1 logs', salida.getvalue())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'El particionado de LogAFIP es sólo de PostgreSQL')
+class LogsAFIPParticionadoTest(APITransactionTestCase):
+    """Pruebas de la migración 0023 en PostgreSQL: tabla particionada por mes, ida y vuelta"""
+
+    anterior = ('finanzas_reportes', '0022_secuencias_comprobantes')
+
+    def setUp(self):
+        configuracion = ConfiguracionAFIP.objects.create(
+            cuit='20123456789', razon_social='Mi Pyme', certificado_path='cert.pem',
+            clave_privada_path='clave.key', punto_venta=3,
+        )
+        self.factura = FacturaElectronica.objects.create(
+            configuracion_afip=configuracion, tipo_comprobante=FacturaElectronica.TipoComprobante.FACTURA_B,
+            punto_venta=3, cliente_numero_documento='30111222', cliente_razon_social='Cliente',
+            importe_total=Decimal('121'), importe_neto=Decimal('100'), importe_iva=Decimal('21'),
+        )
+        self.addCleanup(self._migrar_al_final)
+
+    def _migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.migrate(destino)
+
+    def _migrar_al_final(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def _log(self, fecha_hora):
+        log = LogAFIP.objects.create(factura=self.factura, accion='Autorización', resultado='OK')
+        LogAFIP.objects.filter(pk=log.pk).update(fecha_hora=fecha_hora)
+        return log.pk
+
+    def _tabla(self):
+        """(relkind de la tabla, particiones, índices, FK) de LogAFIP"""
+        tabla = logs_afip.TABLA
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", [tabla])
+            tipo, = cursor.fetchone()
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+                [tabla],
+            )
+            particiones = [nombre for nombre, in cursor.fetchall()]
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [tabla])
+            indices = {nombre for nombre, in cursor.fetchall()}
+            cursor.execute(
+                "SELECT count(*) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [tabla],
+            )
+            claves, = cursor.fetchone()
+        return tipo, particiones, indices, claves
+
+    def test_migracion_en_los_dos_sentidos(self):
+        tabla = logs_afip.TABLA
+        enero = timezone.make_aware(dt.datetime(2025, 1, 31, 23, 30))
+        ids = [self._log(enero), self._log(timezone.now())]
+
+        tipo, particiones, indices, claves = self._tabla()
+        self.assertEqual(tipo, 'p')
+        self.assertIn(f'{tabla}_default', particiones)
+        self.assertIn(logs_afip.nombre_particion(2025, 1), particiones)
+        hoy = timezone.localdate()
+        self.assertIn(logs_afip.nombre_particion(hoy.year, hoy.month), particiones)
+        self.assertTrue({'logafip_fecha_hora_idx', 'logafip_factura_fecha_idx'} <= indices)
+        self.assertEqual(claves, 1)
+
+        # Hacia atrás: tabla simple con los mismos datos, índices, FK e ids siguientes
+        self._migrar([self.anterior])
+        tipo, particiones, indices, claves = self._tabla()
+        self.assertEqual((tipo, particiones, claves), ('r', [], 1))
+        self.assertIn(f'{tabla}_pkey', indices)
+        self.assertEqual(sorted(LogAFIP.objects.values_list('id', flat=True)), ids)
+        self.assertEqual(LogAFIP.objects.get(pk=ids[0]).fecha_hora, enero)
+        ids.append(self._log(timezone.now()))
+        self.assertGreater(ids[-1], ids[1])
+
+        # Y de nuevo hacia adelante, con los logs en su partición
+        self._migrar_al_final()
+        tipo, particiones, indices, claves = self._tabla()
+        self.assertEqual((tipo, claves), ('p', 1))
+        self.assertTrue({'logafip_fecha_hora_idx', 'logafip_factura_fecha_idx'} <= indices)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {logs_afip.nombre_particion(2025, 1)}")
+            self.assertEqual(cursor.fetchall(), [(ids[0],)])
+            cursor.execute(f"SELECT count(*) FROM {tabla}_default")
+            self.assertEqual(cursor.fetchone(), (0,))
+        ids.append(self._log(timezone.now()))
+        self.assertGreater(ids[-1], ids[2])
+        self.assertEqual(LogAFIP.objects.count(), 4)
+
+        # Con la FK: borrar la factura borra sus logs en todas las particiones
+        self.factura.delete()
+        self.assertFalse(LogAFIP.objects.exists())
+
+
+class PeriodosIVAAcumuladoresTest(APITestCase):
+    """Pruebas de los acumuladores de IVA mantenidos por deltas"""
+
+    def setUp(self):
+        self.periodo = PeriodoIVA.obtener_o_crear_periodo_actual()
+        self.cliente = Cliente.objects.create(nombre_fantasia="Cliente IVA", identificacion="20123456789")
+        self.proveedor = Proveedor.objects.create(nombre="Proveedor IVA", identificacion="30111111111")
+
+    def _venta(self, iva, **kwargs):
+        return Venta.objects.create(
+            cliente=self.cliente, incluye_iva=True,
+            subtotal=iva * 100 / 21, iva_monto=iva, total=iva * 121 / 21, **kwargs
+        )
+
+    def _compra(self, iva, fecha=None):
+        return Compra.objects.create(
+            proveedor=self.proveedor, fecha=fecha or date.today(), incluye_iva=True,
+            subtotal=iva * 100 / 21, iva_monto=iva, total=iva * 121 / 21,
+        )
+
+    def test_alta_modificacion_y_anulacion(self):
+        venta = self._venta(Decimal('21'))
+        self._venta(Decimal('10.50'))
+        compra = self._compra(Decimal('42'))
+
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_debito_fiscal, Decimal('31.50'))
+        self.assertEqual(self.periodo.iva_credito_fiscal, Decimal('42.00'))
+        self.assertEqual(self.periodo.saldo_favor_contribuyente, Decimal('10.50'))
+        self.assertEqual(self.periodo.saldo_favor_fisco, Decimal('0'))
+
+        venta.iva_monto = Decimal('63')
+        venta.save()
+        venta.anulada = True
+        venta.save(update_fields=['anulada'])
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_debito_fiscal, Decimal('10.50'))
+
+        # Una compra que se pasa al mes anterior sale de este período
+        compra.fecha = self.periodo.fecha_desde - timedelta(days=1)
+        compra.save()
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_credito_fiscal, Decimal('0'))
+        self.assertEqual(self.periodo.saldo_favor_fisco, Decimal('10.50'))
+        self.assertEqual(iva_periodos.verificar([self.periodo]), [])
+
+    def test_periodo_cerrado_rechaza_cambios(self):
+        venta = self._venta(Decimal('21'))
+        PeriodoIVA.objects.filter(pk=self.periodo.pk).update(estado=PeriodoIVA.Estado.CERRADO)
+
+        venta.iva_monto = Decimal('42')
+        with self.assertRaises(iva_periodos.PeriodoIVACerrado), transaction.atomic():
+            venta.save()
+        with self.assertRaises(iva_periodos.PeriodoIVACerrado), transaction.atomic():
+            self._compra(Decimal('42'))
+        with self.assertRaises(iva_periodos.PeriodoIVACerrado), transaction.atomic():
+            Venta.objects.get(pk=venta.pk).delete()
+
+        # Lo que no cambia el IVA se puede seguir guardando
+        venta.refresh_from_db()
+        venta.numero = 'A-0002'
+        venta.save()
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_debito_fiscal, Decimal('21.00'))
+
+    def test_lee_la_fila_previa_una_sola_vez(self):
+        venta = self._venta(Decimal('21'))
+        venta.fecha = venta.fecha - timedelta(days=1)
+        venta.iva_monto = Decimal('42')
+        with CaptureQueriesContext(connection) as consultas:
+            venta.save()
+        lecturas = [
+            q['sql'] for q in consultas.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "ventas_venta" WHERE "ventas_venta"."id" =' in q['sql']
+        ]
+        self.assertEqual(len(lecturas), 1)
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_debito_fiscal, Decimal('42.00'))
+
+    def test_verificar_y_corregir(self):
+        venta = self._venta(Decimal('21'))
+        # queryset.update() no dispara señales
+        Venta.objects.filter(pk=venta.pk).update(iva_monto=Decimal('30'))
+
+        salida = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('verificar_periodos_iva', stdout=salida)
+        self.assertIn('iva_debito_fiscal: acumulado=21.00', salida.getvalue())
+        self.assertIn('(desvío -9.00)', salida.getvalue())
+
+        call_command('verificar_periodos_iva', '--corregir', stdout=StringIO())
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_debito_fiscal, Decimal('30.00'))
+        self.assertEqual(self.periodo.saldo_favor_fisco, Decimal('30.00'))
+        call_command('verificar_periodos_iva', stdout=StringIO())
+
+
+class CuentaCorrienteTest(APITestCase):
+    """Pruebas del libro de cuenta corriente de clientes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cliente = Cliente.objects.create(nombre_fantasia="Cliente Cuenta", identificacion="20123456789")
+        self.url = '/api/finanzas/cuenta-corriente/estado-de-cuenta/'
+
+    def _venta(self, precio):
+        from usuarios.services.venta_service import VentaService
+
+        return VentaService.crear_venta(
+            self.user, self.cliente.id,
+            [{'descripcion': 'Servicio', 'cantidad': 1, 'cantidad_kg': Decimal('1'), 'precio_unitario': Decimal(precio)}],
+        )
+
+    def _pago(self, monto):
+        from usuarios.services.pago_service import PagoService
+
+        return PagoService.registrar_pago(self.user, self.cliente.id, Decimal(monto), MedioPago.EFECTIVO)
+
+    def test_servicios_y_anulaciones_agregan_movimientos(self):
+        import usuarios.services.handlers  # noqa: F401 (registra los handlers de undo)
+        from usuarios.services.undo_service import UndoService
+
+        self._venta('100')
+        self._venta('50')
+        self._pago('30')
+
+        # Deshacer el pago y después la última venta agrega las contrapartidas
+        for _ in range(2):
+            resultado = UndoService.undo_last(self.user)
+            self.assertTrue(resultado.success, resultado.error_message)
+
+        movimientos = list(
+            MovimientoCuentaCorriente.objects.filter(cliente=self.cliente)
+            .order_by('id').values_list('tipo', 'debe', 'haber', 'saldo')
+        )
+        self.assertEqual(movimientos, [
+            ('VENTA', Decimal('100.00'), Decimal('0.00'), Decimal('100.00')),
+            ('VENTA', Decimal('50.00'), Decimal('0.00'), Decimal('150.00')),
+            ('PAGO', Decimal('0.00'), Decimal('30.00'), Decimal('120.00')),
+            ('ANULACION_PAGO', Decimal('30.00'), Decimal('0.00'), Decimal('150.00')),
+            ('ANULACION_VENTA', Decimal('0.00'), Decimal('50.00'), Decimal('100.00')),
+        ])
+        self.assertEqual(cuenta_corriente.saldo_al(self.cliente.id), self.cliente.saldo)
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id]), [])
+
+    def test_altas_por_api_sin_sistema_de_undo(self):
+        response = self.client.post('/api/ventas/', {
+            'cliente': self.cliente.id,
+            'lineas': [{'descripcion': 'Servicio', 'cantidad': '1', 'cantidad_kg': '1', 'precio_unitario': '80'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/api/finanzas/pagos/', {
+            'cliente': self.cliente.id, 'monto': '30', 'medio': MedioPago.EFECTIVO, 'fecha': date.today().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        tipos = MovimientoCuentaCorriente.objects.filter(cliente=self.cliente).order_by('id').values_list('tipo', 'saldo')
+        self.assertEqual(list(tipos), [('VENTA', Decimal('80.00')), ('PAGO', Decimal('50.00'))])
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id]), [])
+
+    def test_modificar_y_eliminar_venta_por_api_agrega_ajustes(self):
+        response = self.client.post('/api/ventas/', {
+            'cliente': self.cliente.id,
+            'lineas': [{'descripcion': 'Servicio', 'cantidad': '1', 'cantidad_kg': '1', 'precio_unitario': '80'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = f"/api/ventas/{response.data['id']}/"
+
+        response = self.client.patch(url, {
+            'lineas': [{'descripcion': 'Servicio', 'cantidad': '1', 'cantidad_kg': '1', 'precio_unitario': '200'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id]), [])
+
+        # Sin cambio de total no hay ajuste
+        response = self.client.patch(url, {'observaciones_cobro': 'Llamar el lunes'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        movimientos = list(
+            MovimientoCuentaCorriente.objects.filter(cliente=self.cliente)
+            .order_by('id').values_list('tipo', 'debe', 'haber', 'saldo')
+        )
+        self.assertEqual(movimientos, [
+            ('VENTA', Decimal('80.00'), Decimal('0.00'), Decimal('80.00')),
+            ('AJUSTE_VENTA', Decimal('120.00'), Decimal('0.00'), Decimal('200.00')),
+            ('AJUSTE_VENTA', Decimal('0.00'), Decimal('200.00'), Decimal('0.00')),
+        ])
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id]), [])
+
+    def test_modificar_y_eliminar_pago_por_api_agrega_ajustes(self):
+        otro = Cliente.objects.create(nombre_fantasia="Otro Cliente", identificacion="20987654321")
+        response = self.client.post('/api/finanzas/pagos/', {
+            'cliente': self.cliente.id, 'monto': '30', 'medio': MedioPago.EFECTIVO, 'fecha': date.today().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = f"/api/finanzas/pagos/{response.data['id']}/"
+
+        response = self.client.patch(url, {'monto': '45'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cuenta_corriente.saldo_al(self.cliente.id), Decimal('-45.00'))
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id]), [])
+
+        # Pago cargado al cliente equivocado: vuelve al primero y pasa al otro
+        response = self.client.patch(url, {'cliente': otro.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cuenta_corriente.saldo_al(self.cliente.id), Decimal('0.00'))
+        self.assertEqual(cuenta_corriente.saldo_al(otro.id), Decimal('-45.00'))
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id, otro.id]), [])
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(cuenta_corriente.saldo_al(otro.id), Decimal('0.00'))
+        self.assertEqual(
+            list(MovimientoCuentaCorriente.objects.filter(cliente=otro).values_list('tipo', flat=True)),
+            ['AJUSTE_PAGO', 'AJUSTE_PAGO'],
+        )
+        self.assertEqual(cuenta_corriente.verificar([self.cliente.id, otro.id]), [])
+
+    def test_estado_de_cuenta_por_rango(self):
+        hoy = date.today()
+        # Movimientos de días anteriores (la fecha de registro la fija registrar())
+        for dias, debe, haber in ((20, '100', '0'), (10, '0', '40'), (5, '25', '0')):
+            movimiento = cuenta_corriente.registrar(
+                self.cliente.id, MovimientoCuentaCorriente.Tipo.VENTA, debe=Decimal(debe), haber=Decimal(haber),
+            )
+            MovimientoCuentaCorriente.objects.filter(pk=movimiento.pk).update(fecha=hoy - timedelta(days=dias))
+        self._venta('10')
+
+        response = self.client.get(self.url, {
+            'cliente': self.cliente.id,
+            'fecha_desde': (hoy - timedelta(days=12)).isoformat(),
+            'fecha_hasta': (hoy - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['saldo_anterior']), Decimal('100'))
+        self.assertEqual(Decimal(response.data['saldo_final']), Decimal('85'))
+        self.assertEqual([fila['saldo'] for fila in response.data['results']], ['85.00', '60.00'])
+
+        # Sin rango: todo el libro, paginado por cursor
+        response = self.client.get(self.url, {'cliente': self.cliente.id, 'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['saldo'], '95.00')
+        self.assertEqual(Decimal(response.data['saldo_final']), Decimal('95'))
+        siguiente = self.client.get(response.data['next'])
+        self.assertEqual([fila['saldo'] for fila in siguiente.data['results']], ['100.00'])
+        self.assertIsNone(siguiente.data['next'])
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'cliente': self.cliente.id, 'fecha_desde': '2024-13-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inicializar_clientes_con_historia(self):
+        Venta.objects.create(cliente=self.cliente, subtotal=Decimal('80'), total=Decimal('80'))
+        PagoCliente.objects.create(cliente=self.cliente, monto=Decimal('30'))
+        otro = Cliente.objects.create(nombre_fantasia="Sin movimientos", identificacion="20987654321")
+
+        with self.assertRaises(CommandError):
+            call_command('inicializar_cuenta_corriente', '--verificar', stdout=StringIO())
+
+        call_command('inicializar_cuenta_corriente', stdout=StringIO())
+        inicial = MovimientoCuentaCorriente.objects.get(cliente=self.cliente)
+        self.assertEqual(inicial.tipo, MovimientoCuentaCorriente.Tipo.SALDO_INICIAL)
+        self.assertEqual(inicial.saldo, Decimal('50.00'))
+        self.assertFalse(MovimientoCuentaCorriente.objects.filter(cliente=otro).exists())
+
+        # Los movimientos siguientes parten del saldo inicial; volver a correrlo no duplica
+        self._venta('20')
+        call_command('inicializar_cuenta_corriente', stdout=StringIO())
+        self.assertEqual(cuenta_corriente.saldo_al(self.cliente.id), Decimal('70.00'))
+        self.assertEqual(MovimientoCuentaCorriente.objects.filter(cliente=self.cliente).count(), 2)
@@ -0,0 +1,247 @@
+"""
+Ejecución de reportes pesados en segundo plano.
+
+Los workers de gunicorn son sync con timeout de 120 s: un reporte largo
+ocupa un worker todo ese tiempo. Las acciones decoradas con
+@en_segundo_plano aceptan ?asincrono=1; en ese caso no calculan nada,
+encolan un TrabajoReporte y responden 202 con la URL para consultarlo:
+
+    GET /api/finanzas/trabajos-reportes/<id>/            estado
+    GET /api/finanzas/trabajos-reportes/<id>/resultado/  respuesta original
+
+La cola es la propia tabla (sin broker externo). El worker
+(`python manage.py run_report_worker`) toma trabajos con
+SELECT ... FOR UPDATE SKIP LOCKED en PostgreSQL (en SQLite alcanza el
+UPDATE condicional) y reproduce el request original contra la misma URL,
+autenticado como el usuario que lo pidió: se aplican los mismos permisos,
+filtros y serializadores que en la llamada sincrónica.
+
+La respuesta se guarda comprimida con zlib y vence a las
+REPORTES_RESULTADO_TTL segundos (24 h por defecto).
+
+Encolar sólo tiene sentido si hay un worker: con REPORTES_ASINCRONOS en
+False (el valor por defecto) ?asincrono=1 se ignora y el reporte se
+calcula en el mismo request.
+"""
+
+import functools
+import io
+import json
+import logging
+import zlib
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+PARAMETRO = "asincrono"
+
+# Un trabajo EN_PROCESO más viejo que esto se considera abandonado
+TIMEOUT_TRABAJO = timedelta(minutes=30)
+MAX_INTENTOS = 3
+
+
+def ttl_resultado():
+    return timedelta(seconds=settings.REPORTES_RESULTADO_TTL)
+
+
+def _pide_asincrono(request):
+    if not settings.REPORTES_ASINCRONOS:
+        return False
+    return request.query_params.get(PARAMETRO, "").lower() in ("1", "true", "si")
+
+
+def encolar(request):
+    """Crea un TrabajoReporte que reproduce `request` sin ?asincrono."""
+    from .models import TrabajoReporte
+
+    parametros = {
+        clave: request.query_params.getlist(clave)
+        for clave in request.query_params
+        if clave != PARAMETRO
+    }
+    cuerpo = None
+    if request.method != "GET":
+        cuerpo = json.loads(json.dumps(request.data, cls=JSONEncoder))
+
+    return TrabajoReporte.objects.create(
+        usuario=request.user,
+        metodo=request.method,
+        ruta=request.path,
+        parametros=parametros,
+        cuerpo=cuerpo,
+        host=request.get_host(),
+    )
+
+
+def en_segundo_plano(metodo):
+    """
+    Decorador opt-in para acciones de reporte.
+
+    Con ?asincrono=1 encola el reporte y responde 202; sin el parámetro, o
+    sin worker configurado (REPORTES_ASINCRONOS), la acción se ejecuta
+    normalmente.
+    """
+
+    @functools.wraps(metodo)
+    def envoltura(self, request, *args, **kwargs):
+        if not _pide_asincrono(request):
+            return metodo(self, request, *args, **kwargs)
+        trabajo = encolar(request)
+        return Response(
+            {
+                "trabajo_id": trabajo.id,
+                "estado": trabajo.estado,
+                "url": request.build_absolute_uri(f"/api/finanzas/trabajos-reportes/{trabajo.id}/"),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    return envoltura
+
+
+def tomar_siguiente(trabajador):
+    """
+    Reserva el trabajo pendiente más antiguo para `trabajador`.
+
+    Returns:
+        TrabajoReporte | None
+    """
+    from .models import TrabajoReporte
+
+    with transaction.atomic():
+        trabajo = (
+            TrabajoReporte.objects.select_for_update(skip_locked=True)
+            .filter(estado=TrabajoReporte.Estado.PENDIENTE)
+            .order_by("fecha_creacion", "id")
+            .first()
+        )
+        if trabajo is None:
+            return None
+        # El filtro por estado evita tomar dos veces el mismo trabajo en
+        # bases sin SELECT FOR UPDATE (SQLite)
+        ahora = timezone.now()
+        tomado = TrabajoReporte.objects.filter(
+            pk=trabajo.pk, estado=TrabajoReporte.Estado.PENDIENTE
+        ).update(
+            estado=TrabajoReporte.Estado.EN_PROCESO,
+            trabajador=trabajador,
+            fecha_inicio=ahora,
+            intentos=trabajo.intentos + 1,
+        )
+    if not tomado:
+        return None
+    trabajo.refresh_from_db()
+    return trabajo
+
+
+def _construir_request(trabajo):
+    cuerpo = b""
+    if trabajo.cuerpo is not None:
+        cuerpo = json.dumps(trabajo.cuerpo).encode()
+    host, _, puerto = (trabajo.host or "localhost").partition(":")
+    request = WSGIRequest({
+        "REQUEST_METHOD": trabajo.metodo,
+        "PATH_INFO": trabajo.ruta,
+        "QUERY_STRING": urlencode(trabajo.parametros, doseq=True),
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(cuerpo)),
+        "HTTP_HOST": trabajo.host or "localhost",
+        "HTTP_ACCEPT": "application/json",
+        "SERVER_NAME": host,
+        "SERVER_PORT": puerto or "80",
+        "wsgi.input": io.BytesIO(cuerpo),
+        "wsgi.url_scheme": "https" if getattr(settings, "SECURE_SSL_REDIRECT", False) else "http",
+    })
+    # DRF autentica con este usuario en lugar de leer el token
+    request._force_auth_user = trabajo.usuario
+    request._dont_enforce_csrf_checks = True
+    return request
+
+
+def _contenido(response):
+    if getattr(response, "streaming", False):
+        return b"".join(response.streaming_content)
+    if hasattr(response, "render"):
+        response.render()
+    return response.content
+
+
+def ejecutar(trabajo):
+    """Reproduce el request del trabajo y guarda su respuesta comprimida."""
+    from .models import TrabajoReporte
+
+    try:
+        coincidencia = resolve(trabajo.ruta)
+        response = coincidencia.func(_construir_request(trabajo), *coincidencia.args, **coincidencia.kwargs)
+        contenido = _contenido(response)
+    except Exception as e:
+        logger.exception("Falló el trabajo de reporte %s", trabajo.id)
+        trabajo.estado = TrabajoReporte.Estado.ERROR
+        trabajo.error = str(e)
+        trabajo.fecha_fin = timezone.now()
+        trabajo.expira_en = trabajo.fecha_fin + ttl_resultado()
+        trabajo.save(update_fields=["estado", "error", "fecha_fin", "expira_en"])
+        return trabajo
+
+    trabajo.codigo_respuesta = response.status_code
+    trabajo.tipo_contenido = response.get("Content-Type", "")
+    trabajo.resultado = zlib.compress(contenido)
+    trabajo.tamano_resultado = len(contenido)
+    trabajo.estado = (
+        TrabajoReporte.Estado.COMPLETADO if response.status_code < 400 else TrabajoReporte.Estado.ERROR
+    )
+    trabajo.fecha_fin = timezone.now()
+    trabajo.expira_en = trabajo.fecha_fin + ttl_resultado()
+    trabajo.save(update_fields=[
+        "codigo_respuesta", "tipo_contenido", "resultado", "tamano_resultado",
+        "estado", "fecha_fin", "expira_en",
+    ])
+    return trabajo
+
+
+def resultado(trabajo):
+    """Bytes originales de la respuesta guardada."""
+    if trabajo.resultado is None:
+        return b""
+    return zlib.decompress(bytes(trabajo.resultado))
+
+
+def recuperar_abandonados():
+    """
+    Reencola los trabajos EN_PROCESO que superaron TIMEOUT_TRABAJO (worker
+    caído) y marca con error los que ya agotaron MAX_INTENTOS.
+    """
+    from .models import TrabajoReporte
+
+    limite = timezone.now() - TIMEOUT_TRABAJO
+    abandonados = TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.Estado.EN_PROCESO, fecha_inicio__lt=limite
+    )
+    agotados = abandonados.filter(intentos__gte=MAX_INTENTOS).update(
+        estado=TrabajoReporte.Estado.ERROR,
+        error="El trabajo superó el máximo de intentos",
+        fecha_fin=timezone.now(),
+        expira_en=timezone.now() + ttl_resultado(),
+    )
+    reencolados = abandonados.filter(intentos__lt=MAX_INTENTOS).update(
+        estado=TrabajoReporte.Estado.PENDIENTE, trabajador=""
+    )
+    return reencolados, agotados
+
+
+def purgar_vencidos():
+    """Elimina los trabajos cuyo resultado venció."""
+    from .models import TrabajoReporte
+
+    eliminados, _ = TrabajoReporte.objects.filter(expira_en__lt=timezone.now()).delete()
+    return eliminados
@@ -12,13 +12,16 @@ from .views import (
     FacturaElectronicaViewSet,
     DetalleFacturaElectronicaViewSet,
     LogAFIPViewSet,
+    MovimientoCuentaCorrienteViewSet,
     PeriodoIVAViewSet,
-    PagoIVAViewSet
+    PagoIVAViewSet,
+    TrabajoReporteViewSet,
 )
 
 router = DefaultRouter()
 router.register(r"pagos", PagoClienteViewSet, basename="pago-cliente")
 router.register(r"pagos-proveedores", PagoProveedorViewSet, basename="pago-proveedor")
+router.register(r"cuenta-corriente", MovimientoCuentaCorrienteViewSet, basename="cuenta-corriente")
 router.register(r"movimientos", MovimientoFinancieroViewSet, basename="movimiento-financiero")
 router.register(r"cuentas-bancarias", CuentaBancariaViewSet, basename="cuenta-bancaria")
 router.register(r"extractos-bancarios", ExtractoBancarioViewSet, basename="extracto-bancario")
@@ -30,5 +33,6 @@ router.register(r"detalles-facturas-electronicas", DetalleFacturaElectronicaView
 router.register(r"logs-afip", LogAFIPViewSet, basename="log-afip")
 router.register(r"periodos-iva", PeriodoIVAViewSet, basename="periodo-iva")
 router.register(r"pagos-iva", PagoIVAViewSet, basename="pago-iva")
+router.register(r"trabajos-reportes", TrabajoReporteViewSet, basename="trabajo-reporte")
 
 urlpatterns = router.urls
\ No newline at end of file
@@ -1,6 +1,11 @@
-﻿from datetime import datetime, timedelta
+﻿import hashlib
+from collections import Counter
+from datetime import datetime, timedelta
 from decimal import Decimal
-from django.db.models import Sum, Avg, Count, Min, Max, Q
+from django.db import transaction
+from django.db.models import Sum, Avg, Count, Min, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
@@ -8,12 +13,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from usuarios.mixins import ModulePermissionMixin
-from compras.models import Compra, MateriaPrima
-from productos.models import Producto
-from recursos_humanos.models import Empleado
+from compras.models import Compra
 from ventas.models import Venta, LineaVenta
-from clientes.models import Cliente
 from .models import (
+    Alerta,
+    MovimientoCuentaCorriente,
     MovimientoFinanciero,
     PagoCliente,
     PagoProveedor,
@@ -28,7 +32,31 @@ from .models import (
     MedioPago,
     PeriodoIVA,
     PagoIVA,
+    TrabajoReporte,
 )
+from . import (
+    afip_soap,
+    cache_reportes,
+    conciliacion,
+    cuenta_corriente,
+    exportacion,
+    extractos,
+    facturas_pdf,
+    libro_iva_digital,
+    numeracion,
+    rentabilidad,
+    resumen_diario,
+    saldos_cuentas,
+    segmentacion,
+    series_ventas,
+    trabajos,
+    wsaa,
+    wsfe,
+)
+from .cache_reportes import cachear_reporte
+from .trabajos import en_segundo_plano
+from .metricas import Conteo, Reporte, Suma
+from .paginacion import PaginacionKeyset
 from .serializers import (
     GastoManualSerializer,
     MovimientoFinancieroSerializer,
@@ -42,16 +70,59 @@ from .serializers import (
     ImportarExtractoSerializer,
     ConfiguracionAFIPSerializer,
     FacturaElectronicaSerializer,
+    FacturaElectronicaListSerializer,
     DetalleFacturaElectronicaSerializer,
     LogAFIPSerializer,
+    MovimientoCuentaCorrienteSerializer,
     CrearFacturaElectronicaSerializer,
     AutorizarFacturaSerializer,
+    GenerarPDFsSerializer,
     PeriodoIVASerializer,
     PagoIVASerializer,
     RecalcularIVASerializer,
+    TrabajoReporteSerializer,
+)
+
+
+# Tablas que alimentan el rollup diario (ver resumen_diario.py)
+TABLAS_RESUMEN_DIARIO = (
+    'ventas.Venta',
+    'compras.Compra',
+    'finanzas_reportes.PagoCliente',
+    'finanzas_reportes.MovimientoFinanciero',
 )
 
 
+def _serializar_periodo_ventas(periodo):
+    """Convierte un período de series_ventas.serie() a tipos JSON."""
+    datos = {
+        'inicio': periodo['inicio'].isoformat(),
+        'fin': periodo['fin'].isoformat(),
+        'cerrado': periodo['cerrado'],
+        'total_ventas': float(periodo['total_ventas']),
+        'cantidad_ventas': periodo['cantidad_ventas'],
+        'venta_promedio': float(periodo['venta_promedio']),
+        'top_productos': [
+            {
+                **producto,
+                'total_vendido': float(producto['total_vendido']),
+                'cantidad_vendida': float(producto['cantidad_vendida']),
+            }
+            for producto in periodo['top_productos']
+        ],
+    }
+    if 'anio_anterior' in periodo:
+        anterior = periodo['anio_anterior']
+        datos['anio_anterior'] = {
+            'inicio': anterior['inicio'].isoformat(),
+            'total_ventas': float(anterior['total_ventas']),
+            'cantidad_ventas': anterior['cantidad_ventas'],
+        }
+        variacion = periodo['variacion_interanual']
+        datos['variacion_interanual'] = round(float(variacion), 2) if variacion is not None else None
+    return datos
+
+
 class PagoClienteViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     modulo_requerido = 'finanzas'
     permission_classes = [IsAuthenticated]
@@ -63,6 +134,11 @@ class PagoClienteViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     ordering_fields = ["fecha", "monto", "cliente__nombre"]
     ordering = ["-fecha", "-id"]
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        cuenta_corriente.registrar_ajuste(cuenta_corriente.aporte(instance), instance, eliminado=True)
+        super().perform_destroy(instance)
+
 
 class PagoProveedorViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     modulo_requerido = 'finanzas'
@@ -97,6 +173,13 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     ordering_fields = ["fecha", "monto", "tipo", "origen", "estado", "fecha_vencimiento", "medio_pago"]
     ordering = ["-fecha", "-id"]
 
+    def _listar_por_keyset(self, queryset):
+        """Página acotada de `queryset` ordenada por (fecha, id) con cursor estable"""
+        paginador = PaginacionKeyset()
+        pagina = paginador.paginate_queryset(queryset, self.request, view=self)
+        serializer = self.get_serializer(pagina, many=True)
+        return paginador.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=["get"], url_path="gastos")
     def listar_gastos(self, request):
         origenes = [opcion.value for opcion in MovimientoFinanciero.Origen.gastos_registrables()]
@@ -105,14 +188,12 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 tipo=MovimientoFinanciero.Tipo.EGRESO, origen__in=origenes
             )
         )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._listar_por_keyset(queryset)
 
     @action(detail=False, methods=["get"], url_path="ingresos")
     def listar_ingresos(self, request):
         queryset = self.filter_queryset(self.get_queryset().filter(tipo=MovimientoFinanciero.Tipo.INGRESO))
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._listar_por_keyset(queryset)
 
     @action(detail=False, methods=["get"], url_path="efectivo-real")
     def listar_efectivo_real(self, request):
@@ -122,8 +203,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 estado__in=[MovimientoFinanciero.Estado.PAGADO, MovimientoFinanciero.Estado.COBRADO]
             )
         )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._listar_por_keyset(queryset)
 
     @action(detail=False, methods=["get"], url_path="compromisos-pendientes")
     def listar_compromisos_pendientes(self, request):
@@ -131,8 +211,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         queryset = self.filter_queryset(
             self.get_queryset().filter(estado__in=[MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL])
         )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._listar_por_keyset(queryset)
 
     @action(detail=False, methods=["post"], url_path="registrar-gasto")
     def registrar_gasto(self, request):
@@ -151,8 +230,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 estado__in=[MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL]
             )
         )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._listar_por_keyset(queryset)
 
     @action(detail=False, methods=["get"], url_path="cuentas-por-cobrar")
     def listar_cuentas_por_cobrar(self, request):
@@ -163,8 +241,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 estado__in=[MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL]
             )
         )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._listar_por_keyset(queryset)
 
     @action(detail=False, methods=["post"], url_path="registrar-pago")
     def registrar_pago(self, request):
@@ -231,6 +308,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'], url_path='resumen/pendiente')
+    @cachear_reporte(depende_de=TABLAS_RESUMEN_DIARIO)
     def resumen_pendiente(self, request):
         fecha_desde = request.query_params.get('fecha_desde')
         fecha_hasta = request.query_params.get('fecha_hasta')
@@ -259,40 +337,23 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        ventas_qs = Venta.objects.all()
-        pagos_qs = PagoCliente.objects.all()
-        compras_qs = Compra.objects.all()
+        # Totales desde el rollup diario (ver resumen_diario.py)
+        operaciones = resumen_diario.totales_operaciones(fecha_desde_val, fecha_hasta_val)
         origenes_gasto = [opcion.value for opcion in MovimientoFinanciero.Origen.gastos_registrables()]
-        gastos_qs = MovimientoFinanciero.objects.filter(
-            tipo=MovimientoFinanciero.Tipo.EGRESO, origen__in=origenes_gasto
+        gastos = resumen_diario.totales_movimientos(
+            fecha_desde_val,
+            fecha_hasta_val,
+            gastos=Q(tipo=MovimientoFinanciero.Tipo.EGRESO, origen__in=origenes_gasto),
         )
 
-        if fecha_desde_val:
-            ventas_qs = ventas_qs.filter(fecha__gte=fecha_desde_val)
-            pagos_qs = pagos_qs.filter(fecha__gte=fecha_desde_val)
-            compras_qs = compras_qs.filter(fecha__gte=fecha_desde_val)
-            gastos_qs = gastos_qs.filter(fecha__gte=fecha_desde_val)
-        if fecha_hasta_val:
-            ventas_qs = ventas_qs.filter(fecha__lte=fecha_hasta_val)
-            pagos_qs = pagos_qs.filter(fecha__lte=fecha_hasta_val)
-            compras_qs = compras_qs.filter(fecha__lte=fecha_hasta_val)
-            gastos_qs = gastos_qs.filter(fecha__lte=fecha_hasta_val)
-
         # IMPORTANTE: Usamos subtotal (sin IVA) para ingresos reales
         # El IVA es un impuesto a recaudar, no un ingreso de la empresa
-        total_ventas_subtotal = ventas_qs.aggregate(total=Sum('subtotal')) or {}
-        total_ventas_total = ventas_qs.aggregate(total=Sum('total')) or {}
-        total_ventas_iva = ventas_qs.aggregate(total=Sum('iva_monto')) or {}
-        total_pagos = pagos_qs.aggregate(total=Sum('monto')) or {}
-        total_compras = compras_qs.aggregate(total=Sum('total')) or {}
-        total_gastos = gastos_qs.aggregate(total=Sum('monto')) or {}
-
-        total_ventas_subtotal_val = total_ventas_subtotal.get('total') or Decimal('0')
-        total_ventas_total_val = total_ventas_total.get('total') or Decimal('0')
-        total_ventas_iva_val = total_ventas_iva.get('total') or Decimal('0')
-        total_pagos_val = total_pagos.get('total') or Decimal('0')
-        total_compras_val = total_compras.get('total') or Decimal('0')
-        total_gastos_val = total_gastos.get('total') or Decimal('0')
+        total_ventas_subtotal_val = operaciones['ventas_subtotal']
+        total_ventas_total_val = operaciones['ventas_total']
+        total_ventas_iva_val = operaciones['ventas_iva']
+        total_pagos_val = operaciones['pagos_total']
+        total_compras_val = operaciones['compras_total']
+        total_gastos_val = gastos['gastos']
 
         # Cálculos de balance (SIN IVA en ingresos)
         # Pendiente de cobro: total facturado - pagos recibidos
@@ -331,6 +392,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'], url_path='resumen/liquidez')
+    @cachear_reporte(depende_de=TABLAS_RESUMEN_DIARIO)
     def resumen_liquidez(self, request):
         """Obtiene resumen de liquidez separando efectivo real vs comprometido"""
         fecha_desde = request.query_params.get('fecha_desde')
@@ -360,35 +422,20 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Filtros de fecha
-        movimientos_qs = MovimientoFinanciero.objects.all()
-        if fecha_desde_val:
-            movimientos_qs = movimientos_qs.filter(fecha__gte=fecha_desde_val)
-        if fecha_hasta_val:
-            movimientos_qs = movimientos_qs.filter(fecha__lte=fecha_hasta_val)
-
-        # Calcular métricas por estado
-        # Efectivo real (PAGADO/COBRADO)
-        ingresos_reales = movimientos_qs.filter(
-            tipo=MovimientoFinanciero.Tipo.INGRESO,
-            estado=MovimientoFinanciero.Estado.COBRADO
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-
-        egresos_reales = movimientos_qs.filter(
-            tipo=MovimientoFinanciero.Tipo.EGRESO,
-            estado=MovimientoFinanciero.Estado.PAGADO
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-
-        # Compromisos pendientes
-        ingresos_pendientes = movimientos_qs.filter(
-            tipo=MovimientoFinanciero.Tipo.INGRESO,
-            estado=MovimientoFinanciero.Estado.PENDIENTE
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-
-        egresos_pendientes = movimientos_qs.filter(
-            tipo=MovimientoFinanciero.Tipo.EGRESO,
-            estado=MovimientoFinanciero.Estado.PENDIENTE
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
+        # Calcular métricas por estado desde el rollup diario, en una sola consulta
+        # Efectivo real (PAGADO/COBRADO) y compromisos pendientes
+        totales = resumen_diario.totales_movimientos(
+            fecha_desde_val,
+            fecha_hasta_val,
+            ingresos_reales=Q(tipo=MovimientoFinanciero.Tipo.INGRESO, estado=MovimientoFinanciero.Estado.COBRADO),
+            egresos_reales=Q(tipo=MovimientoFinanciero.Tipo.EGRESO, estado=MovimientoFinanciero.Estado.PAGADO),
+            ingresos_pendientes=Q(tipo=MovimientoFinanciero.Tipo.INGRESO, estado=MovimientoFinanciero.Estado.PENDIENTE),
+            egresos_pendientes=Q(tipo=MovimientoFinanciero.Tipo.EGRESO, estado=MovimientoFinanciero.Estado.PENDIENTE),
+        )
+        ingresos_reales = totales['ingresos_reales']
+        egresos_reales = totales['egresos_reales']
+        ingresos_pendientes = totales['ingresos_pendientes']
+        egresos_pendientes = totales['egresos_pendientes']
 
         # Cálculos de liquidez
         liquidez_real = ingresos_reales - egresos_reales
@@ -430,6 +477,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'], url_path='resumen/por-medio')
+    @cachear_reporte(depende_de=TABLAS_RESUMEN_DIARIO)
     def resumen_por_medio(self, request):
         """Obtiene resumen de dinero por medio de pago (Efectivo, Cheque, Transferencia)"""
         from django.db.models import Case, When, Value, CharField
@@ -456,30 +504,19 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        movimientos_qs = MovimientoFinanciero.objects.filter(
-            estado__in=[
-                MovimientoFinanciero.Estado.PAGADO,
-                MovimientoFinanciero.Estado.COBRADO,
-            ],
-            medio_pago__isnull=False,
-        ).exclude(medio_pago="")
-        if fecha_desde_val:
-            movimientos_qs = movimientos_qs.filter(fecha__gte=fecha_desde_val)
-        if fecha_hasta_val:
-            movimientos_qs = movimientos_qs.filter(fecha__lte=fecha_hasta_val)
-
-        ingresos_por_medio = movimientos_qs.filter(
-            tipo=MovimientoFinanciero.Tipo.INGRESO
-        ).values('medio_pago').annotate(
-            total=Sum('monto'),
-            cantidad_operaciones=Count('id')
-        )
-
-        egresos_por_medio = movimientos_qs.filter(
-            tipo=MovimientoFinanciero.Tipo.EGRESO
-        ).values('medio_pago').annotate(
-            total=Sum('monto'),
-            cantidad_operaciones=Count('id')
+        # Rollup diario agrupado por medio: una consulta para ingresos y egresos
+        por_medio = resumen_diario.totales_movimientos(
+            fecha_desde_val,
+            fecha_hasta_val,
+            agrupar_por=('medio_pago',),
+            ingresos=Q(
+                tipo=MovimientoFinanciero.Tipo.INGRESO,
+                estado__in=[MovimientoFinanciero.Estado.PAGADO, MovimientoFinanciero.Estado.COBRADO],
+            ),
+            egresos=Q(
+                tipo=MovimientoFinanciero.Tipo.EGRESO,
+                estado__in=[MovimientoFinanciero.Estado.PAGADO, MovimientoFinanciero.Estado.COBRADO],
+            ),
         )
 
         # Construir resumen por medio
@@ -495,21 +532,15 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 'cantidad_egresos': 0
             }
 
-        # Llenar ingresos por medio
-        for ingreso in ingresos_por_medio:
-            medio = ingreso['medio_pago'] or ''
-            if medio not in resumen_medios:
-                continue
-            resumen_medios[medio]['ingresos'] = ingreso['total'] or Decimal('0')
-            resumen_medios[medio]['cantidad_ingresos'] = ingreso['cantidad_operaciones']
-
-        # Llenar egresos por medio
-        for egreso in egresos_por_medio:
-            medio = egreso['medio_pago'] or ''
+        # Llenar ingresos y egresos por medio (medio vacío = sin medio registrado)
+        for fila in por_medio:
+            medio = fila['medio_pago']
             if medio not in resumen_medios:
                 continue
-            resumen_medios[medio]['egresos'] = egreso['total'] or Decimal('0')
-            resumen_medios[medio]['cantidad_egresos'] = egreso['cantidad_operaciones']
+            resumen_medios[medio]['ingresos'] = fila['ingresos']
+            resumen_medios[medio]['cantidad_ingresos'] = fila['ingresos_cantidad']
+            resumen_medios[medio]['egresos'] = fila['egresos']
+            resumen_medios[medio]['cantidad_egresos'] = fila['egresos_cantidad']
 
         # Calcular netos
         for medio in resumen_medios:
@@ -554,6 +585,7 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'], url_path='comparativas/periodo')
+    @cachear_reporte(depende_de=TABLAS_RESUMEN_DIARIO)
     def comparativas_periodo(self, request):
         """Obtiene comparativas entre períodos para análisis de tendencias"""
         from datetime import timedelta
@@ -600,43 +632,25 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
 
         # Función auxiliar para obtener métricas de un período
         def obtener_metricas_periodo(fecha_desde, fecha_hasta):
-            from ventas.models import Venta
-            from compras.models import Compra
-
-            # Ventas del período
-            ventas_periodo = Venta.objects.filter(
-                fecha__gte=fecha_desde,
-                fecha__lte=fecha_hasta
-            )
-
-            # Compras del período
-            compras_periodo = Compra.objects.filter(
-                fecha__gte=fecha_desde,
-                fecha__lte=fecha_hasta
-            )
-
-            # Movimientos financieros del período
-            movimientos_periodo = MovimientoFinanciero.objects.filter(
-                fecha__gte=fecha_desde,
-                fecha__lte=fecha_hasta,
-                estado__in=[MovimientoFinanciero.Estado.PAGADO, MovimientoFinanciero.Estado.COBRADO]
-            )
-
-            # Calcular métricas
-            total_ventas = ventas_periodo.aggregate(total=Sum('total'))['total'] or Decimal('0')
-            cantidad_ventas = ventas_periodo.count()
+            # Ventas y compras del período desde el rollup diario
+            operaciones = resumen_diario.totales_operaciones(fecha_desde, fecha_hasta)
+            total_ventas = operaciones['ventas_total']
+            cantidad_ventas = operaciones['ventas_cantidad']
             ticket_promedio = total_ventas / cantidad_ventas if cantidad_ventas > 0 else Decimal('0')
 
-            total_compras = compras_periodo.aggregate(total=Sum('total'))['total'] or Decimal('0')
-            cantidad_compras = compras_periodo.count()
+            total_compras = operaciones['compras_total']
+            cantidad_compras = operaciones['compras_cantidad']
 
-            ingresos_reales = movimientos_periodo.filter(
-                tipo=MovimientoFinanciero.Tipo.INGRESO
-            ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-
-            egresos_reales = movimientos_periodo.filter(
-                tipo=MovimientoFinanciero.Tipo.EGRESO
-            ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
+            # Movimientos financieros efectivamente pagados/cobrados del período
+            estados_reales = [MovimientoFinanciero.Estado.PAGADO, MovimientoFinanciero.Estado.COBRADO]
+            flujo = resumen_diario.totales_movimientos(
+                fecha_desde,
+                fecha_hasta,
+                ingresos=Q(tipo=MovimientoFinanciero.Tipo.INGRESO, estado__in=estados_reales),
+                egresos=Q(tipo=MovimientoFinanciero.Tipo.EGRESO, estado__in=estados_reales),
+            )
+            ingresos_reales = flujo['ingresos']
+            egresos_reales = flujo['egresos']
 
             balance_neto = ingresos_reales - egresos_reales
             margen_bruto = total_ventas - total_compras
@@ -712,298 +726,152 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
 
         return Response(comparativas)
 
+    @action(detail=False, methods=['get'], url_path='cache/estadisticas')
+    def estadisticas_cache(self, request):
+        """Aciertos y fallos del cache de reportes por endpoint"""
+        return Response(cache_reportes.estadisticas())
+
     @action(detail=False, methods=['get'])
     def alertas_dashboard(self, request):
-        """Obtiene todas las alertas para mostrar en el dashboard"""
-        alertas = []
-
-        # 1. Alertas de stock bajo - Productos
-        productos_stock_bajo = Producto.productos_con_stock_bajo()
-        for producto in productos_stock_bajo:
-            alertas.append({
-                'tipo': 'stock_bajo',
-                'categoria': 'producto',
-                'id': producto.id,
-                'titulo': f'Stock bajo: {producto.nombre}',
-                'descripcion': f'Quedan {producto.stock} unidades (mínimo: {producto.stock_minimo})',
-                'urgencia': 'alta' if producto.stock == 0 else 'media',
-                'fecha': None,
-                'datos': {
-                    'stock_actual': str(producto.stock),
-                    'stock_minimo': str(producto.stock_minimo),
-                    'sku': producto.sku,
-                }
-            })
-
-        # 2. Alertas de stock bajo - Materias Primas
-        materias_stock_bajo = MateriaPrima.materias_primas_con_stock_bajo()
-        for materia in materias_stock_bajo:
-            alertas.append({
-                'tipo': 'stock_bajo',
-                'categoria': 'materia_prima',
-                'id': materia.id,
-                'titulo': f'Stock bajo: {materia.nombre}',
-                'descripcion': f'Quedan {materia.stock} {materia.get_unidad_medida_display()} (mínimo: {materia.stock_minimo})',
-                'urgencia': 'alta' if materia.stock == 0 else 'media',
-                'fecha': None,
-                'datos': {
-                    'stock_actual': str(materia.stock),
-                    'stock_minimo': str(materia.stock_minimo),
-                    'unidad_medida': materia.unidad_medida,
-                    'sku': materia.sku,
-                }
-            })
-
-        # 3. Alertas de pagos vencidos usando los nuevos campos
-        hoy = datetime.now().date()
-        ventas_vencidas = Venta.objects.filter(
-            fecha_vencimiento__lt=hoy
-        ).select_related('cliente')
-
-        for venta in ventas_vencidas:
-            estado_pago = venta.estado_pago
-            if estado_pago in ['PENDIENTE', 'PARCIAL', 'VENCIDO']:
-                dias_vencida = venta.dias_vencimiento
-                saldo_pendiente = venta.saldo_pendiente
-                urgencia_cobranza = venta.urgencia_cobranza.lower()
-
-                alertas.append({
-                    'tipo': 'pago_vencido',
-                    'categoria': 'cliente',
-                    'id': venta.cliente.id,
-                    'titulo': f'Pago vencido: {venta.cliente.nombre}',
-                    'descripcion': f'Venta #{venta.numero or venta.id} - Saldo: ${saldo_pendiente} - {dias_vencida} días vencido',
-                    'urgencia': urgencia_cobranza,
-                    'fecha': venta.fecha_vencimiento.isoformat(),
-                    'datos': {
-                        'saldo_pendiente': str(saldo_pendiente),
-                        'dias_vencida': dias_vencida,
-                        'venta_id': venta.id,
-                        'venta_numero': venta.numero,
-                        'estado_pago': estado_pago,
-                        'condicion_pago': venta.condicion_pago,
-                        'puede_enviar_recordatorio': venta.puede_enviar_recordatorio,
-                    }
-                })
-
-        # 4. Alertas de ventas próximas a vencer (próximos 7 días)
-        fecha_limite_proximo = hoy + timedelta(days=7)
-        ventas_proximas_vencer = Venta.objects.filter(
-            fecha_vencimiento__gte=hoy,
-            fecha_vencimiento__lte=fecha_limite_proximo
-        ).select_related('cliente')
-
-        for venta in ventas_proximas_vencer:
-            estado_pago = venta.estado_pago
-            if estado_pago in ['PENDIENTE', 'PARCIAL']:
-                dias_hasta_vencimiento = (venta.fecha_vencimiento - hoy).days
-                saldo_pendiente = venta.saldo_pendiente
-
-                alertas.append({
-                    'tipo': 'pago_proximo_vencer',
-                    'categoria': 'cliente',
-                    'id': venta.cliente.id,
-                    'titulo': f'Pago próximo a vencer: {venta.cliente.nombre}',
-                    'descripcion': f'Venta #{venta.numero or venta.id} - Vence en {dias_hasta_vencimiento} días - Saldo: ${saldo_pendiente}',
-                    'urgencia': 'media' if dias_hasta_vencimiento <= 3 else 'baja',
-                    'fecha': venta.fecha_vencimiento.isoformat(),
-                    'datos': {
-                        'saldo_pendiente': str(saldo_pendiente),
-                        'dias_hasta_vencimiento': dias_hasta_vencimiento,
-                        'venta_id': venta.id,
-                        'venta_numero': venta.numero,
-                        'estado_pago': estado_pago,
-                        'puede_enviar_recordatorio': venta.puede_enviar_recordatorio,
-                    }
-                })
-
-        # 5. Alertas de cuentas por pagar vencidas
-        cuentas_vencidas = MovimientoFinanciero.objects.filter(
-            tipo=MovimientoFinanciero.Tipo.EGRESO,
-            estado__in=[MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL],
-            fecha_vencimiento__lt=hoy
-        ).select_related('proveedor')
-
-        for cuenta in cuentas_vencidas:
-            dias_vencida = (hoy - cuenta.fecha_vencimiento).days if cuenta.fecha_vencimiento else 0
-            urgencia = 'alta' if dias_vencida > 30 else 'media' if dias_vencida > 7 else 'baja'
-
-            alertas.append({
-                'tipo': 'pago_proveedor_vencido',
-                'categoria': 'proveedor',
-                'id': cuenta.proveedor.id if cuenta.proveedor else None,
-                'titulo': f'Pago vencido: {cuenta.proveedor.nombre if cuenta.proveedor else "Proveedor"}',
-                'descripcion': f'Vencido hace {dias_vencida} días - Monto pendiente: ${cuenta.monto_pendiente}',
-                'urgencia': urgencia,
-                'fecha': cuenta.fecha_vencimiento.isoformat() if cuenta.fecha_vencimiento else None,
-                'datos': {
-                    'monto_pendiente': str(cuenta.monto_pendiente),
-                    'dias_vencida': dias_vencida,
-                    'movimiento_id': cuenta.id,
-                    'descripcion': cuenta.descripcion,
-                }
-            })
+        """
+        Obtiene las alertas del dashboard desde la tabla Alerta.
 
-        # 6. Alertas de cuentas por pagar próximas a vencer
-        fecha_limite_pago = hoy + timedelta(days=7)
-        cuentas_proximas_vencer = MovimientoFinanciero.objects.filter(
-            tipo=MovimientoFinanciero.Tipo.EGRESO,
-            estado__in=[MovimientoFinanciero.Estado.PENDIENTE, MovimientoFinanciero.Estado.PARCIAL],
-            fecha_vencimiento__gte=hoy,
-            fecha_vencimiento__lte=fecha_limite_pago
-        ).select_related('proveedor')
-
-        for cuenta in cuentas_proximas_vencer:
-            dias_hasta_vencimiento = (cuenta.fecha_vencimiento - hoy).days if cuenta.fecha_vencimiento else 0
-
-            alertas.append({
-                'tipo': 'pago_proveedor_proximo_vencer',
-                'categoria': 'proveedor',
-                'id': cuenta.proveedor.id if cuenta.proveedor else None,
-                'titulo': f'Pago próximo a vencer: {cuenta.proveedor.nombre if cuenta.proveedor else "Proveedor"}',
-                'descripcion': f'Vence en {dias_hasta_vencimiento} días - Monto: ${cuenta.monto_pendiente}',
-                'urgencia': 'media' if dias_hasta_vencimiento <= 3 else 'baja',
-                'fecha': cuenta.fecha_vencimiento.isoformat() if cuenta.fecha_vencimiento else None,
-                'datos': {
-                    'monto_pendiente': str(cuenta.monto_pendiente),
-                    'dias_hasta_vencimiento': dias_hasta_vencimiento,
-                    'movimiento_id': cuenta.id,
-                    'descripcion': cuenta.descripcion,
-                }
-            })
+        Las alertas se mantienen por eventos y por el comando nocturno
+        `actualizar_alertas`. La lectura es paginada, ordenada por el índice
+        (prioridad, fecha, id) y responde 304 si el ETag no cambió.
 
-        # 7. Notificaciones de empleados (cumpleaños próximos)
-        empleados = Empleado.objects.filter(activo=True)
-
-        for empleado in empleados:
-            # Calcular próximo cumpleaños y aniversario
-            fecha_ingreso = empleado.fecha_ingreso
-            años_trabajando = (hoy - fecha_ingreso).days // 365
-
-            # Aniversario laboral próximo (próximos 7 días)
-            proximo_aniversario = fecha_ingreso.replace(year=hoy.year)
-            if proximo_aniversario < hoy:
-                proximo_aniversario = fecha_ingreso.replace(year=hoy.year + 1)
-
-            dias_hasta_aniversario = (proximo_aniversario - hoy).days
-            if 0 <= dias_hasta_aniversario <= 7:
-                alertas.append({
-                    'tipo': 'aniversario_laboral',
-                    'categoria': 'empleado',
-                    'id': empleado.id,
-                    'titulo': f'Aniversario laboral: {empleado.nombre_completo}',
-                    'descripcion': f'Cumple {años_trabajando + 1} años en la empresa en {dias_hasta_aniversario} días',
-                    'urgencia': 'baja',
-                    'fecha': proximo_aniversario.isoformat(),
-                    'datos': {
-                        'años_trabajando': años_trabajando + 1,
-                        'dias_hasta_aniversario': dias_hasta_aniversario,
-                        'puesto': empleado.puesto,
-                    }
-                })
+        Filtros opcionales: urgencia, tipo, categoria.
+        """
+        # Conteos por urgencia y marca de última modificación en una consulta;
+        # sirven tanto para el ETag como para los contadores de la respuesta
+        estadisticas = {
+            fila['urgencia']: fila
+            for fila in Alerta.objects.order_by().values('urgencia').annotate(
+                cantidad=Count('id'),
+                ultima_actualizacion=Max('fecha_actualizacion'),
+                ultimo_id=Max('id'),
+            )
+        }
+        firma = '|'.join(
+            f"{urgencia}:{datos['cantidad']}:{datos['ultima_actualizacion'].isoformat()}:{datos['ultimo_id']}"
+            for urgencia, datos in sorted(estadisticas.items())
+        )
+        etag = '"{}"'.format(hashlib.md5(f"{firma}|{request.get_full_path()}".encode()).hexdigest())
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        queryset = Alerta.objects.all()
+        for filtro in ('urgencia', 'tipo', 'categoria'):
+            valor = request.query_params.get(filtro)
+            if valor:
+                queryset = queryset.filter(**{filtro: valor})
+
+        pagina = self.paginate_queryset(queryset)
+        alertas = [
+            {
+                'tipo': alerta.tipo,
+                'categoria': alerta.categoria,
+                'id': alerta.entidad_id,
+                'titulo': alerta.titulo,
+                'descripcion': alerta.descripcion,
+                'urgencia': alerta.urgencia,
+                'fecha': alerta.fecha.isoformat() if alerta.fecha else None,
+                'datos': alerta.datos,
+            }
+            for alerta in (pagina if pagina is not None else queryset)
+        ]
 
-        # Ordenar alertas por urgencia y fecha
-        orden_urgencia = {'alta': 0, 'media': 1, 'baja': 2}
-        alertas.sort(key=lambda x: (orden_urgencia.get(x['urgencia'], 3), x['fecha'] or ''))
+        def contar(urgencia):
+            return estadisticas.get(urgencia, {}).get('cantidad', 0)
 
-        return Response({
+        datos_respuesta = {
             'alertas': alertas,
-            'total_alertas': len(alertas),
-            'alertas_alta': len([a for a in alertas if a['urgencia'] == 'alta']),
-            'alertas_media': len([a for a in alertas if a['urgencia'] == 'media']),
-            'alertas_baja': len([a for a in alertas if a['urgencia'] == 'baja']),
-        })
+            'total_alertas': sum(datos['cantidad'] for datos in estadisticas.values()),
+            'alertas_alta': contar(Alerta.Urgencia.ALTA),
+            'alertas_media': contar(Alerta.Urgencia.MEDIA),
+            'alertas_baja': contar(Alerta.Urgencia.BAJA),
+        }
+        if pagina is not None:
+            datos_respuesta.update({
+                'count': self.paginator.page.paginator.count,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link(),
+            })
+
+        return Response(datos_respuesta, headers={'ETag': etag})
 
     @action(detail=False, methods=['get'])
+    @en_segundo_plano
+    @cachear_reporte(depende_de=(
+        'ventas.Venta', 'ventas.LineaVenta', 'inventario.MovimientoStock',
+        'inventario.ValorizacionInventario', 'productos.Producto',
+    ))
     def reporte_rentabilidad_productos(self, request):
-        """Genera reporte de rentabilidad por producto"""
-        from django.db.models import F, Sum, Avg, Count
-        from ventas.models import LineaVenta
-        from compras.models import CompraLinea
+        """
+        Genera reporte de rentabilidad por producto con CMV real.
+
+        El costo sale de las salidas por venta de inventario y, para las
+        unidades sin salida registrada, del costo promedio de los lotes
+        (ver rentabilidad.py). Usa una cantidad fija de consultas.
 
+        Query params:
+            fecha_desde, fecha_hasta: Rango de fechas de venta
+            periodo: mes, trimestre o anio para abrir cada producto por período
+        """
         fecha_desde = request.query_params.get('fecha_desde')
         fecha_hasta = request.query_params.get('fecha_hasta')
+        periodo = request.query_params.get('periodo') or None
 
-        # Filtros de fecha si se proporcionan
-        filtros_venta = {}
-        filtros_compra = {}
-        if fecha_desde:
-            filtros_venta['venta__fecha__gte'] = fecha_desde
-            filtros_compra['compra__fecha__gte'] = fecha_desde
-        if fecha_hasta:
-            filtros_venta['venta__fecha__lte'] = fecha_hasta
-            filtros_compra['compra__fecha__lte'] = fecha_hasta
-
-        # Datos de ventas por producto
-        ventas_por_producto = LineaVenta.objects.filter(
-            producto__isnull=False,
-            **filtros_venta
-        ).values(
-            'producto__id',
-            'producto__nombre',
-            'producto__sku'
-        ).annotate(
-            total_vendido=Sum(F('cantidad') * F('precio_unitario')),
-            cantidad_vendida=Sum('cantidad'),
-            ventas_count=Count('venta', distinct=True),
-            precio_promedio=Avg('precio_unitario')
-        )
-
-        # Datos de compras por materia prima (aproximación del costo)
-        compras_por_materia = CompraLinea.objects.filter(
-            materia_prima__isnull=False,
-            **filtros_compra
-        ).values(
-            'materia_prima__id',
-            'materia_prima__nombre'
-        ).annotate(
-            total_comprado=Sum(F('cantidad') * F('precio_unitario')),
-            cantidad_comprada=Sum('cantidad'),
-            costo_promedio=Avg('precio_unitario')
-        )
+        try:
+            filas = rentabilidad.rentabilidad_por_producto(fecha_desde, fecha_hasta, periodo)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Construir reporte de rentabilidad
         reporte_productos = []
-        for venta in ventas_por_producto:
-            producto_id = venta['producto__id']
-
-            # Calcular margen estimado (usando precio promedio vs costo estimado)
-            precio_promedio = float(venta['precio_promedio'] or 0)
-            costo_estimado = float(Producto.objects.get(id=producto_id).precio or 0)
-
-            margen_bruto = precio_promedio - costo_estimado
-            margen_porcentaje = (margen_bruto / precio_promedio * 100) if precio_promedio > 0 else 0
-
+        for fila in filas:
+            precio_promedio = float(fila['precio_promedio'])
+            costo_estimado = float(fila['costo_unitario'])
             reporte_productos.append({
-                'producto_id': producto_id,
-                'producto_nombre': venta['producto__nombre'],
-                'producto_sku': venta['producto__sku'],
-                'total_vendido': float(venta['total_vendido'] or 0),
-                'cantidad_vendida': float(venta['cantidad_vendida'] or 0),
-                'ventas_count': venta['ventas_count'],
+                'producto_id': fila['producto_id'],
+                'producto_nombre': fila['producto_nombre'],
+                'producto_sku': fila['producto_sku'],
+                'periodo': fila['periodo'].isoformat() if fila['periodo'] else None,
+                'total_vendido': float(fila['total_vendido']),
+                'cantidad_vendida': float(fila['cantidad_vendida']),
+                'ventas_count': fila['ventas_count'],
                 'precio_promedio': precio_promedio,
                 'costo_estimado': costo_estimado,
-                'margen_bruto': margen_bruto,
-                'margen_porcentaje': round(margen_porcentaje, 2),
+                'costo_total': float(fila['costo_total']),
+                'costo_fuente': fila['costo_fuente'],
+                'margen_bruto': precio_promedio - costo_estimado,
+                'margen_total': float(fila['margen_total']),
+                'margen_porcentaje': round(float(fila['margen_porcentaje']), 2),
             })
 
-        # Ordenar por rentabilidad
-        reporte_productos.sort(key=lambda x: x['total_vendido'], reverse=True)
+        con_costo = [p for p in reporte_productos if p['costo_fuente'] != 'sin_costo']
+        total_vendido = sum(p['total_vendido'] for p in reporte_productos)
+        total_vendido_con_costo = sum(p['total_vendido'] for p in con_costo)
+        margen_con_costo = sum(p['margen_total'] for p in con_costo)
 
         return Response({
             'periodo': {
                 'fecha_desde': fecha_desde,
-                'fecha_hasta': fecha_hasta
+                'fecha_hasta': fecha_hasta,
+                'agrupacion': periodo,
             },
             'productos': reporte_productos,
             'resumen': {
-                'total_productos': len(reporte_productos),
-                'total_vendido': sum(p['total_vendido'] for p in reporte_productos),
-                'margen_promedio': sum(p['margen_porcentaje'] for p in reporte_productos) / len(reporte_productos) if reporte_productos else 0
+                'total_productos': len({p['producto_id'] for p in reporte_productos}),
+                'total_vendido': total_vendido,
+                'total_costo': sum(p['costo_total'] for p in reporte_productos),
+                'productos_sin_costo': len(reporte_productos) - len(con_costo),
+                # Margen ponderado por ventas, solo sobre productos con costo conocido
+                'margen_promedio': round(margen_con_costo / total_vendido_con_costo * 100, 2) if total_vendido_con_costo else 0,
             }
         })
 
     @action(detail=False, methods=['get'])
+    @cachear_reporte(depende_de=('ventas.Venta', 'finanzas_reportes.PagoCliente', 'clientes.Cliente'))
     def reporte_rentabilidad_clientes(self, request):
         """Genera reporte de rentabilidad por cliente"""
         from django.db.models import F, Sum, Count, Avg
@@ -1081,36 +949,53 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @en_segundo_plano
+    @cachear_reporte(depende_de=('ventas.Venta', 'ventas.LineaVenta', 'productos.Producto'))
     def tendencias_ventas(self, request):
-        """Análisis de tendencias de ventas con comparativas mensuales"""
+        """
+        Análisis de tendencias de ventas con comparativas interanuales
+
+        Los períodos cerrados se leen de snapshots (ver series_ventas.py);
+        sólo el período abierto se calcula en vivo.
+
+        Query params:
+            granularidad: dia, semana, mes (default) o trimestre
+            fecha_desde, fecha_hasta: Rango (default: último año)
+            top: Productos por período en la serie (default 5, máximo 10)
+        """
         from django.db.models import F, Sum, Count
-        from django.db.models.functions import TruncMonth, TruncYear
         import calendar
 
-        # Ventas por mes del último año
-        hace_un_año = datetime.now().date() - timedelta(days=365)
+        fecha_desde = request.query_params.get('fecha_desde')
+        fecha_hasta = request.query_params.get('fecha_hasta')
 
-        ventas_mensuales = Venta.objects.filter(
-            fecha__gte=hace_un_año
-        ).annotate(
-            mes=TruncMonth('fecha')
-        ).values('mes').annotate(
-            total_ventas=Sum('total'),
-            cantidad_ventas=Count('id'),
-            venta_promedio=Avg('total')
-        ).order_by('mes')
+        hoy = datetime.now().date()
+        try:
+            fecha_hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date() if fecha_hasta else hoy
+            if fecha_desde:
+                hace_un_año = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
+            else:
+                hace_un_año = fecha_hasta - timedelta(days=365)
+            granularidad = request.query_params.get('granularidad', 'mes')
+            top_n = int(request.query_params.get('top', 5))
+            serie = series_ventas.serie(hace_un_año, fecha_hasta, granularidad, top_n, hoy=hoy)
+            serie_mensual = serie if granularidad == 'mes' else series_ventas.serie(
+                hace_un_año, fecha_hasta, 'mes', 0, interanual=False, hoy=hoy
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Formatear datos mensuales
         datos_mensuales = []
-        for venta_mes in ventas_mensuales:
-            mes_fecha = venta_mes['mes']
+        for periodo in serie_mensual:
+            mes_fecha = periodo['inicio']
             datos_mensuales.append({
                 'año': mes_fecha.year,
                 'mes': mes_fecha.month,
                 'mes_nombre': calendar.month_name[mes_fecha.month],
-                'total_ventas': float(venta_mes['total_ventas'] or 0),
-                'cantidad_ventas': venta_mes['cantidad_ventas'],
-                'venta_promedio': float(venta_mes['venta_promedio'] or 0)
+                'total_ventas': float(periodo['total_ventas']),
+                'cantidad_ventas': periodo['cantidad_ventas'],
+                'venta_promedio': float(periodo['venta_promedio'])
             })
 
         # Comparativa año actual vs año anterior
@@ -1139,20 +1024,24 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         # Top productos del período
         top_productos = LineaVenta.objects.filter(
             venta__fecha__gte=hace_un_año,
+            venta__fecha__lte=fecha_hasta,
+            venta__anulada=False,
             producto__isnull=False
         ).values(
             'producto__nombre',
             'producto__sku'
         ).annotate(
-            total_vendido=Sum(F('cantidad') * F('precio_unitario')),
+            total_vendido=Sum(F('cantidad_kg') * F('precio_unitario')),
             cantidad_total=Sum('cantidad')
         ).order_by('-total_vendido')[:10]
 
         return Response({
             'periodo_analisis': {
                 'fecha_desde': hace_un_año.isoformat(),
-                'fecha_hasta': datetime.now().date().isoformat()
+                'fecha_hasta': fecha_hasta.isoformat()
             },
+            'granularidad': granularidad,
+            'serie': [_serializar_periodo_ventas(periodo) for periodo in serie],
             'ventas_mensuales': datos_mensuales,
             'comparativa_anual': {
                 'año_actual': {
@@ -1179,9 +1068,15 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @en_segundo_plano
+    @cachear_reporte(depende_de=('ventas.Venta', 'finanzas_reportes.PagoCliente', 'clientes.Cliente'))
     def analisis_rentabilidad_clientes(self, request):
         """
         Análisis detallado de rentabilidad por cliente
+
+        Categoriza y puntúa (RFM) a todos los clientes con dos consultas
+        agrupadas (ver segmentacion.py). Los umbrales de categoría se pueden
+        ajustar con umbral_<clave>, p. ej. ?umbral_vip_ticket=8000.
         """
         # Parámetros de fecha
         fecha_desde = request.query_params.get('fecha_desde')
@@ -1198,72 +1093,21 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         else:
             fecha_hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
 
-        # Análisis por cliente
-        clientes_analisis = []
-
-        for cliente in Cliente.objects.all():
-            # Ventas del cliente en el período
-            ventas_cliente = Venta.objects.filter(
-                cliente_id=cliente.id,
-                fecha__gte=fecha_desde,
-                fecha__lte=fecha_hasta
-            )
-
-            # Métricas básicas
-            total_ventas = ventas_cliente.aggregate(total=Sum('total'))['total'] or 0
-            cantidad_ventas = ventas_cliente.count()
-
-            if cantidad_ventas == 0:
-                continue  # Saltar clientes sin ventas
-
-            # Pagos recibidos del cliente
-            pagos_cliente = PagoCliente.objects.filter(
-                cliente_id=cliente.id,
-                fecha__gte=fecha_desde,
-                fecha__lte=fecha_hasta
-            ).aggregate(total=Sum('monto'))['total'] or 0
-
-            # Cálculos de rentabilidad
-            ticket_promedio = float(total_ventas) / cantidad_ventas if cantidad_ventas > 0 else 0
-            frecuencia_compra = cantidad_ventas / ((fecha_hasta - fecha_desde).days / 30) if (fecha_hasta - fecha_desde).days > 0 else 0
-
-            # Margen estimado (20% por defecto - se puede personalizar)
-            margen_estimado = float(total_ventas) * 0.20
-
-            # Días desde última compra
-            ultima_venta = ventas_cliente.order_by('-fecha').first()
-            dias_ultima_compra = (datetime.now().date() - ultima_venta.fecha).days if ultima_venta else 999
-
-            # Clasificación de cliente
-            if ticket_promedio > 10000 and frecuencia_compra > 2:
-                categoria = "VIP"
-            elif ticket_promedio > 5000 and frecuencia_compra > 1:
-                categoria = "Premium"
-            elif frecuencia_compra > 0.5:
-                categoria = "Regular"
-            else:
-                categoria = "Ocasional"
-
-            clientes_analisis.append({
-                'cliente_id': cliente.id,
-                'cliente_nombre': cliente.nombre,
-                'cliente_identificacion': cliente.identificacion,
-                'total_ventas': float(total_ventas),
-                'total_pagos': float(pagos_cliente),
-                'saldo_pendiente': float(total_ventas) - float(pagos_cliente),
-                'cantidad_ventas': cantidad_ventas,
-                'ticket_promedio': round(ticket_promedio, 2),
-                'frecuencia_mensual': round(frecuencia_compra, 2),
-                'margen_estimado': round(margen_estimado, 2),
-                'dias_ultima_compra': dias_ultima_compra,
-                'categoria': categoria,
-                'rentabilidad_score': round(
-                    (ticket_promedio * 0.4 + frecuencia_compra * 0.3 + margen_estimado * 0.3) / 100, 2
+        # Umbrales de categorización configurables: ?umbral_vip_ticket=8000, etc.
+        umbrales = {}
+        for clave in segmentacion.UMBRALES_POR_DEFECTO:
+            valor = request.query_params.get(f'umbral_{clave}')
+            if valor is None:
+                continue
+            try:
+                umbrales[clave] = float(valor)
+            except ValueError:
+                return Response(
+                    {'error': f'umbral_{clave} debe ser numérico'},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-            })
 
-        # Ordenar por rentabilidad
-        clientes_analisis.sort(key=lambda x: x['rentabilidad_score'], reverse=True)
+        clientes_analisis = segmentacion.segmentar_clientes(fecha_desde, fecha_hasta, umbrales)
 
         # Estadísticas generales
         total_clientes_activos = len(clientes_analisis)
@@ -1289,11 +1133,11 @@ class MovimientoFinancieroViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             'top_clientes': top_clientes,
             'clientes_en_riesgo': clientes_riesgo,
             'distribucion_categorias': {
-                'VIP': len([c for c in clientes_analisis if c['categoria'] == 'VIP']),
-                'Premium': len([c for c in clientes_analisis if c['categoria'] == 'Premium']),
-                'Regular': len([c for c in clientes_analisis if c['categoria'] == 'Regular']),
-                'Ocasional': len([c for c in clientes_analisis if c['categoria'] == 'Ocasional'])
-            }
+                categoria: sum(1 for c in clientes_analisis if c['categoria'] == categoria)
+                for categoria in segmentacion.CATEGORIAS
+            },
+            'distribucion_rfm': dict(Counter(c['rfm']['segmento'] for c in clientes_analisis)),
+            'umbrales': {**segmentacion.UMBRALES_POR_DEFECTO, **umbrales},
         })
 
 
@@ -1322,19 +1166,54 @@ class CuentaBancariaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             )
 
         try:
-            cuenta.saldo_actual = Decimal(str(nuevo_saldo))
-            cuenta.save()
+            saldos_cuentas.ajustar_saldo_actual(cuenta, Decimal(str(nuevo_saldo)))
 
             return Response({
                 "mensaje": "Saldo actualizado correctamente",
                 "cuenta": CuentaBancariaSerializer(cuenta).data
             })
-        except (ValueError, TypeError):
+        except (ValueError, TypeError, ArithmeticError):
             return Response(
                 {"error": "El saldo debe ser un número válido"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=True, methods=['get'])
+    def saldos(self, request, pk=None):
+        """
+        Saldos diarios de la cuenta en libros y según el banco.
+
+        Parámetros: fecha_desde y fecha_hasta (default: últimos 30 días).
+        """
+        cuenta = self.get_object()
+        fecha_hasta = datetime.now().date()
+        fecha_desde = None
+        try:
+            if request.query_params.get('fecha_hasta'):
+                fecha_hasta = datetime.strptime(request.query_params['fecha_hasta'], '%Y-%m-%d').date()
+            if request.query_params.get('fecha_desde'):
+                fecha_desde = datetime.strptime(request.query_params['fecha_desde'], '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {"error": "Formato de fecha inválido. Usar YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fecha_desde = fecha_desde or fecha_hasta - timedelta(days=30)
+
+        datos = {"fecha_desde": fecha_desde, "fecha_hasta": fecha_hasta}
+        for fuente in (saldos_cuentas.LIBRO, saldos_cuentas.BANCO):
+            apertura, dias = saldos_cuentas.serie(cuenta, fecha_desde, fecha_hasta, fuente)
+            datos[fuente.lower()] = {
+                "saldo_apertura": str(apertura),
+                "saldo_cierre": str(dias[-1]['saldo'] if dias else apertura),
+                "dias": [
+                    {clave: str(valor) if isinstance(valor, Decimal) else valor for clave, valor in dia.items()}
+                    for dia in dias
+                ],
+            }
+        return Response(datos)
+
 
 class ExtractoBancarioViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar extractos bancarios"""
@@ -1350,138 +1229,68 @@ class ExtractoBancarioViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def importar_extracto(self, request):
-        """Importar extracto bancario desde archivo CSV/Excel"""
-        import csv
-        import io
-        import pandas as pd
-        from django.db import transaction
+        """
+        Importar extracto bancario desde archivo CSV/Excel.
 
+        Las filas se insertan en lotes; las que ya estaban cargadas (extractos
+        superpuestos) se cuentan como duplicadas y no se vuelven a insertar.
+        """
         serializer = ImportarExtractoSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         validated_data = serializer.validated_data
-        cuenta_bancaria = validated_data['cuenta_bancaria']
         archivo = validated_data['archivo']
 
-        try:
-            with transaction.atomic():
-                # Crear el extracto bancario
-                extracto = ExtractoBancario.objects.create(
-                    cuenta_bancaria=cuenta_bancaria,
-                    archivo_nombre=archivo.name,
-                    fecha_desde=validated_data['fecha_desde'],
-                    fecha_hasta=validated_data['fecha_hasta'],
-                    saldo_inicial=validated_data['saldo_inicial'],
-                    saldo_final=validated_data['saldo_final']
-                )
-
-                # Procesar archivo
-                movimientos_creados = 0
-
-                if archivo.name.lower().endswith('.csv'):
-                    # Procesar CSV
-                    archivo_contenido = archivo.read().decode('utf-8')
-                    csv_reader = csv.DictReader(io.StringIO(archivo_contenido))
-
-                    for fila in csv_reader:
-                        # Mapear campos (ajustar según formato del banco)
-                        fecha_str = fila.get('fecha', fila.get('Fecha', ''))
-                        descripcion = fila.get('descripcion', fila.get('Descripcion', ''))
-                        debito = fila.get('debito', fila.get('Débito', ''))
-                        credito = fila.get('credito', fila.get('Crédito', ''))
-                        saldo = fila.get('saldo', fila.get('Saldo', ''))
-
-                        if fecha_str and descripcion:
-                            fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
-
-                            MovimientoBancario.objects.create(
-                                extracto=extracto,
-                                fecha=fecha,
-                                descripcion=descripcion,
-                                debito=Decimal(debito) if debito else None,
-                                credito=Decimal(credito) if credito else None,
-                                saldo=Decimal(saldo) if saldo else Decimal('0')
-                            )
-                            movimientos_creados += 1
-
-                elif archivo.name.lower().endswith(('.xlsx', '.xls')):
-                    # Procesar Excel
-                    df = pd.read_excel(archivo)
-
-                    for _, fila in df.iterrows():
-                        fecha = fila.get('fecha', fila.get('Fecha'))
-                        descripcion = fila.get('descripcion', fila.get('Descripcion', ''))
-                        debito = fila.get('debito', fila.get('Débito'))
-                        credito = fila.get('credito', fila.get('Crédito'))
-                        saldo = fila.get('saldo', fila.get('Saldo', 0))
-
-                        if pd.notna(fecha) and descripcion:
-                            if isinstance(fecha, str):
-                                fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
-
-                            MovimientoBancario.objects.create(
-                                extracto=extracto,
-                                fecha=fecha,
-                                descripcion=str(descripcion),
-                                debito=Decimal(str(debito)) if pd.notna(debito) and debito != 0 else None,
-                                credito=Decimal(str(credito)) if pd.notna(credito) and credito != 0 else None,
-                                saldo=Decimal(str(saldo)) if pd.notna(saldo) else Decimal('0')
-                            )
-                            movimientos_creados += 1
-
-                # Actualizar total de movimientos y marcar como procesado
-                extracto.total_movimientos = movimientos_creados
-                extracto.procesado = True
-                extracto.save()
-
-                return Response({
-                    "mensaje": "Extracto importado correctamente",
-                    "extracto": ExtractoBancarioSerializer(extracto).data,
-                    "movimientos_procesados": movimientos_creados
-                })
+        extracto = ExtractoBancario.objects.create(
+            cuenta_bancaria=validated_data['cuenta_bancaria'],
+            archivo_nombre=archivo.name,
+            fecha_desde=validated_data['fecha_desde'],
+            fecha_hasta=validated_data['fecha_hasta'],
+            saldo_inicial=validated_data['saldo_inicial'],
+            saldo_final=validated_data['saldo_final']
+        )
 
+        try:
+            resultado = extractos.importar(extracto, archivo, validated_data['formato'])
+        except extractos.ErrorImportacion as e:
+            extracto.delete()
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
+            # Los lotes ya insertados quedan; al reimportar se saltean por huella
             return Response(
                 {"error": f"Error al procesar el archivo: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    @action(detail=True, methods=['post'])
-    def conciliar_automatico(self, request, pk=None):
-        """Conciliación automática basada en coincidencias de monto y fecha"""
-        extracto = self.get_object()
-
-        movimientos_conciliados = 0
-        movimientos_bancarios = extracto.movimientos.filter(conciliado=False)
-
-        for mov_bancario in movimientos_bancarios:
-            # Buscar movimientos financieros que coincidan por monto y fecha (±3 días)
-            fecha_inicio = mov_bancario.fecha - timedelta(days=3)
-            fecha_fin = mov_bancario.fecha + timedelta(days=3)
-
-            monto_buscado = abs(mov_bancario.monto)
+        extracto.total_movimientos = resultado['creados']
+        extracto.procesado = True
+        extracto.save(update_fields=['total_movimientos', 'procesado'])
 
-            movimientos_candidatos = MovimientoFinanciero.objects.filter(
-                fecha__gte=fecha_inicio,
-                fecha__lte=fecha_fin,
-                monto=monto_buscado
-            ).filter(movimiento_bancario__isnull=True)
+        return Response({
+            "mensaje": "Extracto importado correctamente",
+            "extracto": ExtractoBancarioSerializer(extracto).data,
+            "movimientos_procesados": resultado['creados'],
+            "movimientos_duplicados": resultado['duplicados'],
+            "filas_rechazadas": resultado['rechazados'],
+            "errores": resultado['errores'],
+        })
 
-            if movimientos_candidatos.exists():
-                # Tomar el primer candidato que coincida
-                mov_financiero = movimientos_candidatos.first()
-                mov_bancario.movimiento_financiero = mov_financiero
-                mov_bancario.conciliado = True
-                mov_bancario.observaciones = "Conciliado automáticamente"
-                mov_bancario.save()
+    @action(detail=True, methods=['post'])
+    def conciliar_automatico(self, request, pk=None):
+        """
+        Conciliación automática por monto exacto y fecha (±3 días).
 
-                movimientos_conciliados += 1
+        Las líneas con más de un candidato equivalente se devuelven en
+        'ambiguos' para conciliarlas a mano.
+        """
+        resultado = conciliacion.conciliar_extracto(self.get_object())
 
         return Response({
-            "mensaje": f"Conciliación automática completada",
-            "movimientos_conciliados": movimientos_conciliados,
-            "total_movimientos": movimientos_bancarios.count()
+            "mensaje": "Conciliación automática completada",
+            "movimientos_conciliados": resultado['conciliados'],
+            "total_movimientos": resultado['total'],
+            "ambiguos": resultado['ambiguos'],
         })
 
 
@@ -1545,8 +1354,6 @@ class ConciliacionBancariaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def generar_conciliacion(self, request):
         """Generar una nueva conciliación bancaria"""
-        from django.db.models import Q
-
         cuenta_bancaria_id = request.data.get('cuenta_bancaria_id')
         fecha_conciliacion = request.data.get('fecha_conciliacion')
         saldo_banco = request.data.get('saldo_banco')
@@ -1562,15 +1369,8 @@ class ConciliacionBancariaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             cuenta_bancaria = CuentaBancaria.objects.get(id=cuenta_bancaria_id)
             fecha = datetime.strptime(fecha_conciliacion, '%Y-%m-%d').date()
 
-            # Calcular saldo en libros hasta la fecha
-            movimientos_hasta_fecha = MovimientoFinanciero.objects.filter(
-                fecha__lte=fecha
-            ).aggregate(
-                ingresos=Sum('monto', filter=Q(tipo=MovimientoFinanciero.Tipo.INGRESO)),
-                egresos=Sum('monto', filter=Q(tipo=MovimientoFinanciero.Tipo.EGRESO))
-            )
-
-            saldo_libro = (movimientos_hasta_fecha['ingresos'] or 0) - (movimientos_hasta_fecha['egresos'] or 0)
+            # Saldo en libros de la cuenta a la fecha (último saldo diario)
+            saldo_libro = saldos_cuentas.saldo_al(cuenta_bancaria, fecha)
 
             # Crear conciliación
             conciliacion = ConciliacionBancaria.objects.create(
@@ -1613,31 +1413,35 @@ class ConfiguracionAFIPViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def test_conexion(self, request, pk=None):
-        """Probar conexión con AFIP"""
+        """Probar conexión con AFIP: servidores (FEDummy) y ticket de acceso (WSAA)"""
         configuracion = self.get_object()
 
         try:
-            # Aquí iría la lógica real de conexión con AFIP
-            # Por ahora simularemos una respuesta exitosa
-            return Response({
-                "mensaje": "Conexión exitosa con AFIP",
-                "ambiente": configuracion.get_ambiente_display(),
-                "cuit": configuracion.cuit,
-                "estado": "OK"
-            })
-
-        except Exception as e:
+            servidores = wsfe.ClienteWSFE(configuracion).dummy()
+            ticket = wsaa.obtener_ticket(configuracion, wsaa.SERVICIO_WSFE)
+        except afip_soap.ErrorAFIP as e:
             return Response(
-                {"error": f"Error al conectar con AFIP: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": f"Error al conectar con AFIP: {str(e)}", "codigo": e.codigo},
+                status=status.HTTP_502_BAD_GATEWAY
             )
 
+        return Response({
+            "mensaje": "Conexión exitosa con AFIP",
+            "ambiente": configuracion.get_ambiente_display(),
+            "cuit": configuracion.cuit,
+            "estado": "OK",
+            "servidores": servidores,
+            "vencimiento_ticket": ticket.expiracion,
+        })
+
 
 class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar facturas electrónicas AFIP"""
     modulo_requerido = 'finanzas'
     permission_classes = [IsAuthenticated]
-    queryset = FacturaElectronica.objects.select_related("configuracion_afip", "venta").prefetch_related("detalles", "logs")
+    queryset = FacturaElectronica.objects.select_related(
+        "configuracion_afip", "venta__cliente"
+    ).prefetch_related("detalles")
     serializer_class = FacturaElectronicaSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ["tipo_comprobante", "estado", "configuracion_afip", "fecha_emision"]
@@ -1645,6 +1449,30 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     ordering_fields = ["fecha_emision", "numero_comprobante", "importe_total"]
     ordering = ["-fecha_emision", "-numero_comprobante"]
 
+    def get_serializer_class(self):
+        """En listados no van los logs completos (ver get_queryset)"""
+        if self.action == 'list':
+            return FacturaElectronicaListSerializer
+        return FacturaElectronicaSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Cantidad y último resultado con subqueries por el índice
+            # (factura, -fecha_hora), sin traer los logs
+            logs = LogAFIP.objects.filter(factura=OuterRef("pk")).order_by()
+            return queryset.annotate(
+                cantidad_logs=Coalesce(Subquery(
+                    logs.values("factura").annotate(cantidad=Count("id")).values("cantidad")
+                ), 0),
+                ultimo_resultado_afip=Subquery(
+                    logs.order_by("-fecha_hora", "-id").values("resultado")[:1]
+                ),
+            )
+        if self.action == 'retrieve':
+            return queryset.prefetch_related("logs")
+        return queryset
+
     @action(detail=False, methods=['post'])
     def crear_desde_venta(self, request):
         """Crear factura electrónica desde una venta existente"""
@@ -1667,76 +1495,25 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def autorizar_lote(self, request):
-        """Autorizar un lote de facturas con AFIP"""
+        """Autorizar un lote de facturas con AFIP (ver wsfe.py)"""
         serializer = AutorizarFacturaSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         facturas_ids = serializer.validated_data['facturas_ids']
-        facturas = FacturaElectronica.objects.filter(id__in=facturas_ids)
-
-        resultados = []
-        facturas_autorizadas = 0
-
-        for factura in facturas:
-            try:
-                # Aquí iría la lógica real de autorización con AFIP
-                # Por ahora simularemos una autorización exitosa
-
-                # Simular generación de CAE
-                import random
-                cae = f"{random.randint(10000000000000, 99999999999999)}"
-                fecha_vencimiento_cae = factura.fecha_emision + timedelta(days=10)
-
-                # Actualizar factura
-                factura.estado = FacturaElectronica.Estado.APROBADO
-                factura.cae = cae
-                factura.fecha_vencimiento_cae = fecha_vencimiento_cae
-                factura.fecha_autorizacion = datetime.now()
-                factura.save()
-
-                # Crear log
-                LogAFIP.objects.create(
-                    factura=factura,
-                    accion="Autorización",
-                    resultado="OK",
-                    mensaje=f"Factura autorizada con CAE {cae}"
-                )
-
-                resultados.append({
-                    "factura_id": factura.id,
-                    "numero_completo": factura.numero_completo,
-                    "estado": "AUTORIZADA",
-                    "cae": cae,
-                    "mensaje": "Autorización exitosa"
-                })
-
-                facturas_autorizadas += 1
-
-            except Exception as e:
-                factura.estado = FacturaElectronica.Estado.RECHAZADO
-                factura.observaciones_afip = str(e)
-                factura.save()
-
-                # Crear log de error
-                LogAFIP.objects.create(
-                    factura=factura,
-                    accion="Autorización",
-                    resultado="ERROR",
-                    mensaje=str(e)
-                )
+        facturas = (
+            FacturaElectronica.objects.filter(id__in=facturas_ids)
+            .select_related("configuracion_afip")
+            .prefetch_related("detalles")
+        )
 
-                resultados.append({
-                    "factura_id": factura.id,
-                    "numero_completo": factura.numero_completo,
-                    "estado": "ERROR",
-                    "mensaje": str(e)
-                })
+        resultados = wsfe.autorizar(facturas)
+        facturas_autorizadas = sum(1 for resultado in resultados if resultado["estado"] == "AUTORIZADA")
 
         return Response({
-            "mensaje": f"Proceso completado. {facturas_autorizadas} de {len(facturas)} facturas autorizadas",
+            "mensaje": f"Proceso completado. {facturas_autorizadas} de {len(resultados)} facturas autorizadas",
             "facturas_autorizadas": facturas_autorizadas,
-            "total_facturas": len(facturas),
+            "total_facturas": len(resultados),
             "resultados": resultados
         })
 
@@ -1748,6 +1525,7 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         if factura.estado not in [
             FacturaElectronica.Estado.BORRADOR,
             FacturaElectronica.Estado.PENDIENTE,
+            FacturaElectronica.Estado.ENVIADO,
             FacturaElectronica.Estado.RECHAZADO
         ]:
             return Response(
@@ -1755,54 +1533,25 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            # Aquí iría la lógica real de autorización con AFIP
-            # Por ahora simularemos una autorización exitosa
-
-            import random
-            cae = f"{random.randint(10000000000000, 99999999999999)}"
-            fecha_vencimiento_cae = factura.fecha_emision + timedelta(days=10)
-
-            factura.estado = FacturaElectronica.Estado.APROBADO
-            factura.cae = cae
-            factura.fecha_vencimiento_cae = fecha_vencimiento_cae
-            factura.fecha_autorizacion = datetime.now()
-            factura.save()
-
-            # Crear log
-            LogAFIP.objects.create(
-                factura=factura,
-                accion="Autorización Individual",
-                resultado="OK",
-                mensaje=f"Factura autorizada con CAE {cae}"
-            )
-
+        resultado, = wsfe.autorizar([factura], accion="Autorización Individual")
+        if resultado["estado"] == "AUTORIZADA":
+            factura = self.get_queryset().get(pk=factura.pk)
             return Response({
                 "mensaje": "Factura autorizada correctamente",
                 "factura": FacturaElectronicaSerializer(factura).data
             })
 
-        except Exception as e:
-            factura.estado = FacturaElectronica.Estado.RECHAZADO
-            factura.observaciones_afip = str(e)
-            factura.save()
-
-            # Crear log de error
-            LogAFIP.objects.create(
-                factura=factura,
-                accion="Autorización Individual",
-                resultado="ERROR",
-                mensaje=str(e)
-            )
-
-            return Response(
-                {"error": f"Error al autorizar factura: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        return Response(
+            {"error": f"Error al autorizar factura: {resultado['mensaje']}"},
+            status=(
+                status.HTTP_502_BAD_GATEWAY if resultado["estado"] == "ERROR"
+                else status.HTTP_400_BAD_REQUEST
             )
+        )
 
     @action(detail=True, methods=['get'])
     def generar_pdf(self, request, pk=None):
-        """Generar PDF de la factura electrónica"""
+        """Generar PDF de la factura electrónica (ver facturas_pdf.py)"""
         factura = self.get_object()
 
         if not factura.cae:
@@ -1811,24 +1560,82 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            # Aquí iría la lógica para generar el PDF real
-            # Por ahora retornamos un enlace simulado
-            pdf_url = f"/api/finanzas/facturas-electronicas/{factura.id}/pdf/"
+        _, reutilizado = facturas_pdf.generar(factura)
+        return Response({
+            "mensaje": "PDF generado correctamente",
+            "pdf_url": f"/api/finanzas/facturas-electronicas/{factura.id}/pdf/",
+            "reutilizado": reutilizado,
+            "factura": FacturaElectronicaSerializer(factura).data
+        })
 
-            return Response({
-                "mensaje": "PDF generado correctamente",
-                "pdf_url": pdf_url,
-                "factura": FacturaElectronicaSerializer(factura).data
-            })
+    @action(detail=True, methods=['get'])
+    def pdf(self, request, pk=None):
+        """Descargar el PDF de la factura electrónica"""
+        factura = self.get_object()
 
-        except Exception as e:
+        if not factura.cae:
             return Response(
-                {"error": f"Error al generar PDF: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": "La factura debe estar autorizada para generar PDF"},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        ruta, _ = facturas_pdf.generar(factura)
+        return FileResponse(
+            open(ruta, "rb"),
+            content_type="application/pdf",
+            filename=f"factura_{factura.numero_completo.replace('-', '_')}.pdf"
+        )
+
+    @action(detail=False, methods=['post'])
+    def generar_pdfs_lote(self, request):
+        """Generar los PDF de un lote de facturas autorizadas"""
+        serializer = GenerarPDFsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        facturas_ids = serializer.validated_data['facturas_ids']
+        facturas = (
+            FacturaElectronica.objects.filter(id__in=facturas_ids)
+            .select_related("configuracion_afip")
+            .prefetch_related("detalles")
+            .order_by("id")
+        )
+
+        resultados = [
+            {
+                "factura_id": factura_id,
+                "pdf_url": f"/api/finanzas/facturas-electronicas/{factura_id}/pdf/",
+                "reutilizado": reutilizado,
+            }
+            for factura_id, _, reutilizado in facturas_pdf.generar_lote(list(facturas))
+        ]
+        reutilizados = sum(1 for resultado in resultados if resultado["reutilizado"])
+
+        return Response({
+            "mensaje": f"{len(resultados)} PDF listos ({reutilizados} reutilizados)",
+            "generados": len(resultados) - reutilizados,
+            "reutilizados": reutilizados,
+            "resultados": resultados
+        })
+
+    @action(detail=False, methods=['get'])
+    def huecos_numeracion(self, request):
+        """Números faltantes por punto de venta y tipo de comprobante (ver numeracion.py)"""
+        # Sólo filtros de grupo: filtrar por fecha o estado inventaría huecos
+        filtros = {
+            campo: request.query_params[campo]
+            for campo in ("configuracion_afip", "punto_venta", "tipo_comprobante")
+            if request.query_params.get(campo)
+        }
+        huecos = numeracion.huecos(FacturaElectronica.objects.filter(**filtros))
+        return Response({
+            "total_huecos": len(huecos),
+            "comprobantes_faltantes": sum(hueco["hasta"] - hueco["desde"] + 1 for hueco in huecos),
+            "huecos": huecos
+        })
+
     @action(detail=False, methods=['get'])
+    @cachear_reporte(depende_de=('finanzas_reportes.FacturaElectronica',))
     def estadisticas(self, request):
         """Estadísticas de facturación electrónica"""
         # Parámetros de fecha
@@ -1842,25 +1649,20 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         if fecha_hasta:
             queryset = queryset.filter(fecha_emision__lte=fecha_hasta)
 
-        # Estadísticas por estado
-        stats_estado = queryset.values('estado').annotate(
-            cantidad=Count('id'),
-            total_importe=Sum('importe_total')
-        ).order_by('estado')
-
-        # Estadísticas por tipo de comprobante
-        stats_tipo = queryset.values('tipo_comprobante').annotate(
-            cantidad=Count('id'),
-            total_importe=Sum('importe_total')
-        ).order_by('tipo_comprobante')
-
-        # Resumen general
-        resumen = queryset.aggregate(
-            total_facturas=Count('id'),
-            total_importe=Sum('importe_total'),
-            facturas_autorizadas=Count('id', filter=Q(estado=FacturaElectronica.Estado.APROBADO)),
-            facturas_rechazadas=Count('id', filter=Q(estado=FacturaElectronica.Estado.RECHAZADO))
-        )
+        # Resumen general, por estado y por tipo de comprobante en una sola consulta
+        reporte = Reporte(
+            queryset,
+            metricas={
+                'cantidad': Conteo(),
+                'total_importe': Suma('importe_total'),
+                'facturas_autorizadas': Conteo(filtro=Q(estado=FacturaElectronica.Estado.APROBADO)),
+                'facturas_rechazadas': Conteo(filtro=Q(estado=FacturaElectronica.Estado.RECHAZADO)),
+            },
+            agrupaciones=[(), ('estado',), ('tipo_comprobante',)],
+        ).ejecutar()
+        resumen = reporte.totales
+        stats_estado = reporte.por('estado')
+        stats_tipo = reporte.por('tipo_comprobante')
 
         return Response({
             'periodo': {
@@ -1868,20 +1670,20 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 'fecha_hasta': fecha_hasta
             },
             'resumen': {
-                'total_facturas': resumen['total_facturas'],
-                'total_importe': float(resumen['total_importe'] or 0),
+                'total_facturas': resumen['cantidad'],
+                'total_importe': float(resumen['total_importe']),
                 'facturas_autorizadas': resumen['facturas_autorizadas'],
                 'facturas_rechazadas': resumen['facturas_rechazadas'],
                 'tasa_autorizacion': (
-                    resumen['facturas_autorizadas'] / resumen['total_facturas'] * 100
-                    if resumen['total_facturas'] > 0 else 0
+                    resumen['facturas_autorizadas'] / resumen['cantidad'] * 100
+                    if resumen['cantidad'] > 0 else 0
                 )
             },
             'por_estado': [
                 {
                     'estado': item['estado'],
                     'cantidad': item['cantidad'],
-                    'total_importe': float(item['total_importe'] or 0)
+                    'total_importe': float(item['total_importe'])
                 }
                 for item in stats_estado
             ],
@@ -1889,7 +1691,7 @@ class FacturaElectronicaViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 {
                     'tipo_comprobante': item['tipo_comprobante'],
                     'cantidad': item['cantidad'],
-                    'total_importe': float(item['total_importe'] or 0)
+                    'total_importe': float(item['total_importe'])
                 }
                 for item in stats_tipo
             ]
@@ -1922,6 +1724,73 @@ class LogAFIPViewSet(ModulePermissionMixin, viewsets.ReadOnlyModelViewSet):
     ordering = ["-fecha_hora"]
 
 
+class MovimientoCuentaCorrienteViewSet(ModulePermissionMixin, viewsets.ReadOnlyModelViewSet):
+    """Cuenta corriente de clientes (solo lectura, ver cuenta_corriente.py)"""
+    modulo_requerido = 'finanzas'
+    permission_classes = [IsAuthenticated]
+    queryset = MovimientoCuentaCorriente.objects.all()
+    serializer_class = MovimientoCuentaCorrienteSerializer
+    pagination_class = PaginacionKeyset
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["cliente", "tipo", "venta", "pago"]
+
+    @action(detail=False, methods=['get'], url_path='estado-de-cuenta')
+    def estado_de_cuenta(self, request):
+        """
+        Movimientos de un cliente entre fecha_desde y fecha_hasta (opcionales),
+        paginados por cursor, con el saldo anterior al rango y el saldo al
+        cierre del rango.
+        """
+        cliente = request.query_params.get('cliente')
+        if not cliente or not cliente.isdigit():
+            return Response({'detail': 'Indicá el cliente (?cliente=ID)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fechas = {}
+        for parametro in ('fecha_desde', 'fecha_hasta'):
+            valor = request.query_params.get(parametro)
+            fechas[parametro] = None
+            if valor:
+                try:
+                    fechas[parametro] = datetime.strptime(valor, '%Y-%m-%d').date()
+                except ValueError:
+                    return Response(
+                        {'detail': f'{parametro} invalida. Usa formato AAAA-MM-DD'},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+        desde, hasta = fechas['fecha_desde'], fechas['fecha_hasta']
+        if desde and hasta and hasta < desde:
+            return Response(
+                {'detail': "El rango de fechas es invalido. 'fecha_hasta' debe ser igual o posterior a 'fecha_desde'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cliente = int(cliente)
+        pagina = self.paginate_queryset(cuenta_corriente.movimientos(cliente, desde, hasta))
+        respuesta = self.get_paginated_response(self.get_serializer(pagina, many=True).data)
+        respuesta.data = {
+            'cliente': cliente,
+            'fecha_desde': desde,
+            'fecha_hasta': hasta,
+            # Saldos de la fila anterior a cada extremo: sin sumar la historia
+            'saldo_anterior': cuenta_corriente.saldo_al(cliente, desde, antes=True) if desde else Decimal('0.00'),
+            'saldo_final': cuenta_corriente.saldo_al(cliente, hasta),
+            **respuesta.data,
+        }
+        return respuesta
+
+
+# Totales de los libros IVA (ventas y compras comparten los mismos campos)
+METRICAS_LIBRO_IVA = {
+    'total_operaciones': Conteo(),
+    'operaciones_con_iva': Conteo(filtro=Q(incluye_iva=True)),
+    'operaciones_sin_iva': Conteo(filtro=Q(incluye_iva=False)),
+    'total_gravado': Suma('subtotal', filtro=Q(incluye_iva=True)),
+    'total_iva': Suma('iva_monto', filtro=Q(incluye_iva=True)),
+    'total_exento': Suma('total', filtro=Q(incluye_iva=False)),
+    'total_general': Suma('total'),
+}
+
+
 class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar períodos de IVA"""
     modulo_requerido = 'finanzas'
@@ -2011,6 +1880,7 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"], url_path="resumen-iva")
+    @cachear_reporte(depende_de=('finanzas_reportes.PeriodoIVA', 'finanzas_reportes.PagoIVA'))
     def resumen_iva(self, request):
         """Obtiene resumen de IVA pendiente de pago"""
         from django.db.models import Sum
@@ -2020,9 +1890,15 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             estado__in=[PeriodoIVA.Estado.ABIERTO, PeriodoIVA.Estado.CERRADO]
         )
 
-        total_debito = periodos_pendientes.aggregate(total=Sum('iva_debito_fiscal'))['total'] or Decimal("0")
-        total_credito = periodos_pendientes.aggregate(total=Sum('iva_credito_fiscal'))['total'] or Decimal("0")
-        total_saldo_fisco = periodos_pendientes.aggregate(total=Sum('saldo_favor_fisco'))['total'] or Decimal("0")
+        totales = Reporte(periodos_pendientes, metricas={
+            'debito': Suma('iva_debito_fiscal'),
+            'credito': Suma('iva_credito_fiscal'),
+            'saldo_fisco': Suma('saldo_favor_fisco'),
+            'cantidad': Conteo(),
+        }).ejecutar()
+        total_debito = totales['debito']
+        total_credito = totales['credito']
+        total_saldo_fisco = totales['saldo_fisco']
 
         # Total pagado en esos períodos
         total_pagado = PagoIVA.objects.filter(
@@ -2037,11 +1913,13 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             "saldo_favor_fisco": str(total_saldo_fisco),
             "total_pagado": str(total_pagado),
             "saldo_pendiente_pago": str(saldo_pendiente_pago),
-            "cantidad_periodos_pendientes": periodos_pendientes.count(),
+            "cantidad_periodos_pendientes": totales['cantidad'],
             "periodos": self.get_serializer(periodos_pendientes, many=True).data
         })
 
     @action(detail=True, methods=["get"], url_path="libro-iva-ventas")
+    @en_segundo_plano
+    @cachear_reporte(depende_de=('finanzas_reportes.PeriodoIVA', 'ventas.Venta', 'clientes.Cliente'))
     def libro_iva_ventas(self, request, pk=None):
         """Genera el libro IVA de ventas para el período"""
         from ventas.models import Venta
@@ -2054,15 +1932,8 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             fecha__lte=periodo.fecha_hasta
         ).select_related('cliente').order_by('fecha', 'id')
 
-        # Calcular totales
-        total_ventas = ventas.count()
-        ventas_con_iva = ventas.filter(incluye_iva=True)
-        ventas_sin_iva = ventas.filter(incluye_iva=False)
-
-        total_gravado = ventas_con_iva.aggregate(total=Sum('subtotal'))['total'] or Decimal("0")
-        total_iva = ventas_con_iva.aggregate(total=Sum('iva_monto'))['total'] or Decimal("0")
-        total_exento = ventas_sin_iva.aggregate(total=Sum('total'))['total'] or Decimal("0")
-        total_general = ventas.aggregate(total=Sum('total'))['total'] or Decimal("0")
+        # Calcular totales en una sola consulta
+        totales = Reporte(ventas, metricas=METRICAS_LIBRO_IVA).ejecutar()
 
         # Serializar ventas
         ventas_data = []
@@ -2088,18 +1959,20 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 'fecha_hasta': periodo.fecha_hasta
             },
             'resumen': {
-                'total_operaciones': total_ventas,
-                'operaciones_con_iva': ventas_con_iva.count(),
-                'operaciones_sin_iva': ventas_sin_iva.count(),
-                'total_gravado': str(total_gravado),
-                'total_iva': str(total_iva),
-                'total_exento': str(total_exento),
-                'total_general': str(total_general)
+                'total_operaciones': totales['total_operaciones'],
+                'operaciones_con_iva': totales['operaciones_con_iva'],
+                'operaciones_sin_iva': totales['operaciones_sin_iva'],
+                'total_gravado': str(totales['total_gravado']),
+                'total_iva': str(totales['total_iva']),
+                'total_exento': str(totales['total_exento']),
+                'total_general': str(totales['total_general'])
             },
             'ventas': ventas_data
         })
 
     @action(detail=True, methods=["get"], url_path="libro-iva-compras")
+    @en_segundo_plano
+    @cachear_reporte(depende_de=('finanzas_reportes.PeriodoIVA', 'compras.Compra', 'proveedores.Proveedor'))
     def libro_iva_compras(self, request, pk=None):
         """Genera el libro IVA de compras para el período"""
         from compras.models import Compra
@@ -2112,15 +1985,8 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
             fecha__lte=periodo.fecha_hasta
         ).select_related('proveedor', 'categoria').order_by('fecha', 'id')
 
-        # Calcular totales
-        total_compras = compras.count()
-        compras_con_iva = compras.filter(incluye_iva=True)
-        compras_sin_iva = compras.filter(incluye_iva=False)
-
-        total_gravado = compras_con_iva.aggregate(total=Sum('subtotal'))['total'] or Decimal("0")
-        total_iva = compras_con_iva.aggregate(total=Sum('iva_monto'))['total'] or Decimal("0")
-        total_exento = compras_sin_iva.aggregate(total=Sum('total'))['total'] or Decimal("0")
-        total_general = compras.aggregate(total=Sum('total'))['total'] or Decimal("0")
+        # Calcular totales en una sola consulta
+        totales = Reporte(compras, metricas=METRICAS_LIBRO_IVA).ejecutar()
 
         # Serializar compras
         compras_data = []
@@ -2147,17 +2013,58 @@ class PeriodoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
                 'fecha_hasta': periodo.fecha_hasta
             },
             'resumen': {
-                'total_operaciones': total_compras,
-                'operaciones_con_iva': compras_con_iva.count(),
-                'operaciones_sin_iva': compras_sin_iva.count(),
-                'total_gravado': str(total_gravado),
-                'total_iva_credito': str(total_iva),
-                'total_exento': str(total_exento),
-                'total_general': str(total_general)
+                'total_operaciones': totales['total_operaciones'],
+                'operaciones_con_iva': totales['operaciones_con_iva'],
+                'operaciones_sin_iva': totales['operaciones_sin_iva'],
+                'total_gravado': str(totales['total_gravado']),
+                'total_iva_credito': str(totales['total_iva']),
+                'total_exento': str(totales['total_exento']),
+                'total_general': str(totales['total_general'])
             },
             'compras': compras_data
         })
 
+    def _exportar_libro(self, request, filas_libro, nombre):
+        periodo = self.get_object()
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in exportacion.FORMATOS:
+            return Response(
+                {"detail": f"formato debe ser uno de: {', '.join(exportacion.FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        encabezados, filas = filas_libro(periodo)
+        return exportacion.respuesta_streaming(
+            formato, f"{nombre}_{periodo.anio}_{periodo.mes:02d}", encabezados, filas
+        )
+
+    @action(detail=True, methods=["get"], url_path="libro-iva-ventas/exportar")
+    def exportar_libro_iva_ventas(self, request, pk=None):
+        """
+        Descarga el libro IVA de ventas en CSV o XLSX (?formato=csv|xlsx).
+
+        Se genera en streaming con los totales al final del archivo.
+        """
+        return self._exportar_libro(request, exportacion.filas_libro_iva_ventas, "libro_iva_ventas")
+
+    @action(detail=True, methods=["get"], url_path="libro-iva-compras/exportar")
+    def exportar_libro_iva_compras(self, request, pk=None):
+        """
+        Descarga el libro IVA de compras en CSV o XLSX (?formato=csv|xlsx).
+
+        Se genera en streaming con los totales al final del archivo.
+        """
+        return self._exportar_libro(request, exportacion.filas_libro_iva_compras, "libro_iva_compras")
+
+    @action(detail=True, methods=["get"], url_path="libro-iva-digital")
+    def libro_iva_digital(self, request, pk=None):
+        """
+        Descarga el Libro IVA Digital del período: un ZIP con los TXT de
+        comprobantes y alícuotas de ventas y compras (RG 4597).
+
+        Se genera en streaming, en una pasada por ventas y otra por compras.
+        """
+        return libro_iva_digital.respuesta_streaming(self.get_object())
+
 
 class PagoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar pagos de IVA"""
@@ -2170,3 +2077,36 @@ class PagoIVAViewSet(ModulePermissionMixin, viewsets.ModelViewSet):
     search_fields = ["numero_comprobante", "observaciones"]
     ordering_fields = ["fecha_pago", "monto"]
     ordering = ["-fecha_pago"]
+
+
+class TrabajoReporteViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de reportes ejecutados en segundo plano (ver trabajos.py).
+
+    Cada usuario ve sólo sus trabajos; los permisos de módulo se verifican
+    al ejecutar el reporte original.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TrabajoReporteSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ["estado"]
+    ordering = ["-fecha_creacion"]
+
+    def get_queryset(self):
+        return TrabajoReporte.objects.filter(usuario=self.request.user).defer("resultado")
+
+    @action(detail=True, methods=["get"])
+    def resultado(self, request, pk=None):
+        """Devuelve la respuesta original del reporte una vez terminado"""
+        trabajo = TrabajoReporte.objects.filter(usuario=request.user, pk=pk).first()
+        if trabajo is None:
+            return Response({"error": "Trabajo no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        if trabajo.estado in (TrabajoReporte.Estado.PENDIENTE, TrabajoReporte.Estado.EN_PROCESO):
+            return Response(self.get_serializer(trabajo).data, status=status.HTTP_202_ACCEPTED)
+        if trabajo.codigo_respuesta is None:
+            return Response(self.get_serializer(trabajo).data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return HttpResponse(
+            trabajos.resultado(trabajo),
+            status=trabajo.codigo_respuesta,
+            content_type=trabajo.tipo_contenido or "application/json",
+        )
@@ -0,0 +1,231 @@
+"""
+Autenticación con el WSAA de AFIP (ticket de acceso).
+
+Para llamar a un servicio (wsfe) hace falta un token y un sign que da el
+WSAA: se arma un TRA (loginTicketRequest), se firma como CMS con el
+certificado y la clave privada de la ConfiguracionAFIP y se envía a
+loginCms. El ticket vale varias horas.
+
+obtener_ticket() no hace login en cada llamada: el ticket se guarda en el
+cache de Django (alias AFIP_TICKETS_CACHE) por CUIT, servicio y ambiente,
+compartido por todos los workers. WSAA además rechaza un login nuevo
+mientras el certificado tiene un ticket vigente, así que no alcanza con
+un cache por proceso.
+
+- Renovación anticipada: a menos de MARGEN_RENOVACION del vencimiento se
+  pide uno nuevo, pero mientras tanto se sigue usando el vigente. Si el
+  login falla (WSAA puede contestar que el ticket sigue vigente) no se
+  reintenta hasta PAUSA_RENOVACION después.
+- Single-flight: sólo un proceso hace el login, el que obtiene el lock
+  (cache.add, atómico en Redis). Si no hay ticket vigente, el resto
+  espera hasta ESPERA_LOGIN a que aparezca en el cache.
+"""
+
+import base64
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from . import afip_soap
+from .afip_soap import ErrorAFIP
+
+NS = "http://wsaa.view.sua.dvadac.desein.afip.gov"
+
+URLS = {
+    "testing": "https://wsaahomo.afip.gov.ar/ws/services/LoginCms",
+    "production": "https://wsaa.afip.gov.ar/ws/services/LoginCms",
+}
+
+SERVICIO_WSFE = "wsfe"
+
+# Vigencia pedida para el ticket (AFIP admite hasta 24 h)
+DURACION_TICKET = timedelta(hours=12)
+
+# Con menos vigencia que esto se renueva el ticket
+MARGEN_RENOVACION = timedelta(minutes=30)
+
+# Segundos entre intentos de renovación anticipada fallidos
+PAUSA_RENOVACION = 60
+
+# Segundos que dura el lock del login (más que el timeout de AFIP)
+DURACION_LOCK = 60
+
+# Segundos que se espera el login de otro proceso cuando no hay ticket
+ESPERA_LOGIN = 30
+INTERVALO_ESPERA = 0.2
+
+
+class Ticket:
+    """Ticket de acceso a un servicio de AFIP."""
+
+    def __init__(self, token, sign, expiracion):
+        self.token = token
+        self.sign = sign
+        self.expiracion = expiracion
+
+    def vigente(self, margen=timedelta(0)):
+        return self.expiracion - margen > timezone.now()
+
+    def como_dict(self):
+        return {"token": self.token, "sign": self.sign, "expiracion": self.expiracion.isoformat()}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos["token"], datos["sign"], datetime.fromisoformat(datos["expiracion"]))
+
+
+def url_wsaa(configuracion):
+    return getattr(settings, "AFIP_WSAA_URL", "") or URLS[configuracion.ambiente]
+
+
+def generar_tra(servicio, ahora=None):
+    """XML del loginTicketRequest para `servicio`."""
+    ahora = ahora or timezone.now()
+    raiz = ET.Element("loginTicketRequest", version="1.0")
+    encabezado = ET.SubElement(raiz, "header")
+    ET.SubElement(encabezado, "uniqueId").text = str(int(ahora.timestamp()))
+    # Margen por diferencias de reloj con AFIP
+    ET.SubElement(encabezado, "generationTime").text = (ahora - timedelta(minutes=10)).isoformat()
+    ET.SubElement(encabezado, "expirationTime").text = (ahora + DURACION_TICKET).isoformat()
+    ET.SubElement(raiz, "service").text = servicio
+    return ET.tostring(raiz, encoding="utf-8", xml_declaration=True)
+
+
+def firmar_tra(tra, configuracion):
+    """CMS (PKCS#7 firmado, DER en base64) del TRA con el certificado de la configuración."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.serialization import pkcs7
+
+    try:
+        with open(configuracion.certificado_path, "rb") as archivo:
+            certificado = x509.load_pem_x509_certificate(archivo.read())
+        with open(configuracion.clave_privada_path, "rb") as archivo:
+            clave = serialization.load_pem_private_key(archivo.read(), password=None)
+    except (OSError, ValueError) as e:
+        raise ErrorAFIP(f"No se pudo leer el certificado o la clave de AFIP: {e}")
+
+    cms = (
+        pkcs7.PKCS7SignatureBuilder()
+        .set_data(tra)
+        .add_signer(certificado, clave, hashes.SHA256())
+        .sign(serialization.Encoding.DER, [])
+    )
+    return base64.b64encode(cms).decode()
+
+
+def login(configuracion, servicio=SERVICIO_WSFE):
+    """
+    Pide un ticket nuevo al WSAA.
+
+    Raises:
+        ErrorAFIP: Certificado ilegible o login rechazado.
+        ErrorComunicacion: WSAA sin respuesta.
+    """
+    cuerpo = ET.Element(f"{{{NS}}}loginCms")
+    afip_soap.agregar(cuerpo, NS, "in0", firmar_tra(generar_tra(servicio), configuracion))
+    respuesta = afip_soap.llamar(url_wsaa(configuracion), "", cuerpo)
+
+    # loginCmsReturn trae el loginTicketResponse como texto
+    retorno = respuesta.cuerpo.findtext(f"{{{NS}}}loginCmsReturn") or respuesta.cuerpo.findtext("loginCmsReturn")
+    try:
+        ticket = ET.fromstring(retorno.encode())
+        token = ticket.findtext("credentials/token")
+        sign = ticket.findtext("credentials/sign")
+        expiracion = datetime.fromisoformat(ticket.findtext("header/expirationTime"))
+    except (AttributeError, ET.ParseError, TypeError, ValueError):
+        raise ErrorAFIP("Respuesta de WSAA inválida")
+    if not token or not sign:
+        raise ErrorAFIP("WSAA no devolvió credenciales")
+    return Ticket(token, sign, expiracion)
+
+
+# ============================================================================
+# CACHE DE TICKETS
+# ============================================================================
+
+def _cache():
+    return caches[getattr(settings, "AFIP_TICKETS_CACHE", "default")]
+
+
+def _clave(configuracion, servicio):
+    return f"afip:wsaa:{configuracion.cuit}:{servicio}:{configuracion.ambiente}"
+
+
+def _ticket_guardado(clave):
+    datos = _cache().get(clave)
+    return Ticket.desde_dict(datos) if datos else None
+
+
+def _guardar(clave, ticket):
+    segundos = int((ticket.expiracion - timezone.now()).total_seconds())
+    if segundos > 0:
+        _cache().set(clave, ticket.como_dict(), timeout=segundos)
+
+
+def _renovar(configuracion, servicio, clave):
+    """
+    Login si este proceso obtiene el lock.
+
+    Returns:
+        Ticket | None: None si otro proceso ya está haciendo el login
+    """
+    lock, dueno = f"{clave}:lock", uuid.uuid4().hex
+    if not _cache().add(lock, dueno, timeout=DURACION_LOCK):
+        return None
+    try:
+        # Otro proceso pudo haberlo renovado entre la lectura y el lock
+        ticket = _ticket_guardado(clave)
+        if ticket is None or not ticket.vigente(MARGEN_RENOVACION):
+            ticket = login(configuracion, servicio)
+            _guardar(clave, ticket)
+        return ticket
+    finally:
+        if _cache().get(lock) == dueno:
+            _cache().delete(lock)
+
+
+def obtener_ticket(configuracion, servicio=SERVICIO_WSFE):
+    """
+    Ticket vigente para `servicio` con las credenciales de `configuracion`.
+
+    Raises:
+        ErrorAFIP: Login rechazado, o no hay ticket y otro proceso no
+        terminó su login a tiempo.
+    """
+    clave = _clave(configuracion, servicio)
+    ticket = _ticket_guardado(clave)
+    if ticket is not None and ticket.vigente(MARGEN_RENOVACION):
+        return ticket
+
+    if ticket is not None and ticket.vigente():
+        # Por vencer: lo renueva quien tome el lock, el resto sigue con este
+        if _cache().get(f"{clave}:pausa"):
+            return ticket
+        try:
+            return _renovar(configuracion, servicio, clave) or ticket
+        except ErrorAFIP:
+            _cache().set(f"{clave}:pausa", True, timeout=PAUSA_RENOVACION)
+            return ticket
+
+    limite = time.monotonic() + ESPERA_LOGIN
+    while True:
+        ticket = _renovar(configuracion, servicio, clave)
+        if ticket is not None:
+            return ticket
+        if time.monotonic() >= limite:
+            raise ErrorAFIP("Otro proceso está obteniendo el ticket de acceso de AFIP; reintentar")
+        time.sleep(INTERVALO_ESPERA)
+        ticket = _ticket_guardado(clave)
+        if ticket is not None and ticket.vigente():
+            return ticket
+
+
+def invalidar_ticket(configuracion, servicio=SERVICIO_WSFE):
+    """Descarta el ticket guardado (por ejemplo, si AFIP lo rechazó)."""
+    _cache().delete(_clave(configuracion, servicio))
@@ -0,0 +1,583 @@
+"""
+Autorización de comprobantes con el WSFEv1 de AFIP (CAE).
+
+autorizar(facturas) agrupa las facturas por (configuración, punto de
+venta, tipo de comprobante) y las envía en solicitudes FECAESolicitar de
+hasta MAX_POR_SOLICITUD comprobantes, numeradas con numeracion.numerar() a
+continuación del último autorizado (FECompUltimoAutorizado). Las llamadas
+comparten la conexión persistente de afip_soap y se reintentan ante
+errores de red.
+
+Rechazos parciales: AFIP aprueba o rechaza cada comprobante por separado.
+Los aprobados guardan su CAE; un rechazo deja sin usar su número, así que
+los siguientes de la solicitud vuelven con el error de numeración
+(ERROR_NUMERACION). Esos se reenvían una vez con números nuevos; los
+rechazados por otro motivo quedan RECHAZADO con las observaciones de AFIP.
+
+Antes de enviar, las facturas quedan ENVIADO con su número. Si no hubo
+respuesta (o la respuesta llegó después de un reintento), AFIP pudo haber
+autorizado el comprobante: antes de volver a numerarlo se consulta con
+FECompConsultar y, si AFIP lo tiene con el mismo documento, fecha e
+importe, se toma ese CAE en lugar de autorizarlo dos veces.
+
+Los resultados de cada solicitud se guardan con un bulk_update y los
+LogAFIP con un bulk_create.
+"""
+
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import afip_soap, cache_reportes, numeracion, wsaa
+from .afip_soap import ErrorAFIP, ErrorComunicacion
+
+NS = "http://ar.gov.afip.dif.FEV1/"
+
+URLS = {
+    "testing": "https://wswhomo.afip.gov.ar/wsfev1/service.asmx",
+    "production": "https://servicios1.afip.gov.ar/wsfev1/service.asmx",
+}
+
+# Comprobantes por FECAESolicitar (FECompTotXRequest)
+MAX_POR_SOLICITUD = 250
+
+# Token o sign inválidos
+ERROR_TICKET = "600"
+
+# "El número o fecha del comprobante no se corresponde con el próximo a autorizar"
+ERROR_NUMERACION = "10016"
+
+CONCEPTO_PRODUCTOS = 1
+MONEDA_PESOS = "PES"
+
+# Comprobantes C: sin IVA discriminado
+TIPOS_C = {"11", "12", "13"}
+TIPOS_A = {"1", "2", "3"}
+
+# Id de alícuota de IVA para AFIP
+ALICUOTAS_IVA = {
+    Decimal("0"): 3,
+    Decimal("10.5"): 4,
+    Decimal("21"): 5,
+    Decimal("27"): 6,
+    Decimal("5"): 8,
+    Decimal("2.5"): 9,
+}
+
+# Condición frente al IVA del receptor: los comprobantes A van a
+# responsables inscriptos; sin más datos, el resto a consumidor final
+CONDICION_IVA_INSCRIPTO = 1
+CONDICION_IVA_CONSUMIDOR_FINAL = 5
+
+CENTAVOS = Decimal("0.01")
+CERO = Decimal("0")
+
+CAMPOS_RESULTADO = [
+    "numero_comprobante", "estado", "cae", "fecha_vencimiento_cae",
+    "fecha_autorizacion", "observaciones_afip",
+]
+
+
+def url_wsfe(configuracion):
+    return getattr(settings, "AFIP_WSFE_URL", "") or URLS[configuracion.ambiente]
+
+
+def _importe(valor):
+    return f"{Decimal(valor).quantize(CENTAVOS):.2f}"
+
+
+def _fecha_afip(texto):
+    return datetime.strptime(texto, "%Y%m%d").date() if texto else None
+
+
+def _fecha_emision(factura):
+    # Recién creada, fecha_emision puede ser todavía el datetime del default
+    fecha = factura.fecha_emision
+    if isinstance(fecha, datetime):
+        return timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+    return fecha
+
+
+def _mensajes(elemento, contenedor, item):
+    """[(código, mensaje)] de Errors/Err, Observaciones/Obs o Events/Evt."""
+    if elemento is None:
+        return []
+    return [
+        (afip_soap.texto(nodo, NS, "Code"), afip_soap.texto(nodo, NS, "Msg"))
+        for nodo in elemento.findall(f"{{{NS}}}{contenedor}/{{{NS}}}{item}")
+    ]
+
+
+def _describir(mensajes):
+    return "; ".join(f"{codigo}: {mensaje}" for codigo, mensaje in mensajes)
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+class ResultadoComprobante:
+    """Respuesta de AFIP para un comprobante de un FECAESolicitar."""
+
+    def __init__(self, numero, resultado, cae="", vencimiento_cae=None, observaciones=()):
+        self.numero = numero
+        self.resultado = resultado
+        self.cae = cae
+        self.vencimiento_cae = vencimiento_cae
+        self.observaciones = list(observaciones)
+
+    @property
+    def aprobado(self):
+        return self.resultado == "A"
+
+    @property
+    def codigos(self):
+        return {codigo for codigo, _ in self.observaciones}
+
+
+class ClienteWSFE:
+    """Operaciones del WSFEv1 para una ConfiguracionAFIP."""
+
+    def __init__(self, configuracion):
+        self.configuracion = configuracion
+        self.url = url_wsfe(configuracion)
+        self._ticket = None
+
+    def _operacion(self, nombre):
+        operacion = ET.Element(f"{{{NS}}}{nombre}")
+        auth = afip_soap.agregar(operacion, NS, "Auth")
+        self._autenticar(auth)
+        return operacion
+
+    def _autenticar(self, auth):
+        if self._ticket is None or not self._ticket.vigente():
+            self._ticket = wsaa.obtener_ticket(self.configuracion, wsaa.SERVICIO_WSFE)
+        auth.clear()
+        afip_soap.agregar(auth, NS, "Token", self._ticket.token)
+        afip_soap.agregar(auth, NS, "Sign", self._ticket.sign)
+        afip_soap.agregar(auth, NS, "Cuit", self.configuracion.cuit)
+
+    def _enviar(self, nombre, operacion):
+        respuesta = afip_soap.llamar(self.url, f"{NS}{nombre}", operacion)
+        respuesta.resultado = respuesta.cuerpo.find(f"{{{NS}}}{nombre}Result")
+        if respuesta.resultado is None:
+            raise ErrorAFIP(f"Respuesta de {nombre} sin resultado")
+        return respuesta
+
+    def _llamar(self, nombre, operacion):
+        respuesta = self._enviar(nombre, operacion)
+        auth = operacion.find(f"{{{NS}}}Auth")
+        if auth is not None and ERROR_TICKET in {codigo for codigo, _ in self._errores(respuesta)}:
+            # Ticket rechazado (revocado o de otro certificado): uno nuevo y un reintento
+            wsaa.invalidar_ticket(self.configuracion, wsaa.SERVICIO_WSFE)
+            self._ticket = None
+            self._autenticar(auth)
+            respuesta = self._enviar(nombre, operacion)
+        return respuesta
+
+    @staticmethod
+    def _errores(respuesta):
+        return _mensajes(respuesta.resultado, "Errors", "Err")
+
+    def ultimo_autorizado(self, punto_venta, tipo):
+        """Número del último comprobante autorizado (0 si no hay)."""
+        operacion = self._operacion("FECompUltimoAutorizado")
+        afip_soap.agregar(operacion, NS, "PtoVta", punto_venta)
+        afip_soap.agregar(operacion, NS, "CbteTipo", tipo)
+        respuesta = self._llamar("FECompUltimoAutorizado", operacion)
+        errores = self._errores(respuesta)
+        if errores:
+            raise ErrorAFIP(_describir(errores), codigo=errores[0][0])
+        return int(afip_soap.texto(respuesta.resultado, NS, "CbteNro", default="0"))
+
+    def consultar(self, punto_venta, tipo, numero):
+        """
+        Datos de un comprobante ya emitido.
+
+        Returns:
+            dict | None: None si AFIP no lo tiene
+        """
+        operacion = self._operacion("FECompConsultar")
+        pedido = afip_soap.agregar(operacion, NS, "FeCompConsReq")
+        afip_soap.agregar(pedido, NS, "CbteTipo", tipo)
+        afip_soap.agregar(pedido, NS, "CbteNro", numero)
+        afip_soap.agregar(pedido, NS, "PtoVta", punto_venta)
+        respuesta = self._llamar("FECompConsultar", operacion)
+        comprobante = respuesta.resultado.find(f"{{{NS}}}ResultGet")
+        if comprobante is None:
+            return None
+        dato = partial(afip_soap.texto, comprobante, NS)
+        return {
+            "numero": int(dato("CbteDesde", default="0")),
+            "doc_tipo": dato("DocTipo"),
+            "doc_nro": dato("DocNro"),
+            "fecha": _fecha_afip(dato("CbteFch")),
+            "importe_total": Decimal(dato("ImpTotal", default="0")),
+            "resultado": dato("Resultado"),
+            "cae": dato("CodAutorizacion"),
+            "vencimiento_cae": _fecha_afip(dato("FchVto")),
+        }
+
+    def solicitar_cae(self, punto_venta, tipo, facturas):
+        """
+        FECAESolicitar con `facturas` (ya numeradas, consecutivas).
+
+        Returns:
+            tuple: (RespuestaSOAP, {numero: ResultadoComprobante})
+
+        Raises:
+            ErrorAFIP: AFIP rechazó la solicitud completa.
+        """
+        operacion = self._operacion("FECAESolicitar")
+        pedido = afip_soap.agregar(operacion, NS, "FeCAEReq")
+        cabecera = afip_soap.agregar(pedido, NS, "FeCabReq")
+        afip_soap.agregar(cabecera, NS, "CantReg", len(facturas))
+        afip_soap.agregar(cabecera, NS, "PtoVta", punto_venta)
+        afip_soap.agregar(cabecera, NS, "CbteTipo", tipo)
+        detalle = afip_soap.agregar(pedido, NS, "FeDetReq")
+        for factura in facturas:
+            _detalle_comprobante(afip_soap.agregar(detalle, NS, "FECAEDetRequest"), factura)
+
+        respuesta = self._llamar("FECAESolicitar", operacion)
+        resultados = {}
+        for nodo in respuesta.resultado.findall(f"{{{NS}}}FeDetResp/{{{NS}}}FECAEDetResponse"):
+            dato = partial(afip_soap.texto, nodo, NS)
+            numero = int(dato("CbteDesde", default="0"))
+            resultados[numero] = ResultadoComprobante(
+                numero,
+                dato("Resultado"),
+                cae=dato("CAE"),
+                vencimiento_cae=_fecha_afip(dato("CAEFchVto")),
+                observaciones=_mensajes(nodo, "Observaciones", "Obs"),
+            )
+        errores = self._errores(respuesta)
+        if errores and not resultados:
+            raise ErrorAFIP(_describir(errores), codigo=errores[0][0])
+        return respuesta, resultados
+
+    def dummy(self):
+        """Estado de los servidores de AFIP (FEDummy, no requiere ticket)."""
+        respuesta = self._enviar("FEDummy", ET.Element(f"{{{NS}}}FEDummy"))
+        dato = partial(afip_soap.texto, respuesta.resultado, NS)
+        return {"app_server": dato("AppServer"), "db_server": dato("DbServer"), "auth_server": dato("AuthServer")}
+
+
+def _alicuotas(factura, neto_total):
+    """[(id AFIP, base imponible, importe)] que suman exactamente `neto_total` e importe_iva."""
+    if not factura.importe_iva:
+        return []
+
+    por_alicuota = defaultdict(lambda: [CERO, CERO])
+    for detalle in factura.detalles.all():
+        por_alicuota[detalle.alicuota_iva][0] += detalle.importe_neto
+        por_alicuota[detalle.alicuota_iva][1] += detalle.importe_iva
+    if not por_alicuota:
+        # Sin detalles: la alícuota más cercana a la proporción IVA / neto
+        tasa = factura.importe_iva / neto_total * 100 if neto_total else CERO
+        por_alicuota[min(ALICUOTAS_IVA, key=lambda alicuota: abs(alicuota - tasa))] = [CERO, CERO]
+
+    alicuotas = sorted(por_alicuota)
+    neto_detalles = sum(valores[0] for valores in por_alicuota.values())
+    iva_detalles = sum(valores[1] for valores in por_alicuota.values())
+    resultado = []
+    resto_base, resto_iva = neto_total, factura.importe_iva
+    for posicion, alicuota in enumerate(alicuotas):
+        if posicion == len(alicuotas) - 1:
+            # La última absorbe el redondeo
+            base, iva = resto_base, resto_iva
+        else:
+            neto, iva_detalle = por_alicuota[alicuota]
+            base = (neto_total * neto / neto_detalles).quantize(CENTAVOS) if neto_detalles else CERO
+            iva = (factura.importe_iva * iva_detalle / iva_detalles).quantize(CENTAVOS) if iva_detalles else CERO
+            resto_base -= base
+            resto_iva -= iva
+        resultado.append((ALICUOTAS_IVA.get(alicuota.normalize(), ALICUOTAS_IVA[Decimal("21")]), base, iva))
+    return resultado
+
+
+def _detalle_comprobante(nodo, factura):
+    agregar = partial(afip_soap.agregar, nodo, NS)
+    tipo_c = factura.tipo_comprobante in TIPOS_C
+    iva = CERO if tipo_c else factura.importe_iva
+    # ImpTotal debe ser la suma exacta de los componentes: el neto absorbe el redondeo
+    neto = factura.importe_total - iva - factura.importe_otros_tributos
+
+    agregar("Concepto", CONCEPTO_PRODUCTOS)
+    agregar("DocTipo", factura.cliente_tipo_documento)
+    agregar("DocNro", "".join(c for c in factura.cliente_numero_documento if c.isdigit()) or "0")
+    agregar("CbteDesde", factura.numero_comprobante)
+    agregar("CbteHasta", factura.numero_comprobante)
+    agregar("CbteFch", _fecha_emision(factura).strftime("%Y%m%d"))
+    agregar("ImpTotal", _importe(factura.importe_total))
+    agregar("ImpTotConc", _importe(CERO))
+    agregar("ImpNeto", _importe(neto))
+    agregar("ImpOpEx", _importe(CERO))
+    agregar("ImpTrib", _importe(factura.importe_otros_tributos))
+    agregar("ImpIVA", _importe(iva))
+    agregar("MonId", MONEDA_PESOS)
+    agregar("MonCotiz", 1)
+    agregar("CondicionIVAReceptorId", (
+        CONDICION_IVA_INSCRIPTO if factura.tipo_comprobante in TIPOS_A else CONDICION_IVA_CONSUMIDOR_FINAL
+    ))
+    if not tipo_c:
+        alicuotas = _alicuotas(factura, neto)
+        if alicuotas:
+            contenedor = agregar("Iva")
+            for codigo, base, importe in alicuotas:
+                alicuota = afip_soap.agregar(contenedor, NS, "AlicIva")
+                afip_soap.agregar(alicuota, NS, "Id", codigo)
+                afip_soap.agregar(alicuota, NS, "BaseImp", _importe(base))
+                afip_soap.agregar(alicuota, NS, "Importe", _importe(importe))
+
+
+# ============================================================================
+# AUTORIZACIÓN EN LOTE
+# ============================================================================
+
+class _Lote:
+    """Resultados y logs acumulados de una llamada a autorizar()."""
+
+    def __init__(self, accion):
+        self.accion = accion
+        self.resultados = {}
+
+    def registrar(self, factura, estado, mensaje):
+        self.resultados[factura.id] = {
+            "factura_id": factura.id,
+            "numero_completo": factura.numero_completo,
+            "estado": estado,
+            "cae": factura.cae,
+            "mensaje": mensaje,
+        }
+
+    def guardar(self, facturas, logs):
+        """Un bulk_update de las facturas y un bulk_create de sus logs."""
+        from .models import FacturaElectronica, LogAFIP
+
+        with transaction.atomic():
+            FacturaElectronica.objects.bulk_update(facturas, CAMPOS_RESULTADO)
+            LogAFIP.objects.bulk_create(logs)
+            # bulk_update no dispara señales: se invalida el cache de reportes a mano
+            transaction.on_commit(
+                partial(cache_reportes.incrementar_version, FacturaElectronica._meta.label)
+            )
+
+    def log(self, factura, resultado, mensaje, respuesta=None, codigo=""):
+        from .models import LogAFIP
+
+        return LogAFIP(
+            factura=factura,
+            accion=self.accion,
+            request_xml=respuesta.request_xml if respuesta else "",
+            response_xml=respuesta.response_xml if respuesta else "",
+            resultado=resultado,
+            mensaje=mensaje,
+            codigo_error=codigo[:10],
+        )
+
+
+def _aprobar(factura, cae, vencimiento, observaciones=""):
+    from .models import FacturaElectronica
+
+    factura.estado = FacturaElectronica.Estado.APROBADO
+    factura.cae = cae
+    factura.fecha_vencimiento_cae = vencimiento
+    factura.fecha_autorizacion = timezone.now()
+    factura.observaciones_afip = observaciones
+
+
+def _coincide(factura, comprobante):
+    documento = "".join(c for c in factura.cliente_numero_documento if c.isdigit()) or "0"
+    return (
+        comprobante is not None
+        and comprobante["resultado"] == "A"
+        and comprobante["doc_nro"] == documento
+        and comprobante["fecha"] == _fecha_emision(factura)
+        and comprobante["importe_total"] == factura.importe_total
+    )
+
+
+def _recuperar(cliente, lote, punto_venta, tipo, facturas):
+    """
+    Resuelve facturas enviadas sin respuesta: toma el CAE si AFIP las
+    autorizó; si no, les quita el número para volver a enviarlas.
+
+    Returns:
+        list: Las que siguen pendientes de autorizar
+    """
+    from .models import FacturaElectronica
+
+    pendientes, actualizadas, logs = [], [], []
+    for factura in facturas:
+        if factura.numero_comprobante is None:
+            pendientes.append(factura)
+            continue
+        comprobante = cliente.consultar(punto_venta, tipo, factura.numero_comprobante)
+        if _coincide(factura, comprobante):
+            _aprobar(factura, comprobante["cae"], comprobante["vencimiento_cae"])
+            mensaje = f"CAE {factura.cae} recuperado con FECompConsultar"
+            logs.append(lote.log(factura, "OK", mensaje))
+            lote.registrar(factura, "AUTORIZADA", mensaje)
+        else:
+            factura.numero_comprobante = None
+            factura.estado = FacturaElectronica.Estado.PENDIENTE
+            pendientes.append(factura)
+        actualizadas.append(factura)
+    if actualizadas:
+        lote.guardar(actualizadas, logs)
+    return pendientes
+
+
+def _sin_respuesta(configuracion_id, punto_venta, tipo, excluir):
+    """Facturas del grupo que quedaron numeradas sin CAE en un envío anterior."""
+    from .models import FacturaElectronica
+
+    return list(
+        FacturaElectronica.objects.filter(
+            configuracion_afip_id=configuracion_id,
+            punto_venta=punto_venta,
+            tipo_comprobante=tipo,
+            estado__in=[FacturaElectronica.Estado.ENVIADO, FacturaElectronica.Estado.PENDIENTE],
+            numero_comprobante__isnull=False,
+            cae__isnull=True,
+        ).exclude(pk__in=excluir)
+    )
+
+
+def _enviar(cliente, lote, punto_venta, tipo, facturas, renumerar):
+    """
+    Una solicitud FECAESolicitar (facturas ya numeradas y guardadas ENVIADO).
+
+    Returns:
+        tuple: (rechazadas sólo por numeración, número del último aprobado o None)
+
+    Raises:
+        ErrorComunicacion: Sin respuesta; las facturas quedan ENVIADO con su
+        número para consultarlas en el próximo intento.
+    """
+    from .models import FacturaElectronica
+
+    try:
+        respuesta, resultados = cliente.solicitar_cae(punto_venta, tipo, facturas)
+    except ErrorComunicacion as e:
+        logs = []
+        for factura in facturas:
+            factura.observaciones_afip = f"Sin respuesta de AFIP: {e}"
+            logs.append(lote.log(factura, "ERROR", str(e), codigo=e.codigo))
+            lote.registrar(factura, "ERROR", factura.observaciones_afip)
+        lote.guardar(facturas, logs)
+        raise
+    except ErrorAFIP as e:
+        logs = []
+        for factura in facturas:
+            factura.estado = FacturaElectronica.Estado.RECHAZADO
+            factura.numero_comprobante = None
+            factura.observaciones_afip = str(e)
+            logs.append(lote.log(factura, "ERROR", str(e), codigo=e.codigo))
+            lote.registrar(factura, "RECHAZADA", str(e))
+        lote.guardar(facturas, logs)
+        return [], None
+
+    por_numeracion, logs, ultimo = [], [], None
+    for factura in facturas:
+        resultado = resultados.get(factura.numero_comprobante)
+        if resultado is None:
+            resultado = ResultadoComprobante(factura.numero_comprobante, "R", observaciones=[
+                ("", "AFIP no informó el resultado del comprobante"),
+            ])
+        observaciones = _describir(resultado.observaciones)
+
+        if resultado.aprobado:
+            _aprobar(factura, resultado.cae, resultado.vencimiento_cae, observaciones)
+            ultimo = factura.numero_comprobante
+            logs.append(lote.log(
+                factura, "WARNING" if observaciones else "OK",
+                f"Factura autorizada con CAE {resultado.cae}", respuesta,
+            ))
+            lote.registrar(factura, "AUTORIZADA", observaciones or "Autorización exitosa")
+            continue
+
+        factura.observaciones_afip = observaciones
+        codigo = resultado.observaciones[0][0] if resultado.observaciones else ""
+        logs.append(lote.log(factura, "ERROR", observaciones, respuesta, codigo=codigo))
+        if resultado.codigos == {ERROR_NUMERACION} and (renumerar or respuesta.reintentos):
+            factura.estado = FacturaElectronica.Estado.PENDIENTE
+            # Si hubo reintentos AFIP pudo haber autorizado un envío anterior:
+            # se conserva el número para consultarlo antes de renumerar
+            if not respuesta.reintentos:
+                factura.numero_comprobante = None
+            if renumerar:
+                por_numeracion.append(factura)
+            else:
+                lote.registrar(factura, "ERROR", observaciones)
+        else:
+            factura.estado = FacturaElectronica.Estado.RECHAZADO
+            factura.numero_comprobante = None
+            lote.registrar(factura, "RECHAZADA", observaciones)
+
+    lote.guardar(facturas, logs)
+    return por_numeracion, ultimo
+
+
+def _autorizar_grupo(cliente, lote, punto_venta, tipo, facturas):
+    _recuperar(cliente, lote, punto_venta, tipo, _sin_respuesta(
+        cliente.configuracion.pk, punto_venta, tipo, [factura.id for factura in facturas]
+    ))
+    pendientes = _recuperar(cliente, lote, punto_venta, tipo, facturas)
+
+    # Segunda pasada: las rechazadas sólo porque una anterior no consumió su número
+    for renumerar in (True, False):
+        if not pendientes:
+            return
+        ultimo = cliente.ultimo_autorizado(punto_venta, tipo)
+        reenviar = []
+        for inicio in range(0, len(pendientes), MAX_POR_SOLICITUD):
+            solicitud = pendientes[inicio:inicio + MAX_POR_SOLICITUD]
+            # Quedan ENVIADO con su número por si el proceso se corta sin respuesta
+            numeracion.numerar(solicitud, ultimo)
+            rechazadas, ultimo_aprobado = _enviar(cliente, lote, punto_venta, tipo, solicitud, renumerar)
+            reenviar.extend(rechazadas)
+            if ultimo_aprobado is not None:
+                ultimo = ultimo_aprobado
+        pendientes = _recuperar(cliente, lote, punto_venta, tipo, reenviar)
+
+
+def autorizar(facturas, accion="Autorización"):
+    """
+    Solicita el CAE de `facturas` (FacturaElectronica autorizables).
+
+    Returns:
+        list: Un dict por factura (factura_id, numero_completo, estado
+        AUTORIZADA/RECHAZADA/ERROR, cae, mensaje), en el orden recibido
+    """
+    facturas = list(facturas)
+    lote = _Lote(accion)
+    grupos = defaultdict(list)
+    for factura in sorted(facturas, key=lambda factura: factura.id):
+        grupos[(factura.configuracion_afip_id, factura.punto_venta, factura.tipo_comprobante)].append(factura)
+
+    # Un cliente (y un ticket) por configuración
+    clientes = {}
+    for (configuracion_id, punto_venta, tipo), grupo in grupos.items():
+        if configuracion_id not in clientes:
+            clientes[configuracion_id] = ClienteWSFE(grupo[0].configuracion_afip)
+        cliente = clientes[configuracion_id]
+        try:
+            _autorizar_grupo(cliente, lote, punto_venta, tipo, grupo)
+        except ErrorAFIP as e:
+            # Falla del grupo (ticket, FECompUltimoAutorizado, AFIP sin respuesta, ...)
+            logs = []
+            for factura in grupo:
+                if factura.id in lote.resultados:
+                    continue
+                logs.append(lote.log(factura, "ERROR", str(e), codigo=e.codigo))
+                lote.registrar(factura, "ERROR", str(e))
+            lote.guardar([], logs)
+
+    return [lote.resultados[factura.id] for factura in facturas]
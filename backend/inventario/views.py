@@ -27,6 +27,7 @@ from .serializers import (
 )
 from productos.models import Producto
 from compras.models import MateriaPrima
+from finanzas_reportes.trabajos import en_segundo_plano
 
 
 class MovimientoStockViewSet(viewsets.ModelViewSet):
@@ -458,6 +459,7 @@ class ValorizacionInventarioViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
     @action(detail=False, methods=['get'])
+    @en_segundo_plano
     def reporte_valorizacion(self, request):
         """Reporte completo de valorización de inventario"""
 
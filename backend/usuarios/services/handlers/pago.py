@@ -8,6 +8,7 @@ incluyendo validaciones robustas y reversión de movimientos financieros.
 from django.db import transaction
 from django.utils import timezone
 
+from finanzas_reportes import cuenta_corriente
 from finanzas_reportes.models import PagoCliente, MovimientoFinanciero
 from ventas.models import Venta
 
@@ -120,6 +121,7 @@ class PagoClienteUndoHandler(BaseUndoHandler):
             - Decrementa Venta.monto_pagado
             - Marca MovimientoFinanciero.estado = CANCELADO
             - Marca pago.anulado = True
+            - Vuelve a debitar el monto en la cuenta corriente del cliente
             - Actualiza result.steps_completed
             - Marca result.success = True si todo OK
         """
@@ -184,6 +186,7 @@ class PagoClienteUndoHandler(BaseUndoHandler):
         pago.fecha_anulacion = timezone.now()
         pago.anulado_por = undo_action.user
         pago.save(update_fields=['anulado', 'fecha_anulacion', 'anulado_por'])
+        cuenta_corriente.registrar_anulacion_pago(pago)
 
         result.success = True
 
@@ -10,6 +10,7 @@ from django.utils import timezone
 
 from ventas.models import Venta
 from productos.models import Producto
+from finanzas_reportes import cuenta_corriente
 from finanzas_reportes.models import PagoCliente
 
 from .base import BaseUndoHandler
@@ -111,6 +112,7 @@ class VentaUndoHandler(BaseUndoHandler):
         Side effects:
             - Incrementa stock de productos
             - Marca venta.anulada = True
+            - Acredita el total en la cuenta corriente del cliente
             - Actualiza result.steps_completed
             - Marca result.success = True si todo OK
         """
@@ -177,6 +179,7 @@ class VentaUndoHandler(BaseUndoHandler):
             'motivo_anulacion',
             'anulada_por'
         ])
+        cuenta_corriente.registrar_anulacion_venta(venta)
 
         result.success = True
         result.description = (
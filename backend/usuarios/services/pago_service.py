@@ -9,6 +9,7 @@ from decimal import Decimal
 from django.db import transaction
 from django.utils import timezone
 
+from finanzas_reportes import cuenta_corriente
 from finanzas_reportes.models import PagoCliente, MovimientoFinanciero
 from ventas.models import Venta
 from usuarios.models import UndoAction
@@ -136,6 +137,9 @@ class PagoService:
             medio_pago=medio,
         )
 
+        # Acreditar el pago en la cuenta corriente del cliente
+        cuenta_corriente.registrar_pago(pago)
+
         # Agregar movimiento financiero al payload
         undo_payload['movimiento_financiero_id'] = str(movimiento.id)
 
@@ -9,6 +9,7 @@ from decimal import Decimal
 from django.db import transaction
 from django.utils import timezone
 
+from finanzas_reportes import cuenta_corriente
 from ventas.models import Venta, LineaVenta
 from productos.models import Producto
 from usuarios.models import UndoAction
@@ -161,6 +162,9 @@ class VentaService:
         venta.total = total
         venta.save(update_fields=["subtotal", "iva_monto", "total"])
 
+        # Cargar la venta en la cuenta corriente del cliente
+        cuenta_corriente.registrar_venta(venta)
+
         # Registrar acción para undo
         undo_payload = {
             'venta_id': str(venta.id),
@@ -0,0 +1,99 @@
+"""
+Clasificación de cobranza de las ventas: días de atraso y urgencia.
+
+Se guardan en Venta (dias_vencimiento, urgencia_cobranza, con índices) para
+que los listados de cobranzas filtren y ordenen en la base:
+
+- Una venta pendiente (PENDIENTE o PARCIAL, no anulada) con fecha de
+  vencimiento anterior a hoy tiene dias_vencimiento = hoy - vencimiento.
+  Cualquier otra tiene 0.
+- Urgencia ALTA con más de DIAS_URGENCIA_ALTA días de atraso, MEDIA con
+  más de DIAS_URGENCIA_MEDIA y BAJA en el resto (mismos umbrales que las
+  alertas de pagos vencidos).
+
+Al guardar una venta (alta, pagos, anulación, cambio de vencimiento) las
+señales (ver signals.py) la reclasifican. El paso del tiempo lo cubre el
+comando diario `manage.py actualizar_cobranzas`, que reclasifica todas con
+un único UPDATE sobre las filas que pueden cambiar.
+"""
+
+from datetime import date, timedelta
+
+from django.db.models import Case, DateField, F, Func, IntegerField, Q, Value, When
+
+DIAS_URGENCIA_ALTA = 30
+DIAS_URGENCIA_MEDIA = 7
+
+ESTADOS_PENDIENTES = ("PENDIENTE", "PARCIAL")
+
+# Campos de Venta que cambian la clasificación
+CAMPOS_RELEVANTES = {"fecha_vencimiento", "estado_pago", "anulada", "monto_pagado", "total"}
+
+
+class DiasDesde(Func):
+    """Días enteros entre una fecha de la fila y `hoy`."""
+
+    output_field = IntegerField()
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+
+    def __init__(self, expresion, hoy):
+        super().__init__(Value(hoy, output_field=DateField()), expresion)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+
+def urgencia(dias_vencimiento):
+    """Urgencia de cobranza para una cantidad de días de atraso."""
+    from .models import Venta
+
+    if dias_vencimiento > DIAS_URGENCIA_ALTA:
+        return Venta.UrgenciaCobranza.ALTA
+    if dias_vencimiento > DIAS_URGENCIA_MEDIA:
+        return Venta.UrgenciaCobranza.MEDIA
+    return Venta.UrgenciaCobranza.BAJA
+
+
+def clasificar(venta, hoy=None):
+    """(dias_vencimiento, urgencia_cobranza) de una venta en memoria."""
+    hoy = hoy or date.today()
+    fecha_vencimiento = venta._meta.get_field("fecha_vencimiento").to_python(venta.fecha_vencimiento)
+    dias = 0
+    if not venta.anulada and venta.estado_pago in ESTADOS_PENDIENTES and fecha_vencimiento:
+        dias = max((hoy - fecha_vencimiento).days, 0)
+    return dias, urgencia(dias)
+
+
+def actualizar(ventas, hoy=None):
+    """
+    Reclasifica `ventas` (queryset) con un único UPDATE, sólo en las filas
+    cuya clasificación puede cambiar: vencidas con saldo, o con atraso o
+    urgencia guardados.
+
+    Returns:
+        int: Filas actualizadas
+    """
+    hoy = hoy or date.today()
+    vencida = Q(anulada=False, estado_pago__in=ESTADOS_PENDIENTES, fecha_vencimiento__lt=hoy)
+
+    return (
+        ventas.filter(vencida | Q(dias_vencimiento__gt=0) | ~Q(urgencia_cobranza="BAJA"))
+        .order_by()
+        .update(
+            dias_vencimiento=Case(
+                When(vencida, then=DiasDesde(F("fecha_vencimiento"), hoy)),
+                default=Value(0),
+            ),
+            urgencia_cobranza=Case(
+                When(vencida & Q(fecha_vencimiento__lt=hoy - timedelta(days=DIAS_URGENCIA_ALTA)), then=Value("ALTA")),
+                When(vencida & Q(fecha_vencimiento__lt=hoy - timedelta(days=DIAS_URGENCIA_MEDIA)), then=Value("MEDIA")),
+                default=Value("BAJA"),
+            ),
+        )
+    )
@@ -0,0 +1,293 @@
+"""
+Alta de ventas en lote para sincronizar la cola de la app de escritorio.
+
+La app carga ventas sin conexión y después envía la cola del día en un
+único pedido. Cada venta trae una clave de idempotencia generada por el
+cliente (Venta.clave_idempotencia): si el pedido se reintenta, las ventas
+ya guardadas se informan como existentes y no se duplican.
+
+El lote se procesa en una transacción con un número fijo de queries, sin
+importar cuántas ventas traiga:
+
+- Claves ya cargadas, clientes y productos se leen con un query cada uno;
+  los productos con bloqueo (select_for_update) para validar el stock de
+  todo el lote contra los valores vigentes.
+- El stock se consume en memoria venta por venta, en el orden del lote:
+  una venta sin stock suficiente se rechaza sin afectar a las demás.
+- Ventas y líneas se insertan con bulk_create y el stock se descuenta con
+  un único UPDATE por CASE.
+
+Cada venta se acepta o se rechaza entera; la respuesta trae un resultado
+por venta, en el orden recibido.
+
+Las claves ya cargadas se leen sin bloqueo: si un reintento se superpone
+con el envío original, el INSERT del segundo choca con la restricción
+única de clave_idempotencia. Ese choque deshace sólo el savepoint del
+guardado, que se repite una vez leyendo de nuevo las claves (ahora con
+las del otro pedido) y el stock; esas ventas salen como existentes.
+
+bulk_create y update() no disparan señales: lo que mantienen las señales
+para una venta nueva (clasificación de cobranza, rollup diario,
+acumuladores de IVA, alertas, cuenta corriente y versiones del cache de
+reportes) se actualiza acá una sola vez para todo el lote. Las ventas del
+lote no se registran en el sistema de undo.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from .serializers import VentaLoteSerializer
+
+# Cantidad máxima de ventas por pedido
+MAX_VENTAS = 500
+
+ALICUOTA_IVA = Decimal("0.21")
+CENTAVO = Decimal("0.01")
+
+CREADA = "creada"
+EXISTENTE = "existente"
+RECHAZADA = "rechazada"
+
+
+def _resultado(clave, estado, venta=None, errores=None):
+    resultado = {"clave": clave, "estado": estado}
+    if venta is not None:
+        resultado["venta"] = venta
+    if errores is not None:
+        resultado["errores"] = errores
+    return resultado
+
+
+def _consumo(lineas):
+    """{producto_id: (unidades, kg)} que descuentan las líneas de una venta."""
+    consumo = defaultdict(lambda: (Decimal("0"), Decimal("0")))
+    for linea in lineas:
+        producto = linea.get("producto")
+        if producto:
+            unidades, kg = consumo[producto]
+            consumo[producto] = (unidades + linea["cantidad"], kg + linea["cantidad_kg"])
+    return consumo
+
+
+def _errores_stock(consumo, productos):
+    errores = []
+    for producto_id, (unidades, kg) in consumo.items():
+        producto = productos.get(producto_id)
+        if producto is None:
+            errores.append(f"Producto con ID {producto_id} no existe o está inactivo")
+            continue
+        if producto.stock < unidades:
+            errores.append(
+                f"Stock insuficiente en unidades para {producto.nombre}. Disponible: {producto.stock} unidades."
+            )
+        if kg > 0 and producto.stock_kg < kg:
+            errores.append(
+                f"Stock insuficiente en kg para {producto.nombre}. Disponible: {producto.stock_kg} kg."
+            )
+    return errores
+
+
+def _venta(datos, hoy):
+    """Venta (sin guardar) con sus totales y su clasificación de cobranza."""
+    from . import cobranzas
+    from .models import Venta
+
+    subtotal = sum(
+        (linea["cantidad_kg"] * linea["precio_unitario"] for linea in datos["lineas"]),
+        Decimal("0"),
+    ).quantize(CENTAVO)
+    iva_monto = (subtotal * ALICUOTA_IVA).quantize(CENTAVO) if datos["incluye_iva"] else Decimal("0")
+
+    venta = Venta(
+        clave_idempotencia=datos["clave"],
+        cliente_id=datos["cliente"],
+        numero=datos["numero"],
+        incluye_iva=datos["incluye_iva"],
+        subtotal=subtotal,
+        iva_monto=iva_monto,
+        total=subtotal + iva_monto,
+        condicion_pago=datos["condicion_pago"],
+        fecha_vencimiento=datos["fecha_vencimiento"],
+        observaciones_cobro=datos["observaciones_cobro"],
+    )
+    venta.dias_vencimiento, venta.urgencia_cobranza = cobranzas.clasificar(venta, hoy)
+    return venta
+
+
+def _descontar_stock(consumo_total):
+    """Descuenta el stock de todos los productos del lote con un único UPDATE."""
+    from productos.models import Producto
+
+    if not consumo_total:
+        return
+    unidades = DecimalField(max_digits=12, decimal_places=2)
+    kg = DecimalField(max_digits=12, decimal_places=3)
+    Producto.objects.filter(pk__in=consumo_total).update(
+        stock=F("stock") - Case(
+            *[When(pk=pk, then=Value(cantidad[0], output_field=unidades)) for pk, cantidad in consumo_total.items()],
+            output_field=unidades,
+        ),
+        stock_kg=F("stock_kg") - Case(
+            *[When(pk=pk, then=Value(cantidad[1], output_field=kg)) for pk, cantidad in consumo_total.items()],
+            output_field=kg,
+        ),
+    )
+
+
+def _actualizar_derivados(ventas, productos, hoy):
+    """Lo que las señales harían por cada venta nueva, una vez para el lote."""
+    from finanzas_reportes import alertas, cache_reportes, cuenta_corriente, iva_periodos, resumen_diario
+
+    cuenta_corriente.registrar_ventas(ventas)
+    resumen_diario.recalcular_dia(hoy, "ventas.Venta")
+
+    cambios = defaultdict(Decimal)
+    for venta in ventas:
+        aporte = iva_periodos.aporte(venta)
+        if aporte:
+            cambios[aporte[0]] += aporte[1]
+    iva_periodos.aplicar(iva_periodos.MODELOS["ventas.Venta"], cambios)
+
+    # Alertas de vencimiento de las ventas que califican y de stock bajo
+    limite_aviso = hoy + timedelta(days=alertas.DIAS_AVISO_VENCIMIENTO)
+    for venta in ventas:
+        if venta.fecha_vencimiento and venta.fecha_vencimiento <= limite_aviso:
+            alertas.sincronizar(venta, hoy)
+    for producto in productos:
+        alertas.sincronizar(producto, hoy)
+
+    # Las ventas son de hoy: no hay snapshots de períodos cerrados que descartar
+    for etiqueta in ("ventas.Venta", "ventas.LineaVenta", "productos.Producto"):
+        transaction.on_commit(partial(cache_reportes.incrementar_version, etiqueta))
+
+
+def _claves_existentes(claves):
+    """{clave: venta_id} de las claves que ya tienen venta."""
+    from .models import Venta
+
+    return dict(
+        Venta.objects.filter(clave_idempotencia__in=claves).values_list("clave_idempotencia", "id")
+    )
+
+
+def _guardar(validos, resultados, hoy):
+    """Resuelve y guarda las ventas con formato válido; completa `resultados`."""
+    from clientes.models import Cliente
+    from finanzas_reportes import iva_periodos
+    from productos.models import Producto
+    from .models import LineaVenta, Venta
+
+    # Claves ya sincronizadas (reintentos) y repetidas dentro del lote
+    existentes = _claves_existentes([datos["clave"] for _, datos in validos])
+    clientes = set(
+        Cliente.objects.filter(id__in={datos["cliente"] for _, datos in validos}).values_list("id", flat=True)
+    )
+    productos = {
+        producto.pk: producto
+        for producto in Producto.objects.select_for_update().filter(
+            activo=True,
+            pk__in={linea["producto"] for _, datos in validos for linea in datos["lineas"] if linea.get("producto")},
+        ).order_by("pk")
+    }
+    try:
+        iva_periodos.validar({(hoy.year, hoy.month): Decimal("1")})
+        periodo_cerrado = None
+    except iva_periodos.PeriodoIVACerrado as exc:
+        periodo_cerrado = exc.messages[0]
+
+    vistas = set()
+    aceptadas = []
+    consumo_total = defaultdict(lambda: (Decimal("0"), Decimal("0")))
+    for indice, datos in validos:
+        clave = datos["clave"]
+        if clave in existentes:
+            resultados[indice] = _resultado(clave, EXISTENTE, venta=existentes[clave])
+            continue
+        if clave in vistas:
+            resultados[indice] = _resultado(clave, RECHAZADA, errores={"clave": ["Clave repetida en el lote"]})
+            continue
+        vistas.add(clave)
+
+        errores = []
+        if datos["cliente"] not in clientes:
+            errores.append(f"Cliente con ID {datos['cliente']} no existe")
+        if periodo_cerrado and datos["incluye_iva"]:
+            errores.append(periodo_cerrado)
+        consumo = _consumo(datos["lineas"])
+        errores += _errores_stock(consumo, productos)
+        if errores:
+            resultados[indice] = _resultado(clave, RECHAZADA, errores={"non_field_errors": errores})
+            continue
+
+        # Reservar el stock en memoria para las ventas siguientes del lote
+        for producto_id, (unidades, kg) in consumo.items():
+            producto = productos[producto_id]
+            producto.stock -= unidades
+            producto.stock_kg -= kg
+            total_unidades, total_kg = consumo_total[producto_id]
+            consumo_total[producto_id] = (total_unidades + unidades, total_kg + kg)
+        aceptadas.append((indice, datos, _venta(datos, hoy)))
+
+    if aceptadas:
+        ventas = Venta.objects.bulk_create([venta for _, _, venta in aceptadas])
+        LineaVenta.objects.bulk_create([
+            LineaVenta(
+                venta=venta,
+                producto_id=linea.get("producto"),
+                descripcion=linea["descripcion"],
+                cantidad=linea["cantidad"],
+                cantidad_kg=linea["cantidad_kg"],
+                precio_unitario=linea["precio_unitario"],
+            )
+            for (_, datos, venta) in aceptadas
+            for linea in datos["lineas"]
+        ])
+        _descontar_stock(consumo_total)
+        _actualizar_derivados(ventas, [productos[pk] for pk in consumo_total], hoy)
+
+        for indice, datos, venta in aceptadas:
+            resultados[indice] = _resultado(datos["clave"], CREADA, venta=venta.pk)
+
+
+@transaction.atomic
+def registrar(items):
+    """
+    Valida y guarda un lote de ventas.
+
+    Args:
+        items: Lista de dicts con los datos de cada venta (ver VentaLoteSerializer)
+
+    Returns:
+        list: Un resultado por venta, en el orden recibido: clave, estado
+        (creada, existente o rechazada), venta (id) y errores
+    """
+    # Venta.fecha es auto_now_add (date.today())
+    hoy = date.today()
+    resultados = [None] * len(items)
+
+    # Validación de formato, venta por venta
+    validos = []
+    for indice, item in enumerate(items):
+        serializer = VentaLoteSerializer(data=item)
+        if serializer.is_valid():
+            validos.append((indice, serializer.validated_data))
+        else:
+            clave = item.get("clave") if isinstance(item, dict) else None
+            resultados[indice] = _resultado(clave, RECHAZADA, errores=serializer.errors)
+
+    # Un reintento superpuesto que insertó las mismas claves primero hace
+    # fallar el INSERT: se repite el guardado con las claves ya visibles
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                _guardar(validos, resultados, hoy)
+            break
+        except IntegrityError:
+            if intento or not _claves_existentes([datos["clave"] for _, datos in validos]):
+                raise
+    return resultados
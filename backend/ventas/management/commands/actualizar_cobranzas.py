@@ -0,0 +1,48 @@
+"""
+Comando de Django para reclasificar la cobranza de las ventas (días de
+atraso y urgencia) por el paso del tiempo.
+
+Pensado para correr una vez por día (cron / tarea programada), por ejemplo:
+    5 0 * * * cd /app/backend && python manage.py actualizar_cobranzas
+
+Los pagos, anulaciones y cambios de vencimiento ya reclasifican la venta en
+el momento; este comando sólo suma los días que pasaron, con un único
+UPDATE (ver ventas/cobranzas.py).
+
+Uso:
+    python manage.py actualizar_cobranzas [--fecha AAAA-MM-DD]
+
+Opciones:
+    --fecha: Fecha de referencia (default: hoy)
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ventas import cobranzas
+from ventas.models import Venta
+
+
+def _parse_fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor}. Usa formato AAAA-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Reclasifica días de atraso y urgencia de cobranza de las ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=_parse_fecha, help='Fecha de referencia (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("=" * 70))
+        self.stdout.write(self.style.WARNING("ACTUALIZACIÓN DE COBRANZAS"))
+        self.stdout.write(self.style.WARNING("=" * 70))
+
+        actualizadas = cobranzas.actualizar(Venta.objects.all(), hoy=options['fecha'])
+
+        self.stdout.write(f"  Ventas reclasificadas: {actualizadas}")
+        self.stdout.write(self.style.SUCCESS("Cobranzas actualizadas"))
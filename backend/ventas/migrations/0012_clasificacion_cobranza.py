@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clasificar_ventas(apps, schema_editor):
+    from ventas import cobranzas
+
+    Venta = apps.get_model("ventas", "Venta")
+    cobranzas.actualizar(Venta.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0007_copy_razon_social_to_nombre_fantasia'),
+        ('ventas', '0011_add_payment_allocation_system'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='dias_vencimiento',
+            field=models.IntegerField(default=0, help_text='Días de atraso del pago (0 si no está vencida o no tiene saldo)'),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='urgencia_cobranza',
+            field=models.CharField(choices=[('ALTA', 'Alta'), ('MEDIA', 'Media'), ('BAJA', 'Baja')], default='BAJA', help_text='Urgencia de cobranza según los días de atraso', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['urgencia_cobranza', 'dias_vencimiento'], name='venta_urgencia_dias_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['dias_vencimiento'], name='venta_dias_vencimiento_idx'),
+        ),
+        migrations.RunPython(clasificar_ventas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0012_clasificacion_cobranza'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, editable=False, help_text='Clave del cliente para sincronizar ventas cargadas sin conexión', max_length=64, null=True, unique=True),
+        ),
+    ]
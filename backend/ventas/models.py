@@ -75,6 +75,11 @@ class Venta(models.Model):
         PARCIAL = "PARCIAL", "Pago Parcial"
         PAGADA = "PAGADA", "Pagada Completamente"
 
+    class UrgenciaCobranza(models.TextChoices):
+        ALTA = "ALTA", "Alta"
+        MEDIA = "MEDIA", "Media"
+        BAJA = "BAJA", "Baja"
+
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name="ventas")
     fecha = models.DateField(auto_now_add=True)
     numero = models.CharField(max_length=20, blank=True)  # ej. Nro factura
@@ -101,6 +106,20 @@ class Venta(models.Model):
         help_text="Estado de pago de la factura"
     )
 
+    # Clasificación de cobranza (ver ventas/cobranzas.py): se guarda al
+    # cambiar la venta o sus pagos y la actualiza a diario el comando
+    # actualizar_cobranzas
+    dias_vencimiento = models.IntegerField(
+        default=0,
+        help_text="Días de atraso del pago (0 si no está vencida o no tiene saldo)"
+    )
+    urgencia_cobranza = models.CharField(
+        max_length=10,
+        choices=UrgenciaCobranza.choices,
+        default=UrgenciaCobranza.BAJA,
+        help_text="Urgencia de cobranza según los días de atraso"
+    )
+
     # Campos de anulación (para sistema de undo)
     anulada = models.BooleanField(default=False, db_index=True, help_text="Marca si la venta fue anulada/deshecha")
     fecha_anulacion = models.DateTimeField(null=True, blank=True, help_text="Fecha y hora en que se anuló la venta")
@@ -114,11 +133,26 @@ class Venta(models.Model):
         help_text="Usuario que anuló la venta"
     )
 
+    # Clave generada por el cliente (app de escritorio) al cargar la venta
+    # sin conexión: reenviar el lote no la duplica (ver ventas/lote.py)
+    clave_idempotencia = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Clave del cliente para sincronizar ventas cargadas sin conexión"
+    )
+
     # Manager personalizado
     objects = VentaManager()
 
     class Meta:
         ordering = ["-fecha", "-id"]
+        indexes = [
+            models.Index(fields=["urgencia_cobranza", "dias_vencimiento"], name="venta_urgencia_dias_idx"),
+            models.Index(fields=["dias_vencimiento"], name="venta_dias_vencimiento_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         # Funcionalidad simplificada para estabilidad
@@ -134,6 +168,11 @@ class Venta(models.Model):
             return Decimal('0')
         return self.total - self.monto_pagado
 
+    @property
+    def esta_vencido(self):
+        """Tiene saldo y pasó su fecha de vencimiento"""
+        return self.dias_vencimiento > 0
+
     @property
     def esta_pagada(self):
         """Verifica si la factura está completamente pagada"""
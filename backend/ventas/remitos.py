@@ -0,0 +1,99 @@
+"""
+Remitos de entrega en HTML.
+
+La plantilla (templates/ventas/remitos.html) se compila una sola vez por
+proceso y el logo se lee y codifica en base64 también una sola vez. El
+logo va en el CSS del documento, no en cada remito, así un lote de remitos
+lo lleva una sola vez.
+
+Las ventas se leen con sus líneas y su cliente en un único query sobre
+LineaVenta (select_related de venta y cliente), agrupando las líneas por
+venta.
+"""
+
+import base64
+import os
+import struct
+from functools import lru_cache
+from itertools import groupby
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import timezone
+
+# Ancho con que se muestra el logo (px); el alto sale de la proporción del PNG
+ANCHO_LOGO = 150
+
+
+@lru_cache(maxsize=1)
+def _plantilla():
+    return get_template("ventas/remitos.html")
+
+
+@lru_cache(maxsize=1)
+def _logo():
+    """{"base64", "alto"} del logo de static/logo.png, o None si no está."""
+    ruta = os.path.join(settings.BASE_DIR, "static", "logo.png")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "rb") as archivo:
+        contenido = archivo.read()
+    # Ancho y alto del PNG: primeros campos del chunk IHDR
+    ancho, alto = struct.unpack(">II", contenido[16:24])
+    return {
+        "base64": base64.b64encode(contenido).decode("ascii"),
+        "alto": round(ANCHO_LOGO * alto / ancho) if ancho else ANCHO_LOGO,
+    }
+
+
+def ventas_con_lineas(lineas):
+    """
+    Ventas de `lineas` (queryset de LineaVenta) con sus líneas en
+    `lineas_remito`, en el orden de las ventas.
+    """
+    ventas = []
+    lineas = lineas.select_related("venta__cliente").order_by("venta__fecha", "venta_id", "id")
+    for _, grupo in groupby(lineas, key=lambda linea: linea.venta_id):
+        grupo = list(grupo)
+        venta = grupo[0].venta
+        venta.lineas_remito = grupo
+        ventas.append(venta)
+    return ventas
+
+
+def venta_para_remito(pk):
+    """
+    Venta con cliente y líneas para el remito.
+
+    Raises:
+        Venta.DoesNotExist: Si no existe.
+    """
+    from .models import LineaVenta, Venta
+
+    ventas = ventas_con_lineas(LineaVenta.objects.filter(venta_id=pk))
+    if ventas:
+        return ventas[0]
+    # Venta sin líneas
+    venta = Venta.objects.select_related("cliente").get(pk=pk)
+    venta.lineas_remito = []
+    return venta
+
+
+def ventas_del_dia(fecha):
+    """Ventas no anuladas de `fecha` con líneas, listas para sus remitos."""
+    from .models import LineaVenta
+
+    return ventas_con_lineas(LineaVenta.objects.filter(venta__fecha=fecha, venta__anulada=False))
+
+
+def renderizar(ventas, titulo):
+    """HTML con un remito por venta, cada uno en su página."""
+    from configuracion.models import ConfiguracionEmpresa
+
+    return _plantilla().render({
+        "titulo": titulo,
+        "ventas": ventas,
+        "config": ConfiguracionEmpresa.get_configuracion(),
+        "logo": _logo(),
+        "emision": timezone.localtime(),
+    })
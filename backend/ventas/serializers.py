@@ -7,6 +7,7 @@ from rest_framework import serializers
 
 from clientes.models import Cliente
 from productos.models import Producto
+from finanzas_reportes import cuenta_corriente
 from finanzas_reportes.models import MovimientoFinanciero, PagoCliente
 from .models import LineaVenta, Venta
 
@@ -42,6 +43,8 @@ class VentaSerializer(serializers.ModelSerializer):
     # Campos de cobranzas
     saldo_pendiente = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     esta_pagada = serializers.BooleanField(read_only=True)
+    esta_vencido = serializers.BooleanField(read_only=True)
+    puede_enviar_recordatorio = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Venta
@@ -53,7 +56,10 @@ class VentaSerializer(serializers.ModelSerializer):
             "monto_pagado", "saldo_pendiente", "esta_pagada",
             "fecha_vencimiento", "condicion_pago", "observaciones_cobro",
             "fecha_ultimo_recordatorio",
+            "estado_pago", "dias_vencimiento", "urgencia_cobranza", "esta_vencido",
+            "puede_enviar_recordatorio",
         )
+        read_only_fields = ("estado_pago", "dias_vencimiento", "urgencia_cobranza")
 
     def _sync_movimiento(self, venta: Venta) -> None:
         # Las ventas ya no generan movimientos financieros automáticamente
@@ -191,10 +197,12 @@ class VentaSerializer(serializers.ModelSerializer):
         venta.total = total
         venta.save(update_fields=["subtotal", "iva_monto", "total"])
         self._sync_movimiento(venta)
+        cuenta_corriente.registrar_venta(venta)
         return venta
 
     @transaction.atomic
     def update(self, instance, validated_data):
+        aporte_anterior = cuenta_corriente.aporte(instance)
         lineas_data = validated_data.pop("lineas", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -217,6 +225,7 @@ class VentaSerializer(serializers.ModelSerializer):
             instance.total = total
         instance.save()
         self._sync_movimiento(instance)
+        cuenta_corriente.registrar_ajuste(aporte_anterior, instance)
         return instance
 
 
@@ -314,9 +323,30 @@ class VentaRapidaSerializer(serializers.Serializer):
                 producto.quitar_stock(cantidad, cantidad_kg=cantidad_kg)
             except ValueError as exc:
                 raise serializers.ValidationError({"producto": str(exc)})
+        cuenta_corriente.registrar_venta(venta)
         return venta
 
 
+class LineaVentaLoteSerializer(LineaVentaSerializer):
+    """Línea de una venta del lote: producto y stock se validan para todo el lote (ver lote.py)."""
+    producto = serializers.IntegerField(required=False, allow_null=True)
+    cantidad = serializers.DecimalField(max_digits=10, decimal_places=2, default=Decimal("1"))
+    cantidad_kg = serializers.DecimalField(max_digits=10, decimal_places=3, default=Decimal("0"))
+    precio_unitario = serializers.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
+
+
+class VentaLoteSerializer(serializers.Serializer):
+    """Una venta cargada sin conexión, con la clave de idempotencia generada por el cliente."""
+    clave = serializers.CharField(max_length=64)
+    cliente = serializers.IntegerField()
+    numero = serializers.CharField(max_length=20, required=False, allow_blank=True, default="")
+    incluye_iva = serializers.BooleanField(default=False)
+    condicion_pago = serializers.CharField(max_length=50, required=False, allow_blank=True, default="Contado")
+    fecha_vencimiento = serializers.DateField(required=False, allow_null=True, default=None)
+    observaciones_cobro = serializers.CharField(required=False, allow_blank=True, default="")
+    lineas = LineaVentaLoteSerializer(many=True, allow_empty=False)
+
+
 class RegistroPagoSerializer(serializers.Serializer):
     cliente = serializers.PrimaryKeyRelatedField(queryset=Cliente.objects.all())
     venta = serializers.PrimaryKeyRelatedField(
@@ -334,4 +364,6 @@ class RegistroPagoSerializer(serializers.Serializer):
     def create(self, validated_data):
         if not validated_data.get("fecha"):
             validated_data["fecha"] = timezone.now().date()
-        return PagoCliente.objects.create(**validated_data)
\ No newline at end of file
+        pago = PagoCliente.objects.create(**validated_data)
+        cuenta_corriente.registrar_pago(pago)
+        return pago
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Señales de ventas.
+
+- Mantienen la clasificación de cobranza (dias_vencimiento,
+  urgencia_cobranza; ver cobranzas.py) cuando se crea una venta o cambian
+  su vencimiento, pagos o anulación.
+
+Se conectan en VentasConfig.ready().
+"""
+
+from django.db.models.signals import post_save, pre_save
+
+from . import cobranzas
+
+
+def clasificar_cobranza(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Guardado completo: la clasificación viaja en el mismo INSERT/UPDATE
+    if raw or update_fields is not None:
+        return
+    instance.dias_vencimiento, instance.urgencia_cobranza = cobranzas.clasificar(instance)
+
+
+def reclasificar_cobranza(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Guardado parcial (pagos, anulación): se actualizan sólo las dos columnas
+    if raw or update_fields is None or not cobranzas.CAMPOS_RELEVANTES & set(update_fields):
+        return
+    instance.dias_vencimiento, instance.urgencia_cobranza = cobranzas.clasificar(instance)
+    sender._default_manager.filter(pk=instance.pk).update(
+        dias_vencimiento=instance.dias_vencimiento,
+        urgencia_cobranza=instance.urgencia_cobranza,
+    )
+
+
+def conectar():
+    from .models import Venta
+
+    pre_save.connect(clasificar_cobranza, sender=Venta, dispatch_uid="cobranzas:ventas.Venta")
+    post_save.connect(reclasificar_cobranza, sender=Venta, dispatch_uid="cobranzas:ventas.Venta")
@@ -1,3 +1,345 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from clientes.models import Cliente
+from configuracion.models import ConfiguracionEmpresa
+from finanzas_reportes.models import MovimientoCuentaCorriente, PeriodoIVA
+from productos.models import Producto
+from . import cobranzas, lote, remitos
+from .models import LineaVenta, Venta
+
+User = get_user_model()
+
+
+class RemitosTest(APITestCase):
+    """Pruebas de los remitos individuales y por día"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        ConfiguracionEmpresa.get_configuracion()
+        self.cliente = Cliente.objects.create(
+            nombre_fantasia="Cliente", razon_social="Cliente <Remito> SA", identificacion="20123456789",
+        )
+        self.venta = self._venta([("Queso <cremoso>", Decimal('3'), Decimal('2.5')), ("Dulce", Decimal('1'), 0)])
+
+    def _venta(self, lineas, cliente=None):
+        venta = Venta.objects.create(cliente=cliente or self.cliente, total=Decimal('100'))
+        for descripcion, cantidad, cantidad_kg in lineas:
+            LineaVenta.objects.create(venta=venta, descripcion=descripcion, cantidad=cantidad, cantidad_kg=cantidad_kg)
+        return venta
+
+    def test_remito_de_una_venta(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/ventas/{self.venta.id}/remito/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        html = response.content.decode()
+        self.assertIn(f'R-{self.venta.id:08d}', html)
+        self.assertIn('Queso &lt;cremoso&gt;', html)
+        self.assertIn('Cliente &lt;Remito&gt; SA', html)
+        self.assertIn('3 unidades', html)
+        self.assertIn('2.50 kg', html)
+        self.assertEqual(html.count('class="remito"'), 1)
+
+    def test_remito_sin_lineas_y_venta_inexistente(self):
+        venta = self._venta([])
+        response = self.client.get(f'/api/ventas/{venta.id}/remito/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/ventas/999999/remito/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_remitos_del_dia(self):
+        otro = Cliente.objects.create(nombre_fantasia="Otro", razon_social="Otro SRL", identificacion="30111111111")
+        self._venta([("Ricota", Decimal('2'), 0)], cliente=otro)
+        anulada = self._venta([("Anulada", Decimal('1'), 0)])
+        Venta.objects.filter(pk=anulada.pk).update(anulada=True)
+        ayer = self._venta([("De ayer", Decimal('1'), 0)])
+        Venta.objects.filter(pk=ayer.pk).update(fecha=date.today() - timedelta(days=1))
+
+        response = self.client.get('/api/ventas/remitos/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        html = response.content.decode()
+        self.assertEqual(html.count('class="remito"'), 2)
+        self.assertIn('Otro SRL', html)
+        self.assertNotIn('Anulada', html)
+        self.assertNotIn('De ayer', html)
+        # El logo va una sola vez en el CSS
+        if remitos._logo():
+            self.assertEqual(html.count(remitos._logo()['base64'][:64]), 1)
+
+        response = self.client.get('/api/ventas/remitos/', {'fecha': '2001-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/ventas/remitos/', {'fecha': 'ayer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AntiguedadSaldosTest(APITestCase):
+    """Pruebas del reporte de antigüedad de saldos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.hoy = date.today()
+        self.norte = Cliente.objects.create(
+            nombre_fantasia="Norte", razon_social="Norte SA", identificacion="1", localidad_fiscal="Pilar",
+        )
+        self.sur = Cliente.objects.create(
+            nombre_fantasia="Sur", razon_social="", identificacion="2", localidad_fiscal="Lobos",
+        )
+
+    def _venta(self, cliente, total, dias, pagado=0, con_vencimiento=True, **kwargs):
+        venta = Venta.objects.create(cliente=cliente, total=Decimal(total), monto_pagado=Decimal(pagado), **kwargs)
+        fecha = self.hoy - timedelta(days=dias)
+        if con_vencimiento:
+            Venta.objects.filter(pk=venta.pk).update(fecha_vencimiento=fecha)
+        else:
+            Venta.objects.filter(pk=venta.pk).update(fecha=fecha)
+        return venta
+
+    def test_tramos_por_cliente(self):
+        self._venta(self.norte, '100', -10)               # por vencer -> 0-30
+        self._venta(self.norte, '200', 30, pagado='50', estado_pago='PARCIAL')
+        self._venta(self.norte, '300', 31)
+        self._venta(self.norte, '400', 75, con_vencimiento=False)
+        self._venta(self.norte, '500', 91)
+        self._venta(self.norte, '999', 200, anulada=True)
+        self._venta(self.norte, '999', 200, pagado='999', estado_pago='PAGADA')
+        self._venta(self.sur, '70', 120)
+
+        response = self.client.get('/api/ventas/cobranzas/antiguedad/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        norte, sur = response.data['clientes']
+        self.assertEqual(norte['cliente'], 'Norte SA')
+        self.assertEqual(
+            [norte[tramo] for tramo in response.data['tramos']],
+            ['250.00', '300.00', '400.00', '500.00'],
+        )
+        self.assertEqual(norte['saldo_total'], '1450.00')
+        self.assertEqual(norte['cantidad_ventas'], 5)
+        self.assertEqual(norte['dias_mas_antigua'], 91)
+        self.assertEqual(sur['cliente'], 'Sur')
+        self.assertEqual(sur['mas_90'], '70.00')
+        self.assertEqual(response.data['totales']['mas_90'], '570.00')
+        self.assertEqual(response.data['totales']['saldo_total'], '1520.00')
+
+        response = self.client.get('/api/ventas/cobranzas/antiguedad/', {'localidad': 'lobos'})
+        self.assertEqual([c['cliente_id'] for c in response.data['clientes']], [self.sur.id])
+
+        # Con otra fecha de referencia cambian los tramos
+        response = self.client.get(
+            '/api/ventas/cobranzas/antiguedad/',
+            {'cliente': self.sur.id, 'fecha': (self.hoy - timedelta(days=60)).isoformat()},
+        )
+        self.assertEqual(response.data['clientes'][0]['31_60'], '70.00')
+
+    def test_parametros_invalidos(self):
+        response = self.client.get('/api/ventas/cobranzas/antiguedad/', {'fecha': '31/12/2025'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/ventas/cobranzas/antiguedad/', {'cliente': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ClasificacionCobranzaTest(APITestCase):
+    """Pruebas de los días de atraso y la urgencia guardados en Venta"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(nombre_fantasia="Cliente", identificacion="1")
+
+    def _venta(self, dias_vencida, total='100'):
+        return Venta.objects.create(
+            cliente=self.cliente, total=Decimal(total),
+            fecha_vencimiento=self.hoy - timedelta(days=dias_vencida),
+        )
+
+    def test_clasificacion_al_guardar_y_al_pagar(self):
+        venta = self._venta(40)
+        venta.refresh_from_db()
+        self.assertEqual(venta.dias_vencimiento, 40)
+        self.assertEqual(venta.urgencia_cobranza, Venta.UrgenciaCobranza.ALTA)
+
+        venta.aplicar_pago(Decimal('30'))
+        venta.refresh_from_db()
+        self.assertEqual(venta.urgencia_cobranza, Venta.UrgenciaCobranza.ALTA)
+
+        venta.aplicar_pago(Decimal('70'))
+        venta.refresh_from_db()
+        self.assertEqual(venta.estado_pago, Venta.EstadoPago.PAGADA)
+        self.assertEqual(venta.dias_vencimiento, 0)
+        self.assertEqual(venta.urgencia_cobranza, Venta.UrgenciaCobranza.BAJA)
+
+        por_vencer = self._venta(-5)
+        por_vencer.refresh_from_db()
+        self.assertEqual((por_vencer.dias_vencimiento, por_vencer.urgencia_cobranza), (0, 'BAJA'))
+
+    def test_comando_diario_coincide_con_la_clasificacion(self):
+        ventas = [self._venta(dias) for dias in (-3, 0, 1, 7, 8, 30, 31, 400)]
+        anulada = self._venta(50)
+        Venta.objects.filter(pk=anulada.pk).update(anulada=True)
+
+        manana = self.hoy + timedelta(days=1)
+        salida = StringIO()
+        call_command('actualizar_cobranzas', '--fecha', manana.isoformat(), stdout=salida)
+        self.assertIn('Cobranzas actualizadas', salida.getvalue())
+
+        for venta in ventas + [anulada]:
+            venta.refresh_from_db()
+            self.assertEqual(
+                (venta.dias_vencimiento, venta.urgencia_cobranza), cobranzas.clasificar(venta, hoy=manana)
+            )
+        self.assertEqual(
+            [venta.urgencia_cobranza for venta in ventas],
+            ['BAJA', 'BAJA', 'BAJA', 'MEDIA', 'MEDIA', 'ALTA', 'ALTA', 'ALTA'],
+        )
+        self.assertEqual((anulada.dias_vencimiento, anulada.urgencia_cobranza), (0, 'BAJA'))
+
+        # Sólo se tocan las vencidas: ni la que vence más adelante ni la anulada
+        self.assertEqual(cobranzas.actualizar(Venta.objects.all(), hoy=manana), 7)
+
+    def test_listados_paginados(self):
+        for dias in (5, 45, 90):
+            self._venta(dias)
+        pagada = self._venta(60)
+        pagada.aplicar_pago(Decimal('100'))
+
+        response = self.client.get('/api/ventas/cobranzas/urgentes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([v['dias_vencimiento'] for v in response.data['results']], [90, 45])
+        self.assertTrue(response.data['results'][0]['esta_vencido'])
+
+        response = self.client.get('/api/ventas/cobranzas/vencidas/')
+        self.assertEqual([v['dias_vencimiento'] for v in response.data['results']], [90, 45, 5])
+
+        response = self.client.get('/api/ventas/cobranzas/pendientes/')
+        self.assertEqual(response.data['count'], 3)
+
+        response = self.client.get('/api/ventas/cobranzas/resumen/')
+        self.assertEqual(response.data['pendientes'], 3)
+        self.assertEqual(response.data['urgentes'], 2)
+        self.assertEqual(response.data['monto_pendiente_total'], Decimal('300'))
+        self.assertEqual(response.data['porcentaje_cobranza'], 25)
+
+
+class LoteVentasTest(APITestCase):
+    """Pruebas del alta de ventas en lote con claves de idempotencia"""
+
+    url = '/api/ventas/lote/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            nivel_acceso=User.NivelAcceso.ADMIN_TOTAL
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cliente = Cliente.objects.create(nombre_fantasia="Cliente", identificacion="1")
+        self.producto = Producto.objects.create(nombre="Queso", stock=Decimal('10'), stock_kg=Decimal('20'))
+        self.periodo = PeriodoIVA.obtener_o_crear_periodo_actual()
+
+    def _venta(self, clave, cantidad='1', kg='2', precio='100', **kwargs):
+        return {
+            'clave': clave,
+            'cliente': self.cliente.id,
+            'lineas': [{
+                'producto': self.producto.id, 'descripcion': 'Queso',
+                'cantidad': cantidad, 'cantidad_kg': kg, 'precio_unitario': precio,
+            }],
+            **kwargs,
+        }
+
+    def test_lote_con_rechazos_y_reintento(self):
+        vencimiento = (date.today() - timedelta(days=10)).isoformat()
+        pedido = [
+            self._venta('a-1', incluye_iva=True),
+            self._venta('a-2', cantidad='8', kg='15', fecha_vencimiento=vencimiento),
+            # Sin stock después de las dos anteriores
+            self._venta('a-3', cantidad='2'),
+            self._venta('a-1'),
+            {'clave': 'a-4', 'cliente': self.cliente.id, 'lineas': []},
+            self._venta('a-5', cliente=999),
+        ]
+        response = self.client.post(self.url, {'ventas': pedido}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['creadas'], response.data['rechazadas']), (2, 4))
+        estados = [resultado['estado'] for resultado in response.data['resultados']]
+        self.assertEqual(estados, ['creada', 'creada', 'rechazada', 'rechazada', 'rechazada', 'rechazada'])
+        self.assertIn('Stock insuficiente en unidades', response.data['resultados'][2]['errores']['non_field_errors'][0])
+        self.assertIn('lineas', response.data['resultados'][4]['errores'])
+
+        primera = Venta.objects.get(clave_idempotencia='a-1')
+        self.assertEqual((primera.subtotal, primera.iva_monto, primera.total), (Decimal('200.00'), Decimal('42.00'), Decimal('242.00')))
+        self.assertEqual(primera.lineas.count(), 1)
+        segunda = Venta.objects.get(clave_idempotencia='a-2')
+        self.assertEqual(segunda.dias_vencimiento, 10)
+        self.assertEqual(segunda.urgencia_cobranza, Venta.UrgenciaCobranza.MEDIA)
+
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock, self.producto.stock_kg), (Decimal('1.00'), Decimal('3.000')))
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.iva_debito_fiscal, Decimal('42.00'))
+        saldos = MovimientoCuentaCorriente.objects.filter(cliente=self.cliente).order_by('id').values_list('saldo', flat=True)
+        self.assertEqual(list(saldos), [Decimal('242.00'), Decimal('1742.00')])
+
+        # Reintento del mismo lote: nada se duplica ni vuelve a descontar stock
+        response = self.client.post(self.url, {'ventas': pedido[:2]}, format='json')
+        self.assertEqual(response.data['existentes'], 2)
+        self.assertEqual(response.data['resultados'][0]['venta'], primera.id)
+        self.assertEqual(Venta.objects.count(), 2)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('1.00'))
+
+    def test_reintento_superpuesto_con_el_envio_original(self):
+        pedido = [self._venta('c-1'), self._venta('c-2', cantidad='2')]
+        lote.registrar(pedido)
+
+        # El reintento leyó las claves antes de que el envío original
+        # confirmara sus ventas: la primera lectura no las ve
+        leer_claves = lote._claves_existentes
+        lecturas = [{}]
+        with mock.patch.object(
+            lote, '_claves_existentes', side_effect=lambda claves: lecturas.pop() if lecturas else leer_claves(claves),
+        ):
+            resultados = lote.registrar(pedido)
+
+        originales = dict(Venta.objects.values_list('clave_idempotencia', 'id'))
+        self.assertEqual(resultados, [
+            {'clave': 'c-1', 'estado': lote.EXISTENTE, 'venta': originales['c-1']},
+            {'clave': 'c-2', 'estado': lote.EXISTENTE, 'venta': originales['c-2']},
+        ])
+        self.assertEqual(Venta.objects.count(), 2)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('7.00'))
+        self.assertEqual(MovimientoCuentaCorriente.objects.filter(cliente=self.cliente).count(), 2)
+
+    def test_lote_invalido(self):
+        self.assertEqual(self.client.post(self.url, {'ventas': []}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        pedido = [self._venta(f'b-{i}') for i in range(lote.MAX_VENTAS + 1)]
+        response = self.client.post(self.url, {'ventas': pedido}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
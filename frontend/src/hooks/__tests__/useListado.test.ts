@@ -0,0 +1,49 @@
+import { act, renderHook, waitFor } from "@testing-library/react";
+import { useListado } from "@/hooks/useListado";
+
+const mockRequest = vi.fn();
+
+vi.mock("@/hooks/useApi", () => ({
+  useApi: () => ({
+    request: mockRequest
+  })
+}));
+
+describe("useListado", () => {
+  beforeEach(() => {
+    mockRequest.mockReset();
+  });
+
+  it("carga sólo la primera página y las siguientes con cargarMas", async () => {
+    const siguiente = "http://localhost:8000/api/finanzas/movimientos/gastos/?cursor=abc";
+    mockRequest
+      .mockResolvedValueOnce({ next: siguiente, previous: null, results: [{ id: 2 }, { id: 1 }] })
+      .mockResolvedValueOnce({ next: null, previous: null, results: [{ id: 0 }] });
+
+    const { result } = renderHook(() => useListado<{ id: number }>("/finanzas/movimientos/gastos/"));
+
+    await waitFor(() => expect(result.current.cargando).toBe(false));
+    expect(result.current.datos.map((fila) => fila.id)).toEqual([2, 1]);
+    expect(result.current.hayMas).toBe(true);
+    expect(mockRequest).toHaveBeenCalledTimes(1);
+
+    await act(async () => {
+      await result.current.cargarMas();
+    });
+
+    expect(result.current.datos.map((fila) => fila.id)).toEqual([2, 1, 0]);
+    expect(result.current.hayMas).toBe(false);
+    expect(mockRequest).toHaveBeenLastCalledWith({ method: "GET", url: siguiente });
+  });
+
+  it("acepta respuestas sin paginar", async () => {
+    mockRequest.mockResolvedValueOnce([{ id: 1 }]);
+
+    const { result } = renderHook(() => useListado<{ id: number }>("/clientes/"));
+
+    await waitFor(() => expect(result.current.cargando).toBe(false));
+    expect(result.current.datos).toEqual([{ id: 1 }]);
+    expect(result.current.hayMas).toBe(false);
+    expect(mockRequest).toHaveBeenCalledTimes(1);
+  });
+});
@@ -1,5 +1,6 @@
 ﻿import { useCallback, useEffect, useState } from "react";
 import type { ApiError } from "@/lib/api/types";
+import type { RespuestaPaginada } from "@/types/mipyme";
 import { useApi } from "./useApi";
 
 type EstadoListado<T> = {
@@ -7,6 +8,27 @@ type EstadoListado<T> = {
   cargando: boolean;
   error: ApiError | null;
   recargar: () => Promise<void>;
+  // Listados paginados: se carga la primera página y las siguientes a pedido
+  hayMas: boolean;
+  cargandoMas: boolean;
+  cargarMas: () => Promise<void>;
+};
+
+// Manejar respuestas paginadas (con results) y respuestas directas (array)
+const leerRespuesta = <T>(respuesta: T[] | RespuestaPaginada<T>): { filas: T[]; siguiente: string | null } => {
+  if (Array.isArray(respuesta)) {
+    // Respuesta directa como array
+    return { filas: respuesta, siguiente: null };
+  }
+  if (respuesta && typeof respuesta === 'object' && 'results' in respuesta) {
+    // Respuesta paginada con formato { count?, next, previous, results }
+    return {
+      filas: Array.isArray(respuesta.results) ? respuesta.results : [],
+      siguiente: respuesta.next ?? null
+    };
+  }
+  // Fallback a array vacío
+  return { filas: [], siguiente: null };
 };
 
 export const useListado = <T>(endpoint: string | null): EstadoListado<T> => {
@@ -14,48 +36,64 @@ export const useListado = <T>(endpoint: string | null): EstadoListado<T> => {
   const [datos, setDatos] = useState<T[]>([]);
   const [cargando, setCargando] = useState<boolean>(true);
   const [error, setError] = useState<ApiError | null>(null);
+  const [siguiente, setSiguiente] = useState<string | null>(null);
+  const [cargandoMas, setCargandoMas] = useState<boolean>(false);
 
   const cargar = useCallback(async () => {
     // Si no hay endpoint (null), no hacer nada
     if (!endpoint) {
       setCargando(false);
       setDatos([]);
+      setSiguiente(null);
       return;
     }
 
     setCargando(true);
     setError(null);
     try {
-      const respuesta = await request<T[] | { results: T[] }>({
+      const respuesta = await request<T[] | RespuestaPaginada<T>>({
         method: "GET",
         url: endpoint
       });
       console.log(`[useListado] ${endpoint} respuesta:`, respuesta);
 
-      // Manejar respuestas paginadas (con results) y respuestas directas (array)
-      let nuevoDatos: T[];
-      if (Array.isArray(respuesta)) {
-        // Respuesta directa como array
-        nuevoDatos = respuesta;
-      } else if (respuesta && typeof respuesta === 'object' && 'results' in respuesta) {
-        // Respuesta paginada con formato { count, next, previous, results }
-        nuevoDatos = Array.isArray(respuesta.results) ? respuesta.results : [];
-      } else {
-        // Fallback a array vacío
-        nuevoDatos = [];
-      }
-
-      console.log(`[useListado] ${endpoint} estableciendo datos:`, nuevoDatos);
-      setDatos(nuevoDatos);
+      const { filas, siguiente: proxima } = leerRespuesta(respuesta);
+      console.log(`[useListado] ${endpoint} estableciendo datos:`, filas);
+      setDatos(filas);
+      setSiguiente(proxima);
     } catch (err) {
       console.error(`[useListado] ${endpoint} error:`, err);
       setError(err as ApiError);
       setDatos([]); // En caso de error, resetear a array vacío
+      setSiguiente(null);
     } finally {
       setCargando(false);
     }
   }, [endpoint, request]);
 
+  // Agrega la página siguiente (URL `next` de la respuesta anterior)
+  const cargarMas = useCallback(async () => {
+    if (!siguiente) {
+      return;
+    }
+
+    setCargandoMas(true);
+    try {
+      const respuesta = await request<T[] | RespuestaPaginada<T>>({
+        method: "GET",
+        url: siguiente
+      });
+      const { filas, siguiente: proxima } = leerRespuesta(respuesta);
+      setDatos((actuales) => [...actuales, ...filas]);
+      setSiguiente(proxima);
+    } catch (err) {
+      console.error(`[useListado] ${siguiente} error:`, err);
+      setError(err as ApiError);
+    } finally {
+      setCargandoMas(false);
+    }
+  }, [siguiente, request]);
+
   useEffect(() => {
     void cargar();
   }, [cargar]);
@@ -64,6 +102,9 @@ export const useListado = <T>(endpoint: string | null): EstadoListado<T> => {
     datos,
     cargando,
     error,
-    recargar: cargar
+    recargar: cargar,
+    hayMas: siguiente !== null,
+    cargandoMas,
+    cargarMas
   };
 };
@@ -145,7 +145,10 @@ const FinanzasPage = () => {
     datos: movimientosData,
     cargando: cargandoMovimientos,
     error: errorMovimientos,
-    recargar: recargarMovimientos
+    recargar: recargarMovimientos,
+    hayMas: hayMasMovimientos,
+    cargandoMas: cargandoMasMovimientos,
+    cargarMas: cargarMasMovimientos
   } = useListado<MovimientoFinanciero>("/finanzas/movimientos/efectivo-real/");
 
   const pagos = Array.isArray(pagosData) ? pagosData : [];
@@ -168,7 +171,10 @@ const FinanzasPage = () => {
     datos: gastos,
     cargando: cargandoGastos,
     error: errorGastos,
-    recargar: recargarGastos
+    recargar: recargarGastos,
+    hayMas: hayMasGastos,
+    cargandoMas: cargandoMasGastos,
+    cargarMas: cargarMasGastos
   } = useListado<MovimientoFinanciero>(gastosEndpoint);
 
   const { request } = useApi();
@@ -1256,6 +1262,16 @@ const FinanzasPage = () => {
                   </li>
                 ))}
               </ul>
+              {hayMasGastos && (
+                <button
+                  type="button"
+                  onClick={() => void cargarMasGastos()}
+                  disabled={cargandoMasGastos}
+                  className="mt-3 w-full rounded-lg border border-slate-200 dark:border-slate-600 px-3 py-2 text-sm font-semibold text-slate-600 dark:text-slate-300 hover:bg-slate-50 dark:hover:bg-slate-700 disabled:opacity-50"
+                >
+                  {cargandoMasGastos ? "Cargando..." : "Cargar más gastos"}
+                </button>
+              )}
             </div>
           )}
         </article>
@@ -1301,6 +1317,16 @@ const FinanzasPage = () => {
                   </li>
                 ))}
               </ul>
+              {hayMasMovimientos && (
+                <button
+                  type="button"
+                  onClick={() => void cargarMasMovimientos()}
+                  disabled={cargandoMasMovimientos}
+                  className="mt-3 w-full rounded-lg border border-slate-200 dark:border-slate-600 px-3 py-2 text-sm font-semibold text-slate-600 dark:text-slate-300 hover:bg-slate-50 dark:hover:bg-slate-700 disabled:opacity-50"
+                >
+                  {cargandoMasMovimientos ? "Cargando..." : "Cargar más movimientos"}
+                </button>
+              )}
             </div>
           )}
         </article>
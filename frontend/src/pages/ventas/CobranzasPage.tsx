@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { useApi } from "@/hooks/useApi";
-import type { Venta } from "@/types/mipyme";
+import type { RespuestaPaginada, VentaCobranza } from "@/types/mipyme";
 
 const formatearMoneda = (valor: number) => {
   return new Intl.NumberFormat('es-AR', {
@@ -47,11 +47,15 @@ const getUrgenciaColor = (urgencia: string) => {
 type TabType = 'pendientes' | 'vencidas' | 'urgentes' | 'resumen';
 
 export default function CobranzasPage() {
-  const api = useApi();
+  const { request } = useApi();
   const [activeTab, setActiveTab] = useState<TabType>('pendientes');
-  const [ventas, setVentas] = useState<Venta[]>([]);
+  const [ventas, setVentas] = useState<VentaCobranza[]>([]);
+  // Los listados de cobranzas vienen paginados: total de la pestaña y URL de la página siguiente
+  const [total, setTotal] = useState<number | null>(null);
+  const [siguiente, setSiguiente] = useState<string | null>(null);
   const [resumen, setResumen] = useState<any>(null);
   const [loading, setLoading] = useState(false);
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   const cargarDatos = async () => {
@@ -62,26 +66,30 @@ export default function CobranzasPage() {
       let endpoint = '';
       switch (activeTab) {
         case 'pendientes':
-          endpoint = '/api/ventas/cobranzas/pendientes/';
+          endpoint = '/ventas/cobranzas/pendientes/';
           break;
         case 'vencidas':
-          endpoint = '/api/ventas/cobranzas/vencidas/';
+          endpoint = '/ventas/cobranzas/vencidas/';
           break;
         case 'urgentes':
-          endpoint = '/api/ventas/cobranzas/urgentes/';
+          endpoint = '/ventas/cobranzas/urgentes/';
           break;
         case 'resumen':
-          endpoint = '/api/ventas/cobranzas/resumen/';
+          endpoint = '/ventas/cobranzas/resumen/';
           break;
       }
 
-      const response = await api.get(endpoint);
-
       if (activeTab === 'resumen') {
+        const response = await request<any>({ method: 'GET', url: endpoint });
         setResumen(response);
         setVentas([]);
+        setTotal(null);
+        setSiguiente(null);
       } else {
-        setVentas(response);
+        const response = await request<RespuestaPaginada<VentaCobranza>>({ method: 'GET', url: endpoint });
+        setVentas(response.results);
+        setTotal(response.count ?? response.results.length);
+        setSiguiente(response.next);
         setResumen(null);
       }
     } catch (err: any) {
@@ -91,9 +99,25 @@ export default function CobranzasPage() {
     }
   };
 
+  const cargarMas = async () => {
+    if (!siguiente) {
+      return;
+    }
+    setCargandoMas(true);
+    try {
+      const response = await request<RespuestaPaginada<VentaCobranza>>({ method: 'GET', url: siguiente });
+      setVentas((actuales) => [...actuales, ...response.results]);
+      setSiguiente(response.next);
+    } catch (err: any) {
+      setError(err.message || 'Error al cargar los datos');
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   const marcarRecordatorio = async (ventaId: number) => {
     try {
-      await api.post(`/api/ventas/${ventaId}/marcar-recordatorio/`);
+      await request({ method: 'POST', url: `/ventas/${ventaId}/marcar-recordatorio/` });
       await cargarDatos(); // Recargar datos
     } catch (err: any) {
       setError(err.message || 'Error al marcar recordatorio');
@@ -105,9 +129,9 @@ export default function CobranzasPage() {
   }, [activeTab]);
 
   const tabs = [
-    { key: 'pendientes' as TabType, label: 'Pendientes', count: ventas.length },
-    { key: 'vencidas' as TabType, label: 'Vencidas', count: ventas.length },
-    { key: 'urgentes' as TabType, label: 'Urgentes', count: ventas.length },
+    { key: 'pendientes' as TabType, label: 'Pendientes', count: activeTab === 'pendientes' ? total : null },
+    { key: 'vencidas' as TabType, label: 'Vencidas', count: activeTab === 'vencidas' ? total : null },
+    { key: 'urgentes' as TabType, label: 'Urgentes', count: activeTab === 'urgentes' ? total : null },
     { key: 'resumen' as TabType, label: 'Resumen', count: null }
   ];
 
@@ -318,6 +342,21 @@ export default function CobranzasPage() {
               </p>
             </div>
           )}
+
+          {siguiente && (
+            <div className="flex items-center justify-between px-6 py-3 border-t border-gray-200 dark:border-gray-700">
+              <span className="text-sm text-gray-500 dark:text-gray-400">
+                {total !== null ? `Mostrando ${ventas.length} de ${total}` : `Mostrando ${ventas.length}`}
+              </span>
+              <button
+                onClick={cargarMas}
+                disabled={cargandoMas}
+                className="text-sm font-medium text-blue-600 hover:text-blue-900 disabled:opacity-50 dark:text-blue-400 dark:hover:text-blue-300"
+              >
+                {cargandoMas ? 'Cargando...' : 'Cargar más'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
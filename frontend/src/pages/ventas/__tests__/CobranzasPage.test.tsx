@@ -0,0 +1,74 @@
+import { render, screen, waitFor } from "@testing-library/react";
+import userEvent from "@testing-library/user-event";
+import CobranzasPage from "@/pages/ventas/CobranzasPage";
+import type { RespuestaPaginada, VentaCobranza } from "@/types/mipyme";
+
+const mockRequest = vi.fn();
+
+vi.mock("@/hooks/useApi", () => ({
+  useApi: () => ({
+    request: mockRequest
+  })
+}));
+
+const venta = (id: number): VentaCobranza => ({
+  id,
+  fecha: "2025-09-01",
+  numero: `V-${id}`,
+  cliente: 1,
+  cliente_nombre: `Cliente ${id}`,
+  incluye_iva: false,
+  subtotal: "100.00",
+  iva_monto: "0.00",
+  total: "100.00",
+  lineas: [],
+  estado_pago: "PENDIENTE",
+  fecha_vencimiento: null,
+  dias_vencimiento: 0,
+  urgencia_cobranza: "BAJA",
+  saldo_pendiente: "100.00",
+  esta_vencido: false,
+  puede_enviar_recordatorio: false
+});
+
+describe("CobranzasPage", () => {
+  const siguiente = "http://localhost:8000/api/ventas/cobranzas/pendientes/?page=2";
+
+  beforeEach(() => {
+    mockRequest.mockReset();
+    mockRequest.mockImplementation(({ url }: { url: string }) => {
+      if (url === "/ventas/cobranzas/pendientes/") {
+        return Promise.resolve({
+          count: 3,
+          next: siguiente,
+          previous: null,
+          results: [venta(1), venta(2)]
+        } satisfies RespuestaPaginada<VentaCobranza>);
+      }
+      if (url === siguiente) {
+        return Promise.resolve({
+          count: 3,
+          next: null,
+          previous: "http://localhost:8000/api/ventas/cobranzas/pendientes/",
+          results: [venta(3)]
+        } satisfies RespuestaPaginada<VentaCobranza>);
+      }
+      return Promise.reject(new Error(`Endpoint no mockeado: ${url}`));
+    });
+  });
+
+  it("muestra la primera página de pendientes y carga las siguientes", async () => {
+    render(<CobranzasPage />);
+
+    expect(await screen.findByText("Cliente 1")).toBeInTheDocument();
+    expect(screen.getByText("Cliente 2")).toBeInTheDocument();
+    expect(screen.getByText("Mostrando 2 de 3")).toBeInTheDocument();
+
+    await userEvent.click(screen.getByRole("button", { name: "Cargar más" }));
+
+    expect(await screen.findByText("Cliente 3")).toBeInTheDocument();
+    expect(screen.getByText("Cliente 1")).toBeInTheDocument();
+    await waitFor(() => expect(screen.queryByRole("button", { name: "Cargar más" })).not.toBeInTheDocument());
+    expect(mockRequest).toHaveBeenLastCalledWith({ method: "GET", url: siguiente });
+  });
+});
@@ -120,6 +120,24 @@ export interface Venta {
   lineas: LineaVenta[];
 }
 
+export interface VentaCobranza extends Venta {
+  estado_pago: string;
+  fecha_vencimiento: string | null;
+  dias_vencimiento: number;
+  urgencia_cobranza: string;
+  saldo_pendiente: string;
+  esta_vencido: boolean;
+  puede_enviar_recordatorio: boolean;
+}
+
+// Respuesta de los listados paginados del backend (count sólo en paginación por número de página)
+export interface RespuestaPaginada<T> {
+  count?: number;
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 export interface CompraLinea {
   id: number;
   materia_prima: number | null;
@@ -256,18 +274,24 @@ export interface ReporteRentabilidadProducto {
   producto_id: number;
   producto_nombre: string;
   producto_sku: string;
+  periodo: string | null;
   total_vendido: number;
   cantidad_vendida: number;
   ventas_count: number;
   precio_promedio: number;
   costo_estimado: number;
+  costo_total: number;
+  costo_fuente: 'salidas' | 'lotes' | 'sin_costo';
   margen_bruto: number;
+  margen_total: number;
   margen_porcentaje: number;
 }
 
 export interface ResumenRentabilidadProductos {
   total_productos: number;
   total_vendido: number;
+  total_costo: number;
+  productos_sin_costo: number;
   margen_promedio: number;
 }
 
@@ -275,6 +299,7 @@ export interface ReporteRentabilidadProductosResponse {
   periodo: {
     fecha_desde: string | null;
     fecha_hasta: string | null;
+    agrupacion: 'mes' | 'trimestre' | 'anio' | null;
   };
   productos: ReporteRentabilidadProducto[];
   resumen: ResumenRentabilidadProductos;